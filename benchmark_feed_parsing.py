@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フィード解析ベンチマーク
+fixtures/feeds/ のフィード（Google News / はてなブックマーク RDF・検索 / FIND to DO ブログ /
+Google Trends / GitHub Atom）について、従来の「全体を ET.fromstring → findall」する解析と
+utils.feeds.parse_feed の所要時間を、全件（従来(全件) / 全件）と呼び出し側の件数指定（従来 / 件数指定）で比較する
+
+使い方:
+    python benchmark_feed_parsing.py [繰り返し回数]
+"""
+
+import glob
+import re
+import sys
+import os
+import time
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.feeds import parse_feed, clean_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'feeds')
+
+# 呼び出し側で実際に使う件数（Google News 5件 / はてな検索 3件 / はてなカテゴリ 4件 など）
+TYPICAL_LIMITS = {
+    'google_news_search.xml': 5,
+    'hatena_search.xml': 3,
+    'hatena_hotentry_it.rdf': 4,
+    'google_trends_daily.xml': None,
+    'find_to_do_blog.xml': None,
+    'github_releases.atom': 5,
+}
+
+_NAMESPACES = {'rss': 'http://purl.org/rss/1.0/', 'atom': 'http://www.w3.org/2005/Atom'}
+
+
+def legacy_parse(content: str, limit=None) -> list:
+    """従来方式：文書全体を木にしてから item を探し、説明文を都度の正規表現で整形"""
+    root = ET.fromstring(content)
+    prefix = ''
+    items = root.findall('.//item')
+    if not items:
+        prefix = 'rss:'
+        items = root.findall('.//rss:item', _NAMESPACES)
+    if not items:
+        prefix = 'atom:'
+        items = root.findall('.//atom:entry', _NAMESPACES)
+    results = []
+    for item in items[:limit]:
+        title = item.find(f'{prefix}title', _NAMESPACES)
+        description = item.find(f'{prefix}summary' if prefix == 'atom:' else f'{prefix}description', _NAMESPACES)
+        text = description.text if description is not None and description.text else ''
+        text = re.sub(r'<[^>]+>', '', text)
+        text = re.sub(r'\s+', ' ', text).strip()
+        results.append((title.text if title is not None else '', text))
+    return results
+
+
+def measure(func, repeat: int) -> float:
+    """最速値（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*')))
+    if not paths:
+        print(f"フィクスチャが見つかりません: {FIXTURE_DIR}")
+        return
+
+    print("🚀 フィード解析ベンチマーク")
+    print("=" * 100)
+    print(f"{'フィード':<26}{'サイズ':>8}{'件数':>6}{'従来(全件)':>12}{'全件':>10}{'従来':>10}{'件数指定':>12}{'短縮率':>10}")
+
+    total_legacy = total_limited = 0.0
+    for path in paths:
+        name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        text = data.decode('utf-8')
+        limit = TYPICAL_LIMITS.get(name)
+
+        count = len(parse_feed(data))
+        legacy_full = measure(lambda: legacy_parse(text), repeat)
+        legacy = measure(lambda: legacy_parse(text, limit), repeat)
+        full = measure(lambda: [clean_html(item.description) for item in parse_feed(data)], repeat)
+        limited = measure(lambda: [clean_html(item.description) for item in parse_feed(data, limit=limit)], repeat)
+        total_legacy += legacy
+        total_limited += limited
+
+        limit_label = f"{limited * 1000:.2f}ms" + (f"({limit})" if limit else "")
+        print(f"{name:<26}{len(data) / 1024:>6.0f}KB{count:>6}{legacy_full * 1000:>10.2f}ms{full * 1000:>8.2f}ms"
+              f"{legacy * 1000:>8.2f}ms{limit_label:>12}{legacy / limited:>9.1f}倍")
+
+    print("-" * 100)
+    print(f"合計: 従来 {total_legacy * 1000:.2f}ms → 件数指定 {total_limited * 1000:.2f}ms "
+          f"({total_legacy / total_limited:.1f}倍)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キーワードカテゴリ判定ベンチマーク
+従来の「キーワードごとに `in` 判定」と KeywordMatcher（Aho-Corasick 1回走査）を
+同じ記事群で比較する
+
+使い方:
+    python benchmark_keyword_matcher.py [記事数]
+"""
+
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.keyword_matcher import KeywordMatcher
+from utils.enhanced_trends_manager import EnhancedTrendsManager
+
+
+def legacy_categorize(category_keywords, text):
+    """従来のカテゴリ判定"""
+    combined_text = text.lower()
+    category, max_matches = '一般', 0
+    for cat, keywords in category_keywords.items():
+        matches = sum(1 for keyword in keywords if keyword.lower() in combined_text)
+        if matches > max_matches:
+            max_matches = matches
+            category = cat
+    return category, max_matches
+
+
+def make_articles(category_keywords, count, seed=0):
+    """タイトル＋説明文相当の長さのテキストを生成"""
+    rng = random.Random(seed)
+    keywords = [keyword for words in category_keywords.values() for keyword in words]
+    filler = ("the a new release of with for and to in on how we built using "
+              "開発 記事 まとめ 入門 解説 実践 チーム 導入 事例 比較").split()
+    articles = []
+    for _ in range(count):
+        words = [rng.choice(keywords) if rng.random() < 0.15 else rng.choice(filler)
+                 for _ in range(rng.randint(10, 60))]
+        articles.append(" ".join(words))
+    return articles
+
+
+def measure(func, articles, repeat=3):
+    """最速値（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in articles:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    category_keywords = EnhancedTrendsManager().category_keywords
+    keyword_total = sum(len(words) for words in category_keywords.values())
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(category_keywords)
+    build_time = time.perf_counter() - start
+
+    articles = make_articles(category_keywords, count)
+    average_length = sum(map(len, articles)) / len(articles)
+
+    print("🚀 キーワードカテゴリ判定ベンチマーク")
+    print("=" * 60)
+    print(f"記事数: {count}件 / 平均 {average_length:.0f}文字 / キーワード {keyword_total}語")
+    print(f"オートマトン構築: {build_time * 1000:.2f}ms（起動時に1回）")
+
+    legacy = measure(lambda text: legacy_categorize(category_keywords, text), articles)
+    compiled = measure(matcher.best_category, articles)
+    print(f"\n⏱️ 従来（キーワードごとに in 判定）: {legacy * 1000:.1f}ms ({legacy / count * 1e6:.1f}µs/件)")
+    print(f"⏱️ KeywordMatcher:                  {compiled * 1000:.1f}ms ({compiled / count * 1e6:.1f}µs/件)")
+    print(f"📈 短縮率: {legacy / compiled:.1f}倍")
+
+    changed = sum(
+        1 for text in articles
+        if (matcher.best_category(text)[0] or '一般') != legacy_categorize(category_keywords, text)[0]
+    )
+    print(f"\n🔍 単語境界により判定が変わった記事: {changed}件 / {count}件")
+
+
+if __name__ == "__main__":
+    main()
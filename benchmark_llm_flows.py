@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM機能ベンチマーク
+ローカルの偽モデルサーバー（utils/fake_llm_server.py）に対して Gemini を使う各機能を同時に動かし、
+1件あたりの所要時間（p50 / p95 / 最大）・スループット・イベントループの最大遅延を測る。
+最後に機能ごとのモデル呼び出しの記録（utils/llm_metrics.py）も表示する。APIキーとクォータは不要
+
+- reply: メンションへの返信（GeminiChat.get_response、ユーザーごとのセッション）
+- character_reply: AIキャラクターへのリプライ（GeminiChat.get_ai_character_response）
+- conversation: 会話台本の一括生成（ConversationPlanner.plan。偽サーバーは台本どおりのJSONを返す）
+- channel_intro: チャンネル紹介のトーク（ChannelIntroCog.get_gemini_talks。応答キャッシュあり）
+- feedback: 告知へのフィードバック（AnnouncementDetector.generate_feedback。LLMは呼ばない）
+
+使い方:
+    python benchmark_llm_flows.py [--requests 40] [--concurrency 10] [--latency 0.5]
+                                  [--rate-limit 0.05] [--error-rate 0.05] [--rpm 0]
+                                  [--flows reply,conversation]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import warnings
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+from cogs.announcement_detector import AnnouncementDetector
+from cogs.channel_intro import ChannelIntroCog
+from lib.gemini_chat import GeminiChat, TIMEOUT_MESSAGE
+from lib.llm_backend import GeminiBackend
+from models.ai_character import AICharacterManager
+from utils.chat_session_store import ChatSessionStore
+from utils.conversation_planner import ConversationPlanner, ConversationStep
+from utils.fake_llm_server import FakeLLMServer
+from utils.llm_cache import LLMResponseCache
+from utils.llm_metrics import LLMMetrics
+from utils.llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE
+
+FLOWS = ['reply', 'character_reply', 'conversation', 'channel_intro', 'feedback']
+
+# 会話台本プロンプトの「会話の流れ」の行（"1. ai_sato（佐藤健太）: 指示"）
+_STEP_RE = re.compile(r'^(\d+)\. (\S+?)（', re.MULTILINE)
+
+ANNOUNCEMENT = ("【勉強会のお知らせ】7月12日(土) 14:00〜 オンラインでPython勉強会を開催します！"
+                "参加はこちら https://example.com/event LINEオープンチャットもあります")
+
+
+def script_responder(prompt: str, body: dict):
+    """会話台本の依頼には、流れの話者どおりのJSONを返す"""
+    config = body.get('generationConfig') or {}
+    if not config.get('responseSchema'):
+        return None
+    lines = [{'step': int(number), 'speaker': speaker, 'text': f"{number}番目の発言です。話題について話しますね。"}
+             for number, speaker in _STEP_RE.findall(prompt)]
+    return json.dumps({'lines': lines}, ensure_ascii=False)
+
+
+def percentile(values: list, ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """interval 秒ごとに起きて、予定時刻からの最大の遅れを返す"""
+    max_lag = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - expected)
+    return max_lag
+
+
+async def run_flow(name: str, call, requests: int, concurrency: int) -> dict:
+    """call(番号) を requests 回、最大 concurrency 件同時に実行して計測する。call は成功したかを返す"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await call(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                failures += 1
+
+    stop = asyncio.Event()
+    monitor = asyncio.ensure_future(measure_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return {
+        'flow': name,
+        'requests': requests,
+        'failures': failures,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'max': max(latencies) if latencies else 0.0,
+        'throughput': requests / elapsed if elapsed else 0.0,
+        'loop_lag': await monitor,
+    }
+
+
+def build_flows(client: GeminiChat, planner: ConversationPlanner) -> dict:
+    """フローごとの呼び出し（番号 -> 成功したか）"""
+    characters = AICharacterManager().get_active_characters()
+    intro = ChannelIntroCog(None)
+    intro.gemini_chat = client
+    detector = AnnouncementDetector(None)
+    error_prefixes = (TIMEOUT_MESSAGE, "現在APIの使用制限", "Geminiとの通信でエラー")
+
+    async def reply(index: int) -> bool:
+        text = await client.get_response(f"bench_user_{index % 20}", f"こんにちは！{index}回目の質問です",
+                                         priority=PRIORITY_INTERACTIVE)
+        return not text.startswith(error_prefixes)
+
+    async def character_reply(index: int) -> bool:
+        character = characters[index % len(characters)]
+        text = await client.get_ai_character_response(
+            character.name, character.personality, character.speaking_style,
+            f"ユーザーから「{index}回目のリプライです」と返信されました", "",
+            priority=PRIORITY_INTERACTIVE
+        )
+        return not text.startswith(f"({character.name}")
+
+    async def conversation(index: int) -> bool:
+        speakers = [characters[(index + offset) % len(characters)] for offset in range(6)]
+        steps = [ConversationStep(speaker, 'reaction', "直前の発言に自分らしく反応する") for speaker in speakers]
+        lines = await planner.plan(f"ベンチマーク{index}の話題", steps)
+        sent = await planner.perform(lines, send=lambda line: asyncio.sleep(0), sleep=lambda seconds: asyncio.sleep(0))
+        return sent == len(steps) and not any(line.regenerated for line in lines)
+
+    async def channel_intro(index: int) -> bool:
+        # 生成に失敗しても定型文を返すので、失敗はサーバー側の集計で確認する
+        talks = await intro.get_gemini_talks()
+        return bool(talks)
+
+    async def feedback(index: int) -> bool:
+        return bool(await detector.generate_feedback(ANNOUNCEMENT, f"ユーザー{index}"))
+
+    return {'reply': reply, 'character_reply': character_reply, 'conversation': conversation,
+            'channel_intro': channel_intro, 'feedback': feedback}
+
+
+async def main(args):
+    server = FakeLLMServer(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit,
+                           error_rate=args.error_rate, responder=script_responder, seed=0)
+    url = server.start_in_thread()
+    # 送信ペースは --rpm（0は無制限）、429後の待機はベンチマーク向けに短くする
+    scheduler = LLMScheduler(requests_per_minute=args.rpm, max_concurrency=args.max_concurrency,
+                             backoff_base=args.backoff, backoff_max=args.backoff * 4)
+    client = GeminiChat(backend=GeminiBackend(api_key='fake-key', transport='rest',
+                                              client_options={'api_endpoint': url}),
+                        timeout=args.timeout, scheduler=scheduler,
+                        session_store=ChatSessionStore(persist=False),
+                        response_cache=LLMResponseCache(persist=False),
+                        metrics=LLMMetrics(persist=False))
+    planner = ConversationPlanner(client)
+    flows = build_flows(client, planner)
+
+    print(f"偽モデルサーバー: {url}（応答 {args.latency}±{args.jitter}秒, 429 {args.rate_limit:.0%}, "
+          f"500 {args.error_rate:.0%}）")
+    print(f"{args.requests}件 × 同時{args.concurrency}件, 送信レート {args.rpm or '無制限'}回/分, "
+          f"同時応答待ち上限 {args.max_concurrency}\n")
+    print(f"{'flow':<16}{'失敗':>6}{'p50(s)':>9}{'p95(s)':>9}{'max(s)':>9}{'件/秒':>9}{'ループ遅延(ms)':>16}")
+    for name in args.flows:
+        result = await run_flow(name, flows[name], args.requests, args.concurrency)
+        print(f"{result['flow']:<16}{result['failures']:>6}{result['p50']:>9.3f}{result['p95']:>9.3f}"
+              f"{result['max']:>9.3f}{result['throughput']:>9.2f}{result['loop_lag'] * 1000:>16.1f}")
+
+    print(f"\nサーバー: {server.stats}")
+    print(f"スケジューラー: {scheduler.stats()}")
+    print(f"会話台本: {planner.stats}")
+
+    print(f"\n{'feature':<24}{'呼出':>6}{'キャッシュ':>8}{'エラー':>6}{'入力tok':>9}{'出力tok':>9}{'p50(s)':>9}{'p95(s)':>9}")
+    for feature, stats in client.metrics.summary().items():
+        print(f"{feature:<24}{stats['calls']:>6}{stats['cache_hits']:>8}{stats['errors']:>6}{stats['prompt_tokens']:>9}"
+              f"{stats['completion_tokens']:>9}{stats['p50']:>9.3f}{stats['p95']:>9.3f}")
+    server.stop_thread()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gemini を使う機能のベンチマーク（偽モデルサーバー使用）")
+    parser.add_argument('--requests', type=int, default=40, help="フローごとの実行回数")
+    parser.add_argument('--concurrency', type=int, default=10, help="同時に実行する件数")
+    parser.add_argument('--latency', type=float, default=0.5, help="偽モデルの応答時間（秒）")
+    parser.add_argument('--jitter', type=float, default=0.2, help="応答時間のばらつき（±秒）")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="429を返す割合")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="500を返す割合")
+    parser.add_argument('--rpm', type=float, default=0, help="スケジューラーの送信レート（回/分、0は無制限）")
+    parser.add_argument('--max-concurrency', type=int, default=8, help="スケジューラーの同時応答待ち上限")
+    parser.add_argument('--backoff', type=float, default=0.5, help="429後の最初の待機（秒）")
+    parser.add_argument('--timeout', type=float, default=10, help="1回の呼び出しのタイムアウト（秒）")
+    parser.add_argument('--flows', default=','.join(FLOWS), help=f"実行するフロー（{','.join(FLOWS)}）")
+    args = parser.parse_args()
+    args.flows = [name for name in args.flows.split(',') if name]
+    unknown = [name for name in args.flows if name not in FLOWS]
+    if unknown:
+        parser.error(f"未対応のフロー: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Peatix解析ベンチマーク
+fixtures/peatix/ の検索結果ページ（article カード形式 / リンク親要素形式）について、
+従来の「BeautifulSoup(html.parser) で全体の木を作って article・リンクを探す」抽出と
+utils.peatix_parser.parse_peatix_cards（カード部分だけを逐次抽出）の所要時間とピークメモリを比較する
+
+使い方:
+    python benchmark_peatix_parsing.py [繰り返し回数]
+"""
+
+import glob
+import os
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+
+from utils.peatix_parser import parse_peatix_cards
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'peatix')
+
+# EventManager._parse_peatix_html が使う件数
+CARD_LIMIT = 5
+
+
+def legacy_parse(html: str, limit: int = CARD_LIMIT) -> list:
+    """従来方式：文書全体を木にしてから article（無ければ /event/ リンクの親要素）を探す"""
+    soup = BeautifulSoup(html, 'html.parser')
+    event_cards = soup.find_all('article')
+    if not event_cards:
+        event_cards = []
+        for link in soup.find_all('a', href=lambda x: x and '/event/' in x):
+            parent = link.find_parent(['div', 'li', 'article'])
+            if parent and parent not in event_cards:
+                event_cards.append(parent)
+
+    results = []
+    for card in event_cards[:limit]:
+        title = ''
+        title_elem = card.find(['h2', 'h3'])
+        if title_elem:
+            title = title_elem.get_text(strip=True)
+        url_elem = card.find('a', href=lambda x: x and '/event/' in x)
+        if not title and url_elem:
+            title = url_elem.get_text(strip=True)
+        url = url_elem['href'] if url_elem and url_elem.get('href') else ''
+
+        date_text = ''
+        for selector in ['time', '.date', '.schedule', '.event-date']:
+            elem = card.select_one(selector)
+            if elem:
+                date_text = elem.get_text(strip=True)
+                break
+        venue = ''
+        for selector in ['.venue', '.location', '.place', '.event-venue']:
+            elem = card.select_one(selector)
+            if elem:
+                venue = elem.get_text(strip=True)
+                break
+        results.append((title, url, date_text, venue))
+    return results
+
+
+def streaming_parse(html: str, limit: int = CARD_LIMIT) -> list:
+    return [(card.title, card.url, card.date_text, card.venue) for card in parse_peatix_cards(html, limit=limit)]
+
+
+def measure(func, repeat: int) -> float:
+    """最速値（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func) -> int:
+    """実行中のピークメモリ（バイト）"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    if not paths:
+        print(f"フィクスチャが見つかりません: {FIXTURE_DIR}")
+        return
+
+    print("🚀 Peatix解析ベンチマーク")
+    print("=" * 96)
+    print(f"{'ページ':<28}{'サイズ':>8}{'従来':>10}{'逐次':>10}{'短縮率':>8}{'従来メモリ':>12}{'逐次メモリ':>12}{'一致':>6}")
+
+    total_legacy = total_streaming = 0.0
+    for path in paths:
+        name = os.path.basename(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        same = legacy_parse(html) == streaming_parse(html)
+        legacy = measure(lambda: legacy_parse(html), repeat)
+        streaming = measure(lambda: streaming_parse(html), repeat)
+        legacy_peak = peak_memory(lambda: legacy_parse(html))
+        streaming_peak = peak_memory(lambda: streaming_parse(html))
+        total_legacy += legacy
+        total_streaming += streaming
+
+        print(f"{name:<28}{len(html.encode('utf-8')) / 1024:>6.0f}KB{legacy * 1000:>8.2f}ms"
+              f"{streaming * 1000:>8.2f}ms{legacy / streaming:>7.1f}倍"
+              f"{legacy_peak / 1024:>10.0f}KB{streaming_peak / 1024:>10.0f}KB{'✅' if same else '❌':>5}")
+
+    print("-" * 96)
+    print(f"合計: 従来 {total_legacy * 1000:.2f}ms → 逐次 {total_streaming * 1000:.2f}ms "
+          f"({total_legacy / total_streaming:.1f}倍)")
+
+
+if __name__ == "__main__":
+    main()
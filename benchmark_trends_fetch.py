@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enhanced Trends 並行取得ベンチマーク
+ローカルのスタンドインHTTPサーバー（ホスト別に遅延を注入）に対して
+EnhancedTrendsManager.get_enhanced_trends を逐次実行・並行実行で比較する
+
+使い方:
+    python benchmark_trends_fetch.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+import time
+from urllib.parse import urlparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+import aiohttp
+
+from utils.enhanced_trends_manager import EnhancedTrendsManager
+from utils.http_cache import http_cache
+from utils.trend_history import trend_history
+from utils.rate_limiter import HostRateLimiter
+from config.config import HTTP_RATE_LIMIT_CONFIG
+
+# ホスト別の注入遅延（秒）
+HOST_LATENCY = {
+    'zenn.dev': 0.3,
+    'hacker-news.firebaseio.com': 0.1,
+    'news.google.com': 0.4,
+    'b.hatena.ne.jp': 0.3,
+    'github.com': 0.5,
+}
+
+# 実運用のホスト別間隔をこの倍率で縮めて計測時間を短縮する
+INTERVAL_SCALE = 0.1
+
+
+def _google_rss(keyword: str) -> str:
+    items = "".join(
+        f"<item><title>{keyword} ニュース {i} - サンプル</title>"
+        f"<link>https://example.org/{keyword}/{i}</link>"
+        f"<pubDate>Wed, 01 Jan 2025 00:00:00 GMT</pubDate></item>"
+        for i in range(8)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'
+
+
+def _hatena_rdf(category: str) -> str:
+    items = "".join(
+        f'<item rdf:about="https://example.org/{category}/{i}">'
+        f"<title>{category} エントリ {i}</title>"
+        f"<link>https://example.org/{category}/{i}</link>"
+        f"<dc:date>2025-01-01T00:00:00+09:00</dc:date>"
+        f"<hatena:bookmarkcount>{30 + i}</hatena:bookmarkcount></item>"
+        for i in range(6)
+    )
+    return (
+        '<?xml version="1.0"?>'
+        '<rdf:RDF xmlns="http://purl.org/rss/1.0/" '
+        'xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+        'xmlns:hatena="http://www.hatena.ne.jp/info/xmlns#">'
+        f"{items}</rdf:RDF>"
+    )
+
+
+def _hatena_search_rss(keyword: str) -> str:
+    items = "".join(
+        f"<item><title>{keyword} 記事 {i} (12 users)</title>"
+        f"<link>https://example.org/hatena/{keyword}/{i}</link></item>"
+        for i in range(4)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'
+
+
+async def stand_in_handler(request: web.Request) -> web.Response:
+    """/{host}/{path} 形式のリクエストに遅延付きで応答"""
+    host = request.match_info['host']
+    path = '/' + request.match_info['path']
+    await asyncio.sleep(HOST_LATENCY.get(host, 0.1))
+
+    if host == 'zenn.dev':
+        articles = [
+            {
+                'id': i, 'title': f'Zenn 記事 {i} python', 'path': f'/articles/{i}',
+                'liked_count': 20 + i, 'comments_count': 2,
+                'published_at': '2025-01-01T00:00:00+09:00', 'topics': [{'name': 'python'}]
+            }
+            for i in range(30)
+        ]
+        return web.json_response({'articles': articles})
+    if host == 'hacker-news.firebaseio.com':
+        if path.endswith('topstories.json'):
+            return web.json_response(list(range(1, 201)))
+        story_id = int(path.rsplit('/', 1)[-1].split('.')[0])
+        return web.json_response({
+            'id': story_id, 'type': 'story', 'score': 40 + story_id * 3,
+            'title': f'HN story {story_id}', 'url': f'https://example.org/hn/{story_id}',
+            'time': 1735689600, 'descendants': 10
+        })
+    if host == 'news.google.com':
+        return web.Response(text=_google_rss(request.query.get('q', '')), content_type='application/xml')
+    if host == 'b.hatena.ne.jp':
+        if path.startswith('/search'):
+            return web.Response(text=_hatena_search_rss(request.query.get('q', '')), content_type='application/xml')
+        category = path.rsplit('/', 1)[-1].replace('.rss', '')
+        return web.Response(text=_hatena_rdf(category), content_type='application/xml')
+    if host == 'github.com':
+        return web.Response(text='<html><body></body></html>', content_type='text/html')
+    return web.Response(status=404)
+
+
+class RewritingSession:
+    """外部URLをスタンドインサーバー宛てに書き換えるセッションラッパー"""
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str):
+        self._session = session
+        self._base_url = base_url
+
+    def _rewrite(self, url: str) -> str:
+        parsed = urlparse(url)
+        rewritten = f"{self._base_url}/{parsed.hostname}{parsed.path}"
+        if parsed.query:
+            rewritten += f"?{parsed.query}"
+        return rewritten
+
+    def get(self, url, **kwargs):
+        return self._session.get(self._rewrite(str(url)), **kwargs)
+
+    async def close(self):
+        await self._session.close()
+
+
+async def run_once(base_url: str, max_concurrency=None, deadline=None) -> tuple:
+    manager = EnhancedTrendsManager(max_concurrency=max_concurrency)
+    manager.rate_limiter = HostRateLimiter({
+        host: {"rate": limit["rate"] / INTERVAL_SCALE, "burst": limit["burst"]}
+        for host, limit in HTTP_RATE_LIMIT_CONFIG["hosts"].items()
+    })
+    if deadline is not None:
+        manager.fetch_deadline = deadline
+
+    async with manager:
+        manager.session = RewritingSession(manager.session, base_url)
+        start = time.perf_counter()
+        trends = await manager.get_enhanced_trends(max_trends=200)
+        elapsed = time.perf_counter() - start
+        statuses = {name: result.status for name, result in manager.last_source_results.items()}
+    return elapsed, len(trends), statuses
+
+
+async def main():
+    app = web.Application()
+    app.router.add_get('/{host}/{path:.*}', stand_in_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    # 取得そのものを計測するためディスクキャッシュ・履歴保存は使わない
+    http_cache.enabled = False
+    trend_history.enabled = False
+
+    print("🚀 Enhanced Trends 並行取得ベンチマーク")
+    print("=" * 60)
+    print(f"注入遅延: {json.dumps(HOST_LATENCY)}")
+    print(f"ホスト間隔倍率: {INTERVAL_SCALE}")
+
+    try:
+        sequential, seq_count, _ = await run_once(base_url, max_concurrency=1)
+        print(f"\n⏱️ 逐次実行 (max_concurrency=1): {sequential:.2f}秒 / {seq_count}件")
+
+        concurrent, con_count, _ = await run_once(base_url)
+        print(f"⏱️ 並行実行: {concurrent:.2f}秒 / {con_count}件")
+        print(f"📈 短縮率: {sequential / concurrent:.1f}倍")
+
+        # 締め切りより遅いソースがあっても部分結果が返ることを確認
+        HOST_LATENCY['github.com'] = 5.0
+        partial, partial_count, statuses = await run_once(base_url, deadline=2.0)
+        missed = [name for name, status in statuses.items() if status != 'ok']
+        print(f"\n⏱️ 締め切り2秒（GitHubに5秒遅延）: {partial:.2f}秒 / {partial_count}件")
+        print(f"   打ち切られたソース: {', '.join(missed) if missed else 'なし'}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,13 +8,21 @@ import discord
 from discord.ext import commands, tasks
 import asyncio
 import random
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional
 import logging
 from datetime import datetime, timedelta
 
 from models.ai_character import AICharacterManager, AICharacter
 from lib.gemini_chat import GeminiChat
 from config.config import AI_CHAT_CONFIG
+from utils.llm_metrics import FEATURE_CHARACTER_CONVERSATION
+from utils.llm_scheduler import PRIORITY_BACKGROUND
+from utils.webhook_registry import webhook_registry
+from utils.conversation_planner import ConversationPlanner, ConversationStep
+from utils.channel_conversations import (
+    ChannelConversations, ConversationState,
+    PHASE_OPENING, PHASE_TURN, PHASE_CLOSING, PHASE_REACTIONS, PHASE_DONE
+)
 
 class AIChatSystem(commands.Cog):
     """AIキャラクター会話システム"""
@@ -23,20 +31,25 @@ class AIChatSystem(commands.Cog):
         self.bot = bot
         self.character_manager = AICharacterManager()
         self.gemini_chat = GeminiChat() if hasattr(GeminiChat, '__init__') else None
-        self.active_conversations: Dict[int, List[str]] = {}  # チャンネルID -> 会話中キャラクターID
-        self.conversation_history: Dict[int, List[Dict]] = {}  # チャンネルID -> 会話履歴
+        # 数ターン分の発言を1回の呼び出しでまとめて生成する
+        self.planner = ConversationPlanner(self.gemini_chat) if self.gemini_chat else None
+        # チャンネルごとの会話タスクと会話履歴（履歴は件数上限つきの deque）
+        self.conversations = ChannelConversations()
+        self.conversation_history: Dict[int, Deque[Dict]] = self.conversations.histories  # チャンネルID -> 会話履歴
         self.last_activity: Dict[int, datetime] = {}  # チャンネルID -> 最後の活動時間
+        self.last_user_message: Dict[int, datetime] = {}  # チャンネルID -> 最後のユーザー発言時間
+        # チャンネルごとのキャラクター用Webhook（一覧の取得はチャンネルごとに1回）
+        self.webhooks = webhook_registry
         
         # 自発的会話のタスク（後で開始）
         # self.spontaneous_chat.start() を後に移動
         # ユーザーとの会話履歴を管理
         self.user_conversation_context: Dict[int, Dict] = {}  # チャンネルID -> 会話コンテキスト
-        # 会話実行中フラグを追加
-        self.is_conversation_active: Dict[int, bool] = {}  # チャンネルID -> 会話実行中フラグ
         
     def cog_unload(self):
         """Cog終了時の処理"""
         self.spontaneous_chat.cancel()
+        self.conversations.cancel_all()
     
     @tasks.loop(hours=1)  # 1時間ごとにチェック
     async def spontaneous_chat(self):
@@ -62,10 +75,17 @@ class AIChatSystem(commands.Cog):
                 return
                 
             # 会話実行中チェック
-            if self.is_conversation_active.get(channel.id, False):
+            if self.conversations.is_active(channel.id):
                 logging.info(f"チャンネル {channel.id} で既に会話が実行中です。スキップします。")
                 return
                 
+            # ユーザーが会話中のチャンネルには割り込まない
+            last_user_message = self.last_user_message.get(channel.id)
+            quiet_minutes = AI_CHAT_CONFIG["quiet_minutes_before_start"]
+            if last_user_message and current_time - last_user_message < timedelta(minutes=quiet_minutes):
+                logging.info(f"チャンネル {channel.id} でユーザーが会話中です。スキップします。")
+                return
+                
             # 1日に同じ時間帯での重複を防ぐ
             today = current_time.date()
             channel_activity = self.last_activity.get(channel.id)
@@ -100,8 +120,8 @@ class AIChatSystem(commands.Cog):
             # 直前の会話履歴からトピックを動的生成
             topic = await self._generate_contextual_topic(channel, participants)
             
-            # 会話を開始
-            await self._conduct_ai_conversation(channel, participants, topic)
+            # 会話をチャンネルごとのタスクとして開始（終了は待たない）
+            self._begin_conversation(channel, participants, topic)
             
         except Exception as e:
             logging.error(f"自発的会話開始エラー: {e}")
@@ -166,7 +186,8 @@ class AIChatSystem(commands.Cog):
                              f"- カジュアルで友達同士らしい話題\n" \
                              f"- 説明は不要、話題のみ回答"
                     
-                    ai_topic = self.gemini_chat.get_response(f"topic_gen_{channel.id}", prompt)
+                    ai_topic = await self.gemini_chat.generate(prompt, priority=PRIORITY_BACKGROUND, use_cache=False,
+                                                               feature=FEATURE_CHARACTER_CONVERSATION)
                     
                     # AI生成トピックが適切な場合は使用
                     if ai_topic and len(ai_topic.strip()) > 0 and len(ai_topic.strip()) <= 30:
@@ -236,472 +257,590 @@ class AIChatSystem(commands.Cog):
         
         return has_question, target_character
 
-    async def _conduct_ai_conversation(self, channel: discord.TextChannel, participants: List[AICharacter], topic: str):
-        """AIキャラクター同士の会話を実行"""
+    def _begin_conversation(self, channel: discord.TextChannel, participants: List[AICharacter],
+                            topic: str) -> Optional[asyncio.Task]:
+        """会話タスクを開始（同じチャンネルで実行中なら開始せず None）"""
+        if self.conversations.is_active(channel.id):
+            logging.info(f"チャンネル {channel.id} で既に会話が実行中です。")
+            return None
+        state = ConversationState(
+            channel.id, participants, topic,
+            max_turns=random.randint(16, 22),  # 16-22回のやり取りでランダム（クロージングフェーズを保証）
+            history=self.conversations.reset_history(channel.id)  # 新しい会話の開始
+        )
+        return self.conversations.start(state, self._run_conversation(channel, state))
+
+    async def _conduct_ai_conversation(self, channel: discord.TextChannel, participants: List[AICharacter],
+                                       topic: str) -> Optional[ConversationState]:
+        """AIキャラクター同士の会話を実行し、終了（または中断）まで待つ"""
+        if self._begin_conversation(channel, participants, topic) is None:
+            return None
+        return await self.conversations.wait(channel.id)
+
+    async def _run_conversation(self, channel: discord.TextChannel, state: ConversationState):
+        """会話の状態機械（段階ごとの処理が次の段階を返す）"""
+        phases = {
+            PHASE_OPENING: self._phase_opening,
+            PHASE_TURN: self._phase_turn,
+            PHASE_CLOSING: self._phase_closing,
+            PHASE_REACTIONS: self._phase_reactions,
+        }
         try:
-            # 会話開始時にフラグを設定
-            self.is_conversation_active[channel.id] = True
-            
-            # 会話履歴をクリア（新しい会話の開始）
-            self.conversation_history[channel.id] = []
-            
-            max_turns = random.randint(16, 22)  # 16-22回のやり取りでランダム（クロージングフェーズを保証）
-            
-            for i in range(max_turns):
-                # 直前のメッセージから質問応答の必要性をチェック
-                previous_question_target = None
-                if i > 0 and self.conversation_history.get(channel.id):
-                    last_message = self.conversation_history[channel.id][-1]
-                    has_question, target_character = self._detect_question_and_target(
-                        last_message['content'], participants
-                    )
-                    
-                    if has_question:
-                        logging.info(f"質問検出: \"{last_message['content'][:50]}...\"")
-                        if target_character:
-                            # 特定の人への質問なら、その人が答える
-                            previous_question_target = target_character
-                            logging.info(f"特定質問検出: {target_character.display_name} が回答予定")
-                        else:
-                            # 一般的な質問なら、前回発言者以外が答える
-                            last_speaker_name = last_message['speaker']
-                            available_answerers = [p for p in participants if p.display_name != last_speaker_name]
-                            if available_answerers:
-                                previous_question_target = random.choice(available_answerers)
-                                logging.info(f"一般質問検出: {previous_question_target.display_name} が回答予定")
-                    else:
-                        logging.info(f"質問なし: \"{last_message['content'][:50]}...\"")
-                
-                # 改善されたキャラクター選択ロジック
-                participated_chars = set(
-                    msg.get('speaker') for msg in self.conversation_history.get(channel.id, [])
-                )
-                
-                # 質問への回答が必要な場合は最優先（他のロジックより優先）
-                if previous_question_target:
-                    speaker = previous_question_target
-                    logging.info(f"質問応答優先選択: {speaker.display_name}, {i+1}回目")
+            while state.phase != PHASE_DONE:
+                state.phase = await phases[state.phase](channel, state)
+            logging.info(f"AI会話が終了（{state.turn}回, 理由: {state.end_reason}）")
+        finally:
+            # 最後の活動時間を更新（中断された場合も同じ時間帯に再開しない）
+            self.last_activity[channel.id] = datetime.now()
+
+    async def _phase_opening(self, channel: discord.TextChannel, state: ConversationState) -> str:
+        """最初の発言：カジュアルで親しみやすい会話開始"""
+        topic = state.topic
+        speaker = random.choice(state.participants)
+        logging.info(f"開始キャラクター選択: {speaker.display_name}, 1回目")
+        # 山田メンターは最初の発言者にしない（質問・指導役なので）
+        if speaker.id == "ai_yamada":
+            other_participants = [p for p in state.participants if p.id != "ai_yamada"]
+            if other_participants:
+                speaker = random.choice(other_participants)
+        # 最初の発言と続く数ターンをまとめて生成（生成できなければ1発言ずつ）
+        if await self._plan_segment(state, first_speaker=speaker, first_type='opening'):
+            return PHASE_TURN
+        interests_text = "、".join(speaker.interests[:2])  # 興味の上位2つを含める
+
+        prompt = f"あなたは{speaker.name}です。今、カフェで仲のいい友達とリラックスしておしゃべり中です。\n\n" \
+                 f"あなたの性格: {speaker.personality}\n" \
+                 f"あなたの話し方: {speaker.speaking_style}\n" \
+                 f"あなたの好きなこと: {interests_text}\n\n" \
+                 f"あなたが会話を始めます。話題「{topic}」について、あなたの経験や最近の出来事から自然に話題を振ってください。\n" \
+                 f"誰かの発言に反応するのではなく、あなたから話題を提供してください。\n\n" \
+                 f"注意事項:\n" \
+                 f"- 「最近〜」「この前〜」「昨日〜」など、具体的な経験から始める\n" \
+                 f"- 友達との会話なので、簡単で親しみやすい言葉で\n" \
+                 f"- 質問や反応ではなく、あなたの体験談から話を始める\n" \
+
+        response = await self._generate_line(speaker, prompt)
+        state.turn += 1
+        if response:
+            await self._post_line(channel, state, speaker, response)
+            await asyncio.sleep(random.randint(3, 6))
+        return PHASE_TURN
+
+    async def _phase_turn(self, channel: discord.TextChannel, state: ConversationState) -> str:
+        """通常の発言ターン（話者を選んで1発言し、終了・まとめに進むか判定）"""
+        if state.turn >= state.max_turns:
+            state.end_reason = "max_turns"
+            return PHASE_DONE
+
+        i = state.turn
+        line = await self._next_scripted_line(state)
+        if line is not None:
+            speaker, response = line.speaker, line.text
+        else:
+            speaker, question_target = self._choose_speaker(state)
+            response = await self._generate_line(speaker, self._turn_prompt(state, speaker, question_target))
+        state.turn += 1
+        if not response:
+            return PHASE_TURN
+
+        await self._post_line(channel, state, speaker, response)
+        next_phase = self._next_phase(state, i, speaker, response)
+        if next_phase != PHASE_TURN:
+            state.script = []  # 会話を締めるので残りの台本は使わない
+
+        # ターン数とキャラクター参加状況をログ出力
+        logging.info(f"ターン{i+1}: {speaker.display_name}, 参加者: {len(state.spoken_names())}/{len(state.participants)}")
+        if next_phase == PHASE_TURN:
+            # 会話の間隔を設ける（ランダム）
+            await asyncio.sleep(random.randint(3, 6))
+        return next_phase
+
+    async def _phase_closing(self, channel: discord.TextChannel, state: ConversationState) -> str:
+        """山田メンターによるクロージング（反応と合わせて1回で生成。失敗したら通常のターンに戻る）"""
+        yamada_mentor = self._find_participant(state, "ai_yamada")
+        await asyncio.sleep(random.randint(2, 4))
+
+        other_participants = [p for p in state.participants if p.id != "ai_yamada"]
+        random.shuffle(other_participants)
+        steps = [ConversationStep(yamada_mentor, 'closing', self._script_instruction(state, yamada_mentor, 'closing'))]
+        steps.extend(ConversationStep(reactor, 'reaction', self._script_instruction(state, reactor, 'reaction'))
+                     for reactor in other_participants)
+        lines = (await self.planner.plan(state.topic, steps, context=self._script_context(state, 5))
+                 if self.planner else [])
+        if not lines or lines[0].step_type != 'closing':
+            await asyncio.sleep(random.randint(3, 6))
+            return PHASE_TURN
+
+        await self._post_line(channel, state, yamada_mentor, lines[0].text)
+        state.closing_text = lines[0].text
+        state.script = lines[1:]
+        # クロージング後の反応フェーズ（全員が反応）
+        await asyncio.sleep(random.randint(3, 5))
+        return PHASE_REACTIONS
+
+    async def _phase_reactions(self, channel: discord.TextChannel, state: ConversationState) -> str:
+        """山田メンター以外の全員がクロージングに反応して会話を終える（反応はクロージングと一緒に生成済み）"""
+        reactions, state.script = state.script, []
+        for j, line in enumerate(reactions):
+            await self._post_line(channel, state, line.speaker, line.text)
+            # 複数反応の場合は間隔を空ける
+            if j < len(reactions) - 1:
+                await asyncio.sleep(random.randint(2, 4))
+
+        logging.info(f"山田メンターによるクロージング完了（{state.turn}回目、反応{len(reactions)}件）")
+        state.end_reason = "closing"
+        return PHASE_DONE
+
+    async def _plan_segment(self, state: ConversationState, first_speaker: Optional[AICharacter] = None,
+                            first_type: str = 'turn') -> bool:
+        """この先の数ターン分の発言を1回の呼び出しでまとめて生成し、state.script に入れる"""
+        count = min(AI_CHAT_CONFIG["script_segment_turns"], state.max_turns - state.turn)
+        if not self.planner or count <= 0:
+            return False
+        speakers = self._plan_speakers(state, first_speaker, count)
+        steps = [
+            ConversationStep(speaker, first_type if offset == 0 else 'turn',
+                             self._script_instruction(state, speaker, first_type if offset == 0 else 'turn',
+                                                      len(state.history) + offset))
+            for offset, speaker in enumerate(speakers)
+        ]
+        state.script = await self.planner.plan(state.topic, steps, context=self._script_context(state))
+        logging.info(f"会話台本を生成: {len(state.script)}/{count}発言（{state.turn + 1}回目から）")
+        return bool(state.script)
+
+    async def _next_scripted_line(self, state: ConversationState):
+        """台本の次の発言（台本がなければ次の数ターン分を生成。生成できなければ None）
+
+        直前の発言が質問で、台本の次の話者が回答者と違う場合は台本を捨て、回答者から台本を作り直す
+        """
+        if state.script and not self._answers_last_question(state, state.script[0].speaker):
+            logging.info(f"台本の次の話者（{state.script[0].speaker.display_name}）が質問の回答者と違うため作り直します")
+            state.script = []
+        if not state.script:
+            has_question = bool(state.history) and self._detect_question_and_target(
+                state.history[-1]['content'], state.participants)[0]
+            if has_question:
+                answerer, _ = self._choose_speaker(state)
+                await self._plan_segment(state, first_speaker=answerer, first_type='answer')
+            else:
+                await self._plan_segment(state)
+        return state.script.pop(0) if state.script else None
+
+    def _answers_last_question(self, state: ConversationState, speaker: AICharacter) -> bool:
+        """speaker が直前の発言（質問なら）に答える話者としてふさわしいか"""
+        if not state.history:
+            return True
+        last_message = state.history[-1]
+        has_question, target = self._detect_question_and_target(last_message['content'], state.participants)
+        if not has_question:
+            return True
+        if target is not None and target.display_name != last_message['speaker']:
+            return speaker is target
+        return speaker.display_name != last_message['speaker']
+
+    def _plan_speakers(self, state: ConversationState, first_speaker: Optional[AICharacter],
+                       count: int) -> List[AICharacter]:
+        """台本に書くターンの話者（通常の話者選択と同じ規則で先に決める）"""
+        spoken = state.spoken_names()
+        last_speaker_name = state.history[-1]['speaker'] if state.history else None
+        speakers = []
+        for offset in range(count):
+            if offset == 0 and first_speaker is not None:
+                speaker = first_speaker
+            else:
+                speaker = self._pick_speaker(state.participants, spoken, last_speaker_name, state.turn + offset)
+            speakers.append(speaker)
+            spoken.add(speaker.display_name)
+            last_speaker_name = speaker.display_name
+        return speakers
+
+    @staticmethod
+    def _script_context(state: ConversationState, count: int = 6) -> str:
+        """台本の続きを書かせるための直近の会話"""
+        return "\n".join(f"{msg['speaker']}: {msg['content']}" for msg in state.recent(count))
+
+    @staticmethod
+    def _script_instruction(state: ConversationState, speaker: AICharacter, step_type: str,
+                            position: int = 0) -> str:
+        """台本の各発言への指示（1発言ずつ生成する場合のプロンプトと同じ方針）"""
+        is_dynaka = speaker.id == "ai_king_dynaka"
+        if step_type == 'opening':
+            return (f"話題「{state.topic}」について、「最近〜」「この前〜」など自分の具体的な体験から自然に話題を振る"
+                    f"（質問や反応ではなく体験談から始める。友達との会話なので簡単な言葉で）")
+        if step_type == 'answer':
+            if is_dynaka:
+                return "直前の質問に、筋トレやモチベーションの経験談を交えて「〜ッス！」口調で直接答える（30-80文字）"
+            return "直前の質問に、自分の経験や専門分野から具体例を出して直接答える（30-80文字）"
+        if step_type == 'closing':
+            return ("『今日の会話から〜』で始めて、会話の重要なポイントと、みんなが次に取るべき行動の方向性"
+                    "（「次は〜してみよう」「〜を意識してみるといい」など）を指導する側として具体的に示す")
+        if step_type == 'reaction':
+            if is_dynaka:
+                return "山田メンターの提案に「やってみるッス！」など前向きな実行意思を「〜ッス！」口調で示す（20-40文字）"
+            return "山田メンターの提案に「やってみます」「意識します」など実践への意気込みを示す（20-40文字）"
+        if speaker.id == "ai_yamada" and position >= 1 and random.random() < 0.6:
+            knowledge = random.choice([
+                "アドラー心理学", "7つの習慣", "0秒思考", "ISSUE DRIVEN",
+                "失敗の本質", "コトラーのマーケティング", "ドラッカーのマネジメント"
+            ])
+            if position >= 8:
+                return f"「{knowledge}」の考え方を自然に織り込み、友達として会話をまとめる建設的で実践的な提案をする（50-90文字）"
+            return f"「{knowledge}」の考え方を参考に、直前の発言の本質を掘り下げる問いかけや視点を出す（30-70文字）"
+        if is_dynaka:
+            return ("直前の発言に、筋トレやモチベーションを絡めて「〜ッス！」口調で具体的に反応する"
+                    "（「へぇー」「なるほど」などの曖昧な相槌は避ける。30-70文字）")
+        return ("直前の発言に、自分の経験や思いを交えて具体的に反応する"
+                "（曖昧な相槌や難しい専門用語は避ける。30-70文字）")
+
+    def _next_phase(self, state: ConversationState, i: int, speaker: AICharacter, response: str) -> str:
+        """発言後の終了判定（10回目以降）"""
+        if i < 9:
+            return PHASE_TURN
+
+        # 明確な終了意図のキーワードのみ検出（終了意図が明確なもののみ）
+        strong_ending_keywords = [
+            "また今度", "じゃあ", "それじゃ", "バイバイ", "お疲れ様",
+            "お疲れさま", "さよなら", "失礼します", "また明日", "また来週"
+        ]
+        # 終了意図が明確なキーワードのみで判定
+        should_end = any(response.endswith(keyword) or f"{keyword}。" in response or f"{keyword}！" in response
+                         for keyword in strong_ending_keywords)
+
+        # 段階的な終了確率設定（より保守的に調整）
+        if i <= 13:  # 14回目まではほぼ終了しない
+            end_probability = 0.001  # 0.1%（ほぼ終了しない）
+        elif i == 14:  # 15回目
+            end_probability = 0.05  # 5%（まだ低い確率）
+        elif i == 15:  # 16回目
+            end_probability = 0.15  # 15%
+        elif i == 16:  # 17回目
+            end_probability = 0.35  # 35%
+        else:  # 18回目以降
+            end_probability = 0.60  # 60%
+
+        # 全キャラクターが参加するまでは終了を完全に防ぐ
+        participated_count = len(state.spoken_names())
+        total_participants = len(state.participants)
+        if participated_count < total_participants:
+            end_probability = 0.0  # 完全に防ぐ
+            logging.info(f"キャラクター参加状況: {participated_count}/{total_participants} - 終了完全防止")
+
+        # 終了判定のログ出力を追加
+        random_value = random.random()
+        logging.info(f"終了判定: i={i+1}, should_end={should_end}, probability={end_probability:.2f}, random={random_value:.2f}")
+
+        # 山田メンターによるクロージング（12回目以降で確率的に実行）
+        if i >= 11 and not should_end and random.random() < 0.8:  # 80%の確率（より確実に実行）
+            if self._find_participant(state, "ai_yamada") and speaker.id != "ai_yamada":
+                return PHASE_CLOSING
+
+        if should_end or random_value < end_probability:
+            state.end_reason = "keyword" if should_end else "probability"
+            return PHASE_DONE
+        return PHASE_TURN
+
+    def _choose_speaker(self, state: ConversationState) -> tuple:
+        """次の話者を選ぶ（直前の発言が質問なら回答者を優先）。(話者, 質問の回答者) を返す"""
+        i = state.turn
+        participants = state.participants
+        # 直前のメッセージから質問応答の必要性をチェック
+        previous_question_target = None
+        if i > 0 and state.history:
+            last_message = state.history[-1]
+            has_question, target_character = self._detect_question_and_target(
+                last_message['content'], participants
+            )
+
+            if has_question:
+                logging.info(f"質問検出: \"{last_message['content'][:50]}...\"")
+                if target_character:
+                    # 特定の人への質問なら、その人が答える
+                    previous_question_target = target_character
+                    logging.info(f"特定質問検出: {target_character.display_name} が回答予定")
                 else:
-                    # 質問応答がない場合のみ通常の選択ロジックを適用
-                    # 未参加キャラクターを優先的に選択
-                    unparticipated_chars = [p for p in participants if p.display_name not in participated_chars]
-                    
-                    if unparticipated_chars and i >= 1:  # 2回目以降で未参加者優先
-                        # キング・ダイナカが未参加なら最優先
-                        king_dynaka = next((p for p in unparticipated_chars if p.id == "ai_king_dynaka"), None)
-                        if king_dynaka:
-                            speaker = king_dynaka
-                            logging.info(f"キング・ダイナカを優先選択: {i+1}回目")
-                        else:
-                            speaker = unparticipated_chars[0]  # 他の未参加者を選択
-                            logging.info(f"未参加者を優先選択: {speaker.display_name}, {i+1}回目")
-                    else:
-                        # 全員参加済みまたは1回目の場合
-                        if i == 0:
-                            # 1回目はランダム選択
-                            speaker = random.choice(participants)
-                            logging.info(f"開始キャラクター選択: {speaker.display_name}, {i+1}回目")
-                        else:
-                            # 2回目以降で全員参加済みの場合は重み付きランダム選択
-                            available_speakers = participants.copy()
-                            # 前回の発言者を除外（質問応答の場合は除外しない）
-                            if self.conversation_history.get(channel.id):
-                                last_speaker_name = self.conversation_history[channel.id][-1]['speaker']
-                                available_speakers = [p for p in participants if p.display_name != last_speaker_name]
-                                if not available_speakers:  # 全員が前回発言者の場合（1人だけの場合）
-                                    available_speakers = participants
-                            
-                            # キング・ダイナカの出現率を上げる（40%の確率で優先選択）
-                            king_dynaka = next((p for p in available_speakers if p.id == "ai_king_dynaka"), None)
-                            if king_dynaka and random.random() < 0.4:
-                                speaker = king_dynaka
-                                logging.info(f"キング・ダイナカを重み付き選択: {i+1}回目")
-                            else:
-                                speaker = random.choice(available_speakers)
-                            logging.info(f"ランダム選択: {speaker.display_name}, {i+1}回目")
-                
-                # クロージングフェーズ判定（8回目以降）
-                conversation_length = len(self.conversation_history.get(channel.id, []))
-                is_closing_phase = conversation_length >= 8
-                
-                # 会話内容を生成
-                interests_text = "、".join(speaker.interests[:2])  # 興味の上位2つを含める
-                
-                if i == 0:
-                    # 最初の発言：カジュアルで親しみやすい会話開始
-                    # 山田メンターは最初の発言者にしない（質問・指導役なので）
-                    if speaker.id == "ai_yamada":
-                        # 山田メンターが最初に選ばれた場合は他のキャラクターに変更
-                        other_participants = [p for p in participants if p.id != "ai_yamada"]
-                        if other_participants:
-                            speaker = random.choice(other_participants)
-                            interests_text = "、".join(speaker.interests[:2])
-                    
-                    prompt = f"あなたは{speaker.name}です。今、カフェで仲のいい友達とリラックスしておしゃべり中です。\n\n" \
+                    # 一般的な質問なら、前回発言者以外が答える
+                    last_speaker_name = last_message['speaker']
+                    available_answerers = [p for p in participants if p.display_name != last_speaker_name]
+                    if available_answerers:
+                        previous_question_target = random.choice(available_answerers)
+                        logging.info(f"一般質問検出: {previous_question_target.display_name} が回答予定")
+            else:
+                logging.info(f"質問なし: \"{last_message['content'][:50]}...\"")
+
+        # 質問への回答が必要な場合は最優先（他のロジックより優先）
+        if previous_question_target:
+            speaker = previous_question_target
+            logging.info(f"質問応答優先選択: {speaker.display_name}, {i+1}回目")
+        else:
+            last_speaker_name = state.history[-1]['speaker'] if state.history else None
+            speaker = self._pick_speaker(participants, state.spoken_names(), last_speaker_name, i)
+
+        return speaker, previous_question_target
+
+    @staticmethod
+    def _pick_speaker(participants: List[AICharacter], participated_chars: set,
+                      last_speaker_name: Optional[str], i: int) -> AICharacter:
+        """質問への回答がない場合の話者選択（未参加者優先 → 前回の発言者以外から重み付きランダム）"""
+        # 未参加キャラクターを優先的に選択
+        unparticipated_chars = [p for p in participants if p.display_name not in participated_chars]
+
+        if unparticipated_chars and i >= 1:  # 2回目以降で未参加者優先
+            # キング・ダイナカが未参加なら最優先
+            king_dynaka = next((p for p in unparticipated_chars if p.id == "ai_king_dynaka"), None)
+            if king_dynaka:
+                logging.info(f"キング・ダイナカを優先選択: {i+1}回目")
+                return king_dynaka
+            speaker = unparticipated_chars[0]  # 他の未参加者を選択
+            logging.info(f"未参加者を優先選択: {speaker.display_name}, {i+1}回目")
+            return speaker
+
+        # 全員参加済みまたは1回目の場合
+        if i == 0:
+            # 1回目はランダム選択
+            speaker = random.choice(participants)
+            logging.info(f"開始キャラクター選択: {speaker.display_name}, {i+1}回目")
+            return speaker
+
+        # 2回目以降で全員参加済みの場合は重み付きランダム選択
+        available_speakers = participants.copy()
+        # 前回の発言者を除外（質問応答の場合は除外しない）
+        if last_speaker_name:
+            available_speakers = [p for p in participants if p.display_name != last_speaker_name]
+            if not available_speakers:  # 全員が前回発言者の場合（1人だけの場合）
+                available_speakers = participants
+
+        # キング・ダイナカの出現率を上げる（40%の確率で優先選択）
+        king_dynaka = next((p for p in available_speakers if p.id == "ai_king_dynaka"), None)
+        if king_dynaka and random.random() < 0.4:
+            speaker = king_dynaka
+            logging.info(f"キング・ダイナカを重み付き選択: {i+1}回目")
+        else:
+            speaker = random.choice(available_speakers)
+        logging.info(f"ランダム選択: {speaker.display_name}, {i+1}回目")
+        return speaker
+
+    def _turn_prompt(self, state: ConversationState, speaker: AICharacter,
+                     previous_question_target: Optional[AICharacter]) -> str:
+        """継続的な会話：より豊富なコンテキストで個性を発揮"""
+        i = state.turn
+        topic = state.topic
+        participants = state.participants
+        interests_text = "、".join(speaker.interests[:2])  # 興味の上位2つを含める
+        # クロージングフェーズ判定（8回目以降）
+        is_closing_phase = len(state.history) >= 8
+
+        recent_messages = state.recent(3)  # 直近3件の会話
+        if recent_messages:
+            context_messages = [f"{msg['speaker']}: {msg['content']}" for msg in recent_messages]
+            full_context = "\n".join(context_messages)
+            participants_names = ', '.join([p.name for p in participants])
+
+            # 質問があるかどうかをチェック
+            has_question = any('？' in msg['content'] or 'どう' in msg['content'] or 'どんな' in msg['content'] 
+                             for msg in recent_messages)
+
+            # 質問への回答かどうかをチェック
+            is_answering_question = False
+            question_content = ""
+            questioner_name = ""
+
+            if previous_question_target and speaker == previous_question_target:
+                is_answering_question = True
+                question_content = recent_messages[-1]['content'] if recent_messages else ""
+                questioner_name = recent_messages[-1].get('speaker', '') if recent_messages else ""
+
+            # 山田メンターの知識ベース特別処理（2回目以降の会話でのみ適用）
+            if speaker.id == "ai_yamada" and i >= 1 and random.random() < 0.6 and not is_answering_question:
+                # 山田メンターが知識ベースから提案
+                knowledge_base = [
+                    "アドラー心理学", "7つの習慣", "0秒思考", "ISSUE DRIVEN",
+                    "失敗の本質", "コトラーのマーケティング", "ドラッカーのマネジメント"
+                ]
+                selected_knowledge = random.choice(knowledge_base)
+
+                # クロージングフェーズかどうかで内容を変更
+                if is_closing_phase:
+                    prompt = f"あなたは山田メンターです。経験豊富なメンターで、いつも本質を見抜く質問をします。\n\n" \
+                             f"今の会話:\n{full_context}\n\n" \
+                             f"この会話から、「{selected_knowledge}」の知識を活かして、みんなにとって価値のある提案やまとめをしてください。\n" \
+                             f"会話を締めくくるような、建設的で実践的なアドバイスをお願いします。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 上から目線ではなく、友達として\n" \
+                             f"- 具体的で実践的な提案\n" \
+                             f"- 「{selected_knowledge}」の考え方を自然に織り込む\n" \
+                             f"- 50-90文字でお願いします"
+                else:
+                    # 通常の会話でのメンターらしい質問・提案
+                    last_message = recent_messages[-1] if recent_messages else {"content": ""}
+                    prompt = f"あなたは山田メンターです。経験豊富なメンターで、「解の質より問いの質」を重視し、本質を見抜く質問をします。\n\n" \
+                             f"直前の発言: \"{last_message['content']}\"\n" \
+                             f"発言者: {last_message.get('speaker', '')}\n\n" \
+                             f"「{selected_knowledge}」の考え方を参考に、この発言の本質を掘り下げる質問や、" \
+                             f"より良い視点を提供してください。メンターらしく、相手の思考を深めるような問いかけをしてください。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 「本質は〜だ」「問いの質はどうだ？」などメンターらしい口調\n" \
+                             f"- 「{selected_knowledge}」の要素を自然に織り込む\n" \
+                             f"- 友達として親しみやすく、でも深い洞察を提供\n" \
+                             f"- 30-70文字でお願いします"
+            # 質問への回答専用プロンプト
+            elif is_answering_question:
+                if speaker.id == "ai_king_dynaka":
+                    prompt = f"あなたはキング・ダイナカです。{questioner_name}から質問されました。\n\n" \
+                             f"質問: \"{question_content}\"\n\n" \
+                             f"この質問に対して、筋トレやモチベーションの視点から具体的に答えてください。\n" \
+                             f"「〜ッス！」口調で、体験談や具体的なアドバイスを含めて回答してください。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 質問に直接答える\n" \
+                             f"- 筋トレやモチベーションの経験談を交える\n" \
+                             f"- 具体的で実用的なアドバイス\n" \
+                             f"- 30-80文字でお願いします"
+                else:
+                    interests_text = "、".join(speaker.interests[:2])
+                    prompt = f"あなたは{speaker.name}です。{questioner_name}から質問されました。\n\n" \
                              f"あなたの性格: {speaker.personality}\n" \
                              f"あなたの話し方: {speaker.speaking_style}\n" \
-                             f"あなたの好きなこと: {interests_text}\n\n" \
-                             f"あなたが会話を始めます。話題「{topic}」について、あなたの経験や最近の出来事から自然に話題を振ってください。\n" \
-                             f"誰かの発言に反応するのではなく、あなたから話題を提供してください。\n\n" \
+                             f"あなたの専門分野: {interests_text}\n\n" \
+                             f"質問: \"{question_content}\"\n\n" \
+                             f"この質問に対して、あなたの経験や専門知識を活かして具体的に答えてください。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 質問に直接答える\n" \
+                             f"- あなたの専門分野や経験から具体例を出す\n" \
+                             f"- 実用的なアドバイスや情報を提供\n" \
+                             f"- 30-80文字でお願いします"
+            # キング・ダイナカの自然な反応パターン  
+            elif speaker.id == "ai_king_dynaka":
+                # キング・ダイナカ用の会話連続性重視プロンプト
+                last_message = recent_messages[-1] if recent_messages else {"content": ""}
+                last_speaker = last_message.get('speaker', '')
+
+                # 山田メンターの提案に対する反応かチェック
+                if is_closing_phase and last_speaker == "山田メンター" and any(word in last_message['content'] for word in ["提案", "アドバイス", "まとめ", "実践", "習慣", "心理学"]):
+                    prompt = f"あなたはキング・ダイナカです。山田メンターから価値のある提案をもらいました。\n\n" \
+                             f"山田メンターの提案: \"{last_message['content']}\"\n\n" \
+                             f"この提案に対して、筋トレやモチベーションの視点から、どう感じますか？\n" \
+                             f"感謝の気持ちと、筋トレや目標達成に絡めた前向きな反応をしてください。\n\n" \
                              f"注意事項:\n" \
-                             f"- 「最近〜」「この前〜」「昨日〜」など、具体的な経験から始める\n" \
-                             f"- 友達との会話なので、簡単で親しみやすい言葉で\n" \
-                             f"- 質問や反応ではなく、あなたの体験談から話を始める\n" \
-                             f"- 20-50文字程度でお願いします"
+                             f"- 「〜ッス！」口調で元気よく\n" \
+                             f"- 筋トレやモチベーションに絡めて\n" \
+                             f"- 「やってみるッス！」など前向きな反応\n" \
+                             f"- 30-70文字でお願いします"
                 else:
-                    # 継続的な会話：より豊富なコンテキストで個性を発揮
-                    recent_messages = self.conversation_history.get(channel.id, [])[-3:]  # 直近3件の会話
-                    if recent_messages:
-                        context_messages = [f"{msg['speaker']}: {msg['content']}" for msg in recent_messages]
-                        full_context = "\n".join(context_messages)
-                        participants_names = ', '.join([p.name for p in participants])
-                        
-                        # 質問があるかどうかをチェック
-                        has_question = any('？' in msg['content'] or 'どう' in msg['content'] or 'どんな' in msg['content'] 
-                                         for msg in recent_messages)
-                        
-                        # 質問への回答かどうかをチェック
-                        is_answering_question = False
-                        question_content = ""
-                        questioner_name = ""
-                        
-                        if previous_question_target and speaker == previous_question_target:
-                            is_answering_question = True
-                            question_content = recent_messages[-1]['content'] if recent_messages else ""
-                            questioner_name = recent_messages[-1].get('speaker', '') if recent_messages else ""
-                        
-                        # 山田メンターの知識ベース特別処理（2回目以降の会話でのみ適用）
-                        if speaker.id == "ai_yamada" and i >= 1 and random.random() < 0.6 and not is_answering_question:
-                            # 山田メンターが知識ベースから提案
-                            knowledge_base = [
-                                "アドラー心理学", "7つの習慣", "0秒思考", "ISSUE DRIVEN",
-                                "失敗の本質", "コトラーのマーケティング", "ドラッカーのマネジメント"
-                            ]
-                            selected_knowledge = random.choice(knowledge_base)
-                            
-                            # クロージングフェーズかどうかで内容を変更
-                            if is_closing_phase:
-                                prompt = f"あなたは山田メンターです。経験豊富なメンターで、いつも本質を見抜く質問をします。\n\n" \
-                                         f"今の会話:\n{full_context}\n\n" \
-                                         f"この会話から、「{selected_knowledge}」の知識を活かして、みんなにとって価値のある提案やまとめをしてください。\n" \
-                                         f"会話を締めくくるような、建設的で実践的なアドバイスをお願いします。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 上から目線ではなく、友達として\n" \
-                                         f"- 具体的で実践的な提案\n" \
-                                         f"- 「{selected_knowledge}」の考え方を自然に織り込む\n" \
-                                         f"- 50-90文字でお願いします"
-                            else:
-                                # 通常の会話でのメンターらしい質問・提案
-                                last_message = recent_messages[-1] if recent_messages else {"content": ""}
-                                prompt = f"あなたは山田メンターです。経験豊富なメンターで、「解の質より問いの質」を重視し、本質を見抜く質問をします。\n\n" \
-                                         f"直前の発言: \"{last_message['content']}\"\n" \
-                                         f"発言者: {last_message.get('speaker', '')}\n\n" \
-                                         f"「{selected_knowledge}」の考え方を参考に、この発言の本質を掘り下げる質問や、" \
-                                         f"より良い視点を提供してください。メンターらしく、相手の思考を深めるような問いかけをしてください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 「本質は〜だ」「問いの質はどうだ？」などメンターらしい口調\n" \
-                                         f"- 「{selected_knowledge}」の要素を自然に織り込む\n" \
-                                         f"- 友達として親しみやすく、でも深い洞察を提供\n" \
-                                         f"- 30-70文字でお願いします"
-                        # 質問への回答専用プロンプト
-                        elif is_answering_question:
-                            if speaker.id == "ai_king_dynaka":
-                                prompt = f"あなたはキング・ダイナカです。{questioner_name}から質問されました。\n\n" \
-                                         f"質問: \"{question_content}\"\n\n" \
-                                         f"この質問に対して、筋トレやモチベーションの視点から具体的に答えてください。\n" \
-                                         f"「〜ッス！」口調で、体験談や具体的なアドバイスを含めて回答してください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 質問に直接答える\n" \
-                                         f"- 筋トレやモチベーションの経験談を交える\n" \
-                                         f"- 具体的で実用的なアドバイス\n" \
-                                         f"- 30-80文字でお願いします"
-                            else:
-                                interests_text = "、".join(speaker.interests[:2])
-                                prompt = f"あなたは{speaker.name}です。{questioner_name}から質問されました。\n\n" \
-                                         f"あなたの性格: {speaker.personality}\n" \
-                                         f"あなたの話し方: {speaker.speaking_style}\n" \
-                                         f"あなたの専門分野: {interests_text}\n\n" \
-                                         f"質問: \"{question_content}\"\n\n" \
-                                         f"この質問に対して、あなたの経験や専門知識を活かして具体的に答えてください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 質問に直接答える\n" \
-                                         f"- あなたの専門分野や経験から具体例を出す\n" \
-                                         f"- 実用的なアドバイスや情報を提供\n" \
-                                         f"- 30-80文字でお願いします"
-                        # キング・ダイナカの自然な反応パターン  
-                        elif speaker.id == "ai_king_dynaka":
-                            # キング・ダイナカ用の会話連続性重視プロンプト
-                            last_message = recent_messages[-1] if recent_messages else {"content": ""}
-                            last_speaker = last_message.get('speaker', '')
-                            
-                            # 山田メンターの提案に対する反応かチェック
-                            if is_closing_phase and last_speaker == "山田メンター" and any(word in last_message['content'] for word in ["提案", "アドバイス", "まとめ", "実践", "習慣", "心理学"]):
-                                prompt = f"あなたはキング・ダイナカです。山田メンターから価値のある提案をもらいました。\n\n" \
-                                         f"山田メンターの提案: \"{last_message['content']}\"\n\n" \
-                                         f"この提案に対して、筋トレやモチベーションの視点から、どう感じますか？\n" \
-                                         f"感謝の気持ちと、筋トレや目標達成に絡めた前向きな反応をしてください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 「〜ッス！」口調で元気よく\n" \
-                                         f"- 筋トレやモチベーションに絡めて\n" \
-                                         f"- 「やってみるッス！」など前向きな反応\n" \
-                                         f"- 30-70文字でお願いします"
-                            else:
-                                prompt = f"あなたはキング・ダイナカです。筋トレとモチベーションが大好きで、いつも元気いっぱいです。\n\n" \
-                                         f"直前の発言: \"{last_message['content']}\"\n" \
-                                         f"発言者: {last_message.get('speaker', '')}\n\n" \
-                                         f"この発言に対して、あなたならどう反応しますか？\n" \
-                                         f"「へぇー」「なるほど」などの曖昧な相槌ではなく、具体的に反応してください。\n" \
-                                         f"筋トレやモチベーションの話を絡めてもいいですし、共感や体験談でもOKです。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 「〜ッス！」口調で元気よく\n" \
-                                         f"- 「へぇー」「なるほど」などの曖昧な相槌は避ける\n" \
-                                         f"- 具体的な体験談や共感を表現\n" \
-                                         f"- 30-70文字でお願いします"
-                        else:
-                            # 一般キャラクター用の会話連続性重視プロンプト
-                            last_message = recent_messages[-1] if recent_messages else {"content": ""}
-                            last_speaker = last_message.get('speaker', '')
-                            
-                            # 山田メンターの提案に対する反応かチェック
-                            if is_closing_phase and last_speaker == "山田メンター" and any(word in last_message['content'] for word in ["提案", "アドバイス", "まとめ", "実践", "習慣", "心理学"]):
-                                prompt = f"あなたは{speaker.name}です。山田メンターから価値のある提案をもらいました。\n\n" \
-                                         f"あなたの性格: {speaker.personality}\n" \
-                                         f"あなたの話し方: {speaker.speaking_style}\n\n" \
-                                         f"山田メンターの提案: \"{last_message['content']}\"\n\n" \
-                                         f"この提案に対して、あなたならどう感じますか？\n" \
-                                         f"感謝の気持ちや、実践への意気込み、共感などを表現してください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 感謝や共感を具体的に表現\n" \
-                                         f"- 「やってみる」「参考になる」など前向きな反応\n" \
-                                         f"- 自然な会話の終わりを意識\n" \
-                                         f"- 30-60文字でお願いします"
-                            else:
-                                prompt = f"あなたは{speaker.name}です。今、カフェで仲のいい友達とおしゃべり中です。\n\n" \
-                                         f"あなたの性格: {speaker.personality}\n" \
-                                         f"あなたの話し方: {speaker.speaking_style}\n" \
-                                         f"あなたの好きなこと: {interests_text}\n\n" \
-                                         f"直前の発言: \"{last_message['content']}\"\n" \
-                                         f"発言者: {last_message.get('speaker', '')}\n\n" \
-                                         f"この発言に対して、あなたならどう反応しますか？\n" \
-                                         f"「へぇー」「なるほど」などの曖昧な相槌ではなく、具体的に反応してください。\n" \
-                                         f"自分の経験や思いを交えて自然に話してください。\n\n" \
-                                         f"注意事項:\n" \
-                                         f"- 「へぇー」「なるほど」などの曖昧な相槌は避ける\n" \
-                                         f"- 難しい専門用語やビジネス用語は使わない\n" \
-                                         f"- 具体的な体験談や共感を表現\n" \
-                                         f"- 30-70文字でお願いします"
-                    else:
-                        # 初回以外で会話履歴がない場合
-                        prompt = f"あなたは{speaker.name}です。カフェで友達とおしゃべり中です。\n\n" \
-                                 f"あなたの性格: {speaker.personality}\n" \
-                                 f"あなたの話し方: {speaker.speaking_style}\n" \
-                                 f"あなたの好きなこと: {interests_text}\n\n" \
-                                 f"話題「{topic}」について、あなたの体験や思いをカジュアルに話してください。\n\n" \
-                                 f"注意事項:\n" \
-                                 f"- 友達との会話なので、簡単な言葉で\n" \
-                                 f"- 難しい専門用語は使わない\n" \
-                                 f"- 体験談や感想を中心に\n" \
-                                 f"- 20-50文字程度でお願いします"
-                
-                # AIから応答を取得（必須）
-                response = None
-                if self.gemini_chat:
-                    try:
-                        response = self.gemini_chat.get_response(f"ai_{speaker.id}_{i}", prompt)
-                        # より自然な文字数制限（120文字以内で自然な終わり方）
-                        if len(response) > 120:
-                            # 句読点で自然に切断
-                            cut_points = ['。', '！', '？', 'ッス！', 'ッス。', 'ッス？']
-                            best_cut = 0
-                            
-                            for point in cut_points:
-                                last_pos = response.rfind(point, 0, 115)  # 115文字以内で最後の句読点を探す
-                                if last_pos > best_cut:
-                                    best_cut = last_pos + len(point)
-                            
-                            if best_cut > 30:  # 30文字以上あれば採用
-                                response = response[:best_cut]
-                            else:
-                                # 句読点が見つからない場合は110文字で切って「…」を付ける
-                                response = response[:110] + '…'
-                    except Exception as e:
-                        logging.error(f"Gemini AI応答エラー ({speaker.name}): {e}")
-                
-                # AIが利用できない場合はスキップ
-                if not response or len(response.strip()) < 3:
-                    logging.warning(f"AI応答を取得できませんでした ({speaker.name})")
-                    continue
-                
-                # Webhookを使用してキャラクターとして発言
-                await self._send_as_character(channel, speaker, response)
-                
-                # 会話履歴を保存
-                if channel.id not in self.conversation_history:
-                    self.conversation_history[channel.id] = []
-                self.conversation_history[channel.id].append({
-                    'speaker': speaker.display_name,
-                    'content': response,
-                    'timestamp': datetime.now()
-                })
-                
-                # 改善された会話終了判定（10回目以降）
-                if i >= 9:
-                    # 明確な終了意図のキーワードのみ検出（終了意図が明確なもののみ）
-                    strong_ending_keywords = [
-                        "また今度", "じゃあ", "それじゃ", "バイバイ", "お疲れ様", 
-                        "お疲れさま", "さよなら", "失礼します", "また明日", "また来週"
-                    ]
-                    # 終了意図が明確なキーワードのみで判定
-                    should_end = any(response.endswith(keyword) or f"{keyword}。" in response or f"{keyword}！" in response 
-                                   for keyword in strong_ending_keywords)
-                    
-                    # 会話の流れを考慮した終了判定
-                    conversation_depth = len(self.conversation_history.get(channel.id, []))
-                    
-                    # 段階的な終了確率設定（より保守的に調整）
-                    if i <= 13:  # 14回目まではほぼ終了しない
-                        end_probability = 0.001  # 0.1%（ほぼ終了しない）
-                    elif i == 14:  # 15回目
-                        end_probability = 0.05  # 5%（まだ低い確率）
-                    elif i == 15:  # 16回目
-                        end_probability = 0.15  # 15%
-                    elif i == 16:  # 17回目
-                        end_probability = 0.35  # 35%
-                    else:  # 18回目以降
-                        end_probability = 0.60  # 60%
-                    
-                    # 全キャラクターの参加状況をチェック
-                    participated_characters = set(
-                        msg.get('speaker') for msg in self.conversation_history.get(channel.id, [])
-                    )
-                    total_participants = len(participants)
-                    participated_count = len(participated_characters)
-                    
-                    # 全キャラクターが参加するまでは終了を完全に防ぐ
-                    if participated_count < total_participants:
-                        end_probability = 0.0  # 完全に防ぐ
-                        logging.info(f"キャラクター参加状況: {participated_count}/{total_participants} - 終了完全防止")
-                    
-                    # 終了判定のログ出力を追加
-                    random_value = random.random()
-                    logging.info(f"終了判定: i={i+1}, should_end={should_end}, probability={end_probability:.2f}, random={random_value:.2f}")
-                    
-                    # 山田メンターによるクロージング（12回目以降で確率的に実行）
-                    if i >= 11 and not should_end and random.random() < 0.8:  # 80%の確率（より確実に実行）
-                        yamada_mentor = next((p for p in participants if p.id == "ai_yamada"), None)
-                        if yamada_mentor and speaker.id != "ai_yamada":
-                            # 山田メンターに会話をまとめてもらう
-                            await asyncio.sleep(random.randint(2, 4))
-                            
-                            # 会話の内容を要約してクロージング
-                            recent_messages = self.conversation_history.get(channel.id, [])[-5:]
-                            conversation_summary = "\n".join([f"{msg['speaker']}: {msg['content'][:50]}..." for msg in recent_messages])
-                            
-                            closing_prompt = f"あなたは山田メンターです。経験豊富なメンターで、相手の成長を促す指導者です。\n\n" \
-                                           f"今回の会話:\n{conversation_summary}\n\n" \
-                                           f"この会話から重要なポイントを抽出し、みんなが次に取るべきアクションの方向性を" \
-                                           f"メンターとして具体的に示してください。『今日の会話から〜』で始めて、" \
-                                           f"「次は〜してみよう」「〜を意識してみるといい」のような行動指針を含めてください。" \
-                                           f"学びを受ける側ではなく、指導する側の立場で発言してください。"
-                            
-                            if self.gemini_chat:
-                                closing_response = self.gemini_chat.get_response(f"closing_{channel.id}_{i}", closing_prompt)
-                                if closing_response:
-                                    await self._send_as_character(channel, yamada_mentor, closing_response)
-                                    
-                                    # 会話履歴に追加
-                                    self.conversation_history[channel.id].append({
-                                        'speaker': yamada_mentor.display_name,
-                                        'content': closing_response,
-                                        'timestamp': datetime.now()
-                                    })
-                                    
-                                    # クロージング後の反応フェーズ（全員が反応）
-                                    await asyncio.sleep(random.randint(3, 5))
-                                    
-                                    # 山田メンター以外の全員が反応
-                                    other_participants = [p for p in participants if p.id != "ai_yamada"]
-                                    if other_participants:
-                                        reaction_count = len(other_participants)  # 全員反応
-                                        random.shuffle(other_participants)
-                                        
-                                        for j in range(reaction_count):
-                                            reactor = other_participants[j]
-                                            
-                                            # 反応プロンプト
-                                            if reactor.id == "ai_king_dynaka":
-                                                reaction_prompt = f"あなたはキング・ダイナカです。山田メンターから具体的なアクションプランの提案をもらいました。\n\n" \
-                                                               f"山田メンターの提案: 「{closing_response}\"\n\n" \
-                                                               f"この提案に対して、筋トレやモチベーションの視点から実践への意気込みを表現してください。" \
-                                                               f"「やってみるッス！」「実践するッス！」など前向きな実行意思を「〜ッス！」口調で表現してください。" \
-                                                               f"20-40文字程度でお願いします。"
-                                            else:
-                                                reaction_prompt = f"あなたは{reactor.name}です。山田メンターから具体的なアクションプランの提案をもらいました。\n\n" \
-                                                               f"あなたの性格: {reactor.personality}\n" \
-                                                               f"山田メンターの提案: 「{closing_response}\"\n\n" \
-                                                               f"この提案に対して、実践への意気込みや決意を表現してください。" \
-                                                               f"「やってみます」「実践します」「意識します」など前向きな実行意思を示してください。" \
-                                                               f"20-40文字程度で、行動への意欲を表現してください。"
-                                            
-                                            reaction_response = self.gemini_chat.get_response(f"reaction_{reactor.id}_{i}_{j}", reaction_prompt)
-                                            if reaction_response:
-                                                await self._send_as_character(channel, reactor, reaction_response)
-                                                
-                                                # 会話履歴に追加
-                                                self.conversation_history[channel.id].append({
-                                                    'speaker': reactor.display_name,
-                                                    'content': reaction_response,
-                                                    'timestamp': datetime.now()
-                                                })
-                                                
-                                                # 複数反応の場合は間隔を空ける
-                                                if j < reaction_count - 1:
-                                                    await asyncio.sleep(random.randint(2, 4))
-                                    
-                                    logging.info(f"山田メンターによるクロージング完了（{i+1}回目、反応{reaction_count}件）")
-                                    break
-                    
-                    if should_end or random_value < end_probability:
-                        end_reason = "keyword" if should_end else "probability"
-                        logging.info(f"AI会話が終了（{i+1}回, 理由: {end_reason}）")
-                        break
-                
-                # ターン数とキャラクター参加状況をログ出力
-                participated_chars = set(
-                    msg.get('speaker') for msg in self.conversation_history.get(channel.id, [])
-                )
-                logging.info(f"ターン{i+1}: {speaker.display_name}, 参加者: {len(participated_chars)}/{len(participants)}")
-                
-                # 会話の間隔を設ける（ランダム）
-                await asyncio.sleep(random.randint(3, 6))
-                
-            # 最後の活動時間を更新
-            self.last_activity[channel.id] = datetime.now()
-            
+                    prompt = f"あなたはキング・ダイナカです。筋トレとモチベーションが大好きで、いつも元気いっぱいです。\n\n" \
+                             f"直前の発言: \"{last_message['content']}\"\n" \
+                             f"発言者: {last_message.get('speaker', '')}\n\n" \
+                             f"この発言に対して、あなたならどう反応しますか？\n" \
+                             f"「へぇー」「なるほど」などの曖昧な相槌ではなく、具体的に反応してください。\n" \
+                             f"筋トレやモチベーションの話を絡めてもいいですし、共感や体験談でもOKです。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 「〜ッス！」口調で元気よく\n" \
+                             f"- 「へぇー」「なるほど」などの曖昧な相槌は避ける\n" \
+                             f"- 具体的な体験談や共感を表現\n" \
+                             f"- 30-70文字でお願いします"
+            else:
+                # 一般キャラクター用の会話連続性重視プロンプト
+                last_message = recent_messages[-1] if recent_messages else {"content": ""}
+                last_speaker = last_message.get('speaker', '')
+
+                # 山田メンターの提案に対する反応かチェック
+                if is_closing_phase and last_speaker == "山田メンター" and any(word in last_message['content'] for word in ["提案", "アドバイス", "まとめ", "実践", "習慣", "心理学"]):
+                    prompt = f"あなたは{speaker.name}です。山田メンターから価値のある提案をもらいました。\n\n" \
+                             f"あなたの性格: {speaker.personality}\n" \
+                             f"あなたの話し方: {speaker.speaking_style}\n\n" \
+                             f"山田メンターの提案: \"{last_message['content']}\"\n\n" \
+                             f"この提案に対して、あなたならどう感じますか？\n" \
+                             f"感謝の気持ちや、実践への意気込み、共感などを表現してください。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 感謝や共感を具体的に表現\n" \
+                             f"- 「やってみる」「参考になる」など前向きな反応\n" \
+                             f"- 自然な会話の終わりを意識\n" \
+                             f"- 30-60文字でお願いします"
+                else:
+                    prompt = f"あなたは{speaker.name}です。今、カフェで仲のいい友達とおしゃべり中です。\n\n" \
+                             f"あなたの性格: {speaker.personality}\n" \
+                             f"あなたの話し方: {speaker.speaking_style}\n" \
+                             f"あなたの好きなこと: {interests_text}\n\n" \
+                             f"直前の発言: \"{last_message['content']}\"\n" \
+                             f"発言者: {last_message.get('speaker', '')}\n\n" \
+                             f"この発言に対して、あなたならどう反応しますか？\n" \
+                             f"「へぇー」「なるほど」などの曖昧な相槌ではなく、具体的に反応してください。\n" \
+                             f"自分の経験や思いを交えて自然に話してください。\n\n" \
+                             f"注意事項:\n" \
+                             f"- 「へぇー」「なるほど」などの曖昧な相槌は避ける\n" \
+                             f"- 難しい専門用語やビジネス用語は使わない\n" \
+                             f"- 具体的な体験談や共感を表現\n" \
+                             f"- 30-70文字でお願いします"
+        else:
+            # 初回以外で会話履歴がない場合
+            prompt = f"あなたは{speaker.name}です。カフェで友達とおしゃべり中です。\n\n" \
+                     f"あなたの性格: {speaker.personality}\n" \
+                     f"あなたの話し方: {speaker.speaking_style}\n" \
+                     f"あなたの好きなこと: {interests_text}\n\n" \
+                     f"話題「{topic}」について、あなたの体験や思いをカジュアルに話してください。\n\n" \
+                     f"注意事項:\n" \
+                     f"- 友達との会話なので、簡単な言葉で\n" \
+                     f"- 難しい専門用語は使わない\n" \
+                     f"- 体験談や感想を中心に\n" \
+                     f"- 20-50文字程度でお願いします"
+        return prompt
+
+    @staticmethod
+    def _find_participant(state: ConversationState, character_id: str) -> Optional[AICharacter]:
+        return next((p for p in state.participants if p.id == character_id), None)
+
+    async def _generate(self, prompt: str, speaker_name: str) -> Optional[str]:
+        """発言を生成（共有スケジューラーの裏方の優先度で送信。失敗したら None）"""
+        if not self.gemini_chat:
+            return None
+        try:
+            response = await self.gemini_chat.generate(prompt, priority=PRIORITY_BACKGROUND, use_cache=False,
+                                                       feature=FEATURE_CHARACTER_CONVERSATION)
         except Exception as e:
-            logging.error(f"AI会話実行エラー: {e}")
-        finally:
-            # 会話終了時にフラグをリセット
-            self.is_conversation_active[channel.id] = False
+            logging.error(f"Gemini AI応答エラー ({speaker_name}): {e}")
+            return None
+        response = (response or '').strip()
+        if len(response) < 3:
+            # AIが利用できない場合はスキップ
+            logging.warning(f"AI応答を取得できませんでした ({speaker_name})")
+            return None
+        return response
+
+    async def _generate_line(self, speaker: AICharacter, prompt: str) -> Optional[str]:
+        """発言ターンの発言を生成（120文字以内で自然な終わり方に切る）"""
+        response = await self._generate(prompt, speaker.name)
+        if response and len(response) > 120:
+            # 句読点で自然に切断
+            cut_points = ['。', '！', '？', 'ッス！', 'ッス。', 'ッス？']
+            best_cut = 0
+
+            for point in cut_points:
+                last_pos = response.rfind(point, 0, 115)  # 115文字以内で最後の句読点を探す
+                if last_pos > best_cut:
+                    best_cut = last_pos + len(point)
+
+            if best_cut > 30:  # 30文字以上あれば採用
+                response = response[:best_cut]
+            else:
+                # 句読点が見つからない場合は110文字で切って「…」を付ける
+                response = response[:110] + '…'
+        return response
+
+    async def _post_line(self, channel: discord.TextChannel, state: ConversationState,
+                         speaker: AICharacter, content: str):
+        """キャラクターとして発言し、会話履歴に追加"""
+        await self._send_as_character(channel, speaker, content)
+        state.history.append({
+            'speaker': speaker.display_name,
+            'content': content,
+            'timestamp': datetime.now()
+        })
     
     async def _send_as_character(self, channel: discord.TextChannel, character: AICharacter, message: str):
         """キャラクターとしてメッセージを送信"""
         try:
-            # Webhookを作成/取得
-            webhooks = await channel.webhooks()
-            webhook = None
-            webhook_name = f"AI_Character_{character.id}"
-            
-            for wh in webhooks:
-                if wh.name == webhook_name:
-                    webhook = wh
-                    break
-            
-            if webhook is None:
-                webhook = await channel.create_webhook(name=webhook_name)
-            
-            # キャラクターとして発言
-            await webhook.send(
+            # キャラクターとして発言（Webhookの一覧取得はチャンネルごとに1回）
+            await self.webhooks.send(
+                channel,
+                character.id,
                 content=message,
                 username=character.display_name,
                 avatar_url=character.avatar_url if character.avatar_url else None
@@ -954,7 +1093,7 @@ class AIChatSystem(commands.Cog):
             
             await ctx.send("🔄 AI応答機能をテスト中...")
             
-            response = self.gemini_chat.get_response(f"test_{ctx.author.id}", test_prompt)
+            response = await self.gemini_chat.get_response(f"test_{ctx.author.id}", test_prompt)
             if response:
                 await self._send_as_character(ctx.channel, test_character, f"🧪 {response}")
                 await ctx.send("✅ AI応答テスト完了！")
@@ -983,6 +1122,10 @@ class AIChatSystem(commands.Cog):
                 await ctx.send("❌ 会話テストに必要なキャラクターが不足しています（2人必要）")
                 return
                 
+            if self.conversations.is_active(ctx.channel.id):
+                await ctx.send("⚠️ このチャンネルでは既にAI会話が実行中です")
+                return
+                
             participant_names = [p.display_name for p in participants]
             await ctx.send(f"🧪 AI会話テスト開始: {', '.join(participant_names)}")
             
@@ -994,8 +1137,13 @@ class AIChatSystem(commands.Cog):
             topic = await self._generate_contextual_topic(ctx.channel, participants)
             
             # 🧪 本番の改善されたロジックを直接呼び出し
-            await self._conduct_ai_conversation(ctx.channel, participants, topic)
-            await ctx.send("✅ AI会話テスト完了！")
+            state = await self._conduct_ai_conversation(ctx.channel, participants, topic)
+            if state is None:
+                await ctx.send("⚠️ このチャンネルでは既にAI会話が実行中です")
+            elif state.phase != PHASE_DONE:
+                await ctx.send(f"⏹️ AI会話テストは中断されました（{state.turn}回目, 理由: {state.end_reason}）")
+            else:
+                await ctx.send("✅ AI会話テスト完了！")
             
         except Exception as e:
             await ctx.send(f"❌ AI会話テストエラー: {e}")
@@ -1024,7 +1172,7 @@ class AIChatSystem(commands.Cog):
                          f"主な興味は{interests_text}です。" \
                          f"ユーザーから「{test_message}」と言われました。あなたの個性を活かして応答してください。"
                 
-                response = self.gemini_chat.get_response(f"test_user_{ctx.author.id}", prompt)
+                response = await self.gemini_chat.get_response(f"test_user_{ctx.author.id}", prompt)
                 if response:
                     await self._send_as_character(ctx.channel, test_character, f"🧪 {response}")
                     await ctx.send("✅ ユーザー会話テスト完了！")
@@ -1062,7 +1210,7 @@ class AIChatSystem(commands.Cog):
             )
             
             # 現在の状態
-            active_conversations = len(self.active_conversations)
+            active_conversations = len(self.conversations.active_channels())
             conversation_history_count = sum(len(history) for history in self.conversation_history.values())
             
             embed.add_field(
@@ -1107,7 +1255,7 @@ class AIChatSystem(commands.Cog):
         try:
             if self.gemini_chat and characters:
                 test_char = characters[0]
-                response = self.gemini_chat.get_response(f"test_all_{ctx.author.id}", 
+                response = await self.gemini_chat.get_response(f"test_all_{ctx.author.id}", 
                     f"あなたは{test_char.name}です。「一括テスト完了」と言ってください。")
                 if response:
                     await self._send_as_character(ctx.channel, test_char, f"🧪 {response}")
@@ -1184,7 +1332,7 @@ class AIChatSystem(commands.Cog):
                 # AIによる会話トピック分析
                 if self.gemini_chat:
                     analysis_prompt = f"以下の会話から主要なトピックを1つ特定し、簡潔に要約してください：\n{context_text}"
-                    topic_analysis = self.gemini_chat.get_response(f"analysis_{ctx.author.id}", analysis_prompt)
+                    topic_analysis = await self.gemini_chat.get_response(f"analysis_{ctx.author.id}", analysis_prompt)
                     if topic_analysis:
                         embed.add_field(
                             name="🤖 AI分析結果",
@@ -1221,6 +1369,11 @@ class AIChatSystem(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ コンテキストテストエラー: {e}")
     
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel):
+        """Webhookの作成・削除をキャッシュに反映"""
+        await self.webhooks.on_webhooks_update(channel)
+    
     @commands.Cog.listener()
     async def on_message(self, message):
         """ユーザーメッセージへの応答"""
@@ -1232,27 +1385,27 @@ class AIChatSystem(commands.Cog):
         if message.content.startswith(self.bot.command_prefix) or message.content.startswith('/'):
             return
             
-        # リプライの場合は、まずリプライ先がAIキャラクターかどうかを確認
+        # ユーザーが発言したチャンネルのAI会話は中断して譲る
+        self.last_user_message[message.channel.id] = datetime.now()
+        if AI_CHAT_CONFIG["cancel_on_user_message"]:
+            self.conversations.cancel(message.channel.id, reason="user_message")
+            
+        # リプライの場合は、まずリプライ先がAIキャラクターかどうかを確認（リプライ先は1回だけ取得して渡す）
         is_reply_to_ai = message.reference and message.reference.message_id
+        replied_message = None
         replying_to_ai_character = None
         
         if is_reply_to_ai:
             try:
-                replied_message = await message.channel.fetch_message(message.reference.message_id)
-                if replied_message.webhook_id:  # Webhookからのメッセージ
-                    # Webhook名からキャラクターを特定
-                    webhooks = await replied_message.channel.webhooks()
-                    for wh in webhooks:
-                        if wh.id == replied_message.webhook_id and wh.name.startswith("AI_Character_"):
-                            character_id = wh.name.replace("AI_Character_", "")
-                            replying_to_ai_character = self.character_manager.get_character(character_id)
-                            break
+                replied_message = await self._get_replied_message(message)
+                replying_to_ai_character = await self._character_for_message(replied_message)
             except Exception as e:
                 logging.error(f"リプライ先確認エラー: {e}")
         
         # AIキャラクターへのリプライなら、設定に関係なく応答
         if replying_to_ai_character:
-            await self._handle_user_interaction(message, is_reply=True)
+            await self._handle_user_interaction(message, is_reply=True, replied_message=replied_message,
+                                                replying_to_character=replying_to_ai_character)
             return
             
         # 通常のメンション処理（設定チャンネルのみ）
@@ -1268,32 +1421,35 @@ class AIChatSystem(commands.Cog):
         if not is_mentioned:
             return
             
-        await self._handle_user_interaction(message, is_reply=is_reply_to_ai)
+        await self._handle_user_interaction(message, is_reply=is_reply_to_ai, replied_message=replied_message)
+    
+    async def _get_replied_message(self, message: discord.Message) -> Optional[discord.Message]:
+        """リプライ先のメッセージ（ゲートウェイが添付した resolved → ボットのキャッシュ → API取得の順）"""
+        reference = message.reference
+        if isinstance(reference.resolved, discord.Message):
+            return reference.resolved
+        if isinstance(reference.resolved, discord.DeletedReferencedMessage):
+            return None
+        cached = discord.utils.get(self.bot.cached_messages, id=reference.message_id)
+        if cached is not None:
+            return cached
+        return await message.channel.fetch_message(reference.message_id)
     
-    async def _handle_user_interaction(self, message, is_reply=False):
-        """ユーザーとのインタラクションを処理"""
+    async def _character_for_message(self, replied_message: Optional[discord.Message]) -> Optional[AICharacter]:
+        """Webhookから送ったキャラクターの発言なら、そのキャラクター"""
+        if replied_message is None or not replied_message.webhook_id:
+            return None
+        # Webhook名からキャラクターを特定（一覧はチャンネルごとに1回だけ取得）
+        character_id = await self.webhooks.resolve_character_id(replied_message.channel, replied_message.webhook_id)
+        return self.character_manager.get_character(character_id) if character_id else None
+    
+    async def _handle_user_interaction(self, message, is_reply=False, replied_message=None,
+                                       replying_to_character=None):
+        """ユーザーとのインタラクションを処理（リプライ先は on_message で取得済みのものを受け取る）"""
         try:
             channel_id = message.channel.id
             user_id = message.author.id
             
-            # リプライの場合は、リプライ先のキャラクターを特定
-            replying_to_character = None
-            if is_reply and message.reference:
-                try:
-                    replied_message = await message.channel.fetch_message(message.reference.message_id)
-                    if replied_message.webhook_id:  # Webhookからのメッセージ
-                        # Webhook名からキャラクターを特定
-                        webhook = await replied_message.channel.webhooks()
-                        for wh in webhook:
-                            if wh.id == replied_message.webhook_id:
-                                # Webhook名からキャラクターIDを抽出
-                                if wh.name.startswith("AI_Character_"):
-                                    character_id = wh.name.replace("AI_Character_", "")
-                                    replying_to_character = self.character_manager.get_character(character_id)
-                                break
-                except Exception as e:
-                    logging.error(f"リプライ先メッセージの取得エラー: {e}")
-            
             # 会話コンテキストを取得/初期化
             if channel_id not in self.user_conversation_context:
                 self.user_conversation_context[channel_id] = {
@@ -1343,15 +1499,14 @@ class AIChatSystem(commands.Cog):
             
             # リプライの場合は元メッセージの内容も含める
             if is_reply and replying_to_character:
-                try:
-                    replied_message = await message.channel.fetch_message(message.reference.message_id)
+                if replied_message is not None:
                     original_content = replied_message.content
                     prompt = f"あなたは{responding_character.name}です。{responding_character.personality}な性格で、{responding_character.speaking_style}話し方をします。" \
                              f"主な興味は{interests_text}です。" \
                              f"あなたが先ほど「{original_content}」と発言したところ、" \
                              f"ユーザー「{message.author.display_name}」から「{clean_message}」とリプライされました。" \
                              f"あなたの個性を活かして、この内容に対して適切に応答してください。簡潔に1-2文で返答してください。"
-                except:
+                else:
                     # リプライ先が取得できない場合は通常のプロンプト
                     prompt = f"あなたは{responding_character.name}です。{responding_character.personality}な性格で、{responding_character.speaking_style}話し方をします。" \
                              f"主な興味は{interests_text}です。" \
@@ -1367,7 +1522,7 @@ class AIChatSystem(commands.Cog):
             response = None
             if self.gemini_chat:
                 try:
-                    response = self.gemini_chat.get_response(f"user_{user_id}", prompt)
+                    response = await self.gemini_chat.get_response(f"user_{user_id}", prompt)
                     # 応答の長さを制限
                     if len(response) > 200:
                         response = response[:200] + "..."
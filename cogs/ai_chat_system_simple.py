@@ -17,6 +17,9 @@ import time
 from models.ai_character import AICharacterManager, AICharacter
 from lib.gemini_chat import GeminiChat
 from config.config import AI_CHAT_CONFIG
+from utils.llm_scheduler import PRIORITY_INTERACTIVE
+from utils.webhook_registry import webhook_registry
+from utils.conversation_planner import ConversationPlanner, ConversationStep
 
 class AIChatSystemSimple(commands.Cog):
     """シンプル化されたAIキャラクター会話システム"""
@@ -27,6 +30,10 @@ class AIChatSystemSimple(commands.Cog):
         self.gemini_chat = GeminiChat()
         self.last_activity: Dict[int, datetime] = {}
         self.conversation_history: Dict[int, List[Dict]] = {}
+        # チャンネルごとのキャラクター用Webhook（一覧の取得はチャンネルごとに1回）
+        self.webhooks = webhook_registry
+        # 会話の台本を1回の生成でまとめて作る
+        self.planner = ConversationPlanner(self.gemini_chat)
         
     def cog_unload(self):
         """Cog終了時の処理"""
@@ -39,6 +46,11 @@ class AIChatSystemSimple(commands.Cog):
         if not self.simplified_chat.is_running():
             self.simplified_chat.start()
     
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel):
+        """Webhookの作成・削除をキャッシュに反映"""
+        await self.webhooks.on_webhooks_update(channel)
+    
     @commands.Cog.listener()
     async def on_message(self, message):
         """メッセージイベントリスナー - AIキャラクターへのリプライを検出"""
@@ -51,26 +63,25 @@ class AIChatSystemSimple(commands.Cog):
             return
             
         # リプライの場合は、まずリプライ先がAIキャラクターかどうかを確認
-        is_reply_to_ai = message.reference and message.reference.message_id
+        replied_message = None
         replying_to_ai_character = None
         
-        if is_reply_to_ai:
+        if message.reference and message.reference.message_id:
             try:
-                replied_message = await message.channel.fetch_message(message.reference.message_id)
-                if replied_message.webhook_id:  # Webhookからのメッセージ
-                    # Webhook名からキャラクターを特定
-                    webhooks = await replied_message.channel.webhooks()
-                    for wh in webhooks:
-                        if wh.id == replied_message.webhook_id and wh.name.startswith("AI_Character_"):
-                            character_id = wh.name.replace("AI_Character_", "")
-                            replying_to_ai_character = self.character_manager.get_character(character_id)
-                            break
+                replied_message = await self._get_replied_message(message)
+                if replied_message and replied_message.webhook_id:  # Webhookからのメッセージ
+                    # Webhook名からキャラクターを特定（一覧はチャンネルごとに1回だけ取得）
+                    character_id = await self.webhooks.resolve_character_id(
+                        replied_message.channel, replied_message.webhook_id
+                    )
+                    if character_id:
+                        replying_to_ai_character = self.character_manager.get_character(character_id)
             except Exception as e:
                 logging.error(f"リプライ先確認エラー: {e}")
         
         # AIキャラクターへのリプライなら応答
         if replying_to_ai_character:
-            await self._handle_reply_to_character(message, replying_to_ai_character)
+            await self._handle_reply_to_character(message, replying_to_ai_character, replied_message)
             return
         
         # キャラクターバイパス機能：指定チャンネルからの投稿をキャラクターバイパス
@@ -166,33 +177,17 @@ class AIChatSystemSimple(commands.Cog):
                 {"speaker": king_dynaka, "type": "final_tease", "message": "返事茶化し"}
             ]
             
-            # 会話実行
-            conversation_context = f"話題: {topic}"
-            
-            for i, step in enumerate(conversation_steps):
-                try:
-                    # 各ステップ間に適切な間隔をあける
-                    if i > 0:
-                        await asyncio.sleep(5)  # 5秒間隔
-                    
-                    message = await self._generate_step_message(
-                        step["speaker"], 
-                        step["type"], 
-                        topic, 
-                        conversation_context,
-                        i + 1
-                    )
-                    
-                    if message:
-                        # Webhookでキャラクターとして投稿
-                        await self._send_character_message(channel, step["speaker"], message)
-                        
-                        # 会話コンテキストを更新
-                        conversation_context += f"\n{step['speaker'].name}: {message}"
-                        
-                except Exception as e:
-                    logging.error(f"会話ステップ {i+1} でエラー: {e}")
-                    continue
+            # 会話全体の台本を1回の生成でまとめて作り、検証してから順に投稿
+            steps = [
+                ConversationStep(step["speaker"], step["type"],
+                                 self._step_instruction(step["speaker"], step["type"], topic))
+                for step in conversation_steps
+            ]
+            lines = await self.planner.plan(topic, steps)
+            await self.planner.perform(
+                lines,
+                lambda line: self._send_character_message(channel, line.speaker, line.text)
+            )
             
             # 最後の活動時間を更新
             self.last_activity[channel.id] = datetime.now()
@@ -226,56 +221,41 @@ class AIChatSystemSimple(commands.Cog):
         ]
         return random.choice(topics)
     
-    async def _generate_step_message(self, character: AICharacter, step_type: str, topic: str, context: str, step_number: int) -> str:
-        """各ステップのメッセージを生成"""
-        try:
-            # ステップタイプごとのプロンプト
-            step_prompts = {
-                "topic": f"「{topic}」について具体的な例を交えて自然に話題を振ってください。商品名や場所など具体的な名前を含めてください。{character.name}らしい独自の視点で発言してください。",
-                "problem": f"「{topic}」について具体的な問題や課題を提起してください。{character.name}の専門分野や興味から見た独自の課題を指摘してください。",
-                "tease": f"前の発言を受けて、{character.name}らしく軽く茶化してください。筋トレや体力に関連付けて独自の例えで話してください。",
-                "analysis": f"「{topic}」について、{character.name}らしい視点で考察してください。他の人とは異なる{character.name}独自の分析をしてください。",
-                "analysis2": f"「{topic}」について、{character.name}らしい別の角度から考察してください。前の人とは全く違う{character.name}独自の視点で話してください。",
-                "tease2": f"これまでの議論を受けて、{character.name}らしく茶化してください。筋トレ用語を使って独自の例えで楽しく反応してください。",
-                "solution": f"「{topic}」について、{character.name}らしい実践的で多角的な解決策を提案してください。メンターとしての経験を活かした独自のアドバイスをしてください。",
-                "response": f"山田メンターの解決策を受けて、{character.name}らしく返事してください。{character.name}の専門分野から見た独自の感想や追加の視点を述べてください。",
-                "response2": f"これまでの議論を受けて、{character.name}らしく返事してください。前の人とは違う{character.name}独自の感想や今後の抱負を述べてください。",
-                "final_tease": f"{character.name}らしく楽しく締めくくってください。筋トレの例えを使って前向きにまとめてください。"
-            }
-            
-            prompt = step_prompts.get(step_type, f"「{topic}」について{character.name}らしく発言してください。")
-            
-            response = await self.gemini_chat.get_ai_character_response(
-                character.name,
-                character.personality,
-                character.speaking_style,
-                prompt,
-                context
-            )
-            
-            return response.strip()
-            
-        except Exception as e:
-            logging.error(f"メッセージ生成エラー ({character.name}, {step_type}): {e}")
+    def _step_instruction(self, character: AICharacter, step_type: str, topic: str) -> str:
+        """各ステップの発言への指示"""
+        step_prompts = {
+            "topic": f"「{topic}」について具体的な例を交えて自然に話題を振ってください。商品名や場所など具体的な名前を含めてください。{character.name}らしい独自の視点で発言してください。",
+            "problem": f"「{topic}」について具体的な問題や課題を提起してください。{character.name}の専門分野や興味から見た独自の課題を指摘してください。",
+            "tease": f"前の発言を受けて、{character.name}らしく軽く茶化してください。筋トレや体力に関連付けて独自の例えで話してください。",
+            "analysis": f"「{topic}」について、{character.name}らしい視点で考察してください。他の人とは異なる{character.name}独自の分析をしてください。",
+            "analysis2": f"「{topic}」について、{character.name}らしい別の角度から考察してください。前の人とは全く違う{character.name}独自の視点で話してください。",
+            "tease2": f"これまでの議論を受けて、{character.name}らしく茶化してください。筋トレ用語を使って独自の例えで楽しく反応してください。",
+            "solution": f"「{topic}」について、{character.name}らしい実践的で多角的な解決策を提案してください。メンターとしての経験を活かした独自のアドバイスをしてください。",
+            "response": f"山田メンターの解決策を受けて、{character.name}らしく返事してください。{character.name}の専門分野から見た独自の感想や追加の視点を述べてください。",
+            "response2": f"これまでの議論を受けて、{character.name}らしく返事してください。前の人とは違う{character.name}独自の感想や今後の抱負を述べてください。",
+            "final_tease": f"{character.name}らしく楽しく締めくくってください。筋トレの例えを使って前向きにまとめてください。"
+        }
+        return step_prompts.get(step_type, f"「{topic}」について{character.name}らしく発言してください。")
+    
+    async def _get_replied_message(self, message: discord.Message) -> Optional[discord.Message]:
+        """リプライ先のメッセージ（ゲートウェイが添付した resolved → ボットのキャッシュ → API取得の順）"""
+        reference = message.reference
+        if isinstance(reference.resolved, discord.Message):
+            return reference.resolved
+        if isinstance(reference.resolved, discord.DeletedReferencedMessage):
             return None
+        cached = discord.utils.get(self.bot.cached_messages, id=reference.message_id)
+        if cached is not None:
+            return cached
+        return await message.channel.fetch_message(reference.message_id)
     
     async def _send_character_message(self, channel: discord.TextChannel, character: AICharacter, message: str):
         """キャラクターとしてメッセージを送信"""
         try:
             # キャラクター固有のWebhookを使用してリプライ検出を可能にする
-            webhooks = await channel.webhooks()
-            webhook = None
-            webhook_name = f"AI_Character_{character.id}"
-            
-            for wh in webhooks:
-                if wh.name == webhook_name:
-                    webhook = wh
-                    break
-            
-            if not webhook:
-                webhook = await channel.create_webhook(name=webhook_name)
-            
-            await webhook.send(
+            await self.webhooks.send(
+                channel,
+                character.id,
                 content=message,
                 username=character.display_name,
                 avatar_url=character.avatar_url
@@ -286,11 +266,13 @@ class AIChatSystemSimple(commands.Cog):
             # Webhookが失敗した場合は通常のメッセージとして送信
             await channel.send(f"**{character.display_name}**: {message}")
     
-    async def _handle_reply_to_character(self, message: discord.Message, character: AICharacter):
+    async def _handle_reply_to_character(self, message: discord.Message, character: AICharacter,
+                                         replied_message: Optional[discord.Message] = None):
         """AIキャラクターへのリプライを処理"""
         try:
-            # リプライされたメッセージの内容を取得
-            replied_message = await message.channel.fetch_message(message.reference.message_id)
+            # リプライされたメッセージの内容（on_message で取得済みのものを使う）
+            if replied_message is None:
+                replied_message = await self._get_replied_message(message)
             original_content = replied_message.content if replied_message else ""
             
             # AI応答を生成
@@ -298,12 +280,13 @@ class AIChatSystemSimple(commands.Cog):
                     f"ユーザーが「{original_content}」というあなたのメッセージに対して「{message.content}」と返信しました。" \
                     f"あなたの性格とキャラクターらしく、適切に返答してください。"
             
-            response = await self.gemini_chat.generate_response(
+            response = await self.gemini_chat.get_ai_character_response(
                 character.name,
                 character.personality,
                 character.speaking_style,
                 prompt,
-                []  # リプライの場合は会話履歴は使わない
+                "",  # リプライの場合は会話履歴は使わない
+                priority=PRIORITY_INTERACTIVE
             )
             
             if response:
@@ -12,13 +12,19 @@ class ChannelIntroCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.jst = pytz.timezone('Asia/Tokyo')
+        # 最初にトークを生成するときに作る（毎回作り直さない）
+        self.gemini_chat = None
     
     async def get_gemini_talks(self) -> list:
         """Geminiから小粋なトークを取得（1個）"""
         talks = []
         try:
             from lib.gemini_chat import GeminiChat
-            gemini = GeminiChat()
+            from utils.llm_metrics import FEATURE_CHANNEL_INTRO
+            from utils.llm_scheduler import PRIORITY_BACKGROUND
+            if self.gemini_chat is None:
+                self.gemini_chat = GeminiChat()
+            gemini = self.gemini_chat
             
             # ランダムなトピックでトークを生成
             topics = [
@@ -37,7 +43,8 @@ class ChannelIntroCog(commands.Cog):
             topic = random.choice(topics)
             prompt = f"{topic}。50文字以内で、絵文字も使って親しみやすくお願いします。"
             
-            response = await gemini.get_response("channel_intro_system", prompt)
+            # 定型トピックなので生成結果はキャッシュから順番に使い回す
+            response = await gemini.generate(prompt, priority=PRIORITY_BACKGROUND, feature=FEATURE_CHANNEL_INTRO)
             
             # レスポンスを50文字に制限
             if len(response) > 50:
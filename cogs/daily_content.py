@@ -6,6 +6,7 @@ import datetime
 import asyncio
 from config.config import ADMIN_ID
 from utils.daily_settings_manager import DailySettingsManager
+from utils.content_fanout import ContentMemo, ChannelRateLimiter, fan_out
 
 class DailyContentCog(commands.Cog):
     def __init__(self, bot):
@@ -18,6 +19,9 @@ class DailyContentCog(commands.Cog):
             "challenge": set(),
             "trends": set()
         }
+        # 同じ日のコンテンツはギルド間で使い回す
+        self.content_memo = ContentMemo()
+        self.channel_limiter = ChannelRateLimiter()
         
     async def cog_load(self):
         """Cogが読み込まれた時に実行"""
@@ -60,7 +64,8 @@ class DailyContentCog(commands.Cog):
                 }
         self.last_check_date = current_date
         
-        # 各ギルドの設定をチェック
+        # 各ギルドの設定をチェックし、配信対象を集める
+        jobs = []
         for guild in self.bot.guilds:
             guild_id = str(guild.id)
             settings = self.settings_manager.get_guild_settings(guild_id)
@@ -70,7 +75,7 @@ class DailyContentCog(commands.Cog):
                 now.hour == settings.quotes_hour and 
                 now.minute == settings.quotes_minute and
                 guild_id not in self.sent_today["quotes"]):
-                await self.send_quotes_content(guild, settings)
+                jobs.append(lambda guild=guild, settings=settings: self.send_quotes_content(guild, settings))
                 self.sent_today["quotes"].add(guild_id)
             
             # スキルアップTipsチェック
@@ -78,7 +83,7 @@ class DailyContentCog(commands.Cog):
                 now.hour == settings.tips_hour and
                 now.minute == settings.tips_minute and
                 guild_id not in self.sent_today["tips"]):
-                await self.send_tips_content(guild, settings)
+                jobs.append(lambda guild=guild, settings=settings: self.send_tips_content(guild, settings))
                 self.sent_today["tips"].add(guild_id)
             
             # 今日のチャレンジチェック
@@ -86,7 +91,7 @@ class DailyContentCog(commands.Cog):
                 now.hour == settings.challenge_hour and
                 now.minute == settings.challenge_minute and
                 guild_id not in self.sent_today["challenge"]):
-                await self.send_challenge_content(guild, settings)
+                jobs.append(lambda guild=guild, settings=settings: self.send_challenge_content(guild, settings))
                 self.sent_today["challenge"].add(guild_id)
             
             # ビジネストレンドチェック
@@ -97,11 +102,38 @@ class DailyContentCog(commands.Cog):
                 # 曜日チェック
                 trend_days = [int(d.strip()) for d in settings.trends_days.split(',')]
                 if current_weekday in trend_days:
-                    await self.send_trends_content(guild, settings)
+                    jobs.append(lambda guild=guild, settings=settings: self.send_trends_content(guild, settings))
                     self.sent_today["trends"].add(guild_id)
+        
+        # 全ギルドへ並列配信（同じ日・同じ種別のコンテンツ生成は1回だけ）
+        if jobs:
+            await fan_out(jobs)
+    
+    async def send_content(self, guild, settings, content_type, builder):
+        """当日分のコンテンツ（全ギルド共通で1回だけ生成）を送信"""
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+        key = ContentMemo.make_key(content_type, now.strftime("%Y-%m-%d"))
+        embed = await self.content_memo.get_or_build(key, builder)
+        await self.send_to_guild(guild, settings, embed)
     
     async def send_quotes_content(self, guild, settings):
         """起業家格言コンテンツを送信"""
+        await self.send_content(guild, settings, "quotes", self.create_quotes_embed)
+    
+    async def send_tips_content(self, guild, settings):
+        """スキルアップTipsコンテンツを送信"""
+        await self.send_content(guild, settings, "tips", self.create_tips_embed)
+    
+    async def send_challenge_content(self, guild, settings):
+        """今日のチャレンジコンテンツを送信"""
+        await self.send_content(guild, settings, "challenge", self.create_challenge_embed)
+    
+    async def send_trends_content(self, guild, settings):
+        """ビジネストレンドコンテンツを送信"""
+        await self.send_content(guild, settings, "trends", self.create_trends_embed)
+    
+    async def create_quotes_embed(self):
+        """起業家格言のEmbed作成"""
         quotes = [
             {
                 "quote": "イノベーションは、リーダーとフォロワーを区別するものだ。",
@@ -199,10 +231,10 @@ class DailyContentCog(commands.Cog):
         )
         embed.set_footer(text="ZERO to ONE 🌟 成長は毎日の積み重ね")
         
-        await self.send_to_guild(guild, settings, embed)
+        return embed
     
-    async def send_tips_content(self, guild, settings):
-        """スキルアップTipsコンテンツを送信"""
+    async def create_tips_embed(self):
+        """スキルアップTipsのEmbed作成"""
         tips = [
             {
                 "category": "💻 プログラミング",
@@ -304,10 +336,10 @@ class DailyContentCog(commands.Cog):
         )
         embed.set_footer(text="ZERO to ONE 📈 スキルアップで差をつけよう")
         
-        await self.send_to_guild(guild, settings, embed)
+        return embed
     
-    async def send_challenge_content(self, guild, settings):
-        """今日のチャレンジコンテンツを送信"""
+    async def create_challenge_embed(self):
+        """今日のチャレンジのEmbed作成"""
         challenges = [
             {
                 "title": "競合分析チャレンジ",
@@ -429,10 +461,10 @@ class DailyContentCog(commands.Cog):
         )
         embed.set_footer(text="ZERO to ONE 🎯 毎日の挑戦で成長しよう")
         
-        await self.send_to_guild(guild, settings, embed)
+        return embed
     
-    async def send_trends_content(self, guild, settings):
-        """ビジネストレンドコンテンツを送信"""
+    async def create_trends_embed(self):
+        """ビジネストレンドのEmbed作成"""
         trends = [
             {
                 "category": "🤖 AI・テクノロジー",
@@ -524,7 +556,7 @@ class DailyContentCog(commands.Cog):
         )
         embed.set_footer(text="ZERO to ONE 📈 トレンドを先取りして競争優位を築こう")
         
-        await self.send_to_guild(guild, settings, embed)
+        return embed
     
     async def send_to_guild(self, guild, settings, embed):
         """個別ギルドに送信"""
@@ -532,6 +564,7 @@ class DailyContentCog(commands.Cog):
             target_channel = self.settings_manager.get_target_channel(guild, settings)
             if target_channel:
                 mention_text = self.settings_manager.get_mention_text(guild, settings)
+                await self.channel_limiter.wait(target_channel.id)
                 if mention_text:
                     await target_channel.send(mention_text, embed=embed)
                 else:
@@ -0,0 +1,106 @@
+# -*- coding:utf-8 -*-
+"""
+LLM Usage
+Gemini の利用状況（機能ごとの呼び出し回数・トークン数・所要時間・キャッシュ利用・エラー）
+
+- 記録は GeminiChat が utils/llm_metrics.py の llm_metrics に溜め、このCogが定期的に書き出す
+- /llm_usage で機能ごとの利用状況と p50 / p95 の所要時間を表示する
+"""
+
+import logging
+from datetime import datetime
+
+import discord
+from discord.ext import commands, tasks
+
+from config.config import LLM_METRICS_CONFIG
+from utils.llm_metrics import (llm_metrics, FEATURE_MENTION_CHAT, FEATURE_CHARACTER_CONVERSATION,
+                               FEATURE_CHANNEL_INTRO, FEATURE_ANNOUNCEMENT_FEEDBACK, FEATURE_SESSION_SUMMARY)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_LABELS = {
+    FEATURE_MENTION_CHAT: "💬 メンション返信",
+    FEATURE_CHARACTER_CONVERSATION: "🎭 AIキャラ会話",
+    FEATURE_CHANNEL_INTRO: "📺 チャンネル紹介",
+    FEATURE_ANNOUNCEMENT_FEEDBACK: "📢 告知フィードバック",
+    FEATURE_SESSION_SUMMARY: "🗂️ 会話履歴の要約",
+}
+
+
+class LLMUsageCog(commands.Cog):
+    """LLM利用状況の書き出しと表示"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = llm_metrics
+
+    @tasks.loop(minutes=LLM_METRICS_CONFIG["flush_interval_minutes"])
+    async def flush_metrics(self):
+        """溜まった記録を定期的に書き出す"""
+        flushed = await self.metrics.flush()
+        if flushed:
+            logger.info(f"LLM利用状況を {flushed}件 書き出しました")
+
+    @discord.app_commands.command(name="llm_usage", description="Gemini の機能ごとの利用状況を表示")
+    @discord.app_commands.default_permissions(administrator=True)
+    @discord.app_commands.describe(hours="集計する期間（時間、0 なら起動してから）")
+    async def show_llm_usage(self, interaction: discord.Interaction, hours: int = 24):
+        """機能ごとの呼び出し回数・トークン数・キャッシュ利用・エラー・所要時間を表示"""
+        await interaction.response.defer()
+
+        if hours > 0:
+            summary = await self.metrics.summary_since(hours)
+            period = f"直近{hours}時間"
+        else:
+            summary = self.metrics.summary()
+            period = f"起動してから（{datetime.fromtimestamp(self.metrics.started):%m/%d %H:%M}〜）"
+
+        embed = discord.Embed(
+            title="🤖 Gemini 利用状況",
+            description=period,
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+
+        if not summary:
+            embed.add_field(name="記録なし", value="この期間のモデル呼び出しはありません", inline=False)
+
+        total_prompt = total_completion = total_calls = 0
+        for feature, stats in sorted(summary.items(), key=lambda item: -item[1]['calls']):
+            total_calls += stats['calls']
+            total_prompt += stats['prompt_tokens']
+            total_completion += stats['completion_tokens']
+            lines = [
+                f"呼び出し: {stats['calls']}回（キャッシュ {stats['cache_hits']}回）",
+                f"トークン: 入力 {stats['prompt_tokens']:,} / 出力 {stats['completion_tokens']:,}",
+                f"所要時間: p50 {stats['p50']:.2f}秒 / p95 {stats['p95']:.2f}秒",
+            ]
+            if stats['errors']:
+                classes = ', '.join(f"{name} {count}" for name, count in
+                                    sorted(stats['error_classes'].items(), key=lambda item: -item[1]))
+                lines.append(f"エラー: {stats['errors']}回（{classes}）")
+            embed.add_field(name=FEATURE_LABELS.get(feature, feature), value="\n".join(lines), inline=False)
+
+        if summary:
+            embed.add_field(
+                name="📊 合計",
+                value=f"呼び出し: {total_calls}回\nトークン: 入力 {total_prompt:,} / 出力 {total_completion:,}",
+                inline=False
+            )
+
+        await interaction.followup.send(embed=embed)
+
+    async def cog_load(self):
+        """Cogロード時に書き出しを開始"""
+        if not self.flush_metrics.is_running():
+            self.flush_metrics.start()
+
+    async def cog_unload(self):
+        """Cogアンロード時に書き出しを止め、残りを書き出す"""
+        self.flush_metrics.cancel()
+        await self.metrics.flush()
+
+
+async def setup(bot):
+    await bot.add_cog(LLMUsageCog(bot))
@@ -6,8 +6,9 @@ import asyncio
 import json
 import os
 from datetime import datetime, timezone, timedelta
-import xml.etree.ElementTree as ET
 from config.config import ADMIN_ID, RSS_CONFIG
+from utils.feeds import parse_feed, clean_html
+from utils.http_cache import http_cache
 
 class RSSMonitorCog(commands.Cog):
     def __init__(self, bot):
@@ -39,6 +40,8 @@ class RSSMonitorCog(commands.Cog):
     def cog_unload(self):
         """Cogがアンロードされる時にタスクを停止"""
         self.rss_monitor_task.cancel()
+        # HTTPキャッシュの裏の再取得を止めてセッションを閉じる（他のCogが使えば作り直される）
+        asyncio.ensure_future(http_cache.close())
     
     @commands.Cog.listener()
     async def on_ready(self):
@@ -101,14 +104,15 @@ class RSSMonitorCog(commands.Cog):
         try:
             print(f"Fetching RSS from: {self.rss_url}")
             async with aiohttp.ClientSession() as session:
-                async with session.get(self.rss_url, timeout=30) as response:
-                    if response.status == 200:
-                        rss_content = await response.text()
-                        print(f"RSS fetch successful, content length: {len(rss_content)}")
-                        return self.parse_rss_content(rss_content)
-                    else:
-                        print(f"RSS fetch failed: Status {response.status} for URL: {self.rss_url}")
-                        return []
+                # 新着検知が遅れないよう期限切れの内容は使わない
+                response = await http_cache.get(session, self.rss_url, timeout=30, stale_ttl=0)
+                if response.status == 200:
+                    rss_content = response.text()
+                    print(f"RSS fetch successful, content length: {len(rss_content)}")
+                    return self.parse_rss_content(rss_content)
+                else:
+                    print(f"RSS fetch failed: Status {response.status} for URL: {self.rss_url}")
+                    return []
         except asyncio.TimeoutError:
             print("RSS fetch timeout")
             return []
@@ -119,61 +123,24 @@ class RSSMonitorCog(commands.Cog):
     def parse_rss_content(self, rss_content):
         """RSS XMLを解析して新記事を抽出"""
         try:
-            root = ET.fromstring(rss_content)
-            new_articles = []
-            
-            # RSS 2.0形式のitemを検索
-            for item in root.findall('.//item'):
-                guid_elem = item.find('guid')
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                description_elem = item.find('description')
-                pub_date_elem = item.find('pubDate')
-                category_elem = item.find('category')
-                
-                if guid_elem is not None and guid_elem.text:
-                    guid = guid_elem.text.strip()
-                    
-                    # 新記事かチェック
-                    if guid not in self.known_articles:
-                        article = {
-                            'guid': guid,
-                            'title': title_elem.text.strip() if title_elem is not None and title_elem.text else "タイトル不明",
-                            'link': link_elem.text.strip() if link_elem is not None and link_elem.text else guid,
-                            'description': self.clean_html(description_elem.text) if description_elem is not None and description_elem.text else "説明なし",
-                            'pub_date': pub_date_elem.text.strip() if pub_date_elem is not None and pub_date_elem.text else "",
-                            'category': category_elem.text.strip() if category_elem is not None and category_elem.text else "未分類"
-                        }
-                        new_articles.append(article)
-            
-            return new_articles
-            
-        except ET.ParseError as e:
-            print(f"RSS XML parse error: {e}")
-            return []
+            return [
+                article for article in self.parse_all_rss_content(rss_content)
+                if article['guid'] not in self.known_articles
+            ]
         except Exception as e:
             print(f"RSS content parse error: {e}")
             return []
     
-    def clean_html(self, text):
-        """HTMLタグを除去してテキストをクリーンアップ"""
-        if not text:
-            return ""
-        
-        # 簡単なHTMLタグ除去
-        import re
-        clean_text = re.sub(r'<[^>]+>', '', text)
-        clean_text = clean_text.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-        clean_text = clean_text.replace('&quot;', '"').replace('&apos;', "'")
-        
-        # 改行とスペースを正規化
-        clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-        
-        # 150文字に制限
-        if len(clean_text) > 150:
-            clean_text = clean_text[:147] + "..."
-        
-        return clean_text
+    def to_article(self, item):
+        """フィード項目を通知用の記事dictに変換"""
+        return {
+            'guid': item.guid,
+            'title': item.title or "タイトル不明",
+            'link': item.link or item.guid,
+            'description': clean_html(item.description, max_length=150) or "説明なし",
+            'pub_date': item.published,
+            'category': item.category or "未分類"
+        }
     
     async def send_new_article_notification(self, article):
         """新記事通知をDiscordに送信"""
@@ -256,17 +223,17 @@ class RSSMonitorCog(commands.Cog):
         try:
             print(f"[TEST] Fetching RSS from: {self.rss_url}")
             async with aiohttp.ClientSession() as session:
-                async with session.get(self.rss_url, timeout=30) as response:
-                    if response.status == 200:
-                        rss_content = await response.text()
-                        print(f"[TEST] RSS fetch successful, content length: {len(rss_content)}")
-                        return self.parse_all_rss_content(rss_content)
-                    else:
-                        print(f"[TEST] RSS fetch failed: Status {response.status} for URL: {self.rss_url}")
-                        # 404の場合、URLが正しいか確認を促す
-                        if response.status == 404:
-                            print(f"[TEST] RSS not found. Please check if the RSS is deployed at: {self.rss_url}")
-                        return []
+                response = await http_cache.get(session, self.rss_url, timeout=30)
+                if response.status == 200:
+                    rss_content = response.text()
+                    print(f"[TEST] RSS fetch successful, content length: {len(rss_content)}")
+                    return self.parse_all_rss_content(rss_content)
+                else:
+                    print(f"[TEST] RSS fetch failed: Status {response.status} for URL: {self.rss_url}")
+                    # 404の場合、URLが正しいか確認を促す
+                    if response.status == 404:
+                        print(f"[TEST] RSS not found. Please check if the RSS is deployed at: {self.rss_url}")
+                    return []
         except asyncio.TimeoutError:
             print("RSS fetch timeout")
             return []
@@ -277,34 +244,8 @@ class RSSMonitorCog(commands.Cog):
     def parse_all_rss_content(self, rss_content):
         """テスト用：全RSS記事を解析（既知チェックなし）"""
         try:
-            root = ET.fromstring(rss_content)
-            all_articles = []
-            
-            # RSS 2.0形式のitemを検索
-            for item in root.findall('.//item'):
-                guid_elem = item.find('guid')
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                description_elem = item.find('description')
-                pub_date_elem = item.find('pubDate')
-                category_elem = item.find('category')
-                
-                if guid_elem is not None and guid_elem.text:
-                    article = {
-                        'guid': guid_elem.text.strip(),
-                        'title': title_elem.text.strip() if title_elem is not None and title_elem.text else "タイトル不明",
-                        'link': link_elem.text.strip() if link_elem is not None and link_elem.text else guid_elem.text.strip(),
-                        'description': self.clean_html(description_elem.text) if description_elem is not None and description_elem.text else "説明なし",
-                        'pub_date': pub_date_elem.text.strip() if pub_date_elem is not None and pub_date_elem.text else "",
-                        'category': category_elem.text.strip() if category_elem is not None and category_elem.text else "未分類"
-                    }
-                    all_articles.append(article)
-            
-            return all_articles
-            
-        except ET.ParseError as e:
-            print(f"RSS XML parse error: {e}")
-            return []
+            # guidのない項目は既知判定ができないため対象外
+            return [self.to_article(item) for item in parse_feed(rss_content) if item.guid]
         except Exception as e:
             print(f"RSS content parse error: {e}")
             return []
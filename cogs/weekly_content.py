@@ -5,13 +5,19 @@ import random
 import datetime
 import asyncio
 import aiohttp
-from config.config import ADMIN_ID, WEEKLY_MENTION_ROLES
+from config.config import ADMIN_ID, WEEKLY_MENTION_ROLES, WEEKLY_PREFETCH_CONFIG, EVENT_INDEX_CONFIG
 from utils.weekly_settings_manager import WeeklySettingsManager
 from utils.event_manager import EventManager
 from utils.news_manager import NewsManager
 from utils.connpass_manager import ConnpassManager
 from utils.trends_manager import TrendsManager
 from utils.enhanced_trends_manager import EnhancedTrendsManager
+from utils.http_cache import http_cache
+from utils.content_prefetcher import ContentPrefetcher
+from utils.content_fanout import ContentMemo, ChannelRateLimiter, fan_out
+
+# 外部ソースから取得するため配信前に事前生成しておくコンテンツ
+PREFETCH_CONTENT_TYPES = ("trends", "tech", "connpass", "events")
 
 class WeeklyContentCog(commands.Cog):
     def __init__(self, bot):
@@ -41,6 +47,12 @@ class WeeklyContentCog(commands.Cog):
             
         # 送信済み記録（重複防止用）
         self.sent_today = set()
+
+        # 配信前のコンテンツ事前生成
+        self.prefetcher = ContentPrefetcher()
+        # 同じ日・同じ内容のコンテンツはギルド間で使い回す
+        self.content_memo = ContentMemo()
+        self.channel_limiter = ChannelRateLimiter()
         print("WeeklyContentCog: Initialization completed")
         
     async def cog_load(self):
@@ -58,12 +70,25 @@ class WeeklyContentCog(commands.Cog):
             if not self.weekly_scheduler.is_running():
                 self.weekly_scheduler.start()
                 print("WeeklyContentCog: Scheduler started")
+            if not self.prefetch_scheduler.is_running():
+                self.prefetch_scheduler.start()
+                print("WeeklyContentCog: Prefetch scheduler started")
+            if not self.event_index_sync.is_running():
+                self.event_index_sync.start()
+                print("WeeklyContentCog: Event index sync started")
         except Exception as e:
             print(f"WeeklyContentCog: Error starting scheduler: {e}")
     
     def cog_unload(self):
         """Cogがアンロードされる時にタスクを停止"""
         self.weekly_scheduler.cancel()
+        self.prefetch_scheduler.cancel()
+        self.event_index_sync.cancel()
+        self.prefetcher.cancel_all()
+        if self.event_manager:
+            asyncio.ensure_future(self.event_manager.close())
+        # HTTPキャッシュの裏の再取得を止めてセッションを閉じる（次に再取得するときは作り直される）
+        asyncio.ensure_future(http_cache.close())
     
     @commands.Cog.listener()
     async def on_ready(self):
@@ -96,7 +121,8 @@ class WeeklyContentCog(commands.Cog):
                 self.sent_today = set()
         self.last_check_date = current_date
         
-        # 各ギルドの設定をチェック
+        # 各ギルドの設定をチェックし、配信対象を集める
+        jobs = []
         for guild in self.bot.guilds:
             guild_id = str(guild.id)
             
@@ -118,34 +144,121 @@ class WeeklyContentCog(commands.Cog):
             if (now.hour == target_hour and 
                 abs(now.minute - target_minute) <= 10):
                 
-                # コンテンツを送信
-                await self.send_daily_content(guild, content_info['content_type'], current_weekday)
+                jobs.append(
+                    lambda guild=guild, content_type=content_info['content_type']:
+                        self.send_daily_content(guild, content_type, current_weekday)
+                )
                 self.sent_today.add(guild_id)
+        
+        # 全ギルドへ並列配信（同じ内容のコンテンツ生成は1回だけ）
+        if jobs:
+            await fan_out(jobs)
+    
+    # 事前生成スケジューラー（配信時刻の lead_minutes 分前から生成・失敗時は裏で再試行）
+    @tasks.loop(minutes=WEEKLY_PREFETCH_CONFIG["check_interval_minutes"])
+    async def prefetch_scheduler(self):
+        """配信予定コンテンツの事前生成スケジューラー"""
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+        current_weekday = now.weekday()
+        
+        for guild in self.bot.guilds:
+            guild_id = str(guild.id)
+            if guild_id in self.sent_today:
+                continue
+            
+            content_info = self.settings_manager.get_today_content_info(guild_id, current_weekday)
+            content_type = content_info['content_type']
+            if not content_info['enabled'] or content_type not in PREFETCH_CONTENT_TYPES:
+                continue
+            if not self.prefetcher.is_due(now, content_info['hour'], content_info['minute']):
+                continue
+            
+            deadline = now.replace(hour=content_info['hour'], minute=content_info['minute'], second=0, microsecond=0)
+            self.prefetcher.schedule(
+                self.get_snapshot_key(guild_id, content_type, now),
+                lambda content_type=content_type, guild_id=guild_id: self.build_snapshot(content_type, guild_id),
+                deadline
+            )
+    
+    # イベントインデックスの同期（前回以降に更新されたイベントだけを取り込む）
+    @tasks.loop(minutes=EVENT_INDEX_CONFIG["sync_interval_minutes"])
+    async def event_index_sync(self):
+        """connpass / Doorkeeper のローカルイベントインデックスを同期"""
+        if not EVENT_INDEX_CONFIG["enabled"]:
+            return
+        managers = [manager for manager in (self.connpass_manager, self.event_manager) if manager]
+        results = await asyncio.gather(*(manager.sync_index() for manager in managers), return_exceptions=True)
+        for manager, result in zip(managers, results):
+            if isinstance(result, Exception):
+                print(f"Event index sync error ({type(manager).__name__}): {result}")
+    
+    def get_snapshot_key(self, guild_id, content_type, now):
+        """事前生成スナップショットのキー（地域イベントは地域設定ごと）"""
+        regions = self.settings_manager.get_regions_list(guild_id) if content_type == "events" else None
+        return ContentPrefetcher.snapshot_key(now.strftime("%Y-%m-%d"), content_type, regions)
+    
+    async def build_snapshot(self, content_type, guild_id):
+        """事前生成用にコンテンツを作成してEmbedのdictリストにする（取得失敗時は例外）"""
+        content = await self.build_content(content_type, guild_id, strict=True)
+        embeds = content if isinstance(content, list) else [content]
+        return [embed.to_dict() for embed in embeds]
+    
+    async def build_content(self, content_type, guild_id, strict=False):
+        """コンテンツタイプに応じたEmbed（connpassはリスト）を作成
+        
+        strict=True の場合は取得失敗時にフォールバックせず例外を送出する（事前生成の再試行用）
+        """
+        if content_type == "quotes":
+            return await self.create_quotes_embed()
+        elif content_type == "trends":
+            return await self.create_trends_embed(strict=strict)
+        elif content_type == "tips":
+            return await self.create_tips_embed()
+        elif content_type == "tech":
+            return await self.create_tech_embed(strict=strict)
+        elif content_type == "challenge":
+            return await self.create_challenge_embed()
+        elif content_type == "events":
+            regions = self.settings_manager.get_regions_list(guild_id)
+            return await self.create_events_embed(regions, strict=strict)
+        elif content_type == "connpass":
+            return await self.create_connpass_embeds(strict=strict)  # send_to_guildでリスト判定される
+        elif content_type == "mindset":
+            return await self.create_mindset_embed()
+        return None  # 未知のコンテンツタイプ
+    
+    async def get_daily_content(self, content_type, guild_id):
+        """当日分のコンテンツを取得（同じ種別・地域のコンテンツは全ギルドで1回だけ生成）"""
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+        regions = self.settings_manager.get_regions_list(guild_id) if content_type == "events" else None
+        key = ContentMemo.make_key(content_type, now.strftime("%Y-%m-%d"), regions)
+        return await self.content_memo.get_or_build(
+            key, lambda: self.load_daily_content(content_type, guild_id, now)
+        )
+    
+    async def load_daily_content(self, content_type, guild_id, now):
+        """事前生成済みならスナップショットから、なければその場でコンテンツを作成"""
+        if content_type in PREFETCH_CONTENT_TYPES:
+            # 事前生成済みならそれを使う（生成中なら少しだけ待つ）
+            key = self.get_snapshot_key(guild_id, content_type, now)
+            payload = self.prefetcher.get(key)
+            if payload is None:
+                payload = await self.prefetcher.wait(key, WEEKLY_PREFETCH_CONFIG["send_wait_seconds"])
+            if payload:
+                embeds = [discord.Embed.from_dict(data) for data in payload]
+                return embeds if content_type == "connpass" else embeds[0]
+            print(f"事前生成なし、その場で生成します: {key}")
+        
+        return await self.build_content(content_type, guild_id)
     
     async def send_daily_content(self, guild, content_type, weekday):
         """日次コンテンツを送信"""
-        settings = self.settings_manager.get_guild_settings(str(guild.id))
+        guild_id = str(guild.id)
+        settings = self.settings_manager.get_guild_settings(guild_id)
         
         try:
-            if content_type == "quotes":
-                embed = await self.create_quotes_embed()
-            elif content_type == "trends":
-                embed = await self.create_trends_embed()
-            elif content_type == "tips":
-                embed = await self.create_tips_embed()
-            elif content_type == "tech":
-                embed = await self.create_tech_embed()
-            elif content_type == "challenge":
-                embed = await self.create_challenge_embed()
-            elif content_type == "events":
-                regions = self.settings_manager.get_regions_list(str(guild.id))
-                embed = await self.create_events_embed(regions)
-            elif content_type == "connpass":
-                embeds = await self.create_connpass_embeds()
-                embed = embeds  # send_to_guildでリスト判定される
-            elif content_type == "mindset":
-                embed = await self.create_mindset_embed()
-            else:
+            embed = await self.get_daily_content(content_type, guild_id)
+            if embed is None:
                 return  # 未知のコンテンツタイプ
             
             await self.send_to_guild(guild, settings, embed, weekday)
@@ -204,7 +317,7 @@ class WeeklyContentCog(commands.Cog):
         
         return embed
     
-    async def get_enhanced_business_trends(self):
+    async def get_enhanced_business_trends(self, strict=False):
         """高品質ビジネストレンド取得 - 各カテゴリ1-2位"""
         print("[DEBUG] get_enhanced_business_trends called")
         try:
@@ -213,7 +326,7 @@ class WeeklyContentCog(commands.Cog):
                 print("[DEBUG] EnhancedTrendsManager created successfully")
                 # 全トレンド取得
                 print("[DEBUG] Calling manager.get_enhanced_trends...")
-                all_trends = await manager.get_enhanced_trends(max_trends=200)
+                all_trends = await manager.get_enhanced_trends(max_trends=200, strict=strict)
                 print(f"[DEBUG] Received {len(all_trends)} trends from manager")
 
                 # カテゴリ別に分類・ソート
@@ -231,10 +344,11 @@ class WeeklyContentCog(commands.Cog):
                     sorted_trends = sorted(trends, key=lambda x: x.get('quality_score', 0), reverse=True)
                     top_trends[category] = sorted_trends[:2]  # 上位2件
 
-                # Discord用フォーマット取得
-                embed_data = manager.format_trends_for_discord(
-                    [trend for trends in top_trends.values() for trend in trends]
-                )
+                # Discord用フォーマット取得（伸び率上位の「急上昇」記事も渡す）
+                selected = [trend for trends in top_trends.values() for trend in trends]
+                selected_ids = {id(trend) for trend in selected}
+                rising = [trend for trend in manager.select_rising(all_trends) if id(trend) not in selected_ids]
+                embed_data = manager.format_trends_for_discord(rising + selected)
                 
                 # Discord Embedオブジェクト作成
                 embed = discord.Embed(
@@ -259,6 +373,8 @@ class WeeklyContentCog(commands.Cog):
             print(f"[DEBUG] Enhanced trends取得エラー: {e}")
             import traceback
             traceback.print_exc()
+            if strict:
+                raise
             # フォールバック: 従来システムを使用
             print("[DEBUG] Falling back to original trends method...")
             return await self.original_trends_method()
@@ -310,9 +426,9 @@ class WeeklyContentCog(commands.Cog):
         
         return embed
 
-    async def create_trends_embed(self):
+    async def create_trends_embed(self, strict=False):
         """ビジネストレンドのEmbed作成（新システム対応）"""
-        return await self.get_enhanced_business_trends()
+        return await self.get_enhanced_business_trends(strict=strict)
     
     async def create_tips_embed(self):
         """スキルアップTipsのEmbed作成"""
@@ -354,11 +470,13 @@ class WeeklyContentCog(commands.Cog):
         
         return embed
     
-    async def create_tech_embed(self):
+    async def create_tech_embed(self, strict=False):
         """テック・イノベーションのEmbed作成（リアルタイムニュース）"""
         try:
             # リアルタイムニュース取得を試行
             articles = await self.news_manager.get_tech_news(max_articles=5)
+            if strict and not articles:
+                raise RuntimeError("テックニュースを取得できませんでした")
             embed_data = self.news_manager.format_news_for_embed(articles)
             
             embed = discord.Embed(
@@ -378,6 +496,8 @@ class WeeklyContentCog(commands.Cog):
             
         except Exception as e:
             print(f"Error creating tech news embed: {e}")
+            if strict:
+                raise
             # フォールバック用の従来のEmbed
             embed = discord.Embed(
                 title="🌐 テック・イノベーション情報",
@@ -446,10 +566,10 @@ class WeeklyContentCog(commands.Cog):
         
         return embed
     
-    async def create_events_embed(self, regions):
+    async def create_events_embed(self, regions, strict=False):
         """地域イベントのEmbed作成"""
         try:
-            events = await self.event_manager.get_career_events(regions, days_ahead=7)
+            events = await self.event_manager.get_career_events(regions, days_ahead=7, strict=strict)
             embed_data = self.event_manager.format_events_for_embed(events, regions)
             
             embed = discord.Embed(
@@ -469,6 +589,8 @@ class WeeklyContentCog(commands.Cog):
             
         except Exception as e:
             print(f"Error creating events embed: {e}")
+            if strict:
+                raise
             # フォールバック用の簡単なEmbed
             embed = discord.Embed(
                 title="🎪 今週の地域イベント情報",
@@ -526,10 +648,10 @@ class WeeklyContentCog(commands.Cog):
         
         return embed
     
-    async def create_connpass_embeds(self):
+    async def create_connpass_embeds(self, strict=False):
         """connpassオンライン講座のEmbed作成（複数embed対応）"""
         try:
-            embeds_data = await self.connpass_manager.get_events_embed()
+            embeds_data = await self.connpass_manager.get_events_embed(strict=strict)
             
             # 各embed_dataをdiscord.Embedに変換
             embeds = []
@@ -558,6 +680,8 @@ class WeeklyContentCog(commands.Cog):
             
         except Exception as e:
             print(f"Error creating connpass embeds: {e}")
+            if strict:
+                raise
             # フォールバック用の簡単なEmbed
             embed = discord.Embed(
                 title="💻 今週のオンライン講座情報",
@@ -605,6 +729,7 @@ class WeeklyContentCog(commands.Cog):
                 if isinstance(embeds, list):
                     # 複数のembedを送信
                     for i, embed in enumerate(embeds):
+                        await self.channel_limiter.wait(target_channel.id)
                         if i == 0 and mention_text:
                             # 最初のメッセージのみメンション付き
                             await target_channel.send(mention_text, embed=embed)
@@ -613,6 +738,7 @@ class WeeklyContentCog(commands.Cog):
                             await target_channel.send(embed=embed)
                 else:
                     # 単一embed（従来の動作）
+                    await self.channel_limiter.wait(target_channel.id)
                     if mention_text:
                         await target_channel.send(mention_text, embed=embeds)
                     else:
@@ -857,9 +983,24 @@ class WeeklyContentCog(commands.Cog):
             else:
                 await interaction.response.send_message("設定の更新に失敗しました", ephemeral=True)
                 
+        elif action.lower() == "cache":
+            stats = http_cache.get_stats()
+            embed = discord.Embed(title="🗄️ HTTPキャッシュ統計", color=discord.Color.blue())
+            embed.add_field(name="ヒット", value=f"{stats['hits']}件（期限切れ再利用 {stats['stale_hits']}件）", inline=True)
+            embed.add_field(name="ミス", value=f"{stats['misses']}件", inline=True)
+            embed.add_field(name="ヒット率", value=f"{stats['hit_rate']:.1%}", inline=True)
+            embed.add_field(name="再取得 / エラー", value=f"{stats['revalidations']}件 / {stats['errors']}件", inline=True)
+            if 'entries' in stats:
+                embed.add_field(
+                    name="保存件数",
+                    value=f"{stats['entries']}件（{stats['total_bytes'] / 1024:.0f}KB、削除 {stats['evictions']}件）",
+                    inline=True
+                )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
         else:
             await interaction.response.send_message(
-                "利用可能なアクション: show, channel, mention, regions, schedule",
+                "利用可能なアクション: show, channel, mention, regions, schedule, cache",
                 ephemeral=True
             )
     
@@ -926,7 +1067,10 @@ class WeeklyContentCog(commands.Cog):
             inline=False
         )
         
-        embed.set_footer(text="10分毎にチェック・配信時刻から10分以内に送信")
+        embed.set_footer(text=(
+            "10分毎にチェック・配信時刻から10分以内に送信"
+            f"（ニュース・イベント系は{WEEKLY_PREFETCH_CONFIG['lead_minutes']}分前から事前生成）"
+        ))
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -51,7 +51,11 @@ AI_CHAT_CONFIG = {
     "conversation_timeout_minutes": 30,  # 会話コンテキストのタイムアウト（分）
     "simple_mode": True,  # シンプルモード有効
     "api_throttle_seconds": 2.0,  # APIリクエスト間隔（秒）
-    
+    "history_max_messages": 40,  # チャンネルごとに保持するAI会話履歴の最大件数
+    "cancel_on_user_message": True,  # ユーザーが発言したらそのチャンネルのAI会話を中断する
+    "quiet_minutes_before_start": 10,  # 直近この分数以内にユーザーの発言があれば自発的会話を始めない
+    "script_segment_turns": 6,  # 自発的会話で1回の呼び出しでまとめて生成する発言数（台本）
+
     # キャラクターバイパスモード設定
     "character_bypass": {
         "enabled": True,
@@ -61,6 +65,94 @@ AI_CHAT_CONFIG = {
     }
 }
 
+# Gemini APIクライアント設定（lib/gemini_chat.py）
+GEMINI_CONFIG = {
+    "model": "gemini-2.0-flash-exp",
+    "timeout_seconds": 30,          # 1回の呼び出しのタイムアウト（秒）
+    "transport_timeout_grace_seconds": 5,  # SDK側のタイムアウトは上の値よりこの秒数だけ長くする（打ち切りは常にこちら側で）
+    "executor_workers": 8,          # SDK呼び出し専用スレッド数（同時に応答待ちできる呼び出し数）
+    "backend": os.getenv('LLM_BACKEND', 'gemini'),  # gemini / fake（ローカルの偽モデルサーバーに送る）
+    "fake_server_url": os.getenv('FAKE_LLM_URL', 'http://127.0.0.1:8765')  # backend=fake の送信先
+}
+
+# 偽モデルサーバー設定（utils/fake_llm_server.py、開発・ベンチマーク用）
+FAKE_LLM_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "latency_seconds": 0.8,         # 1回の応答にかける時間（秒）
+    "latency_jitter_seconds": 0.4,  # 応答時間のばらつき（±秒）
+    "rate_limit_rate": 0.0,         # 429（使用制限）を返す割合
+    "error_rate": 0.0,              # 500（サーバーエラー）を返す割合
+    "stream_chunk_chars": 12,       # ストリーミング応答の1断片の文字数
+    "stream_chunk_delay_seconds": 0.15  # ストリーミング応答の断片の間隔（秒）
+}
+
+# メンションへのストリーミング返信設定（utils/streaming_reply.py）
+STREAMING_REPLY_CONFIG = {
+    "enabled": True,
+    "placeholder": "考え中… 💭",     # 返信が揃う前に投稿する仮メッセージ
+    "single_send_window_seconds": 0.8,  # この時間内に返信が揃えば仮メッセージなしで1回で送る
+    "edit_interval_seconds": 1.2,   # メッセージ編集の最短間隔（Discordの編集レート制限 5回/5秒 に収める）
+    "max_message_chars": 2000       # 1メッセージの最大文字数（超えた分は続けて送る）
+}
+
+# LLMリクエストスケジューラー設定（utils/llm_scheduler.py、全機能共通）
+LLM_SCHEDULER_CONFIG = {
+    "requests_per_minute": 15,      # APIのクォータに合わせた送信レート（回/分、0以下は無制限）
+    "burst": 3,                     # 連続で許可する回数
+    "max_concurrency": 4,           # 同時に応答待ちできる呼び出し数
+    "backoff_base": 5,              # 429応答後の最初の待機秒数（連続するたびに倍）
+    "backoff_max": 120,             # 429応答後の待機の上限（秒）
+    "min_rate_factor": 0.25,        # 429応答で下げる送信レートの下限（設定値に対する割合）
+    "recovery_step": 0.1,           # 成功1回ごとに戻す送信レートの割合
+    "wait_samples": 200             # 待ち時間の統計に使う直近の件数（優先度ごと）
+}
+
+# Geminiチャットのセッション保持設定（utils/chat_session_store.py）
+CHAT_SESSION_CONFIG = {
+    "max_sessions": 500,            # メモリに保持するセッション数の上限（最も古く使われたものから破棄）
+    "idle_ttl_minutes": 180,        # 最後の会話からこの時間が過ぎたセッションは破棄
+    "persist": True,                # SQLiteに保存して再起動後も会話を引き継ぐ
+    "path": "data/chat_sessions.db",
+    "max_turns": 20,                # 履歴の発言数がこれを超えたら古い発言を要約にまとめる
+    "keep_recent_turns": 8,         # 要約後もそのまま残す直近の発言数
+    "summary_max_chars": 600        # 要約の最大文字数
+}
+
+# LLM応答キャッシュ設定（utils/llm_cache.py、同じプロンプトの生成結果を再利用）
+LLM_CACHE_CONFIG = {
+    "enabled": True,
+    "persist": True,                # SQLiteに保存して再起動後も再利用する
+    "path": "data/llm_cache.db",
+    "ttl_hours": 24,                # 生成結果を通常の応答として使う期間
+    "stale_ttl_hours": 168,         # APIの使用制限中・障害中に限り使う期間
+    "variants": 3,                  # 1つのプロンプトに保持する生成結果の数（揃うまではAPIで生成し、揃ったら順番に返す）
+    "temperature_step": 0.25,       # temperature をこの幅で丸めて同じキーにする
+    "max_keys": 1000                # メモリに保持するプロンプト数の上限
+}
+
+# LLM利用状況の記録設定（utils/llm_metrics.py、cogs/llm_usage.py）
+LLM_METRICS_CONFIG = {
+    "enabled": True,
+    "persist": True,                # 1回ごとの記録をSQLiteに書き出す（/llm_usage で期間を指定して集計できる）
+    "path": "data/llm_metrics.db",
+    "flush_interval_minutes": 5,    # 記録を書き出す間隔
+    "retention_days": 30,           # 記録を残す期間
+    "latency_samples": 500,         # 起動してからの集計で p50 / p95 に使う直近の件数（機能ごと）
+    "max_pending": 5000             # 書き出し前の記録をメモリに溜める上限（超えたら古いものから捨てる）
+}
+
+# AIキャラクター会話の一括生成設定（utils/conversation_planner.py）
+CONVERSATION_PLANNER_CONFIG = {
+    "temperature": 0.9,             # 会話台本を生成する際の temperature
+    "timeout_seconds": 60,          # 台本生成（1回の呼び出し）のタイムアウト
+    "max_line_chars": 150,          # 1発言の最大文字数（超えたら作り直す）
+    "pacing_base_seconds": 2.0,     # 発言を流す間隔の基本秒数
+    "pacing_seconds_per_char": 0.05, # 発言の文字数に応じて足す秒数（読む時間）
+    "pacing_min_seconds": 3.0,      # 発言間隔の下限
+    "pacing_max_seconds": 8.0       # 発言間隔の上限
+}
+
 # Discord メトリクス収集設定
 METRICS_CONFIG = {
     # メインロール設定
@@ -182,3 +274,133 @@ CHANNEL_INTRO_CONFIG = {
     },
     "interval_hours": 24  # 24時間間隔での確認
 }
+
+# トレンド取得スケジューラー設定（EnhancedTrendsManager）
+TRENDS_FETCH_CONFIG = {
+    "deadline_seconds": 90,         # 全ソース取得の締め切り（超過分は打ち切って部分結果を返す）
+    "source_timeout_seconds": 60,   # ソースごとのタイムアウト（個別指定がない場合）
+    "source_timeouts": {            # ソース別タイムアウト（秒）
+        "zenn": 30,
+        "hacker_news": 30,
+        "github": 45
+    }
+}
+
+# 外部HTTPリクエストのホスト別レート制限（トークンバケット、全マネージャー共通）
+HTTP_RATE_LIMIT_CONFIG = {
+    "default_rate": 0,              # 指定のないホストのレート（回/秒、0以下は無制限）
+    "default_burst": 1,             # 指定のないホストのバースト
+    "default_retry_after": 30,      # Retry-Afterのない429応答を受けた際の待機秒数
+    "max_retry_after": 120,         # Retry-Afterで待機する上限（秒）
+    "max_retries": 1,               # 429応答時に待機後に再試行する回数
+    "hosts": {                      # ホスト別 {"rate": 回/秒, "burst": 連続で許可する回数}
+        "zenn.dev": {"rate": 2.0, "burst": 2},
+        "news.google.com": {"rate": 1.0, "burst": 2},
+        "b.hatena.ne.jp": {"rate": 2.0, "burst": 2},
+        "github.com": {"rate": 1.0, "burst": 1},
+        "connpass.com": {"rate": 1.0, "burst": 1},
+        "api.doorkeeper.jp": {"rate": 1.0, "burst": 1},
+        "peatix.com": {"rate": 0.5, "burst": 1}
+    }
+}
+
+# Hacker News 取得設定（utils/hacker_news.py）
+HACKER_NEWS_CONFIG = {
+    "top_n": 30,                    # 取得するトップストーリー件数
+    "concurrency": 16,              # item取得の同時実行数
+    "item_ttl_seconds": 900,        # 記事詳細のキャッシュ有効期間
+    "top_stories_ttl_seconds": 120  # トップストーリーID一覧のキャッシュ有効期間
+}
+
+# GitHub Trending 取得設定（utils/github_trending.py）
+GITHUB_TRENDING_CONFIG = {
+    "languages": ["javascript", "typescript", "python", ""],  # 取得する言語ページ（空文字は全言語）
+    "periods": ["daily", "weekly"],  # 取得する期間（先頭ほど優先して重複をまとめる）
+    "period_ttls": {                 # 期間ごとのページキャッシュ有効期間（秒）
+        "daily": 3600,
+        "weekly": 6 * 3600,
+        "monthly": 24 * 3600
+    },
+    "max_repos_per_page": 10         # 1ページから採用するリポジトリ数（掲載順）
+}
+
+# HTTPレスポンスキャッシュ設定（utils/http_cache.py）
+HTTP_CACHE_CONFIG = {
+    "enabled": True,
+    "path": "data/http_cache.db",      # SQLiteファイル
+    "max_bytes": 50 * 1024 * 1024,     # 圧縮後の合計サイズ上限（超過分は最終アクセスが古い順に削除）
+    "default_ttl": 600,                # TTL（秒）: ホスト別指定がない場合
+    "stale_ttl": 3600,                 # TTL切れ後も古い内容を返しつつ裏で再取得する猶予（秒）
+    "ttls": {                          # ホスト別TTL（秒）
+        "zenn.dev": 900,
+        "news.google.com": 900,
+        "b.hatena.ne.jp": 900,
+        "github.com": 3600,
+        "trends.google.co.jp": 900,
+        "connpass.com": 1800,
+        "api.doorkeeper.jp": 1800,
+        "peatix.com": 3600,
+        "find-to-do.com": 300          # RSS監視は新着検知のため短め
+    }
+}
+
+# トレンド記事の重複除去設定（utils/near_duplicate.py）
+DEDUP_CONFIG = {
+    "threshold": 0.7,               # タイトルの文字n-gram Jaccard類似度がこれ以上なら重複とみなす
+    "ngram": 3,                     # シングルの文字数
+    "num_perm": 64,                 # MinHash署名の長さ
+    "tracking_params": [            # URL正規化時に除去するクエリパラメータ（utm_* は常に除去）
+        "fbclid", "gclid", "yclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+        "ref", "ref_src", "ref_url", "oc", "ved", "ei", "usg", "_ga", "spm", "si"
+    ]
+}
+
+# 週間コンテンツの事前生成設定
+WEEKLY_PREFETCH_CONFIG = {
+    "lead_minutes": 30,             # 配信時刻の何分前から事前生成を始めるか
+    "check_interval_minutes": 5,    # 事前生成スケジューラーの実行間隔
+    "retry_base_seconds": 60,       # 生成失敗時の再試行間隔（初回、以降倍々）
+    "retry_max_seconds": 600,       # 再試行間隔の上限
+    "send_wait_seconds": 20,        # 配信時に生成中だった場合に完了を待つ最大秒数
+    "snapshot_file": "data/weekly_snapshots.json"
+}
+
+# 定期配信のギルド一斉送信設定
+CONTENT_FANOUT_CONFIG = {
+    "max_concurrency": 5,           # 同時に送信処理を行うギルド数の上限
+    "channel_interval_seconds": 1.0 # 同じチャンネルへ連続送信する際の最小間隔（秒）
+}
+
+# トレンド履歴（伸び率ランキング）設定
+TREND_HISTORY_CONFIG = {
+    "enabled": True,
+    "path": "data/trend_history.db",   # SQLiteファイル
+    "retention_days": 30,              # 観測値の保持期間（日）
+    "velocity_windows_hours": [24, 168], # 伸び率を計算するウィンドウ（時間）。短い方を優先して代表値にする
+    "velocity_max_gap_hours": 336,     # どのウィンドウにも観測が2つ無い場合、この時間以内の直前の観測との差で計算（週1回の取得向け）
+    "min_span_hours": 0.5,             # ウィンドウ内の観測がこれより短い間隔しかない場合は伸び率を計算しない
+    "rising_count": 3,                 # 「急上昇」に表示する件数
+    "rising_min_velocity": 1.0         # 「急上昇」とみなす伸び率（反応数/時）の下限
+}
+
+# connpass イベント検索設定
+CONNPASS_SEARCH_CONFIG = {
+    "max_keywords": 10,             # 検索に使う search_keywords の件数
+    "keyword_batch_size": 5,        # 1リクエストに keyword_or でまとめるキーワード数
+    "page_size": 100,               # 1ページの取得件数（API上限100）
+    "max_pages": 3,                 # 1バッチあたりの最大ページ数
+    "cache_ttl": 1800               # (キーワード, 日付範囲) ごとの検索結果の保持秒数
+}
+
+# イベントのローカルインデックス（connpass / Doorkeeper）設定
+EVENT_INDEX_CONFIG = {
+    "enabled": True,
+    "path": "data/event_index.db",     # SQLiteファイル
+    "retention_days": 30,              # 開催日からの保持期間（日）
+    "sync_interval_minutes": 60,       # バックグラウンド同期の間隔
+    "max_staleness_minutes": 360,      # 取得時にこれより古ければその場で同期する
+    "sync_days_ahead": 30,             # 同期対象とする開催日の範囲（今日から何日先まで）
+    "sync_max_pages": 5,               # 差分同期の1クエリあたりの最大ページ数（更新日時の新しい順に取得）
+    "full_sync_interval_hours": 24,    # 期間内を更新日時に関係なく取り直す間隔（期間に新しく入ったイベントを拾う）
+    "full_sync_max_pages": 20          # 全件同期の1クエリあたりの最大ページ数（開催日時順に取得）
+}
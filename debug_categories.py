@@ -34,13 +34,13 @@ async def debug_categories():
             print(f"  📝 説明文: {description[:50]}...")
             
             # 各カテゴリでのマッチ数をチェック
-            combined_text = f"{title.lower()} {description.lower()}"
+            combined_text = f"{title} {description}"
+            matched = set(manager.keyword_matcher.matched_keywords(combined_text))
             print(f"  🔍 カテゴリ別マッチ数:")
             
-            for cat, keywords in manager.category_keywords.items():
-                matches = sum(1 for keyword in keywords if keyword.lower() in combined_text)
+            for cat, matches in manager.keyword_matcher.count(combined_text).items():
                 if matches > 0:
-                    matched_keywords = [kw for kw in keywords if kw.lower() in combined_text]
+                    matched_keywords = [kw for kw in manager.category_keywords[cat] if kw.lower() in matched]
                     print(f"    {cat}: {matches}件 -> {matched_keywords[:3]}")
         
         # カテゴリ統計
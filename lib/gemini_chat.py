@@ -1,92 +1,361 @@
 # -*- coding:utf-8 -*-
-import google.generativeai as genai
-import os
 from dotenv import load_dotenv
 import asyncio
+import functools
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import weakref
+from typing import Dict, Any, AsyncIterator, List
+from config.config import GEMINI_CONFIG, CHAT_SESSION_CONFIG
+from lib.llm_backend import LLMBackend, create_backend
+from utils.chat_session_store import ChatSession, ChatSessionStore, chat_session_store
+from utils.llm_cache import LLMResponseCache, llm_response_cache
+from utils.llm_metrics import (LLMMetrics, llm_metrics, estimate_tokens, FEATURE_CHARACTER_CONVERSATION,
+                               FEATURE_MENTION_CHAT, FEATURE_OTHER, FEATURE_SESSION_SUMMARY)
+from utils.llm_scheduler import llm_scheduler, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
 
 load_dotenv()
 
-class GeminiChat:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY環境変数が設定されていません")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.chat_sessions = {}
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # 2秒間隔でリクエスト制限
-    
-    async def get_response(self, user_id: str, message: str) -> str:
-        """ユーザーごとのチャットセッションを管理してレスポンスを生成"""
-        try:
-            # APIスロットリング
-            await self._throttle_request()
-            # ユーザーごとのチャットセッションを取得または作成
-            if user_id not in self.chat_sessions:
-                # システムプロンプトを設定
-                system_prompt = """あなたは「DJアイズ」という名前のDiscordボットです。
+# SDK の同期呼び出し専用スレッドプール（全 GeminiChat で共有。イベントループのスレッドでは呼ばない）
+_executor = ThreadPoolExecutor(max_workers=GEMINI_CONFIG["executor_workers"], thread_name_prefix='gemini')
+
+TIMEOUT_MESSAGE = "Geminiからの応答がタイムアウトしました。しばらく待ってから再度お試しください。"
+
+# DJアイズのシステムプロンプト（セッションの履歴の先頭に毎回入れる）
+SYSTEM_PROMPT = """あなたは「DJアイズ」という名前のDiscordボットです。
 フレンドリーで親しみやすい性格で、ユーザーと楽しく会話してください。
 長い説明や定型文は避け、自然な会話を心がけてください。
 箇条書きは使わず、短く簡潔に返答してください。"""
-                
-                self.chat_sessions[user_id] = self.model.start_chat(
-                    history=[
-                        {"role": "user", "parts": [system_prompt]},
-                        {"role": "model", "parts": ["了解しました！DJアイズとして楽しく会話しますね！"]}
-                    ]
-                )
-            
-            chat = self.chat_sessions[user_id]
-            response = chat.send_message(message)
+SYSTEM_PROMPT_ACK = "了解しました！DJアイズとして楽しく会話しますね！"
+
+def is_rate_limited(error: Exception) -> bool:
+    """APIの使用制限（429 / クォータ超過）によるエラーか"""
+    return "429" in str(error) or "quota" in str(error).lower()
+
+# 通信ライブラリ側のタイムアウト（requests の ReadTimeout / gRPC の DeadlineExceeded など）
+_TRANSPORT_TIMEOUT_NAMES = {'Timeout', 'ReadTimeout', 'ConnectTimeout', 'ReadTimeoutError',
+                            'ConnectTimeoutError', 'DeadlineExceeded'}
+
+def as_timeout(error: BaseException) -> BaseException:
+    """通信ライブラリ側のタイムアウトを asyncio.TimeoutError に揃える（それ以外はそのまま）"""
+    if isinstance(error, asyncio.TimeoutError) or type(error).__name__ not in _TRANSPORT_TIMEOUT_NAMES:
+        return error
+    timeout_error = asyncio.TimeoutError(str(error))
+    timeout_error.__cause__ = error
+    return timeout_error
+
+def _prompt_text(args: tuple) -> str:
+    """呼び出しの引数（プロンプト、またはチャット履歴と送信文）から送信した本文を取り出す"""
+    texts = []
+    for arg in args:
+        if isinstance(arg, str):
+            texts.append(arg)
+        elif isinstance(arg, list):
+            texts.extend(str(part) for content in arg for part in content.get('parts', []))
+    return ''.join(texts)
+
+class GeminiChat:
+    def __init__(self, api_key: str = None, transport: str = None, client_options: Dict[str, Any] = None,
+                 timeout: float = None, scheduler=None, session_store: ChatSessionStore = None,
+                 response_cache: LLMResponseCache = None, backend: LLMBackend = None,
+                 metrics: LLMMetrics = None):
+        # モデルの呼び出し先（省略時は設定に応じて Gemini API か偽モデルサーバー）
+        self.backend = backend if backend is not None else create_backend(api_key=api_key, transport=transport,
+                                                                          client_options=client_options)
+        self.timeout = timeout or GEMINI_CONFIG["timeout_seconds"]
+        # ユーザーごとの会話履歴（LRU + TTL、全 GeminiChat で共有。空のストアは偽になるので None で判定する）
+        self.chat_sessions = session_store if session_store is not None else chat_session_store
+        # 同じユーザーのセッションへの送信は1件ずつ（履歴の更新が混ざらないように）
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._background_tasks = set()
+        # 要約中のユーザー（同じ発言を二重に要約しないように）
+        self._compacting = set()
+        # 送信ペース・同時実行数・優先度の制御（全機能で共有）
+        self.scheduler = scheduler if scheduler is not None else llm_scheduler
+        # 同じプロンプトの生成結果の再利用（generate のみ。会話セッションには使わない）
+        self.response_cache = response_cache if response_cache is not None else llm_response_cache
+        # 機能ごとの呼び出し回数・トークン数・所要時間の記録（全機能で共有）
+        self.metrics = metrics if metrics is not None else llm_metrics
+    
+    async def _call(self, func, *args, timeout: float = None, priority: int = PRIORITY_BACKGROUND,
+                    feature: str = FEATURE_OTHER, **kwargs):
+        """スケジューラーの送信枠を確保し、同期SDK呼び出しを専用スレッドで実行して結果を待つ
+        
+        timeout 秒で打ち切る（SDK側には少し長いタイムアウトを渡すのでスレッドもその後すぐ解放される）。
+        通信ライブラリ側のタイムアウトも asyncio.TimeoutError として送出する。
+        呼び出し元がキャンセルされた場合も待機はすぐに終わる。
+        429応答はスケジューラーに伝えて以降の送信を控えさせる。
+        結果（成功・エラー）は feature の呼び出しとして metrics に記録する
+        """
+        timeout = timeout or self.timeout
+        async with self.scheduler.slot(priority):
+            loop = asyncio.get_running_loop()
+            usage = {}
+            started = time.monotonic()
+            future = loop.run_in_executor(
+                _executor, functools.partial(func, *args, request_options=self._request_options(timeout),
+                                             usage=usage, **kwargs)
+            )
+            try:
+                result = await asyncio.wait_for(future, timeout=timeout)
+            except BaseException as e:
+                error = as_timeout(e)
+                self._record_call(feature, started, args, usage, error=error)
+                if isinstance(error, Exception) and is_rate_limited(error):
+                    self.scheduler.report_rate_limited()
+                if error is not e:
+                    raise error from e
+                raise
+            self._record_call(feature, started, args, usage, reply=result)
+            self.scheduler.report_success()
+            return result
+    
+    async def _stream_call(self, func, *args, timeout: float = None, priority: int = PRIORITY_INTERACTIVE,
+                           feature: str = FEATURE_OTHER, **kwargs) -> AsyncIterator[str]:
+        """_call のストリーミング版：同期SDKのイテレーターを専用スレッドで回し、断片を届いた順に返す
+        
+        送信枠は最後の断片まで確保したまま。timeout は最初の断片から最後までを含めた全体にかかる。
+        所要時間は最後の断片までの時間で記録する
+        """
+        timeout = timeout or self.timeout
+        async with self.scheduler.slot(priority):
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            finished = object()
+            usage = {}
+            chunks = []
+            started = time.monotonic()
             
-            # セッション履歴が長くなりすぎたらリセット
-            if len(chat.history) > 20:
-                system_prompt = """あなたは「DJアイズ」という名前のDiscordボットです。
-フレンドリーで親しみやすい性格で、ユーザーと楽しく会話してください。
-長い説明や定型文は避け、自然な会話を心がけてください。
-箇条書きは使わず、短く簡潔に返答してください。"""
-                
-                self.chat_sessions[user_id] = self.model.start_chat(
-                    history=[
-                        {"role": "user", "parts": [system_prompt]},
-                        {"role": "model", "parts": ["了解しました！DJアイズとして楽しく会話しますね！"]}
-                    ]
-                )
+            def pump():
+                try:
+                    for chunk in func(*args, request_options=self._request_options(timeout), usage=usage, **kwargs):
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, finished)
             
-            return response.text
+            loop.run_in_executor(_executor, pump)
+            deadline = loop.time() + timeout
+            try:
+                while True:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0))
+                    if item is finished:
+                        break
+                    if isinstance(item, Exception):
+                        if is_rate_limited(item):
+                            self.scheduler.report_rate_limited()
+                        raise as_timeout(item)
+                    chunks.append(item)
+                    yield item
+            except BaseException as e:
+                self._record_call(feature, started, args, usage, error=e)
+                raise
+            self._record_call(feature, started, args, usage, reply=''.join(chunks))
+            self.scheduler.report_success()
+    
+    @staticmethod
+    def _request_options(timeout: float) -> Dict[str, Any]:
+        """SDKに渡すタイムアウト（wait_for より少し長くし、打ち切りが asyncio.TimeoutError になるように）"""
+        return {'timeout': timeout + GEMINI_CONFIG["transport_timeout_grace_seconds"]}
+    
+    def _record_call(self, feature: str, started: float, args: tuple, usage: Dict[str, int],
+                     reply: str = None, error: BaseException = None):
+        """モデル呼び出し1回分を記録（APIがトークン数を返さなかった成功分は文字数からの目安）"""
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        if error is None and not usage:
+            prompt_tokens = estimate_tokens(_prompt_text(args))
+            completion_tokens = estimate_tokens(reply or '')
+        self.metrics.record(feature, time.monotonic() - started, prompt_tokens, completion_tokens,
+                            error=type(error).__name__ if error is not None else None)
+    
+    async def generate(self, prompt: str, timeout: float = None, priority: int = PRIORITY_BACKGROUND,
+                       temperature: float = None, use_cache: bool = True,
+                       generation_config: Dict[str, Any] = None, feature: str = FEATURE_OTHER) -> str:
+        """履歴を持たない1回きりの生成（応答キャッシュつき）
+        
+        同じプロンプトの生成結果が揃っていればAPIを呼ばずに順番に返す。
+        APIの使用制限・タイムアウト時は古い生成結果があればそれを返し、無ければ例外をそのまま送出する。
+        generation_config には response_mime_type / response_schema などを渡せる。
+        feature は利用状況の記録に使う機能の区分（utils/llm_metrics.py の FEATURE_*）
+        """
+        key = self.response_cache.make_key(prompt, GEMINI_CONFIG["model"], temperature, generation_config)
+        if use_cache:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                self.metrics.record(feature, 0.0, cache_hit=True)
+                return cached
+        
+        config = dict(generation_config or {})
+        if temperature is not None:
+            config['temperature'] = temperature
+        try:
+            text = await self._call(self.backend.generate, prompt, timeout=timeout, priority=priority,
+                                    feature=feature, generation_config=config or None)
+        except Exception as e:
+            if use_cache and (isinstance(e, asyncio.TimeoutError) or is_rate_limited(e)):
+                cached = await self.response_cache.get(key, allow_stale=True)
+                if cached is not None:
+                    self.metrics.record(feature, 0.0, cache_hit=True)
+                    return cached
+            raise
+        
+        if use_cache:
+            await self.response_cache.put(key, text)
+        return text
+    
+    async def get_response(self, user_id: str, message: str, timeout: float = None,
+                           priority: int = PRIORITY_INTERACTIVE, feature: str = FEATURE_MENTION_CHAT) -> str:
+        """ユーザーごとのチャットセッションを管理してレスポンスを生成
+        
+        priority はユーザーへの直接の返信なら PRIORITY_INTERACTIVE、
+        定期投稿などの裏方の生成なら PRIORITY_BACKGROUND
+        """
+        try:
+            async with self._lock_for(user_id):
+                return await self._send_chat_message(user_id, message, timeout, priority, feature)
+        except asyncio.TimeoutError:
+            return TIMEOUT_MESSAGE
         except Exception as e:
             # 429エラーの場合は特別な処理
-            if "429" in str(e) or "quota" in str(e).lower():
+            if is_rate_limited(e):
                 return "現在APIの使用制限に達しています。しばらく待ってから再度お試しください。"
             return f"Geminiとの通信でエラーが発生しました: {str(e)}"
     
-    def reset_session(self, user_id: str):
-        """特定ユーザーのチャットセッションをリセット"""
-        if user_id in self.chat_sessions:
-            del self.chat_sessions[user_id]
+    async def stream_response(self, user_id: str, message: str, timeout: float = None,
+                              priority: int = PRIORITY_INTERACTIVE,
+                              feature: str = FEATURE_MENTION_CHAT) -> AsyncIterator[str]:
+        """get_response のストリーミング版：返信を生成された順に断片で返す
+        
+        最初の断片より前に失敗した場合は get_response と同じエラーメッセージを1つ返す。
+        途中で失敗した場合はそこまでで打ち切る（どちらも履歴には残さない）
+        """
+        async with self._lock_for(user_id):
+            session = await self.chat_sessions.get(user_id) or ChatSession(user_id)
+            chunks = []
+            try:
+                async for chunk in self._stream_call(self.backend.chat_stream, self._build_history(session),
+                                                     message, timeout=timeout, priority=priority,
+                                                     feature=feature):
+                    chunks.append(chunk)
+                    yield chunk
+            except asyncio.TimeoutError:
+                if not chunks:
+                    yield TIMEOUT_MESSAGE
+                return
+            except Exception as e:
+                print(f"ストリーミング応答エラー ({user_id}): {e}")
+                if not chunks:
+                    yield ("現在APIの使用制限に達しています。しばらく待ってから再度お試しください。"
+                           if is_rate_limited(e) else f"Geminiとの通信でエラーが発生しました: {str(e)}")
+                return
+            await self._record_exchange(session, message, ''.join(chunks))
+    
+    async def _send_chat_message(self, user_id: str, message: str, timeout: float = None,
+                                 priority: int = PRIORITY_INTERACTIVE, feature: str = FEATURE_MENTION_CHAT) -> str:
+        """セッションにメッセージを送信（呼び出し元でユーザーごとのロックを取得済み）
+        
+        履歴は応答を受け取ってから記録する（打ち切った送信は履歴に残らない）
+        """
+        session = await self.chat_sessions.get(user_id) or ChatSession(user_id)
+        reply = await self._call(self.backend.chat, self._build_history(session), message,
+                                 timeout=timeout, priority=priority, feature=feature)
+        await self._record_exchange(session, message, reply)
+        return reply
     
-    async def _throttle_request(self):
-        """APIリクエストのスロットリング"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+    async def _record_exchange(self, session: ChatSession, message: str, reply: str):
+        """受け取った返信を履歴に記録（長くなったら古い発言の要約を裏で始める）"""
+        session.add_exchange(message, reply)
+        await self.chat_sessions.save(session)
         
-        if time_since_last < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last
-            await asyncio.sleep(sleep_time)
+        # 履歴が長くなったら古い発言を要約にまとめる（返信は待たせない）
+        if session.split_for_compaction(CHAT_SESSION_CONFIG["max_turns"],
+                                        CHAT_SESSION_CONFIG["keep_recent_turns"]):
+            task = asyncio.ensure_future(self._compact_session(session.key))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+    
+    @staticmethod
+    def _build_history(session: ChatSession) -> List[Dict[str, Any]]:
+        """システムプロンプト・これまでの要約・直近の発言からチャット履歴を組み立てる"""
+        history = [
+            {"role": "user", "parts": [SYSTEM_PROMPT]},
+            {"role": "model", "parts": [SYSTEM_PROMPT_ACK]}
+        ]
+        if session.summary:
+            history.append({"role": "user", "parts": [f"（これまでの会話の要約）\n{session.summary}"]})
+            history.append({"role": "model", "parts": ["覚えておきますね！"]})
+        history.extend({"role": role, "parts": [text]} for role, text in session.turns)
+        return history
+    
+    async def _compact_session(self, user_id: str):
+        """古い発言を要約に畳み込む（要約に失敗した場合は古い発言を捨てて前回の要約を残す）
         
-        self.last_request_time = time.time()
+        要約の生成中はロックを持たない（その間もユーザーへの返信を待たせない）
+        """
+        if user_id in self._compacting:
+            return
+        self._compacting.add(user_id)
+        try:
+            async with self._lock_for(user_id):
+                session = await self.chat_sessions.get(user_id)
+                if session is None:
+                    return
+                old_turns = session.split_for_compaction(CHAT_SESSION_CONFIG["max_turns"],
+                                                         CHAT_SESSION_CONFIG["keep_recent_turns"])
+                if not old_turns:
+                    return
+                previous_summary = session.summary
+            
+            max_chars = CHAT_SESSION_CONFIG["summary_max_chars"]
+            conversation = "\n".join(
+                f"{'ユーザー' if role == 'user' else 'DJアイズ'}: {text}" for role, text in old_turns
+            )
+            prompt = f"""以下はDiscordボット「DJアイズ」とユーザーの会話です。
+これまでの要約と会話をまとめて、今後の会話に必要なこと（ユーザーの呼び名・好み・話題・約束など）を
+{max_chars}文字以内の日本語で要約してください。要約の本文だけを出力してください。
+
+これまでの要約: {previous_summary or "（なし）"}
+
+会話:
+{conversation}"""
+            summary = None
+            try:
+                summary = await self._call(self.backend.generate, prompt, priority=PRIORITY_BACKGROUND,
+                                           feature=FEATURE_SESSION_SUMMARY)
+            except Exception as e:
+                print(f"会話履歴の要約に失敗しました ({user_id}): {e}")
+            
+            async with self._lock_for(user_id):
+                # 要約中にリセット・作り直しされたセッションには反映しない
+                session = await self.chat_sessions.get(user_id)
+                if (session is None or session.summary != previous_summary
+                        or session.turns[:len(old_turns)] != old_turns):
+                    return
+                if summary is not None:
+                    session.summary = summary.strip()[:max_chars]
+                session.turns = session.turns[len(old_turns):]
+                await self.chat_sessions.save(session)
+        finally:
+            self._compacting.discard(user_id)
+    
+    def _lock_for(self, user_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(user_id)
+        if lock is None:
+            lock = self._session_locks[user_id] = asyncio.Lock()
+        return lock
+    
+    def reset_session(self, user_id: str):
+        """特定ユーザーのチャットセッションをリセット"""
+        self.chat_sessions.discard(user_id)
     
     async def get_ai_character_response(self, character_name: str, character_personality: str, 
-                                       speaking_style: str, message: str, conversation_context: str = "") -> str:
+                                       speaking_style: str, message: str, conversation_context: str = "",
+                                       timeout: float = None, priority: int = PRIORITY_BACKGROUND,
+                                       feature: str = FEATURE_CHARACTER_CONVERSATION) -> str:
         """AIキャラクター専用のレスポンス生成"""
         try:
-            # APIスロットリング
-            await self._throttle_request()
-            
             # キャラクター専用のプロンプト
             system_prompt = f"""あなたは「{character_name}」というキャラクターです。
 
@@ -107,13 +376,12 @@ class GeminiChat:
 - 括弧で囲まれた指示文（例：（会話全体を振り返って））は発言に含めないでください
 - 他のキャラクターと全く同じ内容を言わないでください。必ず独自の視点で発言してください"""
             
-            response = self.model.generate_content(
-                f"{system_prompt}\n\n{message}"
-            )
-            
-            return response.text
+            return await self.generate(f"{system_prompt}\n\n{message}", timeout=timeout, priority=priority,
+                                       feature=feature)
             
+        except asyncio.TimeoutError:
+            return f"({character_name}は一時的に応答できません)"
         except Exception as e:
-            if "429" in str(e) or "quota" in str(e).lower():
+            if is_rate_limited(e):
                 return f"({character_name}は一時的に応答できません)"
             return f"({character_name}): エラーが発生しました"
\ No newline at end of file
@@ -0,0 +1,99 @@
+# -*- coding:utf-8 -*-
+"""
+LLM Backend
+GeminiChat がモデルを呼び出す部分（差し替え可能なバックエンド）
+
+- LLMBackend: generate（履歴なしの1回の生成）と chat（履歴つきの送信）、chat_stream（chat の返答を
+  生成された順に少しずつ返す。既定は chat の結果を1回で返す）を持つ同期インターフェース。
+  GeminiChat が専用スレッドで呼び出し、スケジューラー・キャッシュ・タイムアウトは GeminiChat 側で扱う。
+  usage に辞書を渡すと、応答のトークン数（prompt_tokens / completion_tokens）を書き込む
+- GeminiBackend: google-generativeai SDK で Gemini API を呼ぶ（本番）
+- GEMINI_CONFIG["backend"] が "fake" なら同じ SDK をRESTでローカルの偽モデルサーバー
+  （utils/fake_llm_server.py）に向けるので、APIキーとクォータなしで全機能を動かせる
+"""
+
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import google.generativeai as genai
+
+from config.config import GEMINI_CONFIG
+
+
+class LLMBackend:
+    """モデル呼び出しのインターフェース（メソッドは同期。呼び出し側がスレッドで実行する）"""
+
+    name = 'base'
+
+    def generate(self, prompt: str, generation_config: Dict[str, Any] = None,
+                 request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> str:
+        """履歴なしで1回生成して本文を返す"""
+        raise NotImplementedError
+
+    def chat(self, history: List[Dict[str, Any]], message: str,
+             request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> str:
+        """履歴（[{"role": "user"/"model", "parts": [本文]}, ...]）に続けて送信し、返答の本文を返す"""
+        raise NotImplementedError
+
+    def chat_stream(self, history: List[Dict[str, Any]], message: str,
+                    request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> Iterator[str]:
+        """chat の返答を生成された順に断片で返す（ストリーミング非対応なら全文を1回で返す）"""
+        yield self.chat(history, message, request_options=request_options, usage=usage)
+
+
+class GeminiBackend(LLMBackend):
+    """google-generativeai SDK 経由の Gemini API"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: str = None, transport: str = None, client_options: Dict[str, Any] = None,
+                 model: str = None):
+        api_key = api_key or os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY環境変数が設定されていません")
+        genai.configure(api_key=api_key, transport=transport, client_options=client_options)
+        self.model_name = model or GEMINI_CONFIG["model"]
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def generate(self, prompt: str, generation_config: Dict[str, Any] = None,
+                 request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> str:
+        options = {'generation_config': generation_config} if generation_config else {}
+        response = self.model.generate_content(prompt, request_options=request_options, **options)
+        _fill_usage(usage, response)
+        return response.text
+
+    def chat(self, history: List[Dict[str, Any]], message: str,
+             request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> str:
+        chat = self.model.start_chat(history=history)
+        response = chat.send_message(message, request_options=request_options)
+        _fill_usage(usage, response)
+        return response.text
+
+    def chat_stream(self, history: List[Dict[str, Any]], message: str,
+                    request_options: Dict[str, Any] = None, usage: Dict[str, int] = None) -> Iterator[str]:
+        chat = self.model.start_chat(history=history)
+        for chunk in chat.send_message(message, stream=True, request_options=request_options):
+            # トークン数は最後の断片にだけつく
+            _fill_usage(usage, chunk)
+            if chunk.parts:
+                yield chunk.text
+
+
+def _fill_usage(usage: Optional[Dict[str, int]], response) -> None:
+    """応答の usage_metadata からトークン数を書き込む（無い場合は何もしない）"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if usage is None or not metadata or not metadata.total_token_count:
+        return
+    usage['prompt_tokens'] = metadata.prompt_token_count
+    usage['completion_tokens'] = metadata.candidates_token_count
+
+
+def create_backend(api_key: str = None, transport: str = None,
+                   client_options: Dict[str, Any] = None) -> LLMBackend:
+    """設定（GEMINI_CONFIG["backend"]）に応じたバックエンドを作る"""
+    if GEMINI_CONFIG["backend"] == 'fake' and client_options is None:
+        return GeminiBackend(api_key=api_key or 'fake-key', transport='rest',
+                             client_options={'api_endpoint': GEMINI_CONFIG["fake_server_url"]})
+    if GEMINI_CONFIG["backend"] not in ('gemini', 'fake'):
+        raise ValueError(f"未対応のLLMバックエンドです: {GEMINI_CONFIG['backend']}")
+    return GeminiBackend(api_key=api_key, transport=transport, client_options=client_options)
@@ -10,7 +10,7 @@ import aiohttp
 from urllib.parse import quote
 from dotenv import load_dotenv
 
-from config.config import DISCORD_BOT_TOKEN, ADMIN_ID, MAIN_CHAT_CHANNEL, BOT_SALON_CHANNEL, BACK_MODE_CHANNEL, GRAVE_CHANNEL, STORM_CHANNEL, DEV_CHANNEL, POKEMON_CHANNEL, WEATHER_API_KEY
+from config.config import DISCORD_BOT_TOKEN, ADMIN_ID, MAIN_CHAT_CHANNEL, BOT_SALON_CHANNEL, BACK_MODE_CHANNEL, GRAVE_CHANNEL, STORM_CHANNEL, DEV_CHANNEL, POKEMON_CHANNEL, WEATHER_API_KEY, STREAMING_REPLY_CONFIG
 
 from lib import wiki
 from lib import weather
@@ -26,6 +26,8 @@ from lib import keisuke_honda
 from lib import dominator
 from lib import dice
 from lib.gemini_chat import GeminiChat
+from utils.llm_scheduler import PRIORITY_INTERACTIVE
+from utils.streaming_reply import StreamingReply
 from models.database import init_db
 
 # 環境変数をロード
@@ -75,7 +77,7 @@ async def on_ready():
         gemini_chat = None
     
     # Cogsをロード
-    for cog in ['cogs.points', 'cogs.role_panel', 'cogs.rumble', 'cogs.welcome', 'cogs.weekly_content', 'cogs.help_system', 'cogs.channel_intro', 'cogs.metrics_collector', 'cogs.announcement_detector', 'cogs.rss_monitor', 'cogs.ai_chat_system_simple', 'cogs.channel_notifications']:
+    for cog in ['cogs.points', 'cogs.role_panel', 'cogs.rumble', 'cogs.welcome', 'cogs.weekly_content', 'cogs.help_system', 'cogs.channel_intro', 'cogs.metrics_collector', 'cogs.announcement_detector', 'cogs.rss_monitor', 'cogs.ai_chat_system_simple', 'cogs.channel_notifications', 'cogs.llm_usage']:
         try:
             await client.load_extension(cog)
             print(f'Loaded {cog}')
@@ -355,9 +357,22 @@ async def on_message(message):
                 # メッセージがある場合はGemini AI、空の場合は定型文
                 elif text.replace('DJアイズ', '').strip():
                     # Gemini AIで応答
-                    if gemini_chat:
+                    if gemini_chat and STREAMING_REPLY_CONFIG["enabled"]:
+                        # 生成された順に投稿・編集する（短い返信は1回で送る）
                         try:
-                            ai_response = await gemini_chat.get_response(str(user_id), text.replace('DJアイズ', '').strip())
+                            reply = StreamingReply(channel)
+                            msg = await reply.run(gemini_chat.stream_response(
+                                str(user_id), text.replace('DJアイズ', '').strip(), priority=PRIORITY_INTERACTIVE))
+                            logging.info(f"Streamed reply to {message.author}: ttft={reply.time_to_first_token}s "
+                                         f"total={reply.total_time:.2f}s chunks={reply.chunks} edits={reply.edits}")
+                            return msg
+                        except Exception as e:
+                            logging.error(f"Streaming reply failed: {e}")
+                            msg = kumo_san + user_name + 'さん その言葉は知らなかったから調べたよ。\n' + wiki.wiki(text)
+                    elif gemini_chat:
+                        try:
+                            ai_response = await gemini_chat.get_response(str(user_id), text.replace('DJアイズ', '').strip(),
+                                                                         priority=PRIORITY_INTERACTIVE)
                             msg = ai_response
                         except:
                             msg = kumo_san + user_name + 'さん その言葉は知らなかったから調べたよ。\n' + wiki.wiki(text)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemini クライアントの非ブロッキングテスト
+ローカルの偽モデルサーバー（generateContent を遅延付きで返す REST サーバー）に対して
+GeminiChat を10件同時に呼び出し、応答待ちの間もイベントループの遅延がしきい値以下に
+収まること（SDK の同期呼び出しでループが止まらないこと）を確認する。
+あわせてタイムアウト・キャンセルで呼び出し元がすぐに解放されることを確認する
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import warnings
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+from lib.gemini_chat import GeminiChat, TIMEOUT_MESSAGE
+from utils.chat_session_store import ChatSessionStore
+from utils.llm_cache import LLMResponseCache
+from utils.llm_scheduler import LLMScheduler
+
+# 偽モデルサーバーの応答遅延（秒）と、"[slow]" を含むプロンプトの遅延
+MODEL_LATENCY = 0.5
+SLOW_LATENCY = 5.0
+# 許容するイベントループの遅延（秒）
+LAG_THRESHOLD = 0.1
+CONCURRENT_CALLS = 10
+
+
+async def _generate_content(request: web.Request) -> web.Response:
+    body = await request.json()
+    prompt = ''.join(part.get('text', '') for content in body.get('contents', [])
+                     for part in content.get('parts', []))
+    await asyncio.sleep(SLOW_LATENCY if '[slow]' in prompt else MODEL_LATENCY)
+    return web.json_response({
+        'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': f"応答 {len(body.get('contents', []))}"}]},
+            'finishReason': 'STOP',
+            'index': 0
+        }]
+    })
+
+
+def start_fake_server() -> str:
+    """別スレッドのイベントループで偽モデルサーバーを起動してURLを返す"""
+    ready = threading.Event()
+    address = []
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post('/{tail:.*}', _generate_content)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        address.append(site._server.sockets[0].getsockname()[1])
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait(10)
+    return f"http://127.0.0.1:{address[0]}"
+
+
+_server_url = None
+
+
+def make_client(timeout: float = None) -> GeminiChat:
+    global _server_url
+    if _server_url is None:
+        _server_url = start_fake_server()
+    # 送信ペースの制御はスケジューラーの話なので外し、同時に待っている状態を作る
+    scheduler = LLMScheduler(requests_per_minute=0, max_concurrency=CONCURRENT_CALLS)
+    return GeminiChat(api_key='test-key', transport='rest',
+                      client_options={'api_endpoint': _server_url}, timeout=timeout, scheduler=scheduler,
+                      session_store=ChatSessionStore(persist=False),
+                      response_cache=LLMResponseCache(persist=False))
+
+
+async def _measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """interval 秒ごとに起きて、予定時刻からの最大の遅れを返す"""
+    max_lag = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - expected)
+    return max_lag
+
+
+def run_concurrent_calls() -> tuple:
+    """10件同時に応答待ちし、しきい値を確認して（所要時間, 最大ループ遅延）を返す"""
+    async def run():
+        client = make_client()
+        stop = asyncio.Event()
+        monitor = asyncio.ensure_future(_measure_lag(stop))
+        start = time.perf_counter()
+        calls = [
+            client.get_response(f"user-{i}", f"こんにちは {i}") if i % 2 == 0 else
+            client.get_ai_character_response(f"キャラ{i}", "明るい", "です・ます", f"話題 {i}")
+            for i in range(CONCURRENT_CALLS)
+        ]
+        responses = await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        return responses, elapsed, await monitor
+
+    responses, elapsed, max_lag = asyncio.run(run())
+    assert all(response.startswith('応答') for response in responses), responses
+    assert max_lag < LAG_THRESHOLD, f"イベントループ遅延 {max_lag * 1000:.0f}ms"
+    # 逐次なら MODEL_LATENCY × 10 かかる
+    assert elapsed < MODEL_LATENCY * CONCURRENT_CALLS / 2, f"所要時間 {elapsed:.2f}秒"
+    return elapsed, max_lag
+
+
+def test_concurrent_calls_do_not_block_event_loop():
+    """10件同時に応答待ちしてもイベントループの遅延はしきい値以下"""
+    run_concurrent_calls()
+
+
+def test_timeout_releases_caller():
+    """応答が遅い呼び出しは timeout 秒で打ち切られ、ループも止まらない"""
+    async def run():
+        client = make_client(timeout=0.5)
+        stop = asyncio.Event()
+        monitor = asyncio.ensure_future(_measure_lag(stop))
+        start = time.perf_counter()
+        response = await client.get_response("slow-user", "[slow] ゆっくり答えて")
+        elapsed = time.perf_counter() - start
+        stop.set()
+        return response, elapsed, await monitor, client
+
+    response, elapsed, max_lag, client = asyncio.run(run())
+    assert response == TIMEOUT_MESSAGE, response
+    assert elapsed < 1.5, f"所要時間 {elapsed:.2f}秒"
+    assert max_lag < LAG_THRESHOLD, f"イベントループ遅延 {max_lag * 1000:.0f}ms"
+    # 打ち切ったセッションは破棄されている
+    assert "slow-user" not in client.chat_sessions
+
+
+def test_cancel_releases_caller():
+    """呼び出し元のタスクをキャンセルするとすぐに CancelledError で終わる"""
+    async def run():
+        client = make_client()
+        task = asyncio.ensure_future(client.get_response("cancel-user", "[slow] 長い話"))
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return time.perf_counter() - start
+        return None
+
+    elapsed = asyncio.run(run())
+    assert elapsed is not None, "キャンセルされませんでした"
+    assert elapsed < 0.1, f"キャンセルまで {elapsed:.2f}秒"
+
+
+if __name__ == "__main__":
+    print("🧪 Gemini クライアント非ブロッキングテスト")
+    print("=" * 60)
+    elapsed, max_lag = run_concurrent_calls()
+    print(f"✅ test_concurrent_calls_do_not_block_event_loop "
+          f"({CONCURRENT_CALLS}件: {elapsed:.2f}秒, 最大ループ遅延 {max_lag * 1000:.1f}ms)")
+    for test in (test_timeout_releases_caller, test_cancel_releases_caller):
+        test()
+        print(f"✅ {test.__name__}")
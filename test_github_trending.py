@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GitHub Trending ページ解析のテスト
+fixtures/github/ に保存した Trending ページから、リポジトリ名・スター数・言語・獲得スター数が
+掲載順に取り出せることを確認する（言語・説明の無いカードも読み飛ばさない）
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.github_trending import parse_trending_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'github', 'trending_daily.html')
+
+
+def load_repos() -> list:
+    with open(FIXTURE, encoding='utf-8') as f:
+        return parse_trending_page(f.read(), 'daily')
+
+
+def test_names_stars_and_languages():
+    """カードごとの名前・スター数・言語を掲載順に取り出す"""
+    repos = load_repos()
+    assert [(repo.name, repo.stars, repo.language) for repo in repos] == [
+        ('microsoft/markitdown', 45210, 'Python'),
+        ('oven-sh/bun', 76918, 'Zig'),
+        ('excalidraw/excalidraw', 93004, 'TypeScript'),
+        ('public-apis/public-apis', 331455, ''),
+        ('rust-lang/rustlings', 56377, 'Rust'),
+    ]
+
+
+def test_card_details():
+    """URL・説明・フォーク数・期間内の獲得スター数と期間"""
+    repos = load_repos()
+    bun = repos[1]
+    assert bun.url == 'https://github.com/oven-sh/bun'
+    assert bun.description.startswith('Incredibly fast JavaScript runtime')
+    assert (bun.forks, bun.stars_gained, bun.period) == (2845, 312, 'daily')
+    assert [repo.stars_gained for repo in repos] == [1532, 312, 287, 145, 98]
+    assert repos[3].description == ''
+
+
+if __name__ == "__main__":
+    print("🧪 GitHub Trending ページ解析テスト")
+    print("=" * 60)
+    for test in (test_names_stars_and_languages, test_card_details):
+        test()
+        print(f"✅ {test.__name__}")
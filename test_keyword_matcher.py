@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キーワードマッチャー等価性テスト
+KeywordMatcher によるカテゴリ判定が、従来の「キーワードごとに `in` で判定」する
+スコアリングと一致することを確認する（単語境界なしの設定で完全一致、
+単語境界ありでは短い英数字キーワードの誤判定だけが解消されること）
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.keyword_matcher import KeywordMatcher
+from utils.enhanced_trends_manager import EnhancedTrendsManager
+from utils.realtime_trends_client import RealtimeTrendsClient
+from utils.trends_manager import TrendsManager
+
+SAMPLE_TITLES = [
+    "Go 1.22 リリース：range over int が追加",
+    "Google が新しい AI モデル Gemini を発表",
+    "ChatGPTでプロンプトエンジニアリングを学ぶ",
+    "AI活用で業務効率化、DX推進のポイント",
+    "React Native と Next.js で作るモバイルアプリ",
+    "Rust で書く安全な並行処理",
+    "Trust and safety at scale",
+    "Email の配信基盤を刷新しました",
+    "Pandas と Matplotlib によるデータ分析入門",
+    "エンジニア転職で年収を上げるためのスキルアップ",
+    "スタートアップの資金調達とIPO戦略",
+    "Udemyで始めるオンライン学習の習慣化",
+    "MongoDB Atlas で作る RAG アプリケーション",
+    "c++20 の coroutine を試す",
+    "Claude Code でリファクタリングを自動化",
+]
+
+
+def _legacy_counts(category_keywords, text):
+    """従来のスコアリング（キーワードごとに部分文字列判定）"""
+    combined_text = text.lower()
+    return {
+        category: sum(1 for keyword in keywords if keyword.lower() in combined_text)
+        for category, keywords in category_keywords.items()
+    }
+
+
+def _legacy_best(category_keywords, text, default):
+    """従来のカテゴリ判定（ヒット数最大、同数は先頭側）"""
+    best, max_matches = default, 0
+    for category, matches in _legacy_counts(category_keywords, text).items():
+        if matches > max_matches:
+            best, max_matches = category, matches
+    return best, max_matches
+
+
+def _corpus(category_keywords, size=2000, seed=0):
+    """キーワードと紛らわしい語を混ぜたテスト用テキスト群"""
+    rng = random.Random(seed)
+    keywords = [keyword for words in category_keywords.values() for keyword in words]
+    filler = ("the new release of with for and to in google email mongo trust interest "
+              "algorithms going 開発 記事 まとめ 入門 解説 AI活用 Go言語").split()
+    texts = list(SAMPLE_TITLES)
+    for _ in range(size):
+        words = [rng.choice(keywords) if rng.random() < 0.2 else rng.choice(filler)
+                 for _ in range(rng.randint(3, 30))]
+        texts.append(rng.choice([" ", "", "、"]).join(words))
+    return texts
+
+
+def test_equivalent_without_word_boundaries():
+    """単語境界を無効にすると従来スコアと完全一致する"""
+    for category_keywords in (EnhancedTrendsManager().category_keywords,
+                              RealtimeTrendsClient().category_keywords):
+        matcher = KeywordMatcher(category_keywords, boundary_max_len=0)
+        for text in _corpus(category_keywords):
+            assert matcher.count(text) == _legacy_counts(category_keywords, text), text
+            best, matches = matcher.best_category(text)
+            assert (best or '一般', matches) == _legacy_best(category_keywords, text, '一般'), text
+
+
+def test_first_category_equivalent():
+    """TrendsManager の先勝ち判定が従来の if/elif 連鎖と一致する"""
+    manager = TrendsManager()
+    matcher = KeywordMatcher(manager.trend_categories, boundary_max_len=0)
+    for text in _corpus(manager.trend_categories):
+        expected = next(
+            (category for category, words in manager.trend_categories.items()
+             if any(word in text.lower() for word in words)),
+            None
+        )
+        assert matcher.first_category(text) == expected, text
+
+
+def test_word_boundaries_only_remove_false_positives():
+    """単語境界ありでは、従来ヒットの部分集合になり短い語の誤判定だけが消える"""
+    category_keywords = EnhancedTrendsManager().category_keywords
+    strict = KeywordMatcher(category_keywords)
+    loose = KeywordMatcher(category_keywords, boundary_max_len=0)
+    for text in _corpus(category_keywords):
+        strict_hits = set(strict.matched_keywords(text))
+        loose_hits = set(loose.matched_keywords(text))
+        assert strict_hits <= loose_hits, text
+        for keyword in loose_hits - strict_hits:
+            assert keyword.isascii() and len(keyword) <= KeywordMatcher.DEFAULT_BOUNDARY_MAX_LEN, keyword
+
+
+def test_short_keyword_boundaries():
+    """'go' / 'ai' などの短い語は単語として現れた時だけヒットする"""
+    matcher = KeywordMatcher({'lang': ['go', 'rust', 'c++'], 'ai': ['ai']})
+    assert matcher.matched_keywords("Go 1.22 released") == ['go']
+    assert matcher.matched_keywords("google search update") == []
+    assert matcher.matched_keywords("trust and safety") == []
+    assert matcher.matched_keywords("email delivery") == []
+    assert matcher.matched_keywords("AI活用のポイント") == ['ai']
+    assert matcher.matched_keywords("生成aiの導入") == ['ai']
+    assert sorted(matcher.matched_keywords("c++20 と rust/go の比較")) == ['c++', 'go', 'rust']
+
+
+if __name__ == "__main__":
+    print("🧪 キーワードマッチャー等価性テスト")
+    print("=" * 60)
+    for test in (test_equivalent_without_word_boundaries, test_first_category_equivalent,
+                 test_word_boundaries_only_remove_false_positives, test_short_keyword_boundaries):
+        test()
+        print(f"✅ {test.__name__}")
+
+    matcher = EnhancedTrendsManager().keyword_matcher
+    print("\n📋 サンプル記事の判定:")
+    for title in SAMPLE_TITLES:
+        legacy = _legacy_best(EnhancedTrendsManager().category_keywords, title, '一般')
+        category, matches = matcher.best_category(title)
+        mark = "" if (category or '一般') == legacy[0] else f"  (従来: {legacy[0]})"
+        print(f"  {title[:30]:<30} -> {category or '一般'} ({matches}){mark}")
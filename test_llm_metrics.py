@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM利用状況の記録テスト
+偽モデルサーバー（utils/fake_llm_server.py）に対して GeminiChat の各呼び出しを行い、
+機能ごとに呼び出し回数・トークン数（usageMetadata）・キャッシュ利用・エラー種別が記録されること、
+記録をSQLiteに書き出して期間を指定して集計できることを確認する
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import warnings
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+from lib.gemini_chat import GeminiChat
+from lib.llm_backend import GeminiBackend
+from utils.chat_session_store import ChatSessionStore
+from utils.fake_llm_server import FakeLLMServer
+from utils.llm_cache import LLMResponseCache
+from utils.llm_metrics import (LLMMetrics, estimate_tokens, FEATURE_CHANNEL_INTRO,
+                               FEATURE_CHARACTER_CONVERSATION, FEATURE_MENTION_CHAT)
+from utils.llm_scheduler import LLMScheduler
+
+REPLY = "記録テストの応答です"
+
+
+def make_client(server: FakeLLMServer, metrics: LLMMetrics) -> GeminiChat:
+    url = server.start_in_thread()
+    return GeminiChat(backend=GeminiBackend(api_key='test-key', transport='rest', client_options={'api_endpoint': url}),
+                      timeout=10, scheduler=LLMScheduler(requests_per_minute=0, backoff_base=0.01, backoff_max=0.01),
+                      session_store=ChatSessionStore(persist=False),
+                      response_cache=LLMResponseCache(persist=False, variants=1), metrics=metrics)
+
+
+def test_calls_are_recorded_per_feature():
+    """機能ごとに回数・トークン数・キャッシュ利用・所要時間を記録し、書き出した記録からも集計できる"""
+    server = FakeLLMServer(latency=0.05, jitter=0, script=[('.', [REPLY])], stream_chunk_chars=4,
+                           stream_chunk_delay=0.01, seed=0)
+    with tempfile.TemporaryDirectory() as directory:
+        metrics = LLMMetrics(persist=True, path=os.path.join(directory, 'llm_metrics.db'))
+        client = make_client(server, metrics)
+
+        async def run():
+            await client.get_response('metrics-user', "こんにちは")
+            async for _ in client.stream_response('metrics-user', "ストリーミングで"):
+                pass
+            await client.get_ai_character_response("佐藤", "明るい", "です・ます", "話題")
+            # 2回目は応答キャッシュから返る
+            for _ in range(2):
+                await client.generate("チャンネル紹介のトーク", feature=FEATURE_CHANNEL_INTRO)
+            # 生成設定が違えば同じプロンプトでもキャッシュは使わない
+            await client.generate("チャンネル紹介のトーク", feature=FEATURE_CHANNEL_INTRO,
+                                  generation_config={'response_mime_type': 'application/json'})
+            flushed = await metrics.flush()
+            return flushed, await metrics.summary_since(1)
+
+        try:
+            flushed, persisted = asyncio.run(run())
+        finally:
+            server.stop_thread()
+
+        summary = metrics.summary()
+        assert set(summary) == {FEATURE_MENTION_CHAT, FEATURE_CHARACTER_CONVERSATION, FEATURE_CHANNEL_INTRO}
+        chat = summary[FEATURE_MENTION_CHAT]
+        assert chat['calls'] == 2 and chat['errors'] == 0
+        # トークン数は偽サーバーの usageMetadata（ストリーミングは最後の断片）から
+        assert chat['completion_tokens'] == 2 * estimate_tokens(REPLY), chat
+        assert chat['prompt_tokens'] > 0 and chat['p50'] >= 0.05
+        intro = summary[FEATURE_CHANNEL_INTRO]
+        assert intro['calls'] == 3 and intro['cache_hits'] == 1, intro
+        assert summary[FEATURE_CHARACTER_CONVERSATION]['calls'] == 1
+
+        assert flushed == 6
+        assert {feature: stats['calls'] for feature, stats in persisted.items()} == \
+               {feature: stats['calls'] for feature, stats in summary.items()}
+
+
+def test_errors_are_recorded_by_class():
+    """429・500・タイムアウトはエラー種別ごとに数え、トークン数には含めない"""
+    server = FakeLLMServer(latency=0.05, jitter=0, rate_limit_rate=1.0, seed=0)
+    metrics = LLMMetrics(persist=False)
+    client = make_client(server, metrics)
+
+    async def run():
+        await client.get_response('error-user', "こんにちは")
+        server.rate_limit_rate, server.error_rate = 0.0, 1.0
+        await client.get_response('error-user', "こんにちは")
+        server.error_rate, server.latency = 0.0, 2.0
+        await client.get_response('error-user', "こんにちは", timeout=0.3)
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+    chat = metrics.summary()[FEATURE_MENTION_CHAT]
+    assert chat['calls'] == 3 and chat['errors'] == 3, chat
+    assert len(chat['error_classes']) == 3, chat['error_classes']
+    assert 'TimeoutError' in chat['error_classes']
+    assert chat['prompt_tokens'] == 0 and chat['completion_tokens'] == 0
+
+
+if __name__ == "__main__":
+    print("🧪 LLM利用状況の記録テスト")
+    print("=" * 60)
+    for test in (test_calls_are_recorded_per_feature, test_errors_are_recorded_by_class):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重複・類似記事判定のテスト
+URL正規化（Google News の記事ID・リダイレクトURL・トラッキングパラメータ）と、
+タイトルが少しだけ違う記事は除去し、別の記事は残すことを確認する
+"""
+
+import base64
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.near_duplicate import NearDuplicateDetector, canonicalize_url
+
+ARTICLE = 'https://example.com/news/2024/ai-release'
+
+
+def google_news_url(original: str) -> str:
+    """元URLを埋め込んだ旧形式の Google News 記事URL（protobuf を base64 にしたID）"""
+    raw = b'\x08\x13\x22' + bytes([len(original)]) + original.encode('ascii') + b'\xd2\x01\x00'
+    article_id = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    return f"https://news.google.com/rss/articles/{article_id}?oc=5"
+
+
+def test_google_news_id_resolves_to_original_url():
+    """記事IDに埋め込まれた元URLを取り出す（元URLの utm_* も除去）"""
+    assert canonicalize_url(google_news_url(ARTICLE + '?utm_source=gn')) == ARTICLE
+
+
+def test_google_news_id_without_url_keeps_id():
+    """元URLを含まない新形式のIDは ID だけのURLにそろえる"""
+    url = 'https://news.google.com/rss/articles/CBMiAbCdEf?oc=5&hl=ja'
+    assert canonicalize_url(url) == 'https://news.google.com/articles/CBMiAbCdEf'
+
+
+def test_redirect_urls_resolve_to_target():
+    """Google のリダイレクトURLとはてなブックマークのエントリURLは元記事URLにする"""
+    assert canonicalize_url(f"https://www.google.com/url?q={ARTICLE}&sa=t&usg=xyz") == ARTICLE
+    assert canonicalize_url('https://b.hatena.ne.jp/entry/s/example.com/news/2024/ai-release') == ARTICLE
+    assert canonicalize_url('https://b.hatena.ne.jp/entry/example.com/news/2024/ai-release') == ARTICLE
+
+
+def test_tracking_params_and_scheme_are_normalized():
+    """トラッキングパラメータ・フラグメント・www・末尾スラッシュ・http/https の違いを無視する"""
+    url = 'http://www.example.com/news/2024/ai-release/?utm_medium=rss&fbclid=abc&page=2#top'
+    assert canonicalize_url(url) == ARTICLE + '?page=2'
+
+
+def test_near_duplicate_titles_are_removed():
+    """サイト名の付け方だけ違うタイトルは重複、別の記事は残す"""
+    items = [
+        {'title': "OpenAI、新しいGPTモデルを発表 開発者向けAPIも公開", 'url': 'https://a.example.com/1'},
+        {'title': "OpenAI、新しいGPTモデルを発表　開発者向けAPIも公開 - ITmedia", 'url': 'https://b.example.com/2'},
+        {'title': "経済産業省、スタートアップ支援の補助金を拡充へ", 'url': 'https://c.example.com/3'},
+    ]
+    detector = NearDuplicateDetector()
+    unique = detector.dedupe(items, title_of=lambda item: item['title'], url_of=lambda item: item['url'])
+    assert [item['url'] for item in unique] == ['https://a.example.com/1', 'https://c.example.com/3']
+
+
+def test_same_article_url_is_removed():
+    """タイトルが違っても元記事URLが同じ記事（Google News 経由を含む）は重複"""
+    items = [
+        {'title': "記事A", 'url': ARTICLE},
+        {'title': "まったく別の見出し", 'url': google_news_url(ARTICLE)},
+    ]
+    detector = NearDuplicateDetector()
+    unique = detector.dedupe(items, title_of=lambda item: item['title'], url_of=lambda item: item['url'])
+    assert unique == items[:1]
+
+
+if __name__ == "__main__":
+    print("🧪 重複・類似記事判定テスト")
+    print("=" * 60)
+    for test in (test_google_news_id_resolves_to_original_url, test_google_news_id_without_url_keeps_id,
+                 test_redirect_urls_resolve_to_target, test_tracking_params_and_scheme_are_normalized,
+                 test_near_duplicate_titles_are_removed, test_same_article_url_is_removed):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ストリーミング返信のテスト
+偽モデルサーバー（utils/fake_llm_server.py）のストリーミング応答を GeminiChat.stream_response で受け取り、
+送信・編集を記録するだけのチャンネルに StreamingReply で投稿する。
+長い返信は仮メッセージを出してから間隔を空けて編集されること（断片ごとには編集しない）、
+短い返信は1回の送信で済むこと、最初の断片までの時間が計測されることを確認する
+"""
+
+import asyncio
+import os
+import sys
+import warnings
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+warnings.filterwarnings('ignore', category=FutureWarning)
+from lib.gemini_chat import GeminiChat
+from lib.llm_backend import GeminiBackend
+from utils.chat_session_store import ChatSessionStore
+from utils.fake_llm_server import FakeLLMServer
+from utils.llm_cache import LLMResponseCache
+from utils.llm_scheduler import LLMScheduler
+from utils.streaming_reply import StreamingReply
+
+LONG_REPLY = "ストリーミングで少しずつ届く長めの返信です。" * 6
+SHORT_REPLY = "短い返信です"
+EDIT_INTERVAL = 0.3
+
+
+class RecordingMessage:
+    def __init__(self, channel, content: str):
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content: str):
+        await asyncio.sleep(0.01)
+        self.content = content
+        self.channel.events.append(('edit', asyncio.get_running_loop().time(), content))
+
+
+class RecordingChannel:
+    """send / edit を記録するだけのチャンネル"""
+
+    def __init__(self):
+        self.events = []
+        self.messages = []
+
+    async def send(self, content: str):
+        await asyncio.sleep(0.01)
+        self.events.append(('send', asyncio.get_running_loop().time(), content))
+        message = RecordingMessage(self, content)
+        self.messages.append(message)
+        return message
+
+
+def make_client(server: FakeLLMServer) -> GeminiChat:
+    url = server.start_in_thread()
+    return GeminiChat(backend=GeminiBackend(api_key='test-key', transport='rest', client_options={'api_endpoint': url}),
+                      timeout=10, scheduler=LLMScheduler(requests_per_minute=0),
+                      session_store=ChatSessionStore(persist=False),
+                      response_cache=LLMResponseCache(persist=False))
+
+
+def run_reply(script, user_id: str, latency: float, chunk_delay: float):
+    server = FakeLLMServer(latency=latency, jitter=0, script=script, stream_chunk_chars=8,
+                           stream_chunk_delay=chunk_delay, seed=0)
+    client = make_client(server)
+
+    async def run():
+        channel = RecordingChannel()
+        reply = StreamingReply(channel, single_send_window=0.4, edit_interval=EDIT_INTERVAL)
+        text = await reply.run(client.stream_response(user_id, "話して"))
+        session = await client.chat_sessions.get(user_id)
+        return channel, reply, text, session
+
+    try:
+        return asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+
+def check_long_reply():
+    """長い返信を流して編集のまとめ方を確認し、返信の計測結果を返す"""
+    channel, reply, text, session = run_reply([('話して', [LONG_REPLY])], 'stream-long', 0.2, 0.05)
+
+    assert text == LONG_REPLY
+    assert [event[0] for event in channel.events].count('send') == 1, channel.events
+    assert channel.messages[0].content == LONG_REPLY
+    # 断片ごと（約20回）ではなく、edit_interval ごとにまとめて編集する
+    assert 1 <= reply.edits < reply.chunks / 2, (reply.edits, reply.chunks)
+    edit_times = [event[1] for event in channel.events if event[0] == 'edit']
+    gaps = [later - earlier for earlier, later in zip(edit_times, edit_times[1:])]
+    assert all(gap >= EDIT_INTERVAL * 0.9 for gap in gaps), gaps
+    assert reply.time_to_first_token is not None and reply.time_to_first_token < reply.total_time
+    # 返信は履歴に記録される
+    assert session is not None and session.turns[-1] == ('model', LONG_REPLY)
+    return reply
+
+
+def check_short_reply():
+    """短い返信が1回だけ送られることを確認し、返信の計測結果を返す"""
+    channel, reply, text, _ = run_reply([('話して', [SHORT_REPLY])], 'stream-short', 0.05, 0.0)
+
+    assert text == SHORT_REPLY
+    assert [(kind, content) for kind, _, content in channel.events] == [('send', SHORT_REPLY)]
+    assert reply.edits == 0
+    return reply
+
+
+def test_long_reply_is_edited_in_coalesced_steps():
+    """長い返信は仮メッセージを投稿し、まとめて編集して最後に全文になる"""
+    check_long_reply()
+
+
+def test_short_reply_is_sent_once():
+    """すぐに揃う短い返信は仮メッセージなしで1回だけ送る"""
+    check_short_reply()
+
+
+if __name__ == "__main__":
+    print("🧪 ストリーミング返信テスト")
+    print("=" * 60)
+    for test, check in ((test_long_reply_is_edited_in_coalesced_steps, check_long_reply),
+                        (test_short_reply_is_sent_once, check_short_reply)):
+        reply = check()
+        print(f"✅ {test.__name__} (TTFT {reply.time_to_first_token:.2f}秒, 全体 {reply.total_time:.2f}秒, "
+              f"断片 {reply.chunks}, 編集 {reply.edits})")
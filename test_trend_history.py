@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+トレンド履歴の伸び率テスト
+トレンドは週1回（ギルドの配信スケジュール）しか取得しないので、1週間おきの2回の観測から
+伸び率が計算され、「急上昇」に伸びた記事が選ばれることを確認する
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.trend_history import TrendHistoryStore, select_rising
+
+WEEK = 7 * 24 * 3600
+
+
+def make_trends(rising_likes: int, steady_likes: int) -> list:
+    return [
+        {'title': "伸びている記事", 'url': 'https://qiita.com/a/items/rising', 'source': 'Qiita', 'likes': rising_likes},
+        {'title': "伸びていない記事", 'url': 'https://qiita.com/a/items/steady', 'source': 'Qiita', 'likes': steady_likes},
+    ]
+
+
+def run_weekly(gap_seconds: float) -> list:
+    """gap_seconds おきに2回記録し、2回目の取得結果に伸び率を付けて急上昇を選ぶ"""
+    async def run(path: str):
+        store = TrendHistoryStore(path=path)
+        now = 1_800_000_000.0
+        await store.record(make_trends(10, 50), observed_at=now - gap_seconds)
+        trends = make_trends(600, 52)
+        await store.record(trends, observed_at=now)
+        await store.annotate_velocity(trends, now=now)
+        return trends
+
+    with tempfile.TemporaryDirectory() as directory:
+        trends = asyncio.run(run(os.path.join(directory, 'trend_history.db')))
+    return trends
+
+
+def test_weekly_fetches_select_rising_item():
+    """1週間おきの取得でも伸び率が計算され、伸びた記事だけが急上昇に選ばれる"""
+    trends = run_weekly(WEEK)
+    rising = select_rising(trends)
+    assert [trend['url'] for trend in rising] == ['https://qiita.com/a/items/rising'], trends
+    assert abs(rising[0]['velocity'] - 590 / 168) < 0.01
+
+
+def test_slightly_late_fetch_uses_previous_observation():
+    """前回の取得から1週間を少し過ぎても（ウィンドウ外でも）直前の観測との差で計算する"""
+    trends = run_weekly(WEEK + 3 * 3600)
+    rising = select_rising(trends)
+    assert [trend['url'] for trend in rising] == ['https://qiita.com/a/items/rising'], trends
+    assert abs(rising[0]['velocity'] - 590 / 171) < 0.01
+
+
+if __name__ == "__main__":
+    print("🧪 トレンド履歴の伸び率テスト")
+    print("=" * 60)
+    for test in (test_weekly_fetches_select_rising_item, test_slightly_late_fetch_uses_previous_observation):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,140 @@
+# -*- coding:utf-8 -*-
+"""
+Channel Conversations
+AIキャラクター同士の会話をチャンネルごとの asyncio タスクとして動かすための管理クラス
+
+- 会話は「開始 → 発言ターン → まとめ → 反応 → 終了」の段階（phase）を順に進める状態機械として書き、
+  1チャンネルにつき1つのタスクで実行する（別チャンネルの会話は同時に進み、LLMの送信枠は
+  共有スケジューラーで分け合う）
+- 会話履歴はチャンネルごとに最大 max_history 件の deque（古い発言から捨てる）
+- ユーザーがチャンネルで発言したら、そのチャンネルの会話タスクをキャンセルして譲る
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Deque, Dict, List, Optional
+
+from config.config import AI_CHAT_CONFIG
+
+# 会話の段階
+PHASE_OPENING = 'opening'      # 最初の発言
+PHASE_TURN = 'turn'            # 通常の発言ターン
+PHASE_CLOSING = 'closing'      # メンターによるまとめ
+PHASE_REACTIONS = 'reactions'  # まとめへの全員の反応
+PHASE_DONE = 'done'
+
+
+class ConversationState:
+    """1チャンネル分の進行中の会話"""
+
+    __slots__ = ('channel_id', 'participants', 'topic', 'phase', 'turn', 'max_turns',
+                 'history', 'script', 'closing_text', 'end_reason', 'started')
+
+    def __init__(self, channel_id: int, participants: List, topic: str, max_turns: int,
+                 history: Deque[Dict]):
+        self.channel_id = channel_id
+        self.participants = participants  # [AICharacter, ...]
+        self.topic = topic
+        self.phase = PHASE_OPENING
+        self.turn = 0                     # 発言ターンの番号（0始まり）
+        self.max_turns = max_turns
+        self.history = history            # チャンネルの会話履歴（deque）
+        self.script: List = []            # まとめて生成済みでまだ投稿していない発言（ScriptLine）
+        self.closing_text: Optional[str] = None
+        self.end_reason: Optional[str] = None
+        self.started = time.monotonic()
+
+    def recent(self, count: int) -> List[Dict]:
+        """直近 count 件の発言（deque はスライスできないのでリストにして返す）"""
+        return list(self.history)[-count:] if count > 0 else []
+
+    def spoken_names(self) -> set:
+        """これまでに発言したキャラクターの表示名"""
+        return {message.get('speaker') for message in self.history}
+
+    def __repr__(self):
+        return (f"ConversationState(channel={self.channel_id}, phase={self.phase!r}, "
+                f"turn={self.turn}/{self.max_turns}, history={len(self.history)})")
+
+
+class ChannelConversations:
+    """チャンネルごとの会話タスクと会話履歴を管理する"""
+
+    def __init__(self, max_history: int = None):
+        self.max_history = max_history or AI_CHAT_CONFIG["history_max_messages"]
+        self.histories: Dict[int, Deque[Dict]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._states: Dict[int, ConversationState] = {}
+        self.stats = {'started': 0, 'completed': 0, 'cancelled': 0, 'failed': 0}
+
+    def history_for(self, channel_id: int) -> Deque[Dict]:
+        """チャンネルの会話履歴（無ければ空の deque を作る）"""
+        history = self.histories.get(channel_id)
+        if history is None:
+            history = self.histories[channel_id] = deque(maxlen=self.max_history)
+        return history
+
+    def reset_history(self, channel_id: int) -> Deque[Dict]:
+        """チャンネルの会話履歴を新しい空の deque にする"""
+        history = self.histories[channel_id] = deque(maxlen=self.max_history)
+        return history
+
+    def is_active(self, channel_id: int) -> bool:
+        task = self._tasks.get(channel_id)
+        return task is not None and not task.done()
+
+    def active_channels(self) -> List[int]:
+        """会話が実行中のチャンネルID"""
+        return [channel_id for channel_id, task in self._tasks.items() if not task.done()]
+
+    def state_for(self, channel_id: int) -> Optional[ConversationState]:
+        return self._states.get(channel_id) if self.is_active(channel_id) else None
+
+    def start(self, state: ConversationState, runner: Awaitable) -> Optional[asyncio.Task]:
+        """会話タスクを開始（同じチャンネルで実行中なら開始せず None）"""
+        if self.is_active(state.channel_id):
+            runner.close()
+            return None
+        task = asyncio.create_task(runner, name=f"ai_conversation_{state.channel_id}")
+        self._tasks[state.channel_id] = task
+        self._states[state.channel_id] = state
+        self.stats['started'] += 1
+        task.add_done_callback(lambda finished: self._finished(state.channel_id, finished))
+        return task
+
+    def cancel(self, channel_id: int, reason: str = 'cancelled') -> bool:
+        """チャンネルの会話タスクをキャンセル（実行中だった場合 True）"""
+        if not self.is_active(channel_id):
+            return False
+        state = self._states.get(channel_id)
+        if state is not None:
+            state.end_reason = reason
+        self._tasks[channel_id].cancel()
+        return True
+
+    def cancel_all(self, reason: str = 'unload'):
+        for channel_id in list(self._tasks):
+            self.cancel(channel_id, reason)
+
+    async def wait(self, channel_id: int) -> Optional[ConversationState]:
+        """会話タスクの終了を待つ（キャンセルされても例外にしない）"""
+        task = self._tasks.get(channel_id)
+        if task is not None:
+            await asyncio.wait({task})
+        return self._states.get(channel_id)
+
+    def _finished(self, channel_id: int, task: asyncio.Task):
+        if self._tasks.get(channel_id) is task:
+            del self._tasks[channel_id]
+        if task.cancelled():
+            self.stats['cancelled'] += 1
+            state = self._states.get(channel_id)
+            logging.info(f"AI会話をキャンセルしました（チャンネル {channel_id}, 理由: "
+                         f"{state.end_reason if state else '不明'}）")
+        elif task.exception() is not None:
+            self.stats['failed'] += 1
+            logging.error(f"AI会話タスクエラー（チャンネル {channel_id}）: {task.exception()}")
+        else:
+            self.stats['completed'] += 1
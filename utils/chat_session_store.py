@@ -0,0 +1,184 @@
+# -*- coding:utf-8 -*-
+"""
+Chat Session Store
+Geminiチャットの会話履歴（ユーザーごと）を保持するセッションストア
+
+- メモリ上は最も古く使われたものから破棄するLRU（上限 max_sessions）
+- 最後の会話から idle_ttl を過ぎたセッションは破棄
+- 履歴は「これまでの要約（summary）」と「直近の発言（turns）」で持ち、
+  発言数が max_turns を超えたら古い発言を要約に畳み込む（要約自体は GeminiChat が作る）
+- persist が有効ならSQLiteにも保存し、再起動後もメモリに無いセッションを読み戻す
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config.config import CHAT_SESSION_CONFIG
+
+
+class ChatSession:
+    """1ユーザー分の会話履歴"""
+
+    __slots__ = ('key', 'summary', 'turns', 'updated')
+
+    def __init__(self, key: str, summary: str = '', turns: List[Tuple[str, str]] = None,
+                 updated: float = None):
+        self.key = key
+        self.summary = summary
+        self.turns = turns if turns is not None else []  # [(role, text), ...] role は user / model
+        self.updated = updated if updated is not None else time.time()
+
+    def add_exchange(self, message: str, reply: str):
+        """ユーザーの発言とモデルの返答を追加"""
+        self.turns.append(('user', message))
+        self.turns.append(('model', reply))
+        self.updated = time.time()
+
+    def split_for_compaction(self, max_turns: int, keep_recent: int) -> Optional[List[Tuple[str, str]]]:
+        """要約に畳み込む古い発言（max_turns 以下なら None）。直近 keep_recent 件は残す"""
+        if len(self.turns) <= max_turns:
+            return None
+        # user / model の組を崩さないよう偶数件で区切る
+        keep = min(keep_recent - keep_recent % 2, len(self.turns))
+        return self.turns[:len(self.turns) - keep]
+
+    def __repr__(self):
+        return f"ChatSession(key={self.key!r}, turns={len(self.turns)}, summary={len(self.summary)}文字)"
+
+
+class ChatSessionStore:
+    """LRU + アイドルTTLのセッションストア（SQLite保存は任意）"""
+
+    def __init__(self, max_sessions: int = None, idle_ttl_minutes: float = None,
+                 persist: bool = None, path: str = None):
+        self.max_sessions = max_sessions or CHAT_SESSION_CONFIG["max_sessions"]
+        self.idle_ttl = (idle_ttl_minutes or CHAT_SESSION_CONFIG["idle_ttl_minutes"]) * 60
+        self.persist = persist if persist is not None else CHAT_SESSION_CONFIG["persist"]
+        self.path = path or CHAT_SESSION_CONFIG["path"]
+
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.stats = {'hits': 0, 'loaded': 0, 'misses': 0, 'evicted': 0, 'expired': 0}
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[ChatSession]:
+        """セッションを取得（メモリに無ければSQLiteから読み戻す。期限切れは None）"""
+        session = self._sessions.get(key)
+        if session is not None:
+            if self._is_expired(session):
+                self.discard(key)
+                self.stats['expired'] += 1
+                return None
+            self._sessions.move_to_end(key)
+            self.stats['hits'] += 1
+            return session
+
+        if self.persist:
+            session = await asyncio.to_thread(self._load, key)
+            if session is not None and not self._is_expired(session):
+                self.stats['loaded'] += 1
+                self._remember(session)
+                return session
+        self.stats['misses'] += 1
+        return None
+
+    async def save(self, session: ChatSession):
+        """セッションを保存（LRUの先頭に移し、上限を超えた分は破棄）"""
+        self._remember(session)
+        if self.persist:
+            await asyncio.to_thread(self._store, session)
+
+    def discard(self, key: str):
+        """セッションを削除（SQLiteからも削除）"""
+        self._sessions.pop(key, None)
+        if self.persist:
+            self._delete(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ------------------------------------------------------------------
+    # メモリ（LRU）
+    # ------------------------------------------------------------------
+    def _is_expired(self, session: ChatSession) -> bool:
+        return time.time() - session.updated > self.idle_ttl
+
+    def _remember(self, session: ChatSession):
+        self._sessions[session.key] = session
+        self._sessions.move_to_end(session.key)
+        # メモリからは外すだけ（SQLiteに残っていれば次回読み戻す）
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS chat_sessions (
+                            session_key TEXT PRIMARY KEY,
+                            summary TEXT NOT NULL,
+                            turns TEXT NOT NULL,
+                            updated REAL NOT NULL
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated '
+                                 'ON chat_sessions(updated)')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _load(self, key: str) -> Optional[ChatSession]:
+        conn = self._connect()
+        with self._db_lock:
+            row = conn.execute(
+                'SELECT summary, turns, updated FROM chat_sessions WHERE session_key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        summary, turns, updated = row
+        return ChatSession(key, summary, [tuple(turn) for turn in json.loads(turns)], updated)
+
+    def _store(self, session: ChatSession):
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute(
+                'INSERT INTO chat_sessions (session_key, summary, turns, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(session_key) DO UPDATE SET summary = excluded.summary, '
+                'turns = excluded.turns, updated = excluded.updated',
+                (session.key, session.summary, json.dumps(session.turns, ensure_ascii=False), session.updated)
+            )
+            # アイドルTTLを過ぎたセッションを削除
+            conn.execute('DELETE FROM chat_sessions WHERE updated < ?', (time.time() - self.idle_ttl,))
+            conn.commit()
+
+    def _delete(self, key: str):
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute('DELETE FROM chat_sessions WHERE session_key = ?', (key,))
+            conn.commit()
+
+
+# 全ての GeminiChat で共有するインスタンス
+chat_session_store = ChatSessionStore()
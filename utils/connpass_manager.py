@@ -1,10 +1,16 @@
 # -*- coding:utf-8 -*-
 import aiohttp
 import datetime
-from typing import List, Dict, Optional
-from config.config import CONNPASS_API_KEY
+import heapq
+import time
+from typing import List, Dict, Optional, Tuple
+from config.config import CONNPASS_API_KEY, CONNPASS_SEARCH_CONFIG, EVENT_INDEX_CONFIG
+from utils.http_cache import http_cache
+from utils.event_index import event_index, detect_prefecture, to_timestamp
 import asyncio
 
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
 class ConnpassManager:
     def __init__(self):
         self.api_key = CONNPASS_API_KEY
@@ -25,6 +31,16 @@ class ConnpassManager:
             "セキュリティ", "勉強会", "エンジニア", "キャリア", "就活", "転職", "就職"
         ]
         
+        # 高重みキーワード（学生・キャリア関連）は1.5倍のスコア
+        high_weight_keywords = {"学生", "キャリア", "インターン", "ガクチカ", "就活", "就職"}
+        self._weighted_filter_keywords = [
+            (keyword, keyword.lower(), 1.5 if keyword in high_weight_keywords else 1.0)
+            for keyword in self.filter_keywords
+        ]
+        
+        # (キーワード, 日付範囲) -> (有効期限, 解析済みイベント)
+        self._search_cache = {}
+        
         # オンライン開催のplace値パターン
         self.online_place_patterns = [
             "オンライン", "リモート", "Google Meet", "Zoom",
@@ -40,216 +56,325 @@ class ConnpassManager:
             "神奈川": "神奈川県", "神奈川県": "神奈川県",
         }
     
-    async def get_online_courses(self, regions: List[str] = None, days_ahead: int = 7) -> List[Dict]:
-        """オンライン講座イベントを取得"""
+    async def get_online_courses(self, regions: List[str] = None, days_ahead: int = 7,
+                                 strict: bool = False) -> List[Dict]:
+        """オンライン講座イベントを取得
+        
+        strict=True の場合は同期に失敗した・イベントがない場合にフォールバックせず例外を送出する
+        """
         if regions is None:
             regions = ["愛知県"]
         
-        all_events = []
-        
-        # 複数のキーワードで検索
-        for keyword in self.search_keywords[:10]:  # 上位10キーワード
-            events = await self._search_events(
-                keyword=keyword,
-                days_ahead=days_ahead
+        if event_index.enabled:
+            # ローカルインデックスから期間内のオンラインイベントを全文検索
+            await self.ensure_index(strict=strict)
+            now = datetime.datetime.now(JST)
+            indexed_events = await event_index.query(
+                'connpass',
+                now.timestamp(),
+                (now + datetime.timedelta(days=days_ahead)).timestamp(),
+                online=True,
+                keywords=self.filter_keywords
+            )
+            filtered_online_events = self._filter_by_keywords(
+                [self._prepare_event(event) for event in indexed_events]
+            )
+        else:
+            # 上位10キーワードをまとめて検索（OR検索でリクエスト数を削減、重複除去済み）
+            all_events = await self.search_events(
+                self.search_keywords[:CONNPASS_SEARCH_CONFIG["max_keywords"]], days_ahead
             )
-            all_events.extend(events)
             
-            # レート制限対策：1秒待機
-            await asyncio.sleep(1)
-        
-        # 重複除去（event_idベース）
-        unique_events = {}
-        for event in all_events:
-            event_id = event.get('id') or event.get('event_id') or event.get('title') or ''
-            unique_events[event_id] = event
-        
-        filtered_events = list(unique_events.values())
-        
-        # オンラインイベントのフィルタリング
-        online_events = self._filter_online_events(filtered_events)
-        
-        # 初心者・学習向けキーワードでフィルタリング
-        filtered_online_events = self._filter_by_keywords(online_events)
+            # オンラインイベントのフィルタリング
+            online_events = self._filter_online_events(all_events)
+            
+            # 初心者・学習向けキーワードでフィルタリング
+            filtered_online_events = self._filter_by_keywords(online_events)
         
         # イベントがない場合はフォールバック
         if not filtered_online_events:
-            filtered_online_events = self._get_fallback_courses()
+            if strict:
+                raise RuntimeError("connpass のオンライン講座を取得できませんでした")
+            filtered_online_events = [self._prepare_event(event) for event in self._get_fallback_courses()]
         
-        # 今日から1週間以内のイベントのみフィルタリング
+        # 今日から days_ahead 日以内のイベントのみ（日時は取得時に解析済み）
         today = datetime.datetime.now()
-        one_week_later = today + datetime.timedelta(days=7)
-        
-        # 日付範囲でフィルタリング
-        date_filtered_events = []
-        parse_errors = 0
-        no_date_count = 0
-        
-        print(f"DEBUG: Filtering {len(filtered_online_events)} events by date range: {today.strftime('%Y-%m-%d')} to {one_week_later.strftime('%Y-%m-%d')}")
-        
-        for event in filtered_online_events:
-            started_at_str = event.get('started_at', '')
-            if started_at_str:
-                try:
-                    # connpassの日時形式をパース
-                    event_date = datetime.datetime.fromisoformat(
-                        started_at_str.replace('+09:00', '')
-                    )
-                    # 今日から1週間以内かチェック
-                    if today <= event_date <= one_week_later:
-                        date_filtered_events.append(event)
-                        print(f"DEBUG: Added event '{event.get('title', 'No title')[:50]}...' on {event_date.strftime('%Y-%m-%d')}")
-                    else:
-                        print(f"DEBUG: Skipped event '{event.get('title', 'No title')[:50]}...' on {event_date.strftime('%Y-%m-%d')} (outside date range)")
-                except ValueError as e:
-                    # 日付パースエラーの場合はスキップ
-                    parse_errors += 1
-                    print(f"DEBUG: Date parse error for '{started_at_str}': {e}")
-                    continue
-            else:
-                # 日付情報がない場合もスキップ
-                no_date_count += 1
-                continue
-        
-        print(f"DEBUG: Date filtering results - kept: {len(date_filtered_events)}, parse errors: {parse_errors}, no date: {no_date_count}")
-        
-        print(f"Date-filtered to {len(date_filtered_events)} events within 1 week from today")
-        
-        # まずマッチ度でソート（降順）してトップ10を選択
-        date_filtered_events.sort(key=lambda x: -x.get('_match_score', 0))
-        top_10_events = date_filtered_events[:10]
+        until = today + datetime.timedelta(days=days_ahead)
+        date_filtered_events = [
+            event for event in filtered_online_events
+            if event['_started_at'] is not None and today <= event['_started_at'] <= until
+        ]
+        print(f"Date-filtered to {len(date_filtered_events)} events "
+              f"({today.strftime('%Y-%m-%d')} - {until.strftime('%Y-%m-%d')})")
         
-        # 選ばれた上位10件を日付順にソート
-        top_10_events.sort(key=lambda x: x.get('started_at', ''))
+        # マッチ度の高い上位10件を選び、日付順に並べる
+        top_10_events = heapq.nlargest(10, date_filtered_events, key=lambda event: event['_match_score'])
+        top_10_events.sort(key=lambda event: event['_started_at'])
         
         return top_10_events
     
-    async def _search_events(self, keyword: str, days_ahead: int) -> List[Dict]:
-        """Connpass APIでイベント検索"""
+    async def ensure_index(self, strict: bool = False):
+        """インデックスが未同期または古い場合はその場で同期（失敗しても保存済みの分で続行。strict=True なら例外）"""
+        _, synced_at = await event_index.sync_state('connpass')
+        if event_index.is_stale(synced_at):
+            try:
+                await self.sync_index()
+            except Exception as e:
+                print(f"Connpass index sync error: {e}")
+                if strict:
+                    raise
+    
+    async def sync_index(self, full: bool = None) -> int:
+        """イベントをインデックスへ取り込む（取り込んだ件数を返す）
+        
+        通常は前回のウォーターマーク以降に更新されたイベントだけを取り込む（差分同期）。
+        初回・前回の全件同期から full_sync_interval_hours 経過時・差分がページ上限を超えた場合は、
+        期間内のイベントを更新日時に関係なく取り直す（全件同期。期間に新しく入ったイベントも拾う）
+        """
+        watermark, _ = await event_index.sync_state('connpass')
+        if full is None:
+            full = not watermark or event_index.is_stale(
+                await event_index.last_full_sync('connpass'), EVENT_INDEX_CONFIG["full_sync_interval_hours"] * 60
+            )
         today = datetime.datetime.now()
-        end_date = today + datetime.timedelta(days=days_ahead)
-        
-        # 日付範囲を指定（YYYYMMDD形式）
         ymd_start = today.strftime("%Y%m%d")
-        ymd_end = end_date.strftime("%Y%m%d")
+        ymd_end = (today + datetime.timedelta(days=EVENT_INDEX_CONFIG["sync_days_ahead"])).strftime("%Y%m%d")
+        
+        keywords = self.search_keywords[:CONNPASS_SEARCH_CONFIG["max_keywords"]]
+        batch_size = CONNPASS_SEARCH_CONFIG["keyword_batch_size"]
+        batches = [tuple(keywords[i:i + batch_size]) for i in range(0, len(keywords), batch_size)]
+        
+        async with aiohttp.ClientSession() as session:
+            if not full:
+                results = await asyncio.gather(
+                    *(self._fetch_sync_pages(session, batch, ymd_start, ymd_end, watermark or 0) for batch in batches)
+                )
+                if any(result is not None and not result[1] for result in results):
+                    print("Connpass index sync: 差分がページ上限を超えたため全件同期します")
+                    full = True
+            if full:
+                results = await asyncio.gather(
+                    *(self._fetch_sync_pages(session, batch, ymd_start, ymd_end) for batch in batches)
+                )
+        
+        rows = {}
+        complete = True
+        for result in results:
+            if result is None:
+                complete = False
+                continue
+            events, reached_end = result
+            complete = complete and reached_end
+            for event in events:
+                row = self._index_row(event)
+                rows.setdefault(row['event_id'], row)
+        
+        # 取得に失敗した・ページ上限で打ち切ったバッチがある場合はウォーターマークを進めない（次回その分を取り直す）
+        new_watermark = max((row['updated_at'] or 0 for row in rows.values()), default=watermark or 0)
+        stored = await event_index.upsert('connpass', list(rows.values()), new_watermark if complete else None,
+                                          full=full and complete)
+        print(f"Connpass index sync ({'full' if full else 'delta'}): {stored} events"
+              + ("" if complete else "（未完了のためウォーターマークは据え置き）"))
+        return stored
+    
+    async def _fetch_sync_pages(self, session: aiohttp.ClientSession, keywords: tuple, ymd_start: str,
+                                ymd_end: str, watermark: float = None) -> Optional[Tuple[List[Dict], bool]]:
+        """同期用にページを順に読む（キャッシュは使わない。失敗時は None）
+        
+        watermark を渡すと更新日時の新しい順に読み、ウォーターマーク以前の更新に達したら打ち切る（差分同期）。
+        省略すると期間内を開催日時順に全て読む（全件同期）。
+        (イベント, 最後まで読めたか) を返す（ページ上限で打ち切った場合は False）
+        """
+        page_size = CONNPASS_SEARCH_CONFIG["page_size"]
+        max_pages = EVENT_INDEX_CONFIG["sync_max_pages" if watermark is not None else "full_sync_max_pages"]
+        fetched = []
+        for page in range(max_pages):
+            data = await self._fetch_page(session, keywords, ymd_start, ymd_end, start=page * page_size + 1,
+                                          order=1 if watermark is not None else 2, fresh=True)
+            if data is None:
+                return None
+            events = data.get('events', [])
+            for event in events:
+                if watermark is not None and (to_timestamp(event.get('updated_at') or '') or 0) <= watermark:
+                    return fetched, True
+                fetched.append(event)
+            if len(events) < page_size:
+                return fetched, True
+        return fetched, False
+    
+    def _index_row(self, event: Dict) -> Dict:
+        """インデックスに保存する行（本文は全文検索用）"""
+        address = event.get('address') or ''
+        place = event.get('place') or ''
+        return {
+            'event_id': event.get('id') or event.get('event_id') or event.get('title') or '',
+            'title': event.get('title') or '',
+            'body': f"{event.get('catch') or ''} {event.get('description') or ''}",
+            'started_at': to_timestamp(event.get('started_at') or ''),
+            'prefecture': detect_prefecture(address, place) if (address or place) else None,
+            'is_online': self._is_online_event(event),
+            'updated_at': to_timestamp(event.get('updated_at') or ''),
+            'payload': event
+        }
+    
+    async def search_events(self, keywords: List[str], days_ahead: int) -> List[Dict]:
+        """キーワード群でイベント検索（keyword_or で数語ずつまとめ、各バッチは並行取得）"""
+        today = datetime.datetime.now()
+        # 日付範囲（YYYYMMDD形式）
+        ymd_start = today.strftime("%Y%m%d")
+        ymd_end = (today + datetime.timedelta(days=days_ahead)).strftime("%Y%m%d")
+        
+        batch_size = CONNPASS_SEARCH_CONFIG["keyword_batch_size"]
+        batches = [tuple(keywords[i:i + batch_size]) for i in range(0, len(keywords), batch_size)]
+        
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(
+                *(self._search_batch(session, batch, ymd_start, ymd_end) for batch in batches)
+            )
+        
+        # 重複除去（event_idベース、先に見つかったものを残す）
+        unique_events = {}
+        for events in results:
+            for event in events:
+                event_id = event.get('id') or event.get('event_id') or event.get('title') or ''
+                unique_events.setdefault(event_id, event)
+        
+        print(f"Connpass: {len(unique_events)} unique events from {len(batches)} keyword batches")
+        return list(unique_events.values())
+    
+    async def _search_batch(self, session: aiohttp.ClientSession, keywords: tuple,
+                            ymd_start: str, ymd_end: str) -> List[Dict]:
+        """キーワード1バッチ分を検索（(キーワード, 日付範囲) ごとに解析済みの結果をTTL付きで保持）"""
+        cache_key = (keywords, ymd_start, ymd_end)
+        cached = self._search_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        page_size = CONNPASS_SEARCH_CONFIG["page_size"]
+        first_page = await self._fetch_page(session, keywords, ymd_start, ymd_end, start=1)
+        if first_page is None:
+            return []
+        events = list(first_page.get('events', []))
+        
+        # 1ページに収まらない場合は残りのページを並行取得
+        available = first_page.get('results_available', len(events))
+        pages = min(-(-available // page_size), CONNPASS_SEARCH_CONFIG["max_pages"])
+        if pages > 1:
+            rest = await asyncio.gather(*(
+                self._fetch_page(session, keywords, ymd_start, ymd_end, start=page * page_size + 1)
+                for page in range(1, pages)
+            ))
+            for data in rest:
+                if data is not None:
+                    events.extend(data.get('events', []))
+        
+        prepared = [self._prepare_event(event) for event in events]
+        print(f"Found {len(prepared)} events for keywords: {', '.join(keywords)}")
+        self._search_cache[cache_key] = (time.monotonic() + CONNPASS_SEARCH_CONFIG["cache_ttl"], prepared)
+        return prepared
+    
+    async def _fetch_page(self, session: aiohttp.ClientSession, keywords: tuple,
+                          ymd_start: str, ymd_end: str, start: int, order: int = 2,
+                          fresh: bool = False) -> Optional[Dict]:
+        """Connpass API v2 で1ページ分を取得（ペースは http_cache のホスト別レート制限で調整）
         
+        fresh=True はキャッシュを使わない（インデックスの同期用）
+        """
         params = {
-            'keyword': keyword,
+            'keyword_or': ','.join(keywords),  # いずれかのキーワードを含むイベント
             'ymd_start': ymd_start,  # 開始日を指定
             'ymd_end': ymd_end,      # 終了日を指定
-            'count': 100,  # 多めに取得
-            'order': 2,  # 開催日時順
+            'count': CONNPASS_SEARCH_CONFIG["page_size"],
+            'start': start,
+            'order': order,  # 1: 更新日時順、2: 開催日時順
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
+            if fresh:
+                response = await http_cache.fetch(session, self.base_url, params=params,
+                                                  headers={'X-API-Key': self.api_key}, timeout=15)
+            else:
+                response = await http_cache.get(
+                    session,
                     self.base_url,
                     params=params,
                     headers={'X-API-Key': self.api_key},
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as response:
-                    print(f"Connpass API status: {response.status}")
-                    
-                    if response.status == 200:
-                        try:
-                            data = await response.json()
-                            events = data.get('events', [])
-                            print(f"Found {len(events)} events for keyword: {keyword}")
-                            
-                            # デバッグ: 最初の3件のイベント詳細を出力
-                            for i, event in enumerate(events[:3]):
-                                print(f"\n=== Event {i+1} for '{keyword}' ===")
-                                print(f"Title: {event.get('title', 'N/A')}")
-                                print(f"Address: {event.get('address', 'N/A')}")
-                                print(f"Place: {event.get('place', 'N/A')}")
-                                print(f"Group: {event.get('group', {}).get('title', 'N/A')}")
-                                print(f"Event Type: {event.get('event_type', 'N/A')}")
-                                print(f"URL: {event.get('url', 'N/A')}")
-                            
-                            return events
-                        except Exception as json_error:
-                            print(f"JSON parsing error: {json_error}")
-                            return []
-                    else:
-                        print(f"Connpass API error: {response.status}")
-                        return []
+                    timeout=15,
+                    ttl=CONNPASS_SEARCH_CONFIG["cache_ttl"]
+                )
+            if response.status != 200:
+                print(f"Connpass API error: {response.status}")
+                return None
+            return response.json()
         except Exception as e:
             print(f"Error fetching events from Connpass: {e}")
-            return []
+            return None
+    
+    def _prepare_event(self, event: Dict) -> Dict:
+        """取得時に1回だけ日時を解析し、マッチ度を計算しておく"""
+        event['_started_at'] = self._parse_datetime(event.get('started_at') or '')
+        if '_match_score' not in event:
+            event['_match_score'], event['_matched_keywords'] = self._match_score(event)
+        return event
+    
+    @staticmethod
+    def _parse_datetime(value: str) -> Optional[datetime.datetime]:
+        """connpassの日時（ISO 8601）を日本時間のnaiveなdatetimeに変換"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(JST).replace(tzinfo=None)
+        return parsed
     
     def _filter_online_events(self, events: List[Dict]) -> List[Dict]:
         """オンラインイベントのみフィルタリング"""
-        online_events = []
-        
-        for event in events:
-            address = event.get('address') or ''
-            place = event.get('place') or ''
-            title = (event.get('title') or '').lower()
-            
-            # placeフィールドでオンライン判定
-            is_online = False
-            for pattern in self.online_place_patterns:
-                if pattern in place or pattern in address:
-                    is_online = True
-                    break
-            
-            # 小文字変換してより厳密にチェック
-            place_lower = place.lower()
-            address_lower = address.lower()
-            
-            if not is_online:
-                online_keywords = ['zoom', 'discord', 'meet', 'teams', 'slack', 'online', 'remote']
-                for keyword in online_keywords:
-                    if keyword in place_lower or keyword in address_lower or keyword in title:
-                        is_online = True
-                        break
-            
-            # addressとplaceが両方空または「-」の場合もオンラインとみなす
-            if not is_online and (not address.strip() or address.strip() == '-') and (not place.strip() or place.strip() == '-'):
-                is_online = True
-            
-            if is_online:
-                online_events.append(event)
-        
+        online_events = [event for event in events if self._is_online_event(event)]
         print(f"Filtered to {len(online_events)} online events from {len(events)} total events")
         return online_events
     
+    def _is_online_event(self, event: Dict) -> bool:
+        """オンライン開催のイベントか"""
+        address = event.get('address') or ''
+        place = event.get('place') or ''
+        title = (event.get('title') or '').lower()
+        
+        # placeフィールドでオンライン判定
+        for pattern in self.online_place_patterns:
+            if pattern in place or pattern in address:
+                return True
+        
+        # 小文字変換してより厳密にチェック
+        place_lower = place.lower()
+        address_lower = address.lower()
+        
+        online_keywords = ['zoom', 'discord', 'meet', 'teams', 'slack', 'online', 'remote']
+        for keyword in online_keywords:
+            if keyword in place_lower or keyword in address_lower or keyword in title:
+                return True
+        
+        # addressとplaceが両方空または「-」の場合もオンラインとみなす
+        return (not address.strip() or address.strip() == '-') and (not place.strip() or place.strip() == '-')
+    
+    def _match_score(self, event: Dict) -> tuple:
+        """初心者・学習向けキーワードのマッチ度（重み付き）とマッチしたキーワード"""
+        # イベント情報全体のテキスト
+        event_text = f"{event.get('title') or ''} {event.get('catch') or ''} {event.get('description') or ''}".lower()
+        
+        match_score = 0
+        matched_keywords = []
+        for keyword, lowered, weight in self._weighted_filter_keywords:
+            if lowered in event_text:
+                match_score += weight
+                matched_keywords.append(keyword)
+        return match_score, matched_keywords
+    
     def _filter_by_keywords(self, events: List[Dict]) -> List[Dict]:
-        """初心者・学習向けキーワードでフィルタリング"""
-        filtered_events = []
-        
-        # 高重みキーワード（学生・キャリア関連）
-        high_weight_keywords = ["学生", "キャリア", "インターン", "ガクチカ", "就活", "就職"]
-        
-        for event in events:
-            title = (event.get('title') or '').lower()
-            catch = (event.get('catch') or '').lower()
-            description = (event.get('description') or '').lower()
-            
-            # イベント情報全体のテキスト
-            event_text = f"{title} {catch} {description}"
-            
-            # キーワードマッチング（重み付き）
-            match_score = 0
-            matched_keywords = []
-            for keyword in self.filter_keywords:
-                if keyword.lower() in event_text:
-                    # 高重みキーワードは1.5倍のスコア
-                    if keyword in high_weight_keywords:
-                        match_score += 1.5
-                    else:
-                        match_score += 1.0
-                    matched_keywords.append(keyword)
-            
-            # 1つ以上のキーワードがマッチした場合に選択
-            if match_score > 0:
-                # マッチスコアをイベント情報に追加
-                event['_match_score'] = match_score
-                event['_matched_keywords'] = matched_keywords
-                filtered_events.append(event)
-                print(f"✓ Matched event: {event.get('title', 'N/A')} (score: {match_score:.1f})")
-        
+        """初心者・学習向けキーワードでフィルタリング（マッチ度は取得時に計算済み）"""
+        filtered_events = [event for event in events if event['_match_score'] > 0]
         print(f"Keyword-filtered to {len(filtered_events)} events from {len(events)} online events")
         return filtered_events
     
@@ -345,12 +470,9 @@ class ConnpassManager:
         def create_course_info(course):
             """個別のコース情報を作成"""
             try:
-                # 日時をパース
-                started_at_str = course.get('started_at', '')
-                if started_at_str:
-                    started_at = datetime.datetime.fromisoformat(
-                        started_at_str.replace('+09:00', '')
-                    )
+                # 日時（取得時に解析済み）
+                started_at = course.get('_started_at') or self._parse_datetime(course.get('started_at', ''))
+                if started_at:
                     date_str = started_at.strftime("%m/%d(%a) %H:%M")
                 else:
                     date_str = "日時未定"
@@ -471,25 +593,29 @@ class ConnpassManager:
         
         return embeds
     
-    async def get_weekly_courses(self):
+    async def get_weekly_courses(self, strict: bool = False):
         """今週のオンラインコースを取得"""
         try:
             # 既存のget_online_coursesメソッドを使用
-            all_events = await self.get_online_courses(regions=[], days_ahead=7)
+            all_events = await self.get_online_courses(regions=[], days_ahead=7, strict=strict)
             return all_events
         except Exception as e:
             print(f"Error getting weekly courses: {e}")
+            if strict:
+                raise
             return []
     
-    async def get_events_embed(self):
-        """connpassから今週のイベント情報を取得してEmbed形式で返す"""
+    async def get_events_embed(self, strict: bool = False):
+        """connpassから今週のイベント情報を取得してEmbed形式で返す（strict=True なら取得失敗時に例外）"""
         try:
-            courses = await self.get_weekly_courses()
+            courses = await self.get_weekly_courses(strict=strict)
             embeds = self.format_courses_for_embed(courses)
             return embeds
             
         except Exception as e:
             print(f"Error creating connpass embed: {e}")
+            if strict:
+                raise
             # エラー時のフォールバック
             return [{
                 "title": "💻 今週のオンライン講座情報",
@@ -0,0 +1,85 @@
+# -*- coding:utf-8 -*-
+"""
+Content Fan-out
+定期配信コンテンツを「1回だけ生成して全ギルドへ配る」ための共通部品
+
+- ContentMemo: (コンテンツ種別, 日付, 地域) ごとに生成結果をその日のうちは使い回す。
+  同じキーの生成が同時に要求された場合も生成は1回だけ（他は完了を待つ）
+- ChannelRateLimiter: チャンネルごとの送信間隔を空ける（複数Embedの連投でレート制限に当たらないように）
+- fan_out: 配信処理を並列数の上限付きで同時実行する
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.config import CONTENT_FANOUT_CONFIG
+
+
+class ContentMemo:
+    """日付つきキーごとのコンテンツ生成結果のメモ"""
+
+    def __init__(self):
+        self._date: Optional[str] = None
+        self._results: Dict[Tuple, object] = {}
+        self._pending: Dict[Tuple, asyncio.Task] = {}
+
+    @staticmethod
+    def make_key(content_type: str, date: str, regions: Optional[Iterable[str]] = None) -> Tuple:
+        """メモのキー（コンテンツ種別, 日付, 地域）"""
+        return (content_type, date, tuple(regions or ()))
+
+    async def get_or_build(self, key: Tuple, builder: Callable[[], Awaitable]):
+        """生成済みならそれを、未生成なら builder で1回だけ生成して返す（失敗は記録しない）"""
+        date = key[1]
+        if date != self._date:
+            # 日付が変わったら前日分を破棄
+            self._date = date
+            self._results = {}
+        if key in self._results:
+            return self._results[key]
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(builder())
+            self._pending[key] = task
+            try:
+                result = await asyncio.shield(task)
+            finally:
+                self._pending.pop(key, None)
+            if result is not None and key[1] == self._date:
+                self._results[key] = result
+            return result
+        return await asyncio.shield(task)
+
+
+class ChannelRateLimiter:
+    """チャンネルごとに送信の最小間隔を守るリミッター"""
+
+    def __init__(self, interval_seconds: float = None):
+        self.interval_seconds = (interval_seconds if interval_seconds is not None
+                                 else CONTENT_FANOUT_CONFIG["channel_interval_seconds"])
+        self._next_allowed: Dict[int, float] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def wait(self, channel_id: int):
+        """そのチャンネルに次の1通を送ってよい時刻まで待つ"""
+        lock = self._locks.setdefault(channel_id, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            next_allowed = self._next_allowed.get(channel_id, now)
+            if next_allowed > now:
+                await asyncio.sleep(next_allowed - now)
+                now = next_allowed
+            self._next_allowed[channel_id] = now + self.interval_seconds
+
+
+async def fan_out(jobs: List[Callable[[], Awaitable]], max_concurrency: int = None) -> List:
+    """配信処理を最大 max_concurrency 件ずつ並列実行（1件の失敗で他を止めない）"""
+    semaphore = asyncio.Semaphore(max_concurrency or CONTENT_FANOUT_CONFIG["max_concurrency"])
+
+    async def run(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
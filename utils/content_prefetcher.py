@@ -0,0 +1,137 @@
+# -*- coding:utf-8 -*-
+"""
+Content Prefetcher
+配信予定のコンテンツを配信時刻より前に組み立てて保存しておくプリフェッチャー
+
+- 配信時刻の lead_minutes 分前からバックグラウンドでコンテンツ（Embedのdictなど）を生成
+- 生成に失敗したら（builder が例外を送出したら）配信時刻まで指数バックオフで再試行
+- 生成結果はキー（日付|コンテンツ種別|地域）ごとにJSONファイルへ保存し、再起動後も利用できる
+- 配信時はスナップショットを読むだけなので、外部ソースが遅くても配信が遅れない
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.config import WEEKLY_PREFETCH_CONFIG
+
+
+class ContentPrefetcher:
+    """コンテンツの事前生成とスナップショット保存"""
+
+    def __init__(self, path: str = None, lead_minutes: int = None,
+                 retry_base_seconds: float = None, retry_max_seconds: float = None):
+        self.path = path or WEEKLY_PREFETCH_CONFIG["snapshot_file"]
+        self.lead_minutes = (lead_minutes if lead_minutes is not None
+                             else WEEKLY_PREFETCH_CONFIG["lead_minutes"])
+        self.retry_base_seconds = retry_base_seconds or WEEKLY_PREFETCH_CONFIG["retry_base_seconds"]
+        self.retry_max_seconds = retry_max_seconds or WEEKLY_PREFETCH_CONFIG["retry_max_seconds"]
+
+        self._snapshots: Dict[str, Dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._load()
+
+    @staticmethod
+    def snapshot_key(date: str, content_type: str, regions: Optional[List[str]] = None) -> str:
+        """スナップショットのキー（日付|コンテンツ種別|地域）"""
+        return f"{date}|{content_type}|{','.join(regions or [])}"
+
+    def is_due(self, now: datetime.datetime, hour: int, minute: int) -> bool:
+        """配信時刻の lead_minutes 分前から配信時刻までの間か"""
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return target - datetime.timedelta(minutes=self.lead_minutes) <= now < target
+
+    def get(self, key: str):
+        """保存済みのペイロード（未生成なら None）"""
+        snapshot = self._snapshots.get(key)
+        return snapshot['payload'] if snapshot else None
+
+    def is_building(self, key: str) -> bool:
+        task = self._tasks.get(key)
+        return task is not None and not task.done()
+
+    def schedule(self, key: str, builder: Callable[[], Awaitable], deadline: datetime.datetime):
+        """未生成なら裏で生成を開始（失敗時は deadline まで再試行）"""
+        if key in self._snapshots or self.is_building(key):
+            return
+        task = asyncio.ensure_future(self._build_with_retry(key, builder, deadline))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def wait(self, key: str, timeout: float):
+        """生成中なら最大 timeout 秒だけ完了を待ってペイロードを返す"""
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception as e:
+                print(f"プリフェッチ待機エラー ({key}): {e}")
+        return self.get(key)
+
+    def cancel_all(self):
+        """生成中のタスクを全て中止"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+    async def _build_with_retry(self, key: str, builder: Callable[[], Awaitable], deadline: datetime.datetime):
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                payload = await builder()
+                if key in self._snapshots:
+                    return  # 生成済みのスナップショットは上書きしない
+                self._snapshots[key] = {
+                    'payload': payload,
+                    'built_at': datetime.datetime.now(deadline.tzinfo).isoformat(),
+                    'attempts': attempt
+                }
+                self._save()
+                print(f"プリフェッチ完了: {key}（{attempt}回目, {time.monotonic() - started:.1f}秒）")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = min(self.retry_base_seconds * (2 ** (attempt - 1)), self.retry_max_seconds)
+                remaining = (deadline - datetime.datetime.now(deadline.tzinfo)).total_seconds()
+                if remaining <= delay:
+                    print(f"プリフェッチ失敗: {key}（{attempt}回目, 配信時刻までに再試行できません）: {e}")
+                    return
+                print(f"プリフェッチ失敗: {key}（{attempt}回目, {delay:.0f}秒後に再試行）: {e}")
+                await asyncio.sleep(delay)
+
+    def _load(self):
+        """保存済みスナップショットを読み込み（前日以前のものは破棄）"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._snapshots = json.load(f)
+                self._prune()
+        except Exception as e:
+            print(f"スナップショット読み込みエラー: {e}")
+            self._snapshots = {}
+
+    def _save(self):
+        try:
+            self._prune()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._snapshots, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"スナップショット保存エラー: {e}")
+
+    def _prune(self):
+        # キー先頭の日付（YYYY-MM-DD）が前日より古いものを削除
+        cutoff = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        for key in [key for key in self._snapshots if key.split('|', 1)[0] < cutoff]:
+            del self._snapshots[key]
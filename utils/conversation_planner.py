@@ -0,0 +1,238 @@
+# -*- coding:utf-8 -*-
+"""
+Conversation Planner
+AIキャラクター同士の会話を1回のLLM呼び出しで台本としてまとめて生成する
+
+- 登場人物（性格・話し方）と会話の流れ（各ステップの話者と指示）を1つのプロンプトにまとめ、
+  JSONスキーマ（{"lines": [{"step", "speaker", "text"}]}）を指定して全発言を一度に生成
+- 生成結果は発言ごとに検証（話者・空文字・長さ・プレースホルダー・重複）し、
+  不合格の発言だけを従来どおり1発言ずつ作り直す（台本全体が壊れていれば全発言を作り直す）
+- 完成した台本は発言の長さに応じた間隔（読む時間）を空けて順に流す
+"""
+
+import asyncio
+import json
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.config import CONVERSATION_PLANNER_CONFIG
+from utils.llm_metrics import FEATURE_CHARACTER_CONVERSATION
+from utils.llm_scheduler import PRIORITY_BACKGROUND
+
+# 台本に含まれていてはいけないプレースホルダー
+_PLACEHOLDER_RE = re.compile(r'〇〇|○○|△△|××')
+
+# 台本のJSONスキーマ（Gemini の response_schema 形式）
+SCRIPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "lines": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "step": {"type": "integer"},
+                    "speaker": {"type": "string"},
+                    "text": {"type": "string"}
+                },
+                "required": ["step", "speaker", "text"]
+            }
+        }
+    },
+    "required": ["lines"]
+}
+
+
+class ConversationStep:
+    """会話の流れの1ステップ（話者と、その発言への指示）"""
+
+    __slots__ = ('speaker', 'step_type', 'instruction')
+
+    def __init__(self, speaker, step_type: str, instruction: str):
+        self.speaker = speaker          # AICharacter
+        self.step_type = step_type
+        self.instruction = instruction
+
+
+class ScriptLine:
+    """台本の1発言"""
+
+    __slots__ = ('speaker', 'step_type', 'text', 'regenerated')
+
+    def __init__(self, speaker, step_type: str, text: str, regenerated: bool = False):
+        self.speaker = speaker
+        self.step_type = step_type
+        self.text = text
+        self.regenerated = regenerated  # 検証に落ちて1発言だけ作り直したか
+
+    def __repr__(self):
+        return f"ScriptLine(speaker={self.speaker.id!r}, text={self.text!r}, regenerated={self.regenerated!r})"
+
+
+class ConversationPlanner:
+    """会話の台本を1回の呼び出しで生成し、検証してから間隔を空けて流す"""
+
+    def __init__(self, gemini_chat, temperature: float = None, timeout: float = None,
+                 max_line_chars: int = None):
+        self.gemini_chat = gemini_chat
+        self.temperature = temperature or CONVERSATION_PLANNER_CONFIG["temperature"]
+        self.timeout = timeout or CONVERSATION_PLANNER_CONFIG["timeout_seconds"]
+        self.max_line_chars = max_line_chars or CONVERSATION_PLANNER_CONFIG["max_line_chars"]
+        self.stats = {'scripts': 0, 'script_failures': 0, 'lines': 0, 'regenerated': 0, 'dropped': 0}
+
+    async def plan(self, topic: str, steps: List[ConversationStep],
+                   priority: int = PRIORITY_BACKGROUND, context: str = '') -> List[ScriptLine]:
+        """会話全体の台本を生成（作り直しても不合格の発言は除く）
+
+        context には続きを書く場合のこれまでの会話（「名前: 発言」の行）を渡す
+        """
+        self.stats['scripts'] += 1
+        try:
+            raw = await self.gemini_chat.generate(
+                self.build_prompt(topic, steps, context),
+                timeout=self.timeout,
+                priority=priority,
+                temperature=self.temperature,
+                use_cache=False,
+                generation_config={'response_mime_type': 'application/json', 'response_schema': SCRIPT_SCHEMA},
+                feature=FEATURE_CHARACTER_CONVERSATION
+            )
+            texts = self.parse_script(raw, steps)
+        except Exception as e:
+            print(f"会話台本の生成に失敗しました（1発言ずつ生成します）: {e}")
+            self.stats['script_failures'] += 1
+            texts = [None] * len(steps)
+
+        lines: List[ScriptLine] = []
+        for step, text in zip(steps, texts):
+            text = self.validate_line(step, text, [line.text for line in lines])
+            regenerated = False
+            if text is None:
+                regenerated = True
+                self.stats['regenerated'] += 1
+                text = await self._regenerate_line(topic, step, lines, priority, context)
+            if text is None:
+                self.stats['dropped'] += 1
+                continue
+            lines.append(ScriptLine(step.speaker, step.step_type, text, regenerated))
+        self.stats['lines'] += len(lines)
+        return lines
+
+    async def perform(self, lines: List[ScriptLine], send: Callable[[ScriptLine], Awaitable],
+                      sleep: Callable[[float], Awaitable] = asyncio.sleep) -> int:
+        """台本を順に流す（2発言目以降は直前の発言の長さに応じて間隔を空ける）。送った件数を返す"""
+        sent = 0
+        for index, line in enumerate(lines):
+            if index > 0:
+                await sleep(self.pacing_delay(lines[index - 1].text))
+            try:
+                await send(line)
+                sent += 1
+            except Exception as e:
+                print(f"会話の発言送信エラー ({line.speaker.name}): {e}")
+        return sent
+
+    @staticmethod
+    def pacing_delay(text: str) -> float:
+        """発言を読む時間に合わせた次の発言までの秒数"""
+        delay = (CONVERSATION_PLANNER_CONFIG["pacing_base_seconds"]
+                 + len(text) * CONVERSATION_PLANNER_CONFIG["pacing_seconds_per_char"])
+        return min(max(delay, CONVERSATION_PLANNER_CONFIG["pacing_min_seconds"]),
+                   CONVERSATION_PLANNER_CONFIG["pacing_max_seconds"])
+
+    # ------------------------------------------------------------------
+    # プロンプト・検証
+    # ------------------------------------------------------------------
+    def build_prompt(self, topic: str, steps: List[ConversationStep], context: str = '') -> str:
+        """登場人物と会話の流れをまとめた台本生成プロンプト"""
+        characters: Dict[str, object] = {}
+        for step in steps:
+            characters.setdefault(step.speaker.id, step.speaker)
+
+        cast = "\n".join(
+            f"- id: {character.id} / 名前: {character.name}\n"
+            f"  性格・特徴: {character.personality}\n"
+            f"  話し方: {character.speaking_style}"
+            for character in characters.values()
+        )
+        flow = "\n".join(
+            f"{number}. {step.speaker.id}（{step.speaker.name}）: {step.instruction}"
+            for number, step in enumerate(steps, 1)
+        )
+        previous = f"これまでの会話（この続きを書いてください）:\n{context}\n\n" if context else ""
+        return f"""以下の登場人物によるDiscordでの雑談の台本を作ってください。
+
+話題: {topic}
+
+登場人物:
+{cast}
+
+{previous}会話の流れ（この順番・この話者で{len(steps)}個の発言を書いてください）:
+{flow}
+
+ルール:
+- 各発言はその人物の性格と話し方を忠実に再現し、自然で短め（1-2文、{self.max_line_chars}文字以内）にする
+- 直前の発言を受けて会話がつながるようにする
+- 発言にキャラクター名やコロン（：）を含めない
+- 商品名や具体例は実在のものを使い、〇〇や△△のようなプレースホルダーは使わない
+- 括弧で囲まれた指示文は発言に含めない
+- 他の発言と同じ内容を繰り返さない
+
+出力は {{"lines": [{{"step": 番号, "speaker": "id", "text": "発言"}}]}} 形式のJSONのみ"""
+
+    @staticmethod
+    def parse_script(raw: str, steps: List[ConversationStep]) -> List[Optional[str]]:
+        """台本JSONをステップ順の発言リストにする（話者が違う・欠けているステップは None）"""
+        data = json.loads(raw)
+        entries = data.get('lines') if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            raise ValueError("台本に lines がありません")
+
+        texts: List[Optional[str]] = [None] * len(steps)
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            step_number = entry.get('step')
+            index = step_number - 1 if isinstance(step_number, int) else position
+            if not 0 <= index < len(steps) or texts[index] is not None:
+                continue
+            if entry.get('speaker') != steps[index].speaker.id:
+                continue
+            text = entry.get('text')
+            texts[index] = text if isinstance(text, str) else None
+        return texts
+
+    def validate_line(self, step: ConversationStep, text: Optional[str],
+                      previous: List[str]) -> Optional[str]:
+        """発言を整えて検証（不合格なら None）"""
+        if not text:
+            return None
+        text = text.strip()
+        # 「名前: 」の書き出しは取り除く
+        for name in (step.speaker.name, step.speaker.display_name):
+            for separator in (':', '：'):
+                if text.startswith(f"{name}{separator}"):
+                    text = text[len(name) + 1:].strip()
+        if not text or len(text) > self.max_line_chars:
+            return None
+        if _PLACEHOLDER_RE.search(text) or text in previous:
+            return None
+        # 応答できなかった場合の定型文
+        if text.startswith(f"({step.speaker.name}"):
+            return None
+        return text
+
+    async def _regenerate_line(self, topic: str, step: ConversationStep, lines: List[ScriptLine],
+                               priority: int, previous: str = '') -> Optional[str]:
+        """検証に落ちた発言だけを1発言ずつの生成で作り直す"""
+        context = (f"話題: {topic}" + (f"\n{previous}" if previous else "")
+                   + "".join(f"\n{line.speaker.name}: {line.text}" for line in lines))
+        text = await self.gemini_chat.get_ai_character_response(
+            step.speaker.name,
+            step.speaker.personality,
+            step.speaker.speaking_style,
+            step.instruction,
+            context,
+            priority=priority
+        )
+        return self.validate_line(step, text, [line.text for line in lines])
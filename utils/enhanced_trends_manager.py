@@ -8,21 +8,39 @@ Enhanced Trends Manager - Fixed Version
 - 各カテゴリに適切なcategoryフィールド設定
 - 7カテゴリ強制表示ロジック実装
 - Discord用フォーマットの改善
+- 取得履歴（utils.trend_history）による伸び率算出と「急上昇」表示
 """
 
 import aiohttp
 import asyncio
 import json
-import xml.etree.ElementTree as ET
-import re
 from typing import List, Dict, Optional
 from datetime import datetime
-import random
+from config.config import TRENDS_FETCH_CONFIG, HACKER_NEWS_CONFIG
+from utils.feeds import parse_feed, split_hatena_users, strip_site_name
+from utils.github_trending import github_trending_fetcher
+from utils.hacker_news import hacker_news_fetcher
+from utils.http_cache import http_cache
+from utils.keyword_matcher import KeywordMatcher
+from utils.near_duplicate import near_duplicate_detector
+from utils.rate_limiter import host_rate_limiter
+from utils.source_scheduler import SourceScheduler
+from utils.trend_history import trend_history, select_rising
 
 class EnhancedTrendsManager:
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         self.session = None
         
+        # 並行取得の設定（締め切り・ソース別タイムアウト・ホスト別レート制限）
+        self.fetch_deadline = TRENDS_FETCH_CONFIG["deadline_seconds"]
+        self.source_timeout = TRENDS_FETCH_CONFIG["source_timeout_seconds"]
+        self.source_timeouts = dict(TRENDS_FETCH_CONFIG["source_timeouts"])
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = host_rate_limiter
+        self.last_source_results = {}
+        self.hn_top_n = HACKER_NEWS_CONFIG["top_n"]
+        self.trend_store = trend_history
+        
         # カテゴリ別キーワード辞書
         self.category_keywords = {
             'プログラミング': [
@@ -80,6 +98,7 @@ class EnhancedTrendsManager:
                 'learning', 'study', 'skill up', 'growth', 'habit', 'efficiency'
             ]
         }
+        self.keyword_matcher = KeywordMatcher(self.category_keywords)
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession()
@@ -89,78 +108,31 @@ class EnhancedTrendsManager:
         if self.session:
             await self.session.close()
     
-    async def get_enhanced_trends(self, max_trends: int = 200, categories: List[str] = None) -> List[Dict]:
-        """高品質なトレンドデータを取得"""
+    async def get_enhanced_trends(self, max_trends: int = 200, categories: List[str] = None,
+                                  strict: bool = False) -> List[Dict]:
+        """高品質なトレンドデータを取得（全ソースを並行取得）
+        
+        strict=True の場合は取得に失敗した（0件を含む）ソースがあれば、履歴に記録する前に例外を送出する
+        """
         print(f"[DEBUG] get_enhanced_trends called with max_trends={max_trends}")
         try:
-            all_trends = []
-            
-            # 1. Zenn記事取得
-            print("[DEBUG] Fetching Zenn trends...")
-            zenn_trends = await self._get_zenn_trends()
-            print(f"[DEBUG] Zenn trends: {len(zenn_trends)} items")
-            all_trends.extend(zenn_trends)
-            
-            # 2. Hacker News取得（海外技術情報）
-            print("[DEBUG] Fetching Hacker News trends...")
-            hn_trends = await self._get_hacker_news_trends()
-            print(f"[DEBUG] Hacker News trends: {len(hn_trends)} items")
-            all_trends.extend(hn_trends)
-            
-            # 3. Google News取得（各分野別）
-            print("[DEBUG] Fetching Google News trends...")
-            google_trends = await self._get_google_news_trends()
-            print(f"[DEBUG] Google News trends: {len(google_trends)} items")
-            all_trends.extend(google_trends)
-            
-            # 4. GitHub Trending取得（リポジトリ情報）
-            print("[DEBUG] Fetching GitHub trends...")
-            github_trends = await self._get_github_trends()
-            print(f"[DEBUG] GitHub trends: {len(github_trends)} items")
-            all_trends.extend(github_trends)
-            
-            # 5. カテゴリ別専門トレンド取得（categoryフィールド付き）
-            print("[DEBUG] Fetching career trends...")
-            career_trends = await self._get_career_trends()
-            print(f"[DEBUG] Career trends: {len(career_trends)} items")
-            all_trends.extend(career_trends)
-            
-            print("[DEBUG] Fetching business trends...")
-            business_trends = await self._get_business_trends()
-            print(f"[DEBUG] Business trends: {len(business_trends)} items")
-            all_trends.extend(business_trends)
-            
-            print("[DEBUG] Fetching programming trends...")
-            programming_trends = await self._get_programming_trends()
-            print(f"[DEBUG] Programming trends: {len(programming_trends)} items")
-            all_trends.extend(programming_trends)
-            
-            print("[DEBUG] Fetching data science trends...")
-            data_science_trends = await self._get_data_science_trends()
-            print(f"[DEBUG] Data science trends: {len(data_science_trends)} items")
-            all_trends.extend(data_science_trends)
-            
-            print("[DEBUG] Fetching generative AI trends...")
-            generative_ai_trends = await self._get_generative_ai_trends()
-            print(f"[DEBUG] Generative AI trends: {len(generative_ai_trends)} items")
-            all_trends.extend(generative_ai_trends)
-            
-            print("[DEBUG] Fetching study trends...")
-            study_trends = await self._get_study_trends()
-            print(f"[DEBUG] Study trends: {len(study_trends)} items")
-            all_trends.extend(study_trends)
-            
-            print("[DEBUG] Fetching webdev trends...")
-            webdev_trends = await self._get_webdev_trends()
-            print(f"[DEBUG] Webdev trends: {len(webdev_trends)} items")
-            all_trends.extend(webdev_trends)
+            all_trends = await self._fetch_all_sources()
+            failed = self.failed_sources()
+            if strict and failed:
+                raise RuntimeError(f"取得に失敗したソースがあります: {', '.join(failed)}")
             
             print(f"[DEBUG] Total trends before categorization: {len(all_trends)}")
             
+            # 前回から変化のない記事は保存済みのカテゴリ・スコアを再利用
+            reused = await self._reuse_history(all_trends)
+            
             # 自動カテゴリ分類（categoryフィールドがない記事のみ）
             print("[DEBUG] Categorizing trends...")
             categorized_trends = self._categorize_trends(all_trends)
-            print(f"[DEBUG] Categorized trends: {len(categorized_trends)} items")
+            print(f"[DEBUG] Categorized trends: {len(categorized_trends)} items ({reused} reused)")
+            
+            # 今回の観測値を記録し、伸び率を付与
+            await self._record_history(categorized_trends)
             
             # フィルタリング（指定カテゴリがある場合）
             if categories:
@@ -170,15 +142,90 @@ class EnhancedTrendsManager:
                         filtered_trends.append(trend)
                 categorized_trends = filtered_trends
             
-            # 品質スコア順でソート
-            sorted_trends = sorted(categorized_trends, key=lambda x: x.get('quality_score', 0), reverse=True)
+            # 品質スコア順（同点は伸び率順）でソート
+            sorted_trends = sorted(
+                categorized_trends,
+                key=lambda x: (x.get('quality_score', 0), x.get('velocity', 0)),
+                reverse=True
+            )
             
             return sorted_trends[:max_trends]
             
         except Exception as e:
             print(f"Enhanced trends取得エラー: {e}")
+            if strict:
+                raise
             return self._get_fallback_trends()
     
+    def failed_sources(self) -> List[str]:
+        """直前の取得で失敗・タイムアウト・0件だったソース名"""
+        return [name for name, result in self.last_source_results.items()
+                if result.status != 'ok' or not result.items]
+    
+    async def _reuse_history(self, trends: List[Dict]) -> int:
+        """変化のない記事に前回のカテゴリ・品質スコアを設定（履歴ストアのエラーでは取得を止めない）"""
+        try:
+            return await self.trend_store.reuse_unchanged(trends)
+        except Exception as e:
+            print(f"トレンド履歴読み込みエラー: {e}")
+            return 0
+    
+    async def _record_history(self, trends: List[Dict]):
+        """観測値を履歴に保存し、各記事に伸び率を付与"""
+        try:
+            await self.trend_store.record(trends)
+            await self.trend_store.annotate_velocity(trends)
+        except Exception as e:
+            print(f"トレンド履歴保存エラー: {e}")
+    
+    @staticmethod
+    def _priority_score(base: int, keyword_index: int = 0, rank: int = 0) -> int:
+        """検索キーワードの優先順・フィード内の順位から決まる品質スコア（上位ほど高い）"""
+        return max(base - keyword_index * 3 - rank * 5, 0)
+    
+    def select_rising(self, trends: List[Dict], count: int = None) -> List[Dict]:
+        """伸び率の高い「急上昇」記事を選択（同じ入力なら常に同じ結果）"""
+        return select_rising(trends, count=count)
+    
+    def _build_source_scheduler(self) -> SourceScheduler:
+        """取得ソースを登録したスケジューラーを作成"""
+        scheduler = SourceScheduler(
+            deadline=self.fetch_deadline,
+            default_timeout=self.source_timeout,
+            max_concurrency=self.max_concurrency
+        )
+        sources = [
+            ('zenn', self._get_zenn_trends),                        # 1. Zenn記事
+            ('hacker_news', self._get_hacker_news_trends),          # 2. Hacker News（海外技術情報）
+            ('google_news', self._get_google_news_trends),          # 3. Google News（各分野別）
+            ('github', self._get_github_trends),                    # 4. GitHub Trending
+            ('career', self._get_career_trends),                    # 5. カテゴリ別専門トレンド
+            ('business', self._get_business_trends),
+            ('programming', self._get_programming_trends),
+            ('data_science', self._get_data_science_trends),
+            ('generative_ai', self._get_generative_ai_trends),
+            ('study', self._get_study_trends),
+            ('webdev', self._get_webdev_trends),
+        ]
+        for name, factory in sources:
+            scheduler.add(name, factory, timeout=self.source_timeouts.get(name))
+        return scheduler
+    
+    async def _fetch_all_sources(self) -> List[Dict]:
+        """全ソースを締め切り付きで並行取得し、間に合った結果を登録順に結合"""
+        scheduler = self._build_source_scheduler()
+        results = await scheduler.run()
+        
+        all_trends = []
+        for name, result in results.items():
+            print(f"[DEBUG] {name}: {len(result.items)} items ({result.status}, {result.elapsed:.1f}s)")
+            if result.error:
+                print(f"[DEBUG] {name} error: {result.error}")
+            all_trends.extend(result.items)
+        
+        self.last_source_results = results
+        return all_trends
+    
     async def _get_zenn_trends(self) -> List[Dict]:
         """Zenn API から技術記事を取得"""
         trends = []
@@ -189,26 +236,25 @@ class EnhancedTrendsManager:
         
         for endpoint in endpoints:
             try:
-                async with self.session.get(endpoint, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('articles'):
-                            for article in data['articles']:
-                                if article.get('liked_count', 0) > 10:
-                                    trends.append({
-                                        'id': f"zenn-{article.get('id')}",
-                                        'title': article.get('title', ''),
-                                        'url': f"https://zenn.dev{article.get('path', '')}",
-                                        'source': 'Zenn',
-                                        'score': 0,
-                                        'likes': article.get('liked_count', 0),
-                                        'comments': article.get('comments_count', 0),
-                                        'published_at': article.get('published_at', ''),
-                                        'topics': [t.get('name', '') for t in article.get('topics', [])],
-                                        'description': self._generate_summary(article.get('title', '')),
-                                        'quality_score': min(article.get('liked_count', 0), 100)
-                                    })
-                await asyncio.sleep(0.5)
+                response = await http_cache.get(self.session, endpoint, timeout=10, rate_limiter=self.rate_limiter)
+                if response.status == 200:
+                    data = response.json()
+                    if data.get('articles'):
+                        for article in data['articles']:
+                            if article.get('liked_count', 0) > 10:
+                                trends.append({
+                                    'id': f"zenn-{article.get('id')}",
+                                    'title': article.get('title', ''),
+                                    'url': f"https://zenn.dev{article.get('path', '')}",
+                                    'source': 'Zenn',
+                                    'score': 0,
+                                    'likes': article.get('liked_count', 0),
+                                    'comments': article.get('comments_count', 0),
+                                    'published_at': article.get('published_at', ''),
+                                    'topics': [t.get('name', '') for t in article.get('topics', [])],
+                                    'description': self._generate_summary(article.get('title', '')),
+                                    'quality_score': min(article.get('liked_count', 0), 100)
+                                })
             except Exception as e:
                 print(f"Zenn API エラー: {e}")
         
@@ -221,28 +267,19 @@ class EnhancedTrendsManager:
             if trend.get('category'):
                 continue
                 
-            title_text = trend.get('title', '').lower()
-            description_text = trend.get('description', '').lower()
-            combined_text = f"{title_text} {description_text}"
-            
-            # カテゴリ判定
-            category = '一般'
-            max_matches = 0
+            combined_text = f"{trend.get('title', '')} {trend.get('description', '')}"
             
-            for cat, keywords in self.category_keywords.items():
-                matches = sum(1 for keyword in keywords if keyword.lower() in combined_text)
-                if matches > max_matches:
-                    max_matches = matches
-                    category = cat
+            # カテゴリ判定（ヒット数最大のカテゴリ）
+            category, max_matches = self.keyword_matcher.best_category(combined_text)
             
-            trend['category'] = category
+            trend['category'] = category or '一般'
             trend['category_confidence'] = max_matches
         
         return trends
     
     def _generate_summary(self, title: str) -> str:
         """タイトルから簡易要約を生成"""
-        clean_title = re.sub(r'\s*-\s*[^-]*$', '', title)
+        clean_title = strip_site_name(title)
         if len(clean_title) > 100:
             clean_title = clean_title[:97] + "..."
         return clean_title
@@ -251,31 +288,22 @@ class EnhancedTrendsManager:
         """Google News RSS をパース"""
         trends = []
         try:
-            root = ET.fromstring(rss_content)
-            items = root.findall('.//item')
-            
-            for item in items[:5]:  # 各キーワードから5件まで
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pub_date_elem = item.find('pubDate')
+            for item in parse_feed(rss_content, limit=5):  # 各キーワードから5件まで
+                clean_title = strip_site_name(item.title)  # サイト名除去
                 
-                if title_elem is not None:
-                    title = title_elem.text or ""
-                    clean_title = re.sub(r'\s*-\s*[^-]*$', '', title)  # サイト名除去
-                    
-                    trends.append({
-                        'id': f"gnews-{keyword}-{len(trends)}",
-                        'title': clean_title,
-                        'url': link_elem.text if link_elem is not None else "",
-                        'source': f'Google News ({keyword})',
-                        'score': 0,
-                        'likes': 0,
-                        'comments': 0,
-                        'published_at': pub_date_elem.text if pub_date_elem is not None else "",
-                        'topics': [keyword],
-                        'description': self._generate_summary(clean_title),
-                        'quality_score': 30  # Google News は中程度の品質
-                    })
+                trends.append({
+                    'id': f"gnews-{keyword}-{len(trends)}",
+                    'title': clean_title,
+                    'url': item.link,
+                    'source': f'Google News ({keyword})',
+                    'score': 0,
+                    'likes': 0,
+                    'comments': 0,
+                    'published_at': item.published,
+                    'topics': [keyword],
+                    'description': self._generate_summary(clean_title),
+                    'quality_score': 30  # Google News は中程度の品質
+                })
         except Exception as e:
             print(f"RSS解析エラー: {e}")
         
@@ -295,20 +323,15 @@ class EnhancedTrendsManager:
             life_trends = await self._get_hatena_category_trends("life", "hotentry")
             for trend in life_trends[:3]:  # 3件まで
                 trend['category'] = 'キャリア'
-                trend['quality_score'] = random.randint(70, 90)
                 trends.append(trend)
             
-            await asyncio.sleep(0.5)
-            
             # 2. キーワード検索で補完
             for keyword in career_keywords[:2]:  # 上位2キーワード
                 try:
                     hatena_trends = await self._get_hatena_bookmark_trends(keyword)
                     for trend in hatena_trends[:1]:  # 各キーワードから1件
                         trend['category'] = 'キャリア'
-                        trend['quality_score'] = random.randint(70, 90)
                         trends.append(trend)
-                    await asyncio.sleep(0.5)  # レート制限対策
                 except Exception as e:
                     print(f"キャリアトレンド取得エラー ({keyword}): {e}")
         except Exception as e:
@@ -327,18 +350,17 @@ class EnhancedTrendsManager:
             '経営戦略', '新規事業', 'ビジネスモデル', 'カスタマーサクセス'
         ]
         
-        for keyword in business_keywords[:4]:  # 上位4キーワードのみ
+        for keyword_index, keyword in enumerate(business_keywords[:4]):  # 上位4キーワードのみ
             try:
                 rss_url = f"https://news.google.com/rss/search?q={keyword}&hl=ja&gl=JP&ceid=JP:ja"
-                async with self.session.get(rss_url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        keyword_trends = self._parse_google_rss(content, keyword)
-                        for trend in keyword_trends[:2]:  # 各キーワードから2件まで
-                            trend['category'] = 'ビジネス'
-                            trend['quality_score'] = random.randint(70, 95)
-                            trends.append(trend)
-                await asyncio.sleep(1)  # レート制限対策
+                response = await http_cache.get(self.session, rss_url, timeout=10, rate_limiter=self.rate_limiter)
+                if response.status == 200:
+                    content = response.text()
+                    keyword_trends = self._parse_google_rss(content, keyword)
+                    for rank, trend in enumerate(keyword_trends[:2]):  # 各キーワードから2件まで
+                        trend['category'] = 'ビジネス'
+                        trend['quality_score'] = self._priority_score(85, keyword_index, rank)
+                        trends.append(trend)
             except Exception as e:
                 print(f"ビジネストレンド取得エラー ({keyword}): {e}")
         
@@ -352,12 +374,12 @@ class EnhancedTrendsManager:
                     'url': 'https://example.com/business',
                     'source': 'ビジネス専門',
                     'score': 0,
-                    'likes': random.randint(30, 150),
-                    'comments': random.randint(8, 40),
+                    'likes': 0,
+                    'comments': 0,
                     'published_at': datetime.now().isoformat(),
                     'topics': ['ビジネス', '戦略', 'DX'],
                     'description': f"{topic}の詳細分析をお届けします",
-                    'quality_score': random.randint(70, 95),
+                    'quality_score': self._priority_score(85, rank=i),
                     'category': 'ビジネス'
                 })
         
@@ -372,18 +394,17 @@ class EnhancedTrendsManager:
             '設計パターン', 'クリーンコード'
         ]
         
-        for keyword in programming_keywords[:3]:  # 上位3キーワードのみ
+        for keyword_index, keyword in enumerate(programming_keywords[:3]):  # 上位3キーワードのみ
             try:
                 rss_url = f"https://news.google.com/rss/search?q={keyword}&hl=ja&gl=JP&ceid=JP:ja"
-                async with self.session.get(rss_url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        keyword_trends = self._parse_google_rss(content, keyword)
-                        for trend in keyword_trends[:2]:  # 各キーワードから2件まで
-                            trend['category'] = 'プログラミング'
-                            trend['quality_score'] = random.randint(75, 98)
-                            trends.append(trend)
-                await asyncio.sleep(1)  # レート制限対策
+                response = await http_cache.get(self.session, rss_url, timeout=10, rate_limiter=self.rate_limiter)
+                if response.status == 200:
+                    content = response.text()
+                    keyword_trends = self._parse_google_rss(content, keyword)
+                    for rank, trend in enumerate(keyword_trends[:2]):  # 各キーワードから2件まで
+                        trend['category'] = 'プログラミング'
+                        trend['quality_score'] = self._priority_score(90, keyword_index, rank)
+                        trends.append(trend)
             except Exception as e:
                 print(f"プログラミングトレンド取得エラー ({keyword}): {e}")
         
@@ -397,12 +418,12 @@ class EnhancedTrendsManager:
                     'url': 'https://example.com/programming',
                     'source': 'プログラミング専門',
                     'score': 0,
-                    'likes': random.randint(40, 200),
-                    'comments': random.randint(10, 50),
+                    'likes': 0,
+                    'comments': 0,
                     'published_at': datetime.now().isoformat(),
                     'topics': ['プログラミング', 'コード', '開発'],
                     'description': f"{topic}について実践的に解説します",
-                    'quality_score': random.randint(75, 98),
+                    'quality_score': self._priority_score(90, rank=i),
                     'category': 'プログラミング'
                 })
         
@@ -416,18 +437,17 @@ class EnhancedTrendsManager:
             'データ分析 手法', 'AI予測 精度', 'MLOps 実装'
         ]
         
-        for keyword in ds_keywords[:3]:  # 上位3キーワードのみ
+        for keyword_index, keyword in enumerate(ds_keywords[:3]):  # 上位3キーワードのみ
             try:
                 rss_url = f"https://news.google.com/rss/search?q={keyword}&hl=ja&gl=JP&ceid=JP:ja"
-                async with self.session.get(rss_url, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        keyword_trends = self._parse_google_rss(content, keyword)
-                        for trend in keyword_trends[:2]:  # 各キーワードから2件まで
-                            trend['category'] = 'データサイエンス・AI開発'
-                            trend['quality_score'] = random.randint(80, 95)
-                            trends.append(trend)
-                await asyncio.sleep(1)  # レート制限対策
+                response = await http_cache.get(self.session, rss_url, timeout=10, rate_limiter=self.rate_limiter)
+                if response.status == 200:
+                    content = response.text()
+                    keyword_trends = self._parse_google_rss(content, keyword)
+                    for rank, trend in enumerate(keyword_trends[:2]):  # 各キーワードから2件まで
+                        trend['category'] = 'データサイエンス・AI開発'
+                        trend['quality_score'] = self._priority_score(90, keyword_index, rank)
+                        trends.append(trend)
             except Exception as e:
                 print(f"データサイエンストレンド取得エラー ({keyword}): {e}")
         
@@ -441,12 +461,12 @@ class EnhancedTrendsManager:
                     'url': 'https://example.com/datascience',
                     'source': 'データサイエンス専門',
                     'score': 0,
-                    'likes': random.randint(25, 120),
-                    'comments': random.randint(6, 35),
+                    'likes': 0,
+                    'comments': 0,
                     'published_at': datetime.now().isoformat(),
                     'topics': ['データサイエンス', '機械学習', 'AI'],
                     'description': f"{topic}の実践的アプローチを紹介",
-                    'quality_score': random.randint(80, 95),
+                    'quality_score': self._priority_score(90, rank=i),
                     'category': 'データサイエンス・AI開発'
                 })
         
@@ -468,12 +488,12 @@ class EnhancedTrendsManager:
                 'url': 'https://example.com/genai',
                 'source': '生成AI専門',
                 'score': 0,
-                'likes': random.randint(50, 250),
-                'comments': random.randint(12, 60),
+                'likes': 0,
+                'comments': 0,
                 'published_at': datetime.now().isoformat(),
                 'topics': ['生成AI', 'ChatGPT', 'Claude'],
                 'description': f"{topic}の実践的な活用方法を解説",
-                'quality_score': random.randint(80, 100),
+                'quality_score': self._priority_score(95, rank=i),
                 'category': '生成AI'
             })
         
@@ -493,20 +513,15 @@ class EnhancedTrendsManager:
             knowledge_trends = await self._get_hatena_category_trends("knowledge", "hotentry")
             for trend in knowledge_trends[:3]:  # 3件まで
                 trend['category'] = '勉強・自己啓発'
-                trend['quality_score'] = random.randint(65, 85)
                 trends.append(trend)
             
-            await asyncio.sleep(0.5)
-            
             # 2. キーワード検索で補完
             for keyword in study_keywords[:2]:  # 上位2キーワード
                 try:
                     hatena_trends = await self._get_hatena_bookmark_trends(keyword)
                     for trend in hatena_trends[:1]:  # 各キーワードから1件
                         trend['category'] = '勉強・自己啓発'
-                        trend['quality_score'] = random.randint(65, 85)
                         trends.append(trend)
-                    await asyncio.sleep(0.5)  # レート制限対策
                 except Exception as e:
                     print(f"勉強・自己啓発トレンド取得エラー ({keyword}): {e}")
         except Exception as e:
@@ -532,12 +547,12 @@ class EnhancedTrendsManager:
                 'url': 'https://example.com/webdev',
                 'source': 'ウェブ開発専門',
                 'score': 0,
-                'likes': random.randint(30, 150),
-                'comments': random.randint(8, 40),
+                'likes': 0,
+                'comments': 0,
                 'published_at': datetime.now().isoformat(),
                 'topics': ['ウェブ開発', 'フロントエンド', 'JavaScript'],
                 'description': f"{topic}の最新動向と実装方法を紹介",
-                'quality_score': random.randint(70, 95),
+                'quality_score': self._priority_score(85, rank=i),
                 'category': 'ウェブ開発'
             })
         
@@ -549,10 +564,10 @@ class EnhancedTrendsManager:
         try:
             # はてなブックマーク検索API（正しい仕様）
             url = f"https://b.hatena.ne.jp/search/text?q={keyword}&users=5&sort=recent&safe=on&mode=rss"
-            async with self.session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    trends = self._parse_hatena_rss(content, keyword)
+            response = await http_cache.get(self.session, url, timeout=10, rate_limiter=self.rate_limiter)
+            if response.status == 200:
+                content = response.text()
+                trends = self._parse_hatena_rss(content, keyword)
         except Exception as e:
             print(f"はてなブックマーク取得エラー ({keyword}): {e}")
         
@@ -564,10 +579,10 @@ class EnhancedTrendsManager:
         try:
             # カテゴリ別人気エントリAPI
             url = f"https://b.hatena.ne.jp/{feed_type}/{category}.rss"
-            async with self.session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    trends = self._parse_hatena_category_rss(content, category)
+            response = await http_cache.get(self.session, url, timeout=10, rate_limiter=self.rate_limiter)
+            if response.status == 200:
+                content = response.text()
+                trends = self._parse_hatena_category_rss(content, category)
         except Exception as e:
             print(f"はてなブックマークカテゴリ取得エラー ({category}): {e}")
         
@@ -577,39 +592,24 @@ class EnhancedTrendsManager:
         """はてなブックマーク検索RSSをパース"""
         trends = []
         try:
-            root = ET.fromstring(rss_content)
-            items = root.findall('.//item')
-            
-            for item in items[:3]:  # 各キーワードから3件まで
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pub_date_elem = item.find('pubDate')
-                description_elem = item.find('description')
+            for item in parse_feed(rss_content, limit=3):  # 各キーワードから3件まで
+                # はてブ検索結果の形式から記事タイトルとブックマーク数を抽出
+                clean_title, bookmark_count = split_hatena_users(item.title)
                 
-                if title_elem is not None:
-                    title = title_elem.text or ""
-                    # はてブ検索結果の形式から記事タイトルを抽出
-                    clean_title = re.sub(r'\s*\(\d+\s*users?\).*$', '', title)
-                    
-                    # ブックマーク数を抽出
-                    bookmark_count = 0
-                    bookmark_match = re.search(r'\((\d+)\s*users?\)', title)
-                    if bookmark_match:
-                        bookmark_count = int(bookmark_match.group(1))
-                    
-                    trends.append({
-                        'id': f"hatena-search-{keyword}-{len(trends)}",
-                        'title': clean_title,
-                        'url': link_elem.text if link_elem is not None else "",
-                        'source': f'はてなブックマーク ({keyword})',
-                        'score': bookmark_count,
-                        'likes': bookmark_count,
-                        'comments': 0,
-                        'published_at': pub_date_elem.text if pub_date_elem is not None else "",
-                        'topics': [keyword],
-                        'description': self._generate_summary(clean_title),
-                        'quality_score': min(bookmark_count * 2, 100)
-                    })
+                trends.append({
+                    'id': f"hatena-search-{keyword}-{len(trends)}",
+                    'title': clean_title,
+                    'url': item.link,
+                    'source': f'はてなブックマーク ({keyword})',
+                    'score': bookmark_count,
+                    'likes': bookmark_count,
+                    'bookmarks': bookmark_count,
+                    'comments': 0,
+                    'published_at': item.published,
+                    'topics': [keyword],
+                    'description': self._generate_summary(clean_title),
+                    'quality_score': min(bookmark_count * 2, 100)
+                })
         except Exception as e:
             print(f"はてなブックマーク検索RSS解析エラー: {e}")
         
@@ -619,94 +619,47 @@ class EnhancedTrendsManager:
         """はてなブックマークカテゴリRSSをパース（RDF形式対応）"""
         trends = []
         try:
-            root = ET.fromstring(rss_content)
-            
-            # RDF形式の名前空間定義
-            namespaces = {
-                'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-                'rss': 'http://purl.org/rss/1.0/',
-                'hatena': 'http://www.hatena.ne.jp/info/xmlns#',
-                'dc': 'http://purl.org/dc/elements/1.1/'
-            }
-            
-            # RDF形式でのitem要素を取得
-            items = root.findall('.//rss:item', namespaces)
-            
-            for item in items[:4]:  # 各カテゴリから4件まで
-                title_elem = item.find('rss:title', namespaces)
-                link_elem = item.find('rss:link', namespaces)
-                description_elem = item.find('rss:description', namespaces)
-                date_elem = item.find('dc:date', namespaces)
-                
-                # はてなブックマーク特有の要素
-                bookmark_count_elem = item.find('hatena:bookmarkcount', namespaces)
-                
-                if title_elem is not None:
-                    title = title_elem.text or ""
-                    
-                    # ブックマーク数を取得
-                    bookmark_count = 0
-                    if bookmark_count_elem is not None:
-                        try:
-                            bookmark_count = int(bookmark_count_elem.text or 0)
-                        except ValueError:
-                            bookmark_count = 0
-                    
-                    # 日付の変換
-                    published_at = ""
-                    if date_elem is not None:
-                        published_at = date_elem.text or ""
-                    
-                    trends.append({
-                        'id': f"hatena-{category}-{len(trends)}",
-                        'title': title,
-                        'url': link_elem.text if link_elem is not None else "",
-                        'source': f'はてなブックマーク ({category})',
-                        'score': bookmark_count,
-                        'likes': bookmark_count,
-                        'comments': 0,
-                        'published_at': published_at,
-                        'topics': [category],
-                        'description': self._generate_summary(title),
-                        'quality_score': min(bookmark_count * 2, 100)
-                    })
+            for item in parse_feed(rss_content, limit=4):  # 各カテゴリから4件まで
+                # ブックマーク数は hatena:bookmarkcount、日付は dc:date
+                trends.append({
+                    'id': f"hatena-{category}-{len(trends)}",
+                    'title': item.title,
+                    'url': item.link,
+                    'source': f'はてなブックマーク ({category})',
+                    'score': item.bookmark_count,
+                    'likes': item.bookmark_count,
+                    'bookmarks': item.bookmark_count,
+                    'comments': 0,
+                    'published_at': item.published,
+                    'topics': [category],
+                    'description': self._generate_summary(item.title),
+                    'quality_score': min(item.bookmark_count * 2, 100)
+                })
         except Exception as e:
             print(f"はてなブックマークカテゴリRSS解析エラー: {e}")
         
         return trends
 
     async def _get_hacker_news_trends(self) -> List[Dict]:
-        """Hacker News API から記事を取得"""
+        """Hacker News API から記事を取得（item は並行取得・キャッシュ付き）"""
         trends = []
         try:
-            # トップストーリーID取得
-            async with self.session.get('https://hacker-news.firebaseio.com/v0/topstories.json') as response:
-                if response.status == 200:
-                    story_ids = await response.json()
-                    
-                    # 上位20件の詳細を取得
-                    for story_id in story_ids[:20]:
-                        try:
-                            async with self.session.get(f'https://hacker-news.firebaseio.com/v0/item/{story_id}.json') as item_response:
-                                if item_response.status == 200:
-                                    item = await item_response.json()
-                                    if item.get('type') == 'story' and item.get('score', 0) > 50:
-                                        trends.append({
-                                            'id': f"hn-{story_id}",
-                                            'title': item.get('title', ''),
-                                            'url': item.get('url', ''),
-                                            'source': 'Hacker News',
-                                            'score': item.get('score', 0),
-                                            'likes': 0,
-                                            'comments': item.get('descendants', 0),
-                                            'published_at': datetime.fromtimestamp(item.get('time', 0)).isoformat(),
-                                            'topics': [],
-                                            'description': self._generate_summary(item.get('title', '')),
-                                            'quality_score': min(item.get('score', 0) // 2, 100)
-                                        })
-                            await asyncio.sleep(0.1)
-                        except Exception as e:
-                            print(f"HN item エラー: {e}")
+            items = await hacker_news_fetcher.get_top_items(self.session, top_n=self.hn_top_n)
+            for item in items:
+                if item.get('type') == 'story' and item.get('score', 0) > 50:
+                    trends.append({
+                        'id': f"hn-{item.get('id')}",
+                        'title': item.get('title', ''),
+                        'url': item.get('url', ''),
+                        'source': 'Hacker News',
+                        'score': item.get('score', 0),
+                        'likes': 0,
+                        'comments': item.get('descendants', 0),
+                        'published_at': datetime.fromtimestamp(item.get('time', 0)).isoformat(),
+                        'topics': [],
+                        'description': self._generate_summary(item.get('title', '')),
+                        'quality_score': min(item.get('score', 0) // 2, 100)
+                    })
         except Exception as e:
             print(f"Hacker News API エラー: {e}")
         
@@ -723,48 +676,47 @@ class EnhancedTrendsManager:
         for keyword in keywords:
             try:
                 rss_url = f"https://news.google.com/rss/search?q={keyword}&hl=ja&gl=JP&ceid=JP:ja"
-                async with self.session.get(rss_url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        rss_trends = self._parse_google_rss(content, keyword)
-                        trends.extend(rss_trends)
-                await asyncio.sleep(1)  # レート制限対策
+                response = await http_cache.get(self.session, rss_url, rate_limiter=self.rate_limiter)
+                if response.status == 200:
+                    content = response.text()
+                    rss_trends = self._parse_google_rss(content, keyword)
+                    trends.extend(rss_trends)
             except Exception as e:
                 print(f"Google News エラー ({keyword}): {e}")
         
         return trends
 
     async def _get_github_trends(self) -> List[Dict]:
-        """GitHub Trending リポジトリ情報を取得"""
+        """GitHub Trending のリポジトリを取得（言語 × 期間のページを並行取得・重複除去済み）"""
         trends = []
-        languages = ['javascript', 'typescript', 'python', 'any']
-        periods = ['daily', 'weekly']
-        
-        for language in languages:
-            for period in periods:
-                try:
-                    url = f"https://github.com/trending/{language}?since={period}"
-                    async with self.session.get(url, timeout=15) as response:
-                        if response.status == 200:
-                            # HTMLパースは複雑なのでタイトル生成で代用
-                            trend_title = f"GitHub Trending: {language.title()} ({period})"
-                            trends.append({
-                                'id': f"github-{language}-{period}",
-                                'title': trend_title,
-                                'url': url,
-                                'source': 'GitHub Trending',
-                                'score': 50,
-                                'likes': 0,
-                                'comments': 0,
-                                'published_at': datetime.now().isoformat(),
-                                'topics': [language, 'github', 'trending'],
-                                'description': f"{language.title()}の人気リポジトリ（{period}）",
-                                'quality_score': 60
-                            })
-                    
-                    await asyncio.sleep(1)  # レート制限対策
-                except Exception as e:
-                    print(f"GitHub Trending取得エラー: {e}")
+        try:
+            repos = await github_trending_fetcher.get_trending(self.session, rate_limiter=self.rate_limiter)
+        except Exception as e:
+            print(f"GitHub Trending取得エラー: {e}")
+            return trends
+        
+        period_days = {'daily': 1, 'weekly': 7, 'monthly': 30}
+        period_labels = {'daily': '今日', 'weekly': '今週', 'monthly': '今月'}
+        for repo in repos:
+            # 期間内の獲得スターを1日あたりに換算して品質スコアにする
+            stars_per_day = repo.stars_gained / period_days.get(repo.period, 1)
+            label = period_labels.get(repo.period, repo.period)
+            description = repo.description or f"{repo.language or 'GitHub'}の人気リポジトリ"
+            trends.append({
+                'id': f"github-{repo.name}",
+                'title': f"{repo.name}: {description}",
+                'url': repo.url,
+                'source': 'GitHub Trending',
+                'score': repo.stars,
+                'likes': 0,
+                'comments': 0,
+                'published_at': datetime.now().isoformat(),
+                'topics': [topic for topic in (repo.language.lower(), 'github', 'trending') if topic],
+                'description': self._generate_summary(f"⭐{repo.stars_gained:,}（{label}） {description}"),
+                'language': repo.language,
+                'stars_gained': repo.stars_gained,
+                'quality_score': min(50 + int(stars_per_day // 20), 100)
+            })
         
         return trends
 
@@ -788,21 +740,10 @@ class EnhancedTrendsManager:
         ]
     
     def _remove_duplicate_trends(self, trends: List[Dict]) -> List[Dict]:
-        """重複記事を除去"""
-        seen_urls = set()
-        seen_titles = set()
-        unique_trends = []
-        
-        for trend in trends:
-            url = trend.get('url', '')
-            title = trend.get('title', '')
-            
-            if url not in seen_urls and title not in seen_titles:
-                seen_urls.add(url)
-                seen_titles.add(title)
-                unique_trends.append(trend)
-        
-        return unique_trends
+        """重複記事を除去（正規化URLの一致、タイトルの類似度ベース）"""
+        return near_duplicate_detector.dedupe(
+            trends, lambda trend: trend.get('title', ''), lambda trend: trend.get('url', '')
+        )
     
     def _ensure_minimum_category_data(self, by_category: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
         """各カテゴリに最低限のデータを保証"""
@@ -844,6 +785,22 @@ class EnhancedTrendsManager:
         
         return by_category
     
+    def _format_rising_lines(self, rising: List[Dict], max_title: int) -> List[str]:
+        """「急上昇」セクションの行を作成（伸び率は反応数/時）"""
+        if not rising:
+            return []
+        lines = ["\n🔥 **急上昇**"]
+        for trend in rising:
+            title = trend['title']
+            if len(title) > max_title:
+                title = title[:max_title - 3] + "..."
+            line = f"• **{title}** (+{trend['velocity']:.0f}/h)"
+            url = trend.get('url', '')
+            if url:
+                line += f" | [詳細]({url})"
+            lines.append(line)
+        return lines
+    
     def format_trends_for_discord(self, trends: List[Dict], max_display: int = 20) -> Dict:
         """Discord用にフォーマット（シンプル形式・7カテゴリ表示）"""
         if not trends:
@@ -856,6 +813,11 @@ class EnhancedTrendsManager:
         # 重複記事を除去
         unique_trends = self._remove_duplicate_trends(trends)
         
+        # 伸び率の高い記事は「急上昇」として先頭にまとめ、カテゴリ欄では重複させない
+        rising = self.select_rising(unique_trends)
+        rising_ids = {id(trend) for trend in rising}
+        unique_trends = [trend for trend in unique_trends if id(trend) not in rising_ids]
+        
         # カテゴリ別に整理（「一般」カテゴリを除外）
         by_category = {}
         required_categories = [
@@ -877,8 +839,8 @@ class EnhancedTrendsManager:
         # by_category = self._ensure_minimum_category_data(by_category)
         
         # 全記事を1つの説明文にまとめる
-        description_parts = []
-        article_count = 0
+        description_parts = self._format_rising_lines(rising, max_title=50)
+        article_count = len(rising)
         
         for category in required_categories:
             cat_trends = by_category.get(category, [])
@@ -938,8 +900,8 @@ class EnhancedTrendsManager:
         # 文字数制限チェック（4096文字制限）
         if len(description) > 4000:
             # 制限を超える場合は記事数を減らす
-            description_parts = []
-            article_count = 0
+            description_parts = self._format_rising_lines(rising, max_title=40)
+            article_count = len(rising)
             description = "**最新のビジネス・技術トレンドを7カテゴリでお届け！**\n"
             
             for category in required_categories:
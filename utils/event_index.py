@@ -0,0 +1,277 @@
+# -*- coding:utf-8 -*-
+"""
+Event Index
+connpass / Doorkeeper のイベントをSQLiteにためておくローカルインデックス
+
+- 開始日時・都道府県・オンラインフラグにインデックス、タイトル・本文はFTS5（trigram）で全文検索
+  （3文字未満のキーワードは LIKE で検索。trigram が使えない環境では全て LIKE）
+- ソースごとに最終更新日時のウォーターマークを保存し、同期はそれより新しく更新されたイベントだけを取り込む。
+  期間に新しく入ったイベント（前回は期間外で、以降更新されていないもの）は定期的な全件同期で拾う
+- 週間コンテンツ作成時はローカルの範囲検索・全文検索だけで完結するため、APIが落ちていても動作する
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.config import EVENT_INDEX_CONFIG
+
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+# 都道府県（「東京」が「京都」より先に判定されるよう JIS コード順）
+PREFECTURES = [
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県",
+    "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県", "東京都", "神奈川県",
+    "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県",
+    "静岡県", "愛知県", "三重県", "滋賀県", "京都府", "大阪府", "兵庫県",
+    "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県",
+    "徳島県", "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県",
+    "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県"
+]
+_PREFECTURE_STEMS = [(name if name == "北海道" else name[:-1], name) for name in PREFECTURES]
+
+# trigram トークナイザで MATCH できるキーワードの最小文字数
+_TRIGRAM_MIN_LENGTH = 3
+
+
+def detect_prefecture(*texts: str) -> str:
+    """住所・会場名から都道府県名を判定（判定できなければ空文字）"""
+    joined = ' '.join(text for text in texts if text)
+    if not joined:
+        return ''
+    for name in PREFECTURES:
+        if name in joined:
+            return name
+    for stem, name in _PREFECTURE_STEMS:
+        if stem in joined:
+            return name
+    return ''
+
+
+def to_timestamp(value: str) -> Optional[float]:
+    """ISO 8601 の日時文字列をUNIX時刻に変換（タイムゾーンなしは日本時間とみなす）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=JST)
+    return parsed.timestamp()
+
+
+class EventIndex:
+    """イベントのローカルインデックス"""
+
+    def __init__(self, path: str = None, retention_days: float = None):
+        self.path = path or EVENT_INDEX_CONFIG["path"]
+        self.retention_days = retention_days or EVENT_INDEX_CONFIG["retention_days"]
+        self.enabled = EVENT_INDEX_CONFIG["enabled"]
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._trigram = False
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    async def upsert(self, source: str, rows: List[Dict], watermark: Optional[float] = None,
+                     full: bool = False) -> int:
+        """イベントを追加・更新し、同期状態を記録（watermark は後退させない）
+
+        rows の各要素: event_id, title, body, started_at（UNIX時刻）, prefecture（住所情報なしは None）,
+        is_online, updated_at（UNIX時刻）, payload（元のイベントdict）。
+        full=True は期間内を全件取り直した同期の完了として記録する（last_full_sync）
+        """
+        return await asyncio.to_thread(self._upsert, source, rows, watermark, time.time(), full)
+
+    async def query(self, source: str, start: float, end: float, online: Optional[bool] = None,
+                    prefectures: Optional[Iterable[str]] = None, keywords: Optional[Iterable[str]] = None,
+                    limit: Optional[int] = None) -> List[Dict]:
+        """開始日時が [start, end] のイベントを開始日時順に返す
+
+        - online: True / False でオンラインのみ / 会場開催のみ
+        - prefectures: 指定都道府県・オンライン・住所情報なしのイベントに絞る
+        - keywords: いずれかを含むイベントに絞る
+        """
+        return await asyncio.to_thread(
+            self._query, source, start, end, online,
+            list(prefectures) if prefectures else None, list(keywords) if keywords else None, limit
+        )
+
+    async def sync_state(self, source: str) -> Tuple[Optional[float], Optional[float]]:
+        """(ウォーターマーク, 最終同期時刻) を返す（未同期なら None, None）"""
+        return await asyncio.to_thread(self._sync_state, source)
+
+    async def last_full_sync(self, source: str) -> Optional[float]:
+        """最後に期間内を全件取り直した時刻（未実施なら None）"""
+        return await asyncio.to_thread(self._last_full_sync, source)
+
+    def is_stale(self, synced_at: Optional[float], max_age_minutes: float = None) -> bool:
+        """最終同期から max_age_minutes 分以上経っているか（未同期も True）"""
+        max_age_minutes = max_age_minutes or EVENT_INDEX_CONFIG["max_staleness_minutes"]
+        return synced_at is None or time.time() - synced_at >= max_age_minutes * 60
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS events (
+                            source TEXT NOT NULL,
+                            event_id TEXT NOT NULL,
+                            title TEXT NOT NULL,
+                            started_at REAL NOT NULL,
+                            prefecture TEXT,
+                            is_online INTEGER NOT NULL DEFAULT 0,
+                            updated_at REAL,
+                            payload TEXT NOT NULL,
+                            PRIMARY KEY (source, event_id)
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_start '
+                                 'ON events(source, started_at)')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_prefecture '
+                                 'ON events(source, prefecture, started_at)')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_online '
+                                 'ON events(source, is_online, started_at)')
+                    try:
+                        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS events_fts "
+                                     "USING fts5(title, body, tokenize='trigram')")
+                        self._trigram = True
+                    except sqlite3.OperationalError as e:
+                        # trigram 非対応の SQLite では通常テーブルに本文を持ち LIKE で検索
+                        print(f"FTS5 trigram が利用できないため LIKE 検索を使用します: {e}")
+                        conn.execute('CREATE TABLE IF NOT EXISTS events_fts '
+                                     '(rowid INTEGER PRIMARY KEY, title TEXT, body TEXT)')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS sync_state (
+                            source TEXT PRIMARY KEY,
+                            watermark REAL,
+                            synced_at REAL NOT NULL,
+                            full_synced_at REAL
+                        )
+                    ''')
+                    columns = [row[1] for row in conn.execute('PRAGMA table_info(sync_state)')]
+                    if 'full_synced_at' not in columns:
+                        # 全件同期の記録を持たない以前のファイル（次回の同期が全件同期になる）
+                        conn.execute('ALTER TABLE sync_state ADD COLUMN full_synced_at REAL')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _upsert(self, source: str, rows: List[Dict], watermark: Optional[float], synced_at: float,
+                full: bool) -> int:
+        conn = self._connect()
+        stored = 0
+        with self._db_lock:
+            for row in rows:
+                if row.get('started_at') is None:
+                    continue
+                conn.execute(
+                    'INSERT INTO events (source, event_id, title, started_at, prefecture, is_online, '
+                    'updated_at, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(source, event_id) DO UPDATE SET title = excluded.title, '
+                    'started_at = excluded.started_at, prefecture = excluded.prefecture, '
+                    'is_online = excluded.is_online, updated_at = excluded.updated_at, '
+                    'payload = excluded.payload',
+                    (source, str(row['event_id']), row.get('title', ''), row['started_at'],
+                     row.get('prefecture'), 1 if row.get('is_online') else 0, row.get('updated_at'),
+                     json.dumps(row['payload'], ensure_ascii=False))
+                )
+                # 全文検索側は events の rowid に合わせて入れ替え
+                rowid = conn.execute('SELECT rowid FROM events WHERE source = ? AND event_id = ?',
+                                     (source, str(row['event_id']))).fetchone()[0]
+                conn.execute('DELETE FROM events_fts WHERE rowid = ?', (rowid,))
+                conn.execute('INSERT INTO events_fts (rowid, title, body) VALUES (?, ?, ?)',
+                             (rowid, row.get('title', ''), row.get('body', '')))
+                stored += 1
+
+            conn.execute(
+                'INSERT INTO sync_state (source, watermark, synced_at, full_synced_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(source) DO UPDATE SET synced_at = excluded.synced_at, '
+                'watermark = MAX(COALESCE(sync_state.watermark, 0), COALESCE(excluded.watermark, 0)), '
+                'full_synced_at = COALESCE(excluded.full_synced_at, sync_state.full_synced_at)',
+                (source, watermark, synced_at, synced_at if full else None)
+            )
+
+            # 開催から保持期間を過ぎたイベントを削除
+            cutoff = synced_at - self.retention_days * 86400
+            conn.execute('DELETE FROM events_fts WHERE rowid IN '
+                         '(SELECT rowid FROM events WHERE started_at < ?)', (cutoff,))
+            conn.execute('DELETE FROM events WHERE started_at < ?', (cutoff,))
+            conn.commit()
+        return stored
+
+    def _query(self, source: str, start: float, end: float, online: Optional[bool],
+               prefectures: Optional[List[str]], keywords: Optional[List[str]],
+               limit: Optional[int]) -> List[Dict]:
+        conn = self._connect()
+        sql = ['SELECT payload FROM events WHERE source = ? AND started_at BETWEEN ? AND ?']
+        params: List = [source, start, end]
+
+        if online is not None:
+            sql.append('AND is_online = ?')
+            params.append(1 if online else 0)
+        if prefectures:
+            sql.append(f"AND (is_online = 1 OR prefecture IS NULL OR prefecture IN ({','.join('?' * len(prefectures))}))")
+            params.extend(prefectures)
+        if keywords:
+            subqueries, keyword_params = self._keyword_subqueries(keywords)
+            sql.append(f"AND rowid IN ({' UNION '.join(subqueries)})")
+            params.extend(keyword_params)
+
+        sql.append('ORDER BY started_at')
+        if limit:
+            sql.append('LIMIT ?')
+            params.append(limit)
+
+        with self._db_lock:
+            rows = conn.execute(' '.join(sql), params).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def _keyword_subqueries(self, keywords: List[str]) -> Tuple[List[str], List]:
+        """キーワードのいずれかを含む rowid を返すサブクエリ（長いものは MATCH、短いものは LIKE）"""
+        subqueries, params = [], []
+        if self._trigram:
+            long_keywords = [keyword for keyword in keywords if len(keyword) >= _TRIGRAM_MIN_LENGTH]
+            if long_keywords:
+                subqueries.append('SELECT rowid FROM events_fts WHERE events_fts MATCH ?')
+                params.append(' OR '.join('"{}"'.format(keyword.replace('"', '""')) for keyword in long_keywords))
+            keywords = [keyword for keyword in keywords if len(keyword) < _TRIGRAM_MIN_LENGTH]
+        for keyword in keywords:
+            pattern = '%{}%'.format(keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+            subqueries.append("SELECT rowid FROM events_fts WHERE title LIKE ? ESCAPE '\\' OR body LIKE ? ESCAPE '\\'")
+            params.extend([pattern, pattern])
+        return subqueries, params
+
+    def _sync_state(self, source: str) -> Tuple[Optional[float], Optional[float]]:
+        conn = self._connect()
+        with self._db_lock:
+            row = conn.execute('SELECT watermark, synced_at FROM sync_state WHERE source = ?',
+                               (source,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _last_full_sync(self, source: str) -> Optional[float]:
+        conn = self._connect()
+        with self._db_lock:
+            row = conn.execute('SELECT full_synced_at FROM sync_state WHERE source = ?', (source,)).fetchone()
+        return row[0] if row else None
+
+
+# 各マネージャーで共有するインスタンス
+event_index = EventIndex()
@@ -1,15 +1,33 @@
 # -*- coding:utf-8 -*-
 import aiohttp
+import asyncio
 import datetime
-from typing import List, Dict, Optional
-from config.config import DOORKEEPER_API_TOKEN
-from bs4 import BeautifulSoup
+from typing import List, Dict, NamedTuple, Optional, Tuple
+from config.config import DOORKEEPER_API_TOKEN, EVENT_INDEX_CONFIG
+from utils.http_cache import http_cache
+from utils.event_index import event_index, detect_prefecture, to_timestamp
+from utils.peatix_parser import parse_peatix_cards
 import re
 
+
+# Peatixの日付表記（"12月25日" など）
+_MONTH_DAY_RE = re.compile(r'(\d+)月(\d+)日')
+
+
+class DoorkeeperQuery(NamedTuple):
+    """Doorkeeper API への検索クエリ（同じ値のクエリは1回だけ実行する）"""
+    keyword: str
+    since: str
+    until: str
+    sort: str
+
+
 class EventManager:
     def __init__(self):
         self.api_token = DOORKEEPER_API_TOKEN
         self.base_url = "https://api.doorkeeper.jp"
+        # 全リクエストで共有するセッション（_get_session で遅延作成）
+        self.session: Optional[aiohttp.ClientSession] = None
         
         # キャリア・ビジネス関連キーワード
         self.career_keywords = [
@@ -36,38 +54,34 @@ class EventManager:
             "北海道": "北海道", "札幌": "北海道"
         }
     
-    async def get_career_events(self, regions: List[str] = None, days_ahead: int = 7) -> List[Dict]:
-        """キャリア系イベントを取得（Doorkeeper + Peatix）"""
+    async def get_career_events(self, regions: List[str] = None, days_ahead: int = 7,
+                                strict: bool = False) -> List[Dict]:
+        """キャリア系イベントを取得（Doorkeeper + Peatix）
+        
+        strict=True の場合は同期に失敗した・イベントがない場合にフォールバックせず例外を送出する
+        """
         if regions is None:
             regions = ["愛知県"]
+        prefectures = [self.prefecture_map.get(region, region) for region in regions]
         
         all_events = []
         
-        # 1. Doorkeeper APIからイベント取得
-        if self.api_token:
-            for region in regions:
-                prefecture = self.prefecture_map.get(region, region)
-                
-                # 複数のキーワードで検索して重複除去
-                events_by_keyword = []
-                for keyword in self.career_keywords[:3]:  # レート制限対策で上位3キーワード
-                    events = await self._search_events(
-                        prefecture=prefecture,
-                        keyword=keyword,
-                        days_ahead=days_ahead
-                    )
-                    events_by_keyword.extend(events)
-                    
-                    # レート制限対策：1秒待機
-                    await asyncio.sleep(1)
-                
-                # 重複除去（event_idベース）
-                unique_events = {}
-                for event in events_by_keyword:
-                    event_id = event.get('id', event.get('title', ''))
-                    unique_events[event_id] = event
-                
-                all_events.extend(unique_events.values())
+        # 1. Doorkeeper のイベントをローカルインデックスから検索（地域・キーワードはローカルで絞り込み）
+        if self.api_token and event_index.enabled:
+            await self.ensure_index(strict=strict)
+            now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
+            all_events = await event_index.query(
+                'doorkeeper',
+                now.timestamp(),
+                (now + datetime.timedelta(days=days_ahead)).timestamp(),
+                prefectures=prefectures,
+                keywords=self.career_keywords
+            )
+        elif self.api_token:
+            # 地域に依存しないクエリだけをまとめて並行実行し、地域はローカルで絞り込む
+            queries = self.plan_queries(regions, self.career_keywords[:3], days_ahead)
+            results = await asyncio.gather(*(self._search_events(query) for query in queries))
+            all_events = self._filter_events_by_regions(self._unique_events(results), prefectures)
         
         # 2. Peatixからイベント取得を試行（現在はスキップ - CloudFront制限のため）
         # Peatixはアンチスクレイピング対策が強化されているため、
@@ -80,6 +94,8 @@ class EventManager:
         
         # 3. イベントがない場合はフォールバック
         if not all_events:
+            if strict:
+                raise RuntimeError("Doorkeeper のイベントを取得できませんでした")
             all_events = self._get_fallback_events(regions)
         
         # 日付順にソート
@@ -88,99 +104,224 @@ class EventManager:
         # 最大10件に制限
         return all_events[:10]
     
-    async def _search_events(self, prefecture: str, keyword: str, days_ahead: int) -> List[Dict]:
-        """Doorkeeper APIでイベント検索"""
-        today = datetime.datetime.now().date()
-        until_date = today + datetime.timedelta(days=days_ahead)
-        
-        # APIパラメータを簡素化（500エラー対策）
-        params = {
-            'q': keyword,
-            'since': today.isoformat(),
-            'sort': 'starts_at',
-            'locale': 'ja'
-        }
+    def _get_session(self) -> aiohttp.ClientSession:
+        """全リクエストで共有するセッション（未作成・クローズ済みなら作成）"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+    
+    async def close(self):
+        """共有セッションを閉じる"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    def plan_queries(self, regions: Optional[List[str]], keywords: List[str], days_ahead: int,
+                     sort: str = 'starts_at') -> List[DoorkeeperQuery]:
+        """地域×キーワードの検索要求を、重複のない Doorkeeper クエリの一覧にする
         
-        # 地域フィルタリングは行わず、キーワード検索のみ実施
-        # オンラインイベントも含めて幅広く取得し、後でフィルタリング
+        地域はローカルで絞り込むためクエリに含めない（地域を増やしてもリクエスト数は増えない）
+        """
+        today = datetime.datetime.now().date()
+        since = today.isoformat()
+        until = (today + datetime.timedelta(days=days_ahead)).isoformat()
         
-        headers = {
+        queries = {}
+        requested = 0
+        for _ in regions or [None]:
+            for keyword in keywords:
+                requested += 1
+                query = DoorkeeperQuery(keyword, since, until, sort)
+                queries.setdefault(query, query)
+        print(f"Doorkeeper: {len(queries)} queries planned for {requested} region×keyword requests")
+        return list(queries)
+    
+    def _api_headers(self) -> Dict:
+        return {
             'Authorization': f'Bearer {self.api_token}',
             'User-Agent': 'DJEyes-Bot/1.0',
             'Accept': 'application/json'
         }
+    
+    async def ensure_index(self, strict: bool = False):
+        """インデックスが未同期または古い場合はその場で同期（失敗しても保存済みの分で続行。strict=True なら例外）"""
+        _, synced_at = await event_index.sync_state('doorkeeper')
+        if event_index.is_stale(synced_at):
+            try:
+                await self.sync_index()
+            except Exception as e:
+                print(f"Doorkeeper index sync error: {e}")
+                if strict:
+                    raise
+    
+    async def sync_index(self, full: bool = None) -> int:
+        """イベントをインデックスへ取り込む（取り込んだ件数を返す）
+        
+        通常は前回のウォーターマーク以降に更新されたイベントだけを取り込む（差分同期）。
+        初回・前回の全件同期から full_sync_interval_hours 経過時・差分がページ上限を超えた場合は、
+        期間内のイベントを更新日時に関係なく取り直す（全件同期。期間に新しく入ったイベントも拾う）
+        """
+        if not self.api_token:
+            return 0
+        watermark, _ = await event_index.sync_state('doorkeeper')
+        if full is None:
+            full = not watermark or event_index.is_stale(
+                await event_index.last_full_sync('doorkeeper'), EVENT_INDEX_CONFIG["full_sync_interval_hours"] * 60
+            )
+        days_ahead = EVENT_INDEX_CONFIG["sync_days_ahead"]
+        
+        if not full:
+            queries = self.plan_queries(None, self.career_keywords[:3], days_ahead, sort='updated_at')
+            results = await asyncio.gather(*(self._fetch_sync_pages(query, watermark or 0) for query in queries))
+            if any(result is not None and not result[1] for result in results):
+                print("Doorkeeper index sync: 差分がページ上限を超えたため全件同期します")
+                full = True
+        if full:
+            queries = self.plan_queries(None, self.career_keywords[:3], days_ahead, sort='starts_at')
+            results = await asyncio.gather(*(self._fetch_sync_pages(query) for query in queries))
+        
+        rows = {}
+        for event in self._unique_events(result[0] for result in results if result is not None):
+            row = self._index_row(event)
+            rows[row['event_id']] = row
+        
+        # 取得に失敗した・ページ上限で打ち切ったクエリがある場合はウォーターマークを進めない（次回その分を取り直す）
+        complete = all(result is not None and result[1] for result in results)
+        new_watermark = max((row['updated_at'] or 0 for row in rows.values()), default=watermark or 0)
+        stored = await event_index.upsert('doorkeeper', list(rows.values()), new_watermark if complete else None,
+                                          full=full and complete)
+        print(f"Doorkeeper index sync ({'full' if full else 'delta'}): {stored} events"
+              + ("" if complete else "（未完了のためウォーターマークは据え置き）"))
+        return stored
+    
+    async def _fetch_sync_pages(self, query: DoorkeeperQuery,
+                                watermark: float = None) -> Optional[Tuple[List[Dict], bool]]:
+        """同期用にページを順に読む（キャッシュは使わない。失敗時は None）
+        
+        watermark を渡すと（更新日時の新しい順のクエリで）ウォーターマーク以前の更新に達したら打ち切る。
+        (イベント, 最後まで読めたか) を返す（ページ上限で打ち切った場合は False）
+        """
+        max_pages = EVENT_INDEX_CONFIG["sync_max_pages" if watermark is not None else "full_sync_max_pages"]
+        fetched = []
+        for page in range(1, max_pages + 1):
+            events = await self._request_events(query, page=page, fresh=True)
+            if events is None:
+                return None
+            if not events:
+                return fetched, True
+            for event in events:
+                if watermark is not None and (to_timestamp(event.get('updated_at') or '') or 0) <= watermark:
+                    return fetched, True
+                fetched.append(event)
+        return fetched, False
+    
+    def _index_row(self, event: Dict) -> Dict:
+        """インデックスに保存する行（本文は全文検索用）"""
+        venue = event.get('venue_name') or ''
+        address = event.get('address') or ''
+        return {
+            'event_id': event.get('id') or event.get('title') or '',
+            'title': event.get('title') or '',
+            'body': f"{venue} {event.get('description') or ''}",
+            'started_at': to_timestamp(event.get('starts_at') or ''),
+            'prefecture': detect_prefecture(address, venue) if (address or venue) else None,
+            'is_online': self._is_online_event(event),
+            'updated_at': to_timestamp(event.get('updated_at') or ''),
+            'payload': event
+        }
+    
+    def _is_online_event(self, event: Dict) -> bool:
+        """オンライン開催のイベントか"""
+        online_keywords = ['オンライン', 'リモート', 'バーチャル', 'ウェビナー', 'Web', 'Zoom']
+        title = (event.get('title') or '').lower()
+        venue = (event.get('venue_name') or '').lower()
+        description = (event.get('description') or '').lower()
+        return any(keyword.lower() in title or keyword.lower() in venue or keyword.lower() in description
+                   for keyword in online_keywords)
+    
+    @staticmethod
+    def _unique_events(results) -> List[Dict]:
+        """クエリ結果を結合して重複除去（event_idベース、先に見つかったものを残す）"""
+        unique_events = {}
+        for events in results:
+            for event in events:
+                unique_events.setdefault(event.get('id', event.get('title', '')), event)
+        return list(unique_events.values())
+    
+    async def _search_events(self, query: DoorkeeperQuery) -> List[Dict]:
+        """Doorkeeper APIでイベント検索（地域での絞り込みは呼び出し側で行う）"""
+        events = await self._request_events(query)
+        if events is None:
+            return []
+        print(f"Doorkeeper: {len(events)} events for keyword: {query.keyword}")
+        return events
+    
+    async def _request_events(self, query: DoorkeeperQuery, page: int = 1,
+                              fresh: bool = False) -> Optional[List[Dict]]:
+        """Doorkeeper API の /events を1ページ取得（失敗時は None。fresh=True はキャッシュを使わない）"""
+        params = {
+            'q': query.keyword,
+            'since': query.since,
+            'until': query.until,
+            'sort': query.sort,
+            'page': page,
+            'locale': 'ja'
+        }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                # まずAPIの基本接続をテスト
-                test_url = f"{self.base_url}/events"
-                print(f"Testing Doorkeeper API: {test_url}")
-                print(f"Headers: {headers}")
-                print(f"Params: {params}")
-                
-                async with session.get(
-                    test_url,
-                    params=params,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as response:
-                    print(f"Response status: {response.status}")
-                    response_text = await response.text()
-                    print(f"Response text: {response_text[:500]}...")
-                    
-                    if response.status == 200:
-                        try:
-                            data = await response.json()
-                            if isinstance(data, list):
-                                events = [item.get('event', item) for item in data if item]
-                                print(f"Found {len(events)} events before filtering")
-                                
-                                # 地域フィルタリング: オンライン or 指定地域のイベント
-                                filtered_events = self._filter_events_by_region(events, prefecture)
-                                print(f"After region filtering: {len(filtered_events)} events")
-                                return filtered_events
-                            else:
-                                print("Unexpected response format")
-                                return []
-                        except Exception as json_error:
-                            print(f"JSON parsing error: {json_error}")
-                            return []
-                    elif response.status == 401:
-                        print("API Token invalid or expired")
-                        return []
-                    elif response.status == 403:
-                        print("API access forbidden")
-                        return []
-                    elif response.status == 500:
-                        print("Server error - using fallback data")
-                        return []
-                    else:
-                        print(f"Doorkeeper API error: {response.status} - {response_text}")
-                        return []
-        except aiohttp.ClientTimeout:
+            fetch = http_cache.fetch if fresh else http_cache.get
+            response = await fetch(
+                self._get_session(),
+                f"{self.base_url}/events",
+                params=params,
+                headers=self._api_headers(),
+                timeout=15
+            )
+        except asyncio.TimeoutError:
             print("API request timeout")
-            return []
+            return None
         except Exception as e:
             print(f"Error fetching events: {e}")
-            return []
+            return None
+        
+        if response.status == 200:
+            try:
+                data = response.json()
+            except Exception as json_error:
+                print(f"JSON parsing error: {json_error}")
+                return None
+            if not isinstance(data, list):
+                print("Unexpected response format")
+                return None
+            return [item.get('event', item) for item in data if item]
+        elif response.status == 401:
+            print("API Token invalid or expired")
+        elif response.status == 403:
+            print("API access forbidden")
+        elif response.status == 500:
+            print("Server error - using fallback data")
+        else:
+            print(f"Doorkeeper API error: {response.status}")
+        return None
+    
+    def _filter_events_by_regions(self, events: List[Dict], target_prefectures: List[str]) -> List[Dict]:
+        """いずれかの地域に該当するイベントに絞り込む（元の順序を保つ）"""
+        matched = set()
+        for prefecture in target_prefectures:
+            matched.update(id(event) for event in self._filter_events_by_region(events, prefecture))
+        return [event for event in events if id(event) in matched]
     
     def _filter_events_by_region(self, events: List[Dict], target_prefecture: str) -> List[Dict]:
         """イベントを地域でフィルタリング（オンライン優遇）"""
         filtered = []
         
         for event in events:
-            # オンラインイベントの判定キーワード
-            online_keywords = ['オンライン', 'リモート', 'バーチャル', 'ウェビナー', 'Web', 'Zoom']
-            
             # イベント情報から判定（None対策）
-            title = (event.get('title') or '').lower()
             venue = (event.get('venue_name') or '').lower()
             address = (event.get('address') or '').lower()
-            description = (event.get('description') or '').lower()
             
             # オンラインイベントの場合は地域関係なく含める
-            if any(keyword.lower() in title or keyword.lower() in venue or keyword.lower() in description 
-                   for keyword in online_keywords):
+            if self._is_online_event(event):
                 filtered.append(event)
                 continue
             
@@ -219,132 +360,76 @@ class EventManager:
             
             for url in search_urls[:2]:  # 負荷軽減のため2つまで
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(
-                            url,
-                            headers={
-                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                                'Accept-Language': 'ja,en;q=0.9',
-                                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-                            },
-                            timeout=aiohttp.ClientTimeout(total=10)
-                        ) as response:
-                            if response.status == 200:
-                                html = await response.text()
-                                parsed_events = self._parse_peatix_html(html, region)
-                                events.extend(parsed_events[:3])  # 各検索から最大3件
-                            else:
-                                print(f"Peatix HTTP error: {response.status}")
-                                
+                    response = await http_cache.get(
+                        self._get_session(),
+                        url,
+                        headers={
+                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                            'Accept-Language': 'ja,en;q=0.9',
+                            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+                        },
+                        timeout=10
+                    )
+                    if response.status == 200:
+                        html = response.text()
+                        parsed_events = self._parse_peatix_html(html, region)
+                        events.extend(parsed_events[:3])  # 各検索から最大3件
+                    else:
+                        print(f"Peatix HTTP error: {response.status}")
+                            
                 except Exception as e:
                     print(f"Error fetching from Peatix: {e}")
-                
-                # レート制限対策
-                await asyncio.sleep(2)
         
         return events
     
     def _parse_peatix_html(self, html: str, region: str) -> List[Dict]:
-        """PeatixのHTMLをパースしてイベント情報を抽出"""
-        soup = BeautifulSoup(html, 'html.parser')
+        """PeatixのHTMLからイベントカード部分だけを抽出してイベント情報にする"""
         events = []
         
-        # デバッグ: HTML内容を確認
-        print(f"Peatix HTML length: {len(html)}")
-        
-        # より汎用的なセレクタでイベントを探す
-        # 1. article要素
-        event_cards = soup.find_all('article')
-        
-        # 2. それでも見つからない場合は、href="/event/"を含むリンクを探す
-        if not event_cards:
-            all_links = soup.find_all('a', href=lambda x: x and '/event/' in x)
-            # リンクの親要素をイベントカードとして扱う
-            event_cards = []
-            for link in all_links:
-                parent = link.find_parent(['div', 'li', 'article'])
-                if parent and parent not in event_cards:
-                    event_cards.append(parent)
-        
-        print(f"Found {len(event_cards)} potential event cards")
-        
-        for card in event_cards[:5]:  # 最大5件
-            try:
-                # タイトル取得（複数の方法を試す）
-                title = None
-                # h2, h3タグ
-                title_elem = card.find(['h2', 'h3'])
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                
-                # それでもない場合は、event URLを含むリンクのテキスト
-                if not title:
-                    link_elem = card.find('a', href=lambda x: x and '/event/' in x)
-                    if link_elem:
-                        title = link_elem.get_text(strip=True)
-                
-                if not title or len(title) < 3:  # タイトルが短すぎる場合はスキップ
-                    continue
-                
-                # URL取得
-                url_elem = card.find('a', href=lambda x: x and '/event/' in x)
-                event_url = None
-                if url_elem and url_elem.get('href'):
-                    href = url_elem['href']
-                    event_url = f"https://peatix.com{href}" if href.startswith('/') else href
-                
-                # 日時取得（様々なパターンを試す）
-                date_text = ''
-                for date_selector in ['time', '.date', '.schedule', '.event-date']:
-                    date_elem = card.select_one(date_selector)
-                    if date_elem:
-                        date_text = date_elem.get_text(strip=True)
-                        break
-                
-                # 場所取得
-                venue_text = None
-                for venue_selector in ['.venue', '.location', '.place', '.event-venue']:
-                    venue_elem = card.select_one(venue_selector)
-                    if venue_elem:
-                        venue_text = venue_elem.get_text(strip=True)
-                        break
-                
-                # オンライン判定（タイトルと会場両方をチェック）
-                full_text = f"{title} {venue_text or ''}"
-                is_online = any(word in full_text for word in ['オンライン', 'リモート', 'ウェビナー', 'Zoom', 'Online'])
-                
-                # 日時パース（簡易的）
-                today = datetime.datetime.now()
-                starts_at = today.isoformat()  # デフォルト値
-                
-                if date_text:
-                    # "12月25日" のような形式を想定
-                    match = re.search(r'(\d+)月(\d+)日', date_text)
-                    if match:
-                        month = int(match.group(1))
-                        day = int(match.group(2))
-                        year = today.year
-                        # 過去の日付なら来年と判定
-                        if month < today.month or (month == today.month and day < today.day):
-                            year += 1
-                        starts_at = datetime.datetime(year, month, day).isoformat()
-                
-                event = {
-                    'id': f'peatix_{hash(title)}',
-                    'title': title,
-                    'starts_at': starts_at,
-                    'venue_name': venue_text or ('オンライン' if is_online else '会場未定'),
-                    'address': region if not is_online else '',
-                    'public_url': event_url or 'https://peatix.com',
-                    'description': f'Peatixイベント: {title}'
-                }
-                
-                events.append(event)
-                
-            except Exception as e:
-                print(f"Error parsing Peatix event: {e}")
+        for card in parse_peatix_cards(html, limit=5):  # 最大5件
+            title = card.title
+            if not title or len(title) < 3:  # タイトルが短すぎる場合はスキップ
                 continue
+            
+            # URL
+            event_url = None
+            if card.url:
+                event_url = f"https://peatix.com{card.url}" if card.url.startswith('/') else card.url
+            
+            # オンライン判定（タイトルと会場両方をチェック）
+            full_text = f"{title} {card.venue}"
+            is_online = any(word in full_text for word in ['オンライン', 'リモート', 'ウェビナー', 'Zoom', 'Online'])
+            
+            # 日時パース（簡易的）
+            today = datetime.datetime.now()
+            starts_at = today.isoformat()  # デフォルト値
+            
+            if card.date_text:
+                # "12月25日" のような形式を想定
+                match = _MONTH_DAY_RE.search(card.date_text)
+                if match:
+                    month = int(match.group(1))
+                    day = int(match.group(2))
+                    year = today.year
+                    # 過去の日付なら来年と判定
+                    if month < today.month or (month == today.month and day < today.day):
+                        year += 1
+                    try:
+                        starts_at = datetime.datetime(year, month, day).isoformat()
+                    except ValueError:
+                        pass
+            
+            events.append({
+                'id': f'peatix_{hash(title)}',
+                'title': title,
+                'starts_at': starts_at,
+                'venue_name': card.venue or ('オンライン' if is_online else '会場未定'),
+                'address': region if not is_online else '',
+                'public_url': event_url or 'https://peatix.com',
+                'description': f'Peatixイベント: {title}'
+            })
         
+        print(f"Peatix: {len(events)} events parsed ({len(html)} chars)")
         return events
     
     def _get_fallback_events(self, regions: List[str]) -> List[Dict]:
@@ -423,13 +508,7 @@ class EventManager:
                     title = title[:17] + "..."
                 
                 # オンラインイベント判定
-                online_keywords = ['オンライン', 'リモート', 'バーチャル', 'ウェビナー', 'Web', 'Zoom']
-                title_text = (event.get('title') or '').lower()
-                venue_text = (event.get('venue_name') or '').lower()
-                description_text = (event.get('description') or '').lower()
-                
-                is_online = any(keyword.lower() in title_text or keyword.lower() in venue_text or keyword.lower() in description_text 
-                               for keyword in online_keywords)
+                is_online = self._is_online_event(event)
                 
                 # 場所情報
                 if is_online:
@@ -477,7 +556,3 @@ class EventManager:
             ],
             "color": 0x9B59B6
         }
-
-# 非同期処理用のimport追加
-import asyncio
-from urllib.parse import quote
\ No newline at end of file
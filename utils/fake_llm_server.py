@@ -0,0 +1,250 @@
+# -*- coding:utf-8 -*-
+"""
+Fake LLM Server
+Gemini API（REST の generateContent / streamGenerateContent）と同じ形で応答するローカルの偽モデルサーバー
+
+- 応答時間（latency ± jitter）、429（使用制限）・500（サーバーエラー）を返す割合を設定できる
+- 応答本文は「台本（正規表現 -> 応答のリスト。順番に使い回す）」→「responder 関数」→「定型文」の順に決める。
+  response_schema つきの依頼には、スキーマに沿ったJSONを返す
+- usageMetadata（トークン数の目安）も返す
+- streamGenerateContent は latency 後に最初の断片を返し、以降は stream_chunk_chars 文字ずつ
+  stream_chunk_delay 秒おきに返す（JSON配列を少しずつ書き出す REST のストリーミング形式）
+- 開発時は `python -m utils.fake_llm_server` で起動し、LLM_BACKEND=fake でボットの送信先をここに向ける
+
+使い方:
+    python -m utils.fake_llm_server [--port 8765] [--latency 0.8] [--rate-limit 0.05] [--error-rate 0.02]
+                                    [--script script.json]
+    script.json: {"rules": [{"pattern": "正規表現", "responses": ["応答1", "応答2"]}]}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from config.config import FAKE_LLM_CONFIG
+from utils.llm_metrics import estimate_tokens
+
+# 台本のルールが無い場合の定型文
+CANNED_RESPONSES = [
+    "いいですね！最近それについてよく考えています。",
+    "なるほど、そういう見方もありますね。",
+    "それ、すごく面白そうです！もう少し詳しく聞きたいです。",
+]
+
+# REST で送られてくる response_schema の type（Schema.Type の番号）
+_SCHEMA_TYPES = {1: 'string', 2: 'number', 3: 'integer', 4: 'boolean', 5: 'array', 6: 'object'}
+
+_ERRORS = {
+    429: ('RESOURCE_EXHAUSTED', 'Resource has been exhausted (e.g. check quota).'),
+    500: ('INTERNAL', 'An internal error has occurred.'),
+}
+
+
+def fill_schema(schema: Dict[str, Any], index: int = 0) -> Any:
+    """response_schema に沿った値を作る"""
+    kind = schema.get('type', 'string')
+    kind = _SCHEMA_TYPES.get(kind, 'string') if isinstance(kind, int) else str(kind).lower()
+    if kind == 'object':
+        return {name: fill_schema(child, index) for name, child in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [fill_schema(schema.get('items', {}), number) for number in range(1, 4)]
+    if kind in ('integer', 'number'):
+        return index
+    if kind == 'boolean':
+        return True
+    return CANNED_RESPONSES[index % len(CANNED_RESPONSES)]
+
+
+class FakeLLMServer:
+    """generateContent に遅延・エラー・台本どおりの応答を返すサーバー"""
+
+    def __init__(self, latency: float = None, jitter: float = None, rate_limit_rate: float = None,
+                 error_rate: float = None, script: List[Tuple[str, List[str]]] = None,
+                 responder: Callable[[str, Dict[str, Any]], Optional[str]] = None, seed: int = None,
+                 stream_chunk_chars: int = None, stream_chunk_delay: float = None):
+        self.latency = latency if latency is not None else FAKE_LLM_CONFIG["latency_seconds"]
+        self.jitter = jitter if jitter is not None else FAKE_LLM_CONFIG["latency_jitter_seconds"]
+        self.rate_limit_rate = rate_limit_rate if rate_limit_rate is not None else FAKE_LLM_CONFIG["rate_limit_rate"]
+        self.error_rate = error_rate if error_rate is not None else FAKE_LLM_CONFIG["error_rate"]
+        # [(正規表現, 応答を順番に返すイテレーター), ...]
+        self.script = [(re.compile(pattern), itertools.cycle(responses)) for pattern, responses in (script or [])]
+        self.responder = responder
+        self.stream_chunk_chars = stream_chunk_chars or FAKE_LLM_CONFIG["stream_chunk_chars"]
+        self.stream_chunk_delay = (stream_chunk_delay if stream_chunk_delay is not None
+                                   else FAKE_LLM_CONFIG["stream_chunk_delay_seconds"])
+        self.url: Optional[str] = None
+        self.stats = {'requests': 0, 'streams': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0,
+                      'in_flight': 0, 'max_in_flight': 0}
+
+        self._random = random.Random(seed)
+        self._canned = itertools.cycle(CANNED_RESPONSES)
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------------
+    # 起動・停止
+    # ------------------------------------------------------------------
+    async def start(self, host: str = None, port: int = None) -> str:
+        """現在のイベントループで起動してURLを返す（port=0 なら空いているポート）"""
+        app = web.Application()
+        app.router.add_post('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host or FAKE_LLM_CONFIG["host"],
+                           FAKE_LLM_CONFIG["port"] if port is None else port)
+        await site.start()
+        bound_host, bound_port = site._server.sockets[0].getsockname()[:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = None, port: int = 0) -> str:
+        """別スレッドのイベントループで起動してURLを返す（呼び出し側のループの遅延を汚さない）"""
+        ready = threading.Event()
+
+        async def serve():
+            self._loop = asyncio.get_running_loop()
+            self._stopped = asyncio.Event()
+            await self.start(host, port)
+            ready.set()
+            await self._stopped.wait()
+            await self.stop()
+
+        threading.Thread(target=lambda: asyncio.run(serve()), name='fake_llm_server', daemon=True).start()
+        if not ready.wait(10):
+            raise RuntimeError("偽モデルサーバーを起動できませんでした")
+        return self.url
+
+    def stop_thread(self):
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    # ------------------------------------------------------------------
+    # 応答
+    # ------------------------------------------------------------------
+    def reply_for(self, prompt: str, body: Dict[str, Any]) -> str:
+        """依頼に対する応答本文（台本 → responder → スキーマ → 定型文）"""
+        for pattern, responses in self.script:
+            if pattern.search(prompt):
+                return next(responses)
+        if self.responder is not None:
+            text = self.responder(prompt, body)
+            if text is not None:
+                return text
+        schema = (body.get('generationConfig') or body.get('generation_config') or {}).get('responseSchema')
+        if schema:
+            return json.dumps(fill_schema(schema), ensure_ascii=False)
+        return next(self._canned)
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.stats['requests'] += 1
+        self.stats['in_flight'] += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            body = await request.json()
+            await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return self._error(429)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return self._error(500)
+
+            contents = body.get('contents', [])
+            prompt = ''.join(part.get('text', '') for part in (contents[-1].get('parts', []) if contents else []))
+            text = self.reply_for(prompt, body)
+            prompt_tokens = sum(estimate_tokens(part.get('text', ''))
+                                for content in contents for part in content.get('parts', []))
+            usage = {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': estimate_tokens(text),
+                'totalTokenCount': prompt_tokens + estimate_tokens(text)
+            }
+            self.stats['ok'] += 1
+            if request.path.endswith(':streamGenerateContent'):
+                self.stats['streams'] += 1
+                return await self._stream(request, text, usage)
+            return web.json_response(self._chunk(text, usage))
+        finally:
+            self.stats['in_flight'] -= 1
+
+    async def _stream(self, request: web.Request, text: str, usage: Dict[str, int]) -> web.StreamResponse:
+        """本文を stream_chunk_chars 文字ずつ、JSON配列の要素として間隔を空けて書き出す"""
+        response = web.StreamResponse(headers={'Content-Type': 'application/json'})
+        await response.prepare(request)
+        pieces = [text[start:start + self.stream_chunk_chars]
+                  for start in range(0, len(text), self.stream_chunk_chars)] or ['']
+        for index, piece in enumerate(pieces):
+            if index:
+                await asyncio.sleep(self.stream_chunk_delay)
+            last = index == len(pieces) - 1
+            chunk = self._chunk(piece, usage if last else None)
+            await response.write((('[' if index == 0 else ',\r\n') + json.dumps(chunk, ensure_ascii=False)).encode('utf-8'))
+        await response.write(b']')
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _chunk(text: str, usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """応答（ストリーミングでは断片）1つ分。usage を渡した最後の断片に終了理由とトークン数をつける"""
+        candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}
+        chunk = {'candidates': [candidate]}
+        if usage is not None:
+            candidate['finishReason'] = 'STOP'
+            chunk['usageMetadata'] = usage
+        return chunk
+
+    @staticmethod
+    def _error(code: int) -> web.Response:
+        status, message = _ERRORS[code]
+        return web.json_response({'error': {'code': code, 'message': message, 'status': status}}, status=code)
+
+
+def load_script(path: str) -> List[Tuple[str, List[str]]]:
+    """台本ファイル（{"rules": [{"pattern", "responses"}]}）を読み込む"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return [(rule['pattern'], list(rule['responses'])) for rule in data.get('rules', [])]
+
+
+async def _serve_forever(server: FakeLLMServer, host: str, port: int):
+    url = await server.start(host, port)
+    print(f"偽モデルサーバーを起動しました: {url}（LLM_BACKEND=fake FAKE_LLM_URL={url}）")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini API 互換の偽モデルサーバー")
+    parser.add_argument('--host', default=FAKE_LLM_CONFIG["host"])
+    parser.add_argument('--port', type=int, default=FAKE_LLM_CONFIG["port"])
+    parser.add_argument('--latency', type=float, default=None, help="応答時間（秒）")
+    parser.add_argument('--jitter', type=float, default=None, help="応答時間のばらつき（±秒）")
+    parser.add_argument('--rate-limit', type=float, default=None, help="429を返す割合")
+    parser.add_argument('--error-rate', type=float, default=None, help="500を返す割合")
+    parser.add_argument('--script', default=None, help="台本ファイル（JSON）")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit,
+                           error_rate=args.error_rate, script=load_script(args.script) if args.script else None)
+    try:
+        asyncio.run(_serve_forever(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
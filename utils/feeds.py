@@ -0,0 +1,201 @@
+# -*- coding:utf-8 -*-
+"""
+Feed Parser
+RSS 2.0 / RDF (RSS 1.0、はてなブックマーク) / Atom を共通の FeedItem で扱うパーサー
+
+- 件数（limit）指定時は iterparse で先頭から読み、limit 件の item を読み終えたら打ち切る
+  （残りの本文は解析しない。途中以降が壊れたフィードでも読めた分は返す）
+- 本文のHTML除去・空白整理などのクリーンアップは事前コンパイル済みの正規表現で共通化
+- 文字列で渡されたフィードは復号済みとして扱い、XML宣言の encoding（Shift_JIS 等）は無視する
+  （expat が読めない文字コードのバイト列は宣言の encoding で復号してから解析）
+"""
+
+import html
+import io
+import re
+import xml.etree.ElementTree as ET
+from typing import List, Optional, Tuple, Union
+
+_ATOM_NS = '{http://www.w3.org/2005/Atom}'
+_RDF_ABOUT = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about'
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+_SITE_SUFFIX_RE = re.compile(r'\s*-\s*[^-]*$')
+_HATENA_USERS_RE = re.compile(r'\s*\((\d+)\s*users?\).*$')
+_XML_DECL_RE = re.compile(r'^\ufeff?\s*<\?xml[^>]*\?>')
+_DECL_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+
+# expat がそのまま読める文字コード
+_EXPAT_ENCODINGS = {'utf-8', 'utf8', 'utf-16', 'utf16', 'iso-8859-1', 'latin-1', 'latin1', 'us-ascii', 'ascii'}
+
+_ITEM = 'item'
+
+# 要素のローカル名 -> FeedItem の属性（同じ属性は先に出現した値を優先）
+_FIELD_TAGS = {
+    'title': 'title',
+    'link': 'link',
+    'guid': 'guid',
+    'id': 'guid',
+    'description': 'description',
+    'summary': 'description',
+    'content': 'description',
+    'pubDate': 'published',
+    'date': 'published',
+    'published': 'published',
+    'updated': 'published',
+    'category': 'category',
+    'subject': 'category',
+    'bookmarkcount': 'bookmark_count',
+    # 記事要素そのもの
+    'item': _ITEM,
+    'entry': _ITEM,
+}
+
+# これより小さいフィードは件数指定でも一括で木を作る（逐次解析のオーバーヘッドの方が大きい）
+_INCREMENTAL_MIN_BYTES = 32 * 1024
+
+
+class FeedItem:
+    """フィード1件分のレコード（値は未加工。必要に応じて clean_html などで整形する）"""
+
+    __slots__ = ('title', 'link', 'guid', 'description', 'published', 'category', 'bookmark_count')
+
+    def __init__(self, title: str = '', link: str = '', guid: str = '', description: str = '',
+                 published: str = '', category: str = '', bookmark_count: int = 0):
+        self.title = title
+        self.link = link
+        self.guid = guid
+        self.description = description
+        self.published = published
+        self.category = category
+        self.bookmark_count = bookmark_count
+
+    def __repr__(self):
+        return f"FeedItem(title={self.title!r}, link={self.link!r})"
+
+
+# 名前空間付きタグ -> 役割（FeedItem の属性名 / _ITEM / None）のキャッシュ
+_role_cache = {}
+
+
+def _role_of(tag) -> Optional[str]:
+    try:
+        return _role_cache[tag]
+    except KeyError:
+        role = None
+        if isinstance(tag, str):
+            role = _FIELD_TAGS.get(tag.rsplit('}', 1)[-1] if tag[:1] == '{' else tag)
+        _role_cache[tag] = role
+        return role
+
+
+def _build_item(element: ET.Element) -> FeedItem:
+    """item / entry 要素の直下の子要素から FeedItem を作る"""
+    values = {}
+    for child in element:
+        field = _role_of(child.tag)
+        if field is None or field is _ITEM:
+            continue
+
+        if field == 'link' and child.tag.startswith(_ATOM_NS):
+            # Atom は href 属性（rel="alternate" または rel 省略を優先）
+            href = child.get('href', '')
+            if href and ('link' not in values or child.get('rel', 'alternate') == 'alternate'):
+                values['link'] = href
+            continue
+        if field in values:
+            continue
+        if field == 'category' and child.get('term'):
+            value = child.get('term')
+        else:
+            value = (child.text or '').strip()
+        if not value:
+            continue
+
+        if field == 'bookmark_count':
+            try:
+                value = int(value)
+            except ValueError:
+                continue
+        values[field] = value
+
+    if 'guid' not in values:
+        values['guid'] = element.get(_RDF_ABOUT, '')
+    return FeedItem(**values)
+
+
+def _item_elements(root: ET.Element) -> List[ET.Element]:
+    """item / entry 要素（RSS 2.0 は channel の直下、RDF・Atom はルートの直下）。文書全体は走査しない"""
+    elements = []
+    for child in root:
+        role = _role_of(child.tag)
+        if role is _ITEM:
+            elements.append(child)
+        elif role is None and child.tag.rsplit('}', 1)[-1] == 'channel':
+            elements.extend(element for element in child if _role_of(element.tag) is _ITEM)
+    return elements
+
+
+def parse_feed(content: Union[str, bytes], limit: Optional[int] = None) -> List[FeedItem]:
+    """RSS 2.0 / RDF / Atom を解析して先頭から最大 limit 件の FeedItem を返す"""
+    if limit is not None and limit <= 0:
+        return []
+    data = _to_parser_bytes(content)
+    items: List[FeedItem] = []
+    try:
+        if limit is None or len(data) < _INCREMENTAL_MIN_BYTES:
+            root = ET.fromstring(data)
+            return [_build_item(element) for element in _item_elements(root)[:limit]]
+
+        for _, element in ET.iterparse(io.BytesIO(data), events=('end',)):
+            if _role_of(element.tag) is not _ITEM:
+                continue
+            items.append(_build_item(element))
+            element.clear()
+            if len(items) >= limit:
+                break
+    except ET.ParseError as e:
+        print(f"フィード解析エラー（{len(items)}件まで取得）: {e}")
+    return items
+
+
+def _to_parser_bytes(content: Union[str, bytes]) -> bytes:
+    """expat に渡せる UTF-8 等のバイト列にする"""
+    if isinstance(content, bytes):
+        match = _DECL_ENCODING_RE.match(content)
+        if not match or match.group(1).decode('ascii').lower() in _EXPAT_ENCODINGS:
+            return content
+        try:
+            content = content.decode(match.group(1).decode('ascii'), errors='replace')
+        except LookupError:
+            # 未知の encoding
+            content = content.decode('utf-8', errors='replace')
+    # 復号済みの文字列を UTF-8 に戻すため、宣言の encoding と食い違わないよう宣言ごと外す
+    return _XML_DECL_RE.sub('', content, count=1).encode('utf-8')
+
+
+def clean_html(text: str, max_length: Optional[int] = None) -> str:
+    """HTMLタグ・実体参照を除去し空白を整理（max_length を超える場合は末尾を ... にする）"""
+    if not text:
+        return ''
+    clean_text = _TAG_RE.sub('', text)
+    if '&' in clean_text:
+        clean_text = html.unescape(clean_text)
+    clean_text = _SPACE_RE.sub(' ', clean_text).strip()
+    if max_length is not None and len(clean_text) > max_length:
+        clean_text = clean_text[:max_length - 3] + '...'
+    return clean_text
+
+
+def strip_site_name(title: str) -> str:
+    """Google News 形式のタイトル末尾「 - サイト名」を除去"""
+    return _SITE_SUFFIX_RE.sub('', title or '')
+
+
+def split_hatena_users(title: str) -> Tuple[str, int]:
+    """はてなブックマーク検索結果のタイトル「記事名 (12 users)」を (記事名, ブックマーク数) に分割"""
+    match = _HATENA_USERS_RE.search(title or '')
+    if not match:
+        return title or '', 0
+    return title[:match.start()], int(match.group(1))
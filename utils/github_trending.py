@@ -0,0 +1,217 @@
+# -*- coding:utf-8 -*-
+"""
+GitHub Trending Fetcher
+GitHub Trending ページ（言語 × 期間）を並行取得し、リポジトリカードを解析する共通モジュール
+
+- ページは html.parser のトークン列から article.Box-row（リポジトリカード）だけを読み、
+  リポジトリ名・説明・言語・スター数・期間内の獲得スター数を TrendingRepo に取り出す
+- 言語 × 期間の各ページは並行取得（github.com へのペースは共有のホスト別レート制限で調整）
+- 解析結果はページごとに期間に応じたTTLで保持（daily は短く、weekly / monthly は長く）
+- 複数の言語ページに出てくるリポジトリは1件にまとめる（期間の短いページ・獲得スターの多いものを優先）
+"""
+
+import asyncio
+import re
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from config.config import GITHUB_TRENDING_CONFIG
+from utils.http_cache import http_cache
+
+_NUMBER_RE = re.compile(r'\d[\d,]*')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class TrendingRepo:
+    """Trending ページのリポジトリ1件分"""
+
+    __slots__ = ('name', 'url', 'description', 'language', 'stars', 'forks', 'stars_gained', 'period')
+
+    def __init__(self, name: str = '', url: str = '', description: str = '', language: str = '',
+                 stars: int = 0, forks: int = 0, stars_gained: int = 0, period: str = ''):
+        self.name = name
+        self.url = url
+        self.description = description
+        self.language = language
+        self.stars = stars
+        self.forks = forks
+        self.stars_gained = stars_gained
+        self.period = period
+
+    def __repr__(self):
+        return f"TrendingRepo(name={self.name!r}, stars_gained={self.stars_gained!r}, period={self.period!r})"
+
+
+def _to_int(text: str) -> int:
+    match = _NUMBER_RE.search(text or '')
+    return int(match.group().replace(',', '')) if match else 0
+
+
+class _TrendingTokenizer(HTMLParser):
+    """article.Box-row の中の必要な要素のテキストだけを記録"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards: List[Dict[str, str]] = []
+        self._card: Optional[Dict[str, str]] = None
+        self._article_depth = 0
+        self._in_heading = False
+        # 取得中の (フィールド名, タグ, 同じタグの入れ子の深さ, テキスト片)
+        self._capture: Optional[list] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._capture is not None and tag == self._capture[1]:
+            self._capture[2] += 1
+
+        if tag == 'article':
+            if self._card is not None:
+                self._article_depth += 1
+                return
+            if 'Box-row' in (dict(attrs).get('class') or '').split():
+                self._card = {}
+                self._article_depth = 1
+            return
+        if self._card is None or self._capture is not None:
+            return
+
+        attributes = dict(attrs)
+        field = None
+        if tag == 'h2':
+            self._in_heading = True
+        elif tag == 'a':
+            href = attributes.get('href') or ''
+            if self._in_heading and 'name' not in self._card:
+                self._card['href'] = href
+                field = 'name'
+            elif href.endswith('/stargazers'):
+                field = 'stars'
+            elif href.endswith('/forks'):
+                field = 'forks'
+        elif tag == 'p' and 'description' not in self._card:
+            field = 'description'
+        elif tag == 'span':
+            if attributes.get('itemprop') == 'programmingLanguage':
+                field = 'language'
+            elif 'float-sm-right' in (attributes.get('class') or '').split():
+                field = 'stars_gained'
+        if field:
+            self._capture = [field, tag, 1, []]
+
+    def handle_endtag(self, tag):
+        if self._card is None:
+            return
+        if self._capture is not None and tag == self._capture[1]:
+            self._capture[2] -= 1
+            if self._capture[2] == 0:
+                field, _, _, parts = self._capture
+                self._card.setdefault(field, _SPACE_RE.sub(' ', ''.join(parts)).strip())
+                self._capture = None
+        if tag == 'h2':
+            self._in_heading = False
+        elif tag == 'article':
+            self._article_depth -= 1
+            if self._article_depth == 0:
+                self.cards.append(self._card)
+                self._card = None
+                self._capture = None
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._capture[3].append(data)
+
+
+def parse_trending_page(html: str, period: str = '') -> List[TrendingRepo]:
+    """Trending ページのHTMLからリポジトリ一覧（掲載順）を取り出す"""
+    tokenizer = _TrendingTokenizer()
+    tokenizer.feed(html)
+    tokenizer.close()
+
+    repos = []
+    for card in tokenizer.cards:
+        href = card.get('href', '').strip('/')
+        if href.count('/') != 1:
+            continue
+        repos.append(TrendingRepo(
+            name=href,
+            url=f"https://github.com/{href}",
+            description=card.get('description', ''),
+            language=card.get('language', ''),
+            stars=_to_int(card.get('stars', '')),
+            forks=_to_int(card.get('forks', '')),
+            stars_gained=_to_int(card.get('stars_gained', '')),
+            period=period
+        ))
+    return repos
+
+
+class GitHubTrendingFetcher:
+    """言語 × 期間の Trending ページをまとめて取得するフェッチャー"""
+
+    BASE_URL = 'https://github.com/trending'
+
+    def __init__(self, languages: List[str] = None, periods: List[str] = None,
+                 period_ttls: Dict[str, float] = None, max_repos_per_page: int = None):
+        self.languages = languages if languages is not None else GITHUB_TRENDING_CONFIG["languages"]
+        self.periods = periods or GITHUB_TRENDING_CONFIG["periods"]
+        self.period_ttls = dict(period_ttls or GITHUB_TRENDING_CONFIG["period_ttls"])
+        self.max_repos_per_page = max_repos_per_page or GITHUB_TRENDING_CONFIG["max_repos_per_page"]
+        # (言語, 期間) -> (有効期限, リポジトリ一覧)
+        self._page_cache: Dict[Tuple[str, str], tuple] = {}
+        self.stats = {'page_hits': 0, 'page_misses': 0}
+
+    def page_url(self, language: str, period: str) -> str:
+        """Trending ページのURL（言語が空文字なら全言語）"""
+        path = f"{self.BASE_URL}/{language}" if language else self.BASE_URL
+        return f"{path}?since={period}"
+
+    async def get_trending(self, session: aiohttp.ClientSession, rate_limiter=None) -> List[TrendingRepo]:
+        """全ページを並行取得し、言語をまたいで重複を除いたリポジトリを返す"""
+        pages = [(language, period) for period in self.periods for language in self.languages]
+        results = await asyncio.gather(*(
+            self._get_page(session, language, period, rate_limiter) for language, period in pages
+        ))
+
+        # 期間の短いページを優先し、同じ期間内では獲得スターの多いものを残す
+        period_rank = {period: rank for rank, period in enumerate(self.periods)}
+        unique: Dict[str, TrendingRepo] = {}
+        for repos in results:
+            for repo in repos:
+                key = repo.name.lower()
+                current = unique.get(key)
+                if current is None or (period_rank[repo.period], -repo.stars_gained) < \
+                        (period_rank[current.period], -current.stars_gained):
+                    unique[key] = repo
+        return list(unique.values())
+
+    async def _get_page(self, session: aiohttp.ClientSession, language: str, period: str,
+                        rate_limiter=None) -> List[TrendingRepo]:
+        """1ページ分を取得して解析（期間ごとのTTLでキャッシュ、失敗時は空リスト）"""
+        key = (language, period)
+        ttl = self.period_ttls.get(period, 3600)
+        cached = self._page_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.stats['page_hits'] += 1
+            return cached[1]
+        self.stats['page_misses'] += 1
+
+        url = self.page_url(language, period)
+        try:
+            response = await http_cache.get(session, url, timeout=15, ttl=ttl, rate_limiter=rate_limiter)
+            if response.status != 200:
+                print(f"GitHub Trending取得失敗 ({url}): {response.status}")
+                return []
+            repos = parse_trending_page(response.text(), period)[:self.max_repos_per_page]
+        except Exception as e:
+            print(f"GitHub Trending取得エラー ({url}): {e}")
+            return []
+
+        if repos:
+            self._page_cache[key] = (time.monotonic() + ttl, repos)
+        return repos
+
+
+# 各マネージャーで共有するインスタンス（キャッシュをまたいで再利用）
+github_trending_fetcher = GitHubTrendingFetcher()
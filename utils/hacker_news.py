@@ -0,0 +1,117 @@
+# -*- coding:utf-8 -*-
+"""
+Hacker News Fetcher
+Hacker News API のトップストーリーを並行取得する共通モジュール
+
+- 個別記事（item）は上限付きセマフォで並行取得（呼び出し側のセッションを再利用し keep-alive を活かす）
+- 記事ごとのTTLキャッシュ（スコアの変化は緩やかなため）
+- 取得件数 top_n は設定で変更可能（100件でも所要時間はほぼ並行数で決まる）
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from config.config import HACKER_NEWS_CONFIG
+
+
+class HackerNewsFetcher:
+    """トップストーリーの記事詳細をまとめて取得するフェッチャー"""
+
+    TOP_STORIES_URL = 'https://hacker-news.firebaseio.com/v0/topstories.json'
+    ITEM_URL = 'https://hacker-news.firebaseio.com/v0/item/{}.json'
+
+    def __init__(self, concurrency: int = None, item_ttl: float = None, top_stories_ttl: float = None):
+        self.concurrency = concurrency or HACKER_NEWS_CONFIG["concurrency"]
+        self.item_ttl = item_ttl if item_ttl is not None else HACKER_NEWS_CONFIG["item_ttl_seconds"]
+        self.top_stories_ttl = (top_stories_ttl if top_stories_ttl is not None
+                                else HACKER_NEWS_CONFIG["top_stories_ttl_seconds"])
+        # story_id -> (取得時刻, item)
+        self._item_cache: Dict[int, tuple] = {}
+        self._top_stories: Optional[tuple] = None
+        self.stats = {'item_hits': 0, 'item_misses': 0}
+
+    async def get_top_items(self, session: aiohttp.ClientSession, top_n: int = None) -> List[Dict]:
+        """トップストーリー上位 top_n 件の item をランキング順で返す（取得失敗分は除外）"""
+        top_n = top_n or HACKER_NEWS_CONFIG["top_n"]
+        story_ids = await self._get_top_story_ids(session)
+        if not story_ids:
+            return []
+
+        target_ids = story_ids[:top_n]
+        now = time.monotonic()
+        items: Dict[int, Dict] = {}
+        missing = []
+        for story_id in target_ids:
+            cached = self._item_cache.get(story_id)
+            if cached and now - cached[0] < self.item_ttl:
+                items[story_id] = cached[1]
+                self.stats['item_hits'] += 1
+            else:
+                missing.append(story_id)
+
+        if missing:
+            self.stats['item_misses'] += len(missing)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            fetched = await asyncio.gather(
+                *(self._fetch_item(session, story_id, semaphore) for story_id in missing)
+            )
+            fetched_at = time.monotonic()
+            for story_id, item in zip(missing, fetched):
+                if item is not None:
+                    self._item_cache[story_id] = (fetched_at, item)
+                    items[story_id] = item
+
+        self._evict_expired()
+        return [items[story_id] for story_id in target_ids if story_id in items]
+
+    async def _get_top_story_ids(self, session: aiohttp.ClientSession) -> List[int]:
+        """トップストーリーID一覧を取得（短時間キャッシュ）"""
+        now = time.monotonic()
+        if self._top_stories and now - self._top_stories[0] < self.top_stories_ttl:
+            return self._top_stories[1]
+
+        try:
+            async with session.get(self.TOP_STORIES_URL, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status != 200:
+                    print(f"HN top stories取得失敗: {response.status}")
+                    return []
+                story_ids = await response.json()
+        except Exception as e:
+            print(f"HN top stories取得エラー: {e}")
+            return []
+
+        if not isinstance(story_ids, list):
+            print("HN top stories: 不正な形式")
+            return []
+
+        self._top_stories = (now, story_ids)
+        return story_ids
+
+    async def _fetch_item(self, session: aiohttp.ClientSession, story_id: int,
+                          semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """個別記事を取得（同時実行数はセマフォで制限）"""
+        async with semaphore:
+            try:
+                async with session.get(self.ITEM_URL.format(story_id),
+                                       timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status == 200:
+                        item = await response.json()
+                        return item if isinstance(item, dict) else None
+            except Exception as e:
+                print(f"HN item取得エラー: {story_id} - {e}")
+        return None
+
+    def _evict_expired(self):
+        """期限切れの記事キャッシュを削除"""
+        now = time.monotonic()
+        expired = [story_id for story_id, (fetched_at, _) in self._item_cache.items()
+                   if now - fetched_at >= self.item_ttl]
+        for story_id in expired:
+            del self._item_cache[story_id]
+
+
+# 各マネージャーで共有するインスタンス（キャッシュをまたいで再利用）
+hacker_news_fetcher = HackerNewsFetcher()
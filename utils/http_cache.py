@@ -0,0 +1,278 @@
+# -*- coding:utf-8 -*-
+"""
+HTTP Response Cache
+コンテンツ取得系マネージャーで共有するGETレスポンスのディスクキャッシュ
+
+- キー: URL + クエリパラメータ
+- ホスト別TTL（HTTP_CACHE_CONFIG["ttls"]）と stale-while-revalidate
+  （期限切れでも猶予期間内なら古い内容を即返し、裏で再取得）
+- 本文はzlib圧縮してSQLiteファイルに保存、合計バイト数によるLRU削除
+- Content-Type の charset も保存し、本文はその文字コードで読む（Shift_JIS / EUC-JP のページ・フィード用）
+- ヒット/ミス統計
+- 通信はホスト別レート制限（utils.rate_limiter）を通し、429応答は Retry-After を待って再試行
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import urlencode, urlparse
+
+import aiohttp
+
+from config.config import HTTP_CACHE_CONFIG, HTTP_RATE_LIMIT_CONFIG
+from utils.rate_limiter import host_rate_limiter
+
+
+class CachedResponse:
+    """キャッシュ経由で取得したレスポンス（本文は読み込み済み）"""
+
+    __slots__ = ('status', 'body', 'charset', 'from_cache', 'stale')
+
+    def __init__(self, status: int, body: bytes, charset: Optional[str] = None,
+                 from_cache: bool = False, stale: bool = False):
+        self.status = status
+        self.body = body
+        self.charset = charset  # Content-Type の charset（無ければ None）
+        self.from_cache = from_cache
+        self.stale = stale
+
+    def text(self, encoding: str = None) -> str:
+        """本文を文字列にする（encoding 省略時は charset、それも無ければ UTF-8）"""
+        encoding = encoding or self.charset or 'utf-8'
+        try:
+            return self.body.decode(encoding, errors='replace')
+        except LookupError:
+            # 未知の charset
+            return self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text())
+
+
+class HttpCache:
+    """SQLiteに圧縮保存するGETレスポンスキャッシュ"""
+
+    def __init__(self, path: str = None, max_bytes: int = None, default_ttl: float = None,
+                 stale_ttl: float = None, ttls: Dict[str, float] = None):
+        self.path = path or HTTP_CACHE_CONFIG["path"]
+        self.max_bytes = max_bytes or HTTP_CACHE_CONFIG["max_bytes"]
+        self.default_ttl = default_ttl if default_ttl is not None else HTTP_CACHE_CONFIG["default_ttl"]
+        self.stale_ttl = stale_ttl if stale_ttl is not None else HTTP_CACHE_CONFIG["stale_ttl"]
+        self.ttls = dict(ttls if ttls is not None else HTTP_CACHE_CONFIG["ttls"])
+        self.enabled = HTTP_CACHE_CONFIG["enabled"]
+        self.rate_limiter = host_rate_limiter
+        self.max_retries = HTTP_RATE_LIMIT_CONFIG["max_retries"]
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {
+            'hits': 0, 'stale_hits': 0, 'misses': 0,
+            'revalidations': 0, 'errors': 0, 'evictions': 0
+        }
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    async def get(self, session: aiohttp.ClientSession, url: str, params: Dict = None,
+                  headers: Dict = None, timeout: float = 15, ttl: float = None,
+                  stale_ttl: float = None, rate_limiter=None) -> CachedResponse:
+        """キャッシュ付きGET（200以外は保存しない。キャッシュも無く通信失敗した場合は例外）"""
+        rate_limiter = rate_limiter or self.rate_limiter
+        if not self.enabled:
+            return await self._fetch(session, url, params, headers, timeout, rate_limiter)
+
+        key = self.make_key(url, params)
+        ttl = self.ttl_for(url) if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        entry = await asyncio.to_thread(self._load, key)
+        now = time.time()
+
+        if entry is not None:
+            status, body, charset, fetched_at = entry
+            age = now - fetched_at
+            if age < ttl:
+                self.stats['hits'] += 1
+                return CachedResponse(status, body, charset, from_cache=True)
+            if age < ttl + stale_ttl:
+                self.stats['stale_hits'] += 1
+                self._schedule_revalidate(key, url, params, headers, timeout, rate_limiter)
+                return CachedResponse(status, body, charset, from_cache=True, stale=True)
+
+        self.stats['misses'] += 1
+        try:
+            response = await self._fetch(session, url, params, headers, timeout, rate_limiter)
+        except Exception:
+            self.stats['errors'] += 1
+            if entry is not None:
+                # 通信失敗時は期限切れでも手元の内容を返す
+                return CachedResponse(entry[0], entry[1], entry[2], from_cache=True, stale=True)
+            raise
+
+        if response.status == 200:
+            await asyncio.to_thread(self._store, key, url, response.status, response.body, response.charset)
+        return response
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str, params: Dict = None,
+                    headers: Dict = None, timeout: float = 15, rate_limiter=None) -> CachedResponse:
+        """キャッシュを使わずに取得（ホスト別レート制限は通す。期限内・通信失敗時も古い内容は返さない）"""
+        return await self._fetch(session, url, params, headers, timeout, rate_limiter or self.rate_limiter)
+
+    def ttl_for(self, url: str) -> float:
+        """URLのホストに対応するTTLを取得"""
+        host = (urlparse(url).hostname or '').lower()
+        return self.ttls.get(host, self.default_ttl)
+
+    @staticmethod
+    def make_key(url: str, params: Dict = None) -> str:
+        """URLとパラメータからキャッシュキーを生成"""
+        raw = url
+        if params:
+            raw += '?' + urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_stats(self) -> Dict:
+        """ヒット/ミス統計と保存サイズを取得"""
+        stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        if self._conn is not None:
+            with self._db_lock:
+                row = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            stats['entries'], stats['total_bytes'] = row
+        return stats
+
+    def clear(self):
+        """キャッシュを全削除"""
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute('DELETE FROM responses')
+            conn.commit()
+
+    async def close(self):
+        """再取得用セッションを閉じる"""
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    # ------------------------------------------------------------------
+    # 通信
+    # ------------------------------------------------------------------
+    async def _fetch(self, session, url, params, headers, timeout, rate_limiter) -> CachedResponse:
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                await rate_limiter.wait(url)
+            async with session.get(url, params=params, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                body = await response.read()
+                charset = response.charset
+                throttled = (rate_limiter.observe(url, response.status, response.headers)
+                             if rate_limiter is not None else None)
+            # 429 は Retry-After 分だけホストを止めてから再試行（次の wait() で待機）
+            if response.status != 429 or throttled is None or attempt >= self.max_retries:
+                return CachedResponse(response.status, body, charset)
+
+    def _schedule_revalidate(self, key, url, params, headers, timeout, rate_limiter):
+        """期限切れエントリを裏で再取得（同じキーの再取得は1本だけ）"""
+        if key in self._revalidating:
+            return
+        task = asyncio.ensure_future(self._revalidate(key, url, params, headers, timeout, rate_limiter))
+        self._revalidating[key] = task
+        task.add_done_callback(lambda _: self._revalidating.pop(key, None))
+
+    async def _revalidate(self, key, url, params, headers, timeout, rate_limiter):
+        # 呼び出し元のセッションは先に閉じられることがあるため専用セッションを使う
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        try:
+            response = await self._fetch(self._session, url, params, headers, timeout, rate_limiter)
+            if response.status == 200:
+                await asyncio.to_thread(self._store, key, url, response.status, response.body, response.charset)
+                self.stats['revalidations'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"HTTPキャッシュ再取得エラー ({url}): {e}")
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS responses (
+                            key TEXT PRIMARY KEY,
+                            url TEXT NOT NULL,
+                            status INTEGER NOT NULL,
+                            body BLOB NOT NULL,
+                            size INTEGER NOT NULL,
+                            fetched_at REAL NOT NULL,
+                            last_access REAL NOT NULL,
+                            charset TEXT
+                        )
+                    ''')
+                    columns = [row[1] for row in conn.execute('PRAGMA table_info(responses)')]
+                    if 'charset' not in columns:
+                        # charset を持たない以前のファイル（既存のエントリは UTF-8 として読む）
+                        conn.execute('ALTER TABLE responses ADD COLUMN charset TEXT')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _load(self, key: str) -> Optional[tuple]:
+        conn = self._connect()
+        with self._db_lock:
+            row = conn.execute(
+                'SELECT status, body, charset, fetched_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+        status, body, charset, fetched_at = row
+        return status, zlib.decompress(body), charset, fetched_at
+
+    def _store(self, key: str, url: str, status: int, body: bytes, charset: Optional[str] = None):
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, url, status, body, size, fetched_at, last_access, charset) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, status, compressed, len(compressed), now, now, charset)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """合計サイズが上限を超えたら最終アクセスが古い順に削除"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute('SELECT key, size FROM responses ORDER BY last_access ASC').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            self.stats['evictions'] += 1
+
+
+# 各マネージャーで共有するインスタンス
+http_cache = HttpCache()
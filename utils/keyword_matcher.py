@@ -0,0 +1,142 @@
+# -*- coding:utf-8 -*-
+"""
+Keyword Matcher
+カテゴリ別キーワード辞書から Aho-Corasick オートマトンを一度だけ構築し、
+記事テキストを1回走査するだけでカテゴリ別のヒット数を求める
+
+- スコアは従来どおり「テキストに含まれるキーワードの種類数」（同じ語が何度出ても1）
+- 'go' や 'ai' のような短い英数字キーワードは単語境界でのみ一致させる
+  （'google' の 'go'、'email' の 'ai' などの誤判定を防ぐ。日本語の隣接文字は境界扱い）
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+
+def _is_word_char(ch: str) -> bool:
+    """単語境界判定用：ASCII英数字とアンダースコアのみを単語構成文字とする"""
+    return ch.isascii() and (ch.isalnum() or ch == '_')
+
+
+class KeywordMatcher:
+    """カテゴリ別キーワードの一括マッチャー"""
+
+    # この文字数以下のASCIIキーワードは単語境界でのみ一致させる
+    DEFAULT_BOUNDARY_MAX_LEN = 4
+
+    def __init__(self, category_keywords: Dict[str, List[str]],
+                 boundary_max_len: int = DEFAULT_BOUNDARY_MAX_LEN):
+        self.categories = list(category_keywords.keys())
+        self.boundary_max_len = boundary_max_len
+
+        # キーワードごとの (キーワード, カテゴリ番号リスト, 左境界要否, 右境界要否)
+        self._patterns: List[tuple] = []
+        pattern_ids: Dict[str, int] = {}
+        for category_index, keywords in enumerate(category_keywords.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                if keyword not in pattern_ids:
+                    pattern_ids[keyword] = len(self._patterns)
+                    self._patterns.append((keyword, [], *self._boundary_flags(keyword)))
+                # 同一カテゴリ内の重複も従来どおり個別に数える
+                self._patterns[pattern_ids[keyword]][1].append(category_index)
+
+        self._build(pattern_ids)
+
+    def _boundary_flags(self, keyword: str) -> tuple:
+        """短いASCIIキーワードの両端に単語境界が必要か"""
+        if not keyword.isascii() or len(keyword) > self.boundary_max_len:
+            return False, False
+        return _is_word_char(keyword[0]), _is_word_char(keyword[-1])
+
+    def _build(self, pattern_ids: Dict[str, int]):
+        """トライと失敗リンクを構築"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[int]] = [[]]
+        for keyword, pattern_id in pattern_ids.items():
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(pattern_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                # 失敗リンク先で終わるキーワードもこの状態で一致する
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(ids) for ids in output]
+
+    def matched_keywords(self, text: str) -> List[str]:
+        """テキストに含まれるキーワード一覧（小文字、重複なし）"""
+        return [self._patterns[pattern_id][0] for pattern_id in self._scan(text.lower())]
+
+    def _scan(self, text: str) -> set:
+        """テキストを1回走査して一致したキーワードIDの集合を返す（textは小文字化済み）"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self._patterns
+        found = set()
+        state = 0
+        length = len(text)
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            for pattern_id in output[state]:
+                if pattern_id in found:
+                    continue
+                keyword, _, left, right = patterns[pattern_id]
+                end = index + 1
+                start = end - len(keyword)
+                if left and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if right and end < length and _is_word_char(text[end]):
+                    continue
+                found.add(pattern_id)
+        return found
+
+    def count(self, text: str) -> Dict[str, int]:
+        """カテゴリ別のヒット数（キーワードの種類数）を返す"""
+        counts = [0] * len(self.categories)
+        for pattern_id in self._scan(text.lower()):
+            for category_index in self._patterns[pattern_id][1]:
+                counts[category_index] += 1
+        return dict(zip(self.categories, counts))
+
+    def best_category(self, text: str) -> tuple:
+        """ヒット数が最大のカテゴリと件数（同数なら辞書の先頭側、ヒットなしは (None, 0)）"""
+        best: Optional[str] = None
+        max_matches = 0
+        for category, matches in self.count(text).items():
+            if matches > max_matches:
+                max_matches = matches
+                best = category
+        return best, max_matches
+
+    def first_category(self, text: str) -> Optional[str]:
+        """辞書の並び順で最初にヒットしたカテゴリ（ヒットなしは None）"""
+        for category, matches in self.count(text).items():
+            if matches:
+                return category
+        return None
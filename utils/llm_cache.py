@@ -0,0 +1,188 @@
+# -*- coding:utf-8 -*-
+"""
+LLM Response Cache
+同じ（定型の）プロンプトに対するLLMの生成結果を再利用する応答キャッシュ
+
+- キーは「正規化したプロンプト（NFKC・空白の連続を1つに）+ モデル名 + 丸めた temperature」
+  （response_mime_type / response_schema などの生成設定を指定した場合はそれも含める）
+- 1キーにつき最大 variants 件の生成結果を保持。揃うまではAPIで生成して追加し、
+  揃ったら保持分を順番に返す（毎回同じ文にならない）
+- ttl を過ぎた生成結果は通常は使わないが、APIの使用制限中・障害中は stale_ttl まで使う
+- persist が有効ならSQLiteに保存し、再起動後も再利用する
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import LLM_CACHE_CONFIG
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """キャッシュキー用にプロンプトを正規化（全角半角・空白の違いを吸収）"""
+    return _SPACE_RE.sub(' ', unicodedata.normalize('NFKC', prompt)).strip()
+
+
+class _Entry:
+    """1キー分の生成結果"""
+
+    __slots__ = ('variants', 'cursor')
+
+    def __init__(self, variants: List[Tuple[float, str]] = None):
+        self.variants = variants if variants is not None else []  # [(生成時刻, 本文), ...] 古い順
+        self.cursor = 0
+
+
+class LLMResponseCache:
+    """プロンプト単位で複数の生成結果を保持するキャッシュ"""
+
+    def __init__(self, ttl_hours: float = None, stale_ttl_hours: float = None, variants: int = None,
+                 temperature_step: float = None, max_keys: int = None, persist: bool = None,
+                 path: str = None):
+        self.ttl = (ttl_hours or LLM_CACHE_CONFIG["ttl_hours"]) * 3600
+        self.stale_ttl = (stale_ttl_hours or LLM_CACHE_CONFIG["stale_ttl_hours"]) * 3600
+        self.variants = variants or LLM_CACHE_CONFIG["variants"]
+        self.temperature_step = temperature_step or LLM_CACHE_CONFIG["temperature_step"]
+        self.max_keys = max_keys or LLM_CACHE_CONFIG["max_keys"]
+        self.persist = persist if persist is not None else LLM_CACHE_CONFIG["persist"]
+        self.path = path or LLM_CACHE_CONFIG["path"]
+        self.enabled = LLM_CACHE_CONFIG["enabled"]
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'stored': 0}
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    def make_key(self, prompt: str, model: str, temperature: Optional[float] = None,
+                 generation_config: Dict[str, Any] = None) -> str:
+        """正規化したプロンプト・モデル名・temperature の区分（・生成設定）からキーを作る"""
+        if temperature is None:
+            bucket = 'default'
+        else:
+            bucket = f"{round(temperature / self.temperature_step) * self.temperature_step:.2f}"
+        parts = [model, bucket, normalize_prompt(prompt)]
+        if generation_config:
+            # スキーマに型オブジェクトが入る場合もあるため JSON にできない値は repr で表す
+            parts.append(json.dumps(generation_config, sort_keys=True, ensure_ascii=False, default=repr))
+        raw = '\x1f'.join(parts)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[str]:
+        """保持している生成結果を順番に1つ返す
+
+        通常は ttl 内の生成結果が variants 件揃っている場合のみ返す（揃うまでは None でAPIに生成させる）。
+        allow_stale=True（使用制限中など）は stale_ttl 内の生成結果が1件でもあれば返す
+        """
+        if not self.enabled:
+            return None
+        entry = await self._entry(key)
+        now = time.time()
+        max_age = self.stale_ttl if allow_stale else self.ttl
+        usable = [text for created, text in entry.variants if now - created <= max_age] if entry else []
+        if not usable or (not allow_stale and len(usable) < self.variants):
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['stale_hits' if allow_stale else 'hits'] += 1
+        text = usable[entry.cursor % len(usable)]
+        entry.cursor += 1
+        return text
+
+    async def put(self, key: str, text: str):
+        """生成結果を追加（variants 件を超えたら古いものから捨てる）"""
+        if not self.enabled or not text:
+            return
+        entry = await self._entry(key) or _Entry()
+        created = time.time()
+        entry.variants = [(at, value) for at, value in entry.variants if created - at <= self.stale_ttl]
+        entry.variants.append((created, text))
+        del entry.variants[:-self.variants]
+        self._remember(key, entry)
+        self.stats['stored'] += 1
+        if self.persist:
+            await asyncio.to_thread(self._store, key, entry.variants)
+
+    # ------------------------------------------------------------------
+    # メモリ（LRU）
+    # ------------------------------------------------------------------
+    async def _entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if not self.persist:
+            return None
+        variants = await asyncio.to_thread(self._load, key)
+        if not variants:
+            return None
+        entry = _Entry(variants)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS llm_responses (
+                            cache_key TEXT NOT NULL,
+                            created REAL NOT NULL,
+                            response TEXT NOT NULL
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_key '
+                                 'ON llm_responses(cache_key, created)')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_created '
+                                 'ON llm_responses(created)')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _load(self, key: str) -> List[Tuple[float, str]]:
+        conn = self._connect()
+        with self._db_lock:
+            return conn.execute(
+                'SELECT created, response FROM llm_responses WHERE cache_key = ? AND created >= ? '
+                'ORDER BY created', (key, time.time() - self.stale_ttl)
+            ).fetchall()
+
+    def _store(self, key: str, variants: List[Tuple[float, str]]):
+        conn = self._connect()
+        with self._db_lock:
+            conn.execute('DELETE FROM llm_responses WHERE cache_key = ?', (key,))
+            conn.executemany('INSERT INTO llm_responses (cache_key, created, response) VALUES (?, ?, ?)',
+                             [(key, created, text) for created, text in variants])
+            # 使用制限中にも使わない古さになった生成結果を削除
+            conn.execute('DELETE FROM llm_responses WHERE created < ?', (time.time() - self.stale_ttl,))
+            conn.commit()
+
+
+# 全ての GeminiChat で共有するインスタンス
+llm_response_cache = LLMResponseCache()
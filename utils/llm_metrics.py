@@ -0,0 +1,211 @@
+# -*- coding:utf-8 -*-
+"""
+LLM Metrics
+モデル呼び出し1回ごとの記録（機能・トークン数・所要時間・キャッシュ利用・エラー種別）を集計する
+
+- GeminiChat がモデル呼び出し・応答キャッシュの利用のたびに record する（機能は feature で区別）
+- 起動してからの合計は機能ごとにメモリで集計し、所要時間は直近 latency_samples 件から p50 / p95 を出す
+- 1回ごとの記録はメモリに溜めて flush でまとめてSQLiteに書き出す（/llm_usage で期間を指定して集計できる）。
+  retention_days を過ぎた記録は削除する
+- トークン数はAPIの usage_metadata を使い、返ってこない場合は文字数からの目安（estimate_tokens）
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import LLM_METRICS_CONFIG
+
+# 機能の区分（GeminiChat の feature 引数）
+FEATURE_MENTION_CHAT = 'mention_chat'                      # メンションへの返信
+FEATURE_CHARACTER_CONVERSATION = 'character_conversation'  # AIキャラクターの会話・リプライ
+FEATURE_CHANNEL_INTRO = 'channel_intro'                    # チャンネル紹介のトーク
+FEATURE_ANNOUNCEMENT_FEEDBACK = 'announcement_feedback'    # 告知へのフィードバック
+FEATURE_SESSION_SUMMARY = 'session_summary'                # 会話履歴の要約（メンションの返信の裏方）
+FEATURE_OTHER = 'other'
+
+# (時刻, 機能, 所要時間, 入力トークン, 出力トークン, キャッシュ利用, エラー種別)
+_Call = Tuple[float, str, float, int, int, bool, Optional[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の目安（日本語はおおよそ1文字1トークン強、英数字は4文字で1トークン）"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return max(1, (len(text) - ascii_chars) + ascii_chars // 4)
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class _FeatureStats:
+    """1機能分の集計"""
+
+    __slots__ = ('calls', 'cache_hits', 'errors', 'error_classes', 'prompt_tokens', 'completion_tokens',
+                 'latencies')
+
+    def __init__(self, samples: int):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.error_classes: Dict[str, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=samples)  # モデルを呼んだ分の所要時間（キャッシュ利用は含めない）
+
+    def add(self, latency: float, prompt_tokens: int, completion_tokens: int, cache_hit: bool,
+            error: Optional[str]):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if cache_hit:
+            self.cache_hits += 1
+        else:
+            self.latencies.append(latency)
+        if error:
+            self.errors += 1
+            self.error_classes[error] = self.error_classes.get(error, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'errors': self.errors,
+            'error_classes': dict(self.error_classes),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+        }
+
+
+class LLMMetrics:
+    """機能ごとのモデル呼び出しの集計（メモリ）と記録の書き出し（SQLite）"""
+
+    def __init__(self, persist: bool = None, path: str = None, latency_samples: int = None,
+                 retention_days: float = None, max_pending: int = None):
+        self.persist = persist if persist is not None else LLM_METRICS_CONFIG["persist"]
+        self.path = path or LLM_METRICS_CONFIG["path"]
+        self.latency_samples = latency_samples or LLM_METRICS_CONFIG["latency_samples"]
+        self.retention = (retention_days or LLM_METRICS_CONFIG["retention_days"]) * 86400
+        self.max_pending = max_pending or LLM_METRICS_CONFIG["max_pending"]
+        self.enabled = LLM_METRICS_CONFIG["enabled"]
+        self.started = time.time()
+
+        self._features: Dict[str, _FeatureStats] = {}
+        self._pending: List[_Call] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.stats = {'recorded': 0, 'flushed': 0, 'dropped': 0}
+
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+    def record(self, feature: str, latency: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+               cache_hit: bool = False, error: Optional[str] = None):
+        """モデル呼び出し（またはキャッシュの利用）1回分を記録する。error はエラーの種別（クラス名）"""
+        if not self.enabled:
+            return
+        stats = self._features.get(feature)
+        if stats is None:
+            stats = self._features[feature] = _FeatureStats(self.latency_samples)
+        stats.add(latency, prompt_tokens, completion_tokens, cache_hit, error)
+        self.stats['recorded'] += 1
+        if self.persist:
+            self._pending.append((time.time(), feature, latency, prompt_tokens, completion_tokens, cache_hit, error))
+            # 書き出せない状態が続いてもメモリを使い切らないよう古いものから捨てる
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.stats['dropped'] += overflow
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """起動してからの機能ごとの集計（所要時間は直近 latency_samples 件）"""
+        return {feature: stats.summary() for feature, stats in sorted(self._features.items())}
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    async def flush(self) -> int:
+        """溜まった記録を書き出して件数を返す（失敗したら戻して次回に回す）"""
+        if not self.persist or not self._pending:
+            return 0
+        calls, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._store, calls)
+        except Exception as e:
+            print(f"LLM利用状況の書き出しに失敗しました: {e}")
+            self._pending = calls + self._pending
+            return 0
+        self.stats['flushed'] += len(calls)
+        return len(calls)
+
+    async def summary_since(self, hours: float) -> Dict[str, Dict[str, Any]]:
+        """直近 hours 時間の機能ごとの集計（書き出した記録から。未書き出しの分は先に書き出す）"""
+        if not self.persist:
+            return self.summary()
+        await self.flush()
+        rows = await asyncio.to_thread(self._load, time.time() - hours * 3600)
+        features: Dict[str, _FeatureStats] = {}
+        for feature, latency, prompt_tokens, completion_tokens, cache_hit, error in rows:
+            stats = features.get(feature)
+            if stats is None:
+                stats = features[feature] = _FeatureStats(len(rows))
+            stats.add(latency, prompt_tokens, completion_tokens, bool(cache_hit), error)
+        return {feature: stats.summary() for feature, stats in sorted(features.items())}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS llm_calls (
+                            created REAL NOT NULL,
+                            feature TEXT NOT NULL,
+                            latency REAL NOT NULL,
+                            prompt_tokens INTEGER NOT NULL,
+                            completion_tokens INTEGER NOT NULL,
+                            cache_hit INTEGER NOT NULL,
+                            error TEXT
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_calls_created ON llm_calls(created)')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _store(self, calls: List[_Call]):
+        conn = self._connect()
+        with self._db_lock:
+            conn.executemany('INSERT INTO llm_calls (created, feature, latency, prompt_tokens, completion_tokens, '
+                             'cache_hit, error) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             [(created, feature, latency, prompt_tokens, completion_tokens, int(cache_hit), error)
+                              for created, feature, latency, prompt_tokens, completion_tokens, cache_hit, error
+                              in calls])
+            conn.execute('DELETE FROM llm_calls WHERE created < ?', (time.time() - self.retention,))
+            conn.commit()
+
+    def _load(self, since: float) -> List[Tuple[str, float, int, int, int, Optional[str]]]:
+        conn = self._connect()
+        with self._db_lock:
+            return conn.execute(
+                'SELECT feature, latency, prompt_tokens, completion_tokens, cache_hit, error FROM llm_calls '
+                'WHERE created >= ?', (since,)
+            ).fetchall()
+
+
+# 全ての GeminiChat で共有するインスタンス
+llm_metrics = LLMMetrics()
@@ -0,0 +1,192 @@
+# -*- coding:utf-8 -*-
+"""
+LLM Scheduler
+LLM（Gemini）APIへのリクエストを優先度つきで送り出す共通スケジューラー
+
+- APIのクォータに合わせたトークンバケット（回/分とバースト）で送信ペースを調整
+- 同時に応答待ちできる呼び出し数を上限で制限
+- 待ち行列は優先度順（ユーザーへの返信 PRIORITY_INTERACTIVE がキャラクター会話などの
+  PRIORITY_BACKGROUND より先）、同じ優先度の中は到着順
+- 429 応答を受けたら送信を止め（連続するたびに待機を倍に）、送信レートも下げる。
+  成功が続けば少しずつ元のレートに戻す
+- 待ち行列の長さ・待ち時間（平均 / p95 / 最大）を stats() で取得できる
+- 全機能で共有するインスタンス llm_scheduler は GeminiChat の既定スケジューラー
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from config.config import LLM_SCHEDULER_CONFIG
+
+# 優先度（値が小さいほど先に送る）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'}
+
+
+class LLMScheduler:
+    """トークンバケット・同時実行数・優先度でLLMリクエストを送り出すスケジューラー"""
+
+    def __init__(self, requests_per_minute: float = None, burst: int = None, max_concurrency: int = None,
+                 backoff_base: float = None, backoff_max: float = None, min_rate_factor: float = None,
+                 recovery_step: float = None, wait_samples: int = None):
+        requests_per_minute = (requests_per_minute if requests_per_minute is not None
+                               else LLM_SCHEDULER_CONFIG["requests_per_minute"])
+        self.rate = requests_per_minute / 60.0  # 回/秒（0以下は無制限）
+        self.burst = max(burst or LLM_SCHEDULER_CONFIG["burst"], 1)
+        self.max_concurrency = max_concurrency or LLM_SCHEDULER_CONFIG["max_concurrency"]
+        self.backoff_base = backoff_base or LLM_SCHEDULER_CONFIG["backoff_base"]
+        self.backoff_max = backoff_max or LLM_SCHEDULER_CONFIG["backoff_max"]
+        self.min_rate_factor = min_rate_factor or LLM_SCHEDULER_CONFIG["min_rate_factor"]
+        self.recovery_step = recovery_step or LLM_SCHEDULER_CONFIG["recovery_step"]
+
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.rate_factor = 1.0        # 429応答で下げた送信レートの割合
+        self.blocked_until = 0.0      # 429応答で送信を止めている期限
+        self.consecutive_limited = 0
+        self.in_flight = 0
+
+        # 待ち行列 (優先度, 到着順, 到着時刻, future)
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._wait_samples = wait_samples or LLM_SCHEDULER_CONFIG["wait_samples"]
+        self._wait_times: Dict[int, deque] = {
+            priority: deque(maxlen=self._wait_samples) for priority in PRIORITY_NAMES
+        }
+        self.counters = {'granted': 0, 'rate_limited': 0, 'cancelled': 0}
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_BACKGROUND):
+        """送信枠を確保してから本体を実行（抜けると枠を返す）"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND):
+        """優先度順に送信枠が空くまで待機"""
+        future = asyncio.get_running_loop().create_future()
+        arrived = time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), arrived, future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 枠を受け取った直後にキャンセルされた場合は返却する
+                self.release()
+            else:
+                self.counters['cancelled'] += 1
+            raise
+        self._wait_times.setdefault(priority, deque(maxlen=self._wait_samples)).append(time.monotonic() - arrived)
+
+    def release(self):
+        """送信枠を返して次の待機者を送り出す"""
+        self.in_flight = max(self.in_flight - 1, 0)
+        self._dispatch()
+
+    def report_success(self):
+        """成功した応答を反映（429後に下げた送信レートを少し戻す）"""
+        self.consecutive_limited = 0
+        if self.rate_factor < 1.0:
+            self.rate_factor = min(1.0, self.rate_factor + self.recovery_step)
+
+    def report_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """429応答を反映（送信を止めて送信レートを下げる）。待機秒数を返す"""
+        self.counters['rate_limited'] += 1
+        self.consecutive_limited += 1
+        self.rate_factor = max(self.min_rate_factor, self.rate_factor / 2)
+        if retry_after is None:
+            retry_after = self.backoff_base * (2 ** (self.consecutive_limited - 1))
+            # 同時に待っていた呼び出しが一斉に再開しないよう少しずらす
+            retry_after *= random.uniform(1.0, 1.2)
+        delay = min(retry_after, self.backoff_max)
+
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        # 停止が明けてからトークンを貯め直す
+        self.tokens = 0.0
+        self.updated = self.blocked_until
+        print(f"LLM APIから429応答: {delay:.0f}秒待機します（送信レート {self.rate_factor:.0%}）")
+        self._dispatch()
+        return delay
+
+    def queue_depth(self, priority: Optional[int] = None) -> int:
+        """待ち行列の長さ（priority を指定するとその優先度のみ）"""
+        return sum(1 for waiter in self._waiters
+                   if not waiter[3].done() and (priority is None or waiter[0] == priority))
+
+    def stats(self) -> Dict:
+        """待ち行列の長さと優先度ごとの待ち時間（秒）"""
+        wait = {}
+        for priority, samples in self._wait_times.items():
+            ordered = sorted(samples)
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            wait[name] = {
+                'queued': self.queue_depth(priority),
+                'count': len(ordered),
+                'avg': sum(ordered) / len(ordered) if ordered else 0.0,
+                'p95': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] if ordered else 0.0,
+                'max': ordered[-1] if ordered else 0.0
+            }
+        return {
+            'queue_depth': self.queue_depth(),
+            'in_flight': self.in_flight,
+            'rate_factor': self.rate_factor,
+            'blocked_for': max(self.blocked_until - time.monotonic(), 0.0),
+            'wait': wait,
+            **self.counters
+        }
+
+    def _dispatch(self):
+        """空いている枠とトークンの分だけ、優先度の高い待機者から送り出す"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters:
+            if self._waiters[0][3].done():
+                heapq.heappop(self._waiters)  # キャンセル済み
+                continue
+            if self.in_flight >= self.max_concurrency:
+                return  # release() で再開
+
+            now = time.monotonic()
+            delay = self._token_delay(now)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            *_, future = heapq.heappop(self._waiters)
+            if self.rate > 0:
+                self.tokens -= 1
+            self.in_flight += 1
+            self.counters['granted'] += 1
+            future.set_result(None)
+
+    def _token_delay(self, now: float) -> float:
+        """次のトークンが使えるまでの秒数（0なら今すぐ送れる）"""
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.rate <= 0:
+            return 0.0
+        rate = self.rate * self.rate_factor
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+# 全てのLLM呼び出しで共有するインスタンス（main のメンション返信・キャラクター会話・チャンネル紹介など）
+llm_scheduler = LLMScheduler()
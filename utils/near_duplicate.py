@@ -0,0 +1,179 @@
+# -*- coding:utf-8 -*-
+"""
+Near Duplicate Detector
+トレンド記事の重複・類似記事の除去
+
+- URL正規化: トラッキング用クエリ（utm_* など）・フラグメントの除去、
+  Google News / はてなブックマークのリダイレクトURLから元記事URLを復元
+- タイトル類似判定: 文字n-gramシングル → MinHash署名 → LSHバンディングで候補を絞り、
+  候補だけ実際のJaccard類似度で判定（全件総当たりせずほぼ線形時間、日本語タイトルにも対応）
+"""
+
+import base64
+import hashlib
+import re
+import struct
+import unicodedata
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse, urlunparse
+
+from config.config import DEDUP_CONFIG
+
+# blake2b 1回（64バイト）で得られる32bitハッシュ値の数
+_HASHES_PER_DIGEST = 16
+
+_EMBEDDED_URL = re.compile(rb'https?://[\x21-\x7e]+')
+_TRACKING_PARAMS = frozenset(param.lower() for param in DEDUP_CONFIG["tracking_params"])
+
+
+def _decode_google_news_id(article_id: str) -> Optional[str]:
+    """Google News の記事ID（base64のprotobuf）に埋め込まれた元URLを取り出す"""
+    try:
+        raw = base64.urlsafe_b64decode(article_id + '=' * (-len(article_id) % 4))
+    except (ValueError, TypeError):
+        return None
+    match = _EMBEDDED_URL.search(raw)
+    if not match:
+        return None
+    # protobufの後続フィールド（0x80以上や制御文字）は正規表現で切れる
+    return match.group(0).decode('ascii', errors='ignore')
+
+
+def canonicalize_url(url: str) -> str:
+    """重複判定用にURLを正規化（元記事URLの復元・トラッキングパラメータ除去）"""
+    if not url:
+        return ''
+    url = url.strip()
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+
+    # リダイレクト・中継URLから元記事URLを復元
+    if host == 'news.google.com' and '/articles/' in parsed.path:
+        article_id = parsed.path.rsplit('/articles/', 1)[1].split('/')[0]
+        original = _decode_google_news_id(article_id)
+        if original:
+            return canonicalize_url(original)
+        # 新形式のIDは元URLを含まないため、IDだけを残す
+        return f"https://news.google.com/articles/{article_id}"
+    if host in ('www.google.com', 'google.com', 'news.google.com') and parsed.path == '/url':
+        params = dict(parse_qsl(parsed.query))
+        target = params.get('url') or params.get('q')
+        if target:
+            return canonicalize_url(target)
+    if host == 'b.hatena.ne.jp' and parsed.path.startswith('/entry/'):
+        rest = parsed.path[len('/entry/'):]
+        if rest.startswith('s/'):
+            return canonicalize_url('https://' + rest[2:])
+        if not rest.isdigit():
+            return canonicalize_url('http://' + unquote(rest))
+
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if parsed.port and parsed.port not in (80, 443):
+        netloc += f":{parsed.port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in _TRACKING_PARAMS
+    ]
+    path = parsed.path.rstrip('/') or '/'
+    # http/https の違いは同一記事として扱う
+    return urlunparse(('https', netloc, path, '', urlencode(sorted(query)), ''))
+
+
+def normalize_title(title: str) -> str:
+    """類似判定用にタイトルを正規化（全角半角統一・小文字化・記号と空白の除去）"""
+    title = unicodedata.normalize('NFKC', title or '').lower()
+    return ''.join(ch for ch in title if ch.isalnum())
+
+
+class NearDuplicateDetector:
+    """MinHash + LSH による類似タイトル検出器"""
+
+    def __init__(self, threshold: float = None, ngram: int = None, num_perm: int = None, seed: int = 1):
+        self.threshold = threshold if threshold is not None else DEDUP_CONFIG["threshold"]
+        self.ngram = ngram or DEDUP_CONFIG["ngram"]
+        num_perm = num_perm or DEDUP_CONFIG["num_perm"]
+        # 署名長は16の倍数に切り上げ（ハッシュ関数は塩を変えたblake2bで16個ずつ生成）
+        self.num_perm = -(-num_perm // _HASHES_PER_DIGEST) * _HASHES_PER_DIGEST
+        self.bands, self.rows = self.choose_bands(self.num_perm, self.threshold)
+        self._salts = [
+            f"{seed}:{block}".encode('ascii')[:16]
+            for block in range(self.num_perm // _HASHES_PER_DIGEST)
+        ]
+        self._unpack = struct.Struct(f"<{self.num_perm}I").unpack
+
+    @staticmethod
+    def choose_bands(num_perm: int, threshold: float, recall: float = 0.95) -> tuple:
+        """しきい値ちょうどの類似度を recall 以上の確率で候補に拾える中で最も選択的な (バンド数, 行数)"""
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            if 1 - (1 - threshold ** rows) ** bands >= recall:
+                best = (bands, rows)
+        return best
+
+    def shingles(self, title: str) -> Set[str]:
+        """正規化したタイトルの文字n-gram集合"""
+        text = normalize_title(title)
+        if len(text) <= self.ngram:
+            return {text} if text else set()
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, shingles: Set[str]) -> List[int]:
+        """MinHash署名（num_perm 個の独立なハッシュ関数それぞれの最小値）"""
+        blake2b = hashlib.blake2b
+        salts = self._salts
+        rows = [
+            self._unpack(b''.join(blake2b(data, salt=salt).digest() for salt in salts))
+            for data in (shingle.encode('utf-8') for shingle in shingles)
+        ]
+        return [min(column) for column in zip(*rows)]
+
+    def dedupe(self, items: List, title_of: Callable, url_of: Callable) -> List:
+        """URL一致またはタイトル類似の記事を除去（先に出現したものを残す）"""
+        seen_urls: Set[str] = set()
+        buckets: List[Dict[tuple, List[int]]] = [{} for _ in range(self.bands)]
+        kept_shingles: List[Set[str]] = []
+        unique_items = []
+
+        for item in items:
+            url = canonicalize_url(url_of(item) or '')
+            if url and url in seen_urls:
+                continue
+
+            shingles = self.shingles(title_of(item) or '')
+            band_keys = []
+            if shingles:
+                signature = self.signature(shingles)
+                band_keys = [tuple(signature[band * self.rows:(band + 1) * self.rows])
+                             for band in range(self.bands)]
+                candidates = set()
+                for band, key in enumerate(band_keys):
+                    candidates.update(buckets[band].get(key, ()))
+                if any(self._jaccard(shingles, kept_shingles[index]) >= self.threshold
+                       for index in candidates):
+                    continue
+
+            index = len(kept_shingles)
+            kept_shingles.append(shingles)
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(index)
+            if url:
+                seen_urls.add(url)
+            unique_items.append(item)
+
+        return unique_items
+
+    @staticmethod
+    def _jaccard(a: Set[str], b: Set[str]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+
+# 各マネージャーで共有するインスタンス
+near_duplicate_detector = NearDuplicateDetector()
@@ -4,6 +4,8 @@ import datetime
 import json
 from typing import List, Dict
 from urllib.parse import quote
+from utils.feeds import parse_feed, clean_html
+from utils.http_cache import http_cache
 
 class NewsManager:
     def __init__(self):
@@ -58,71 +60,40 @@ class NewsManager:
         
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.get(
+                response = await http_cache.get(
+                    session,
                     url,
-                    timeout=aiohttp.ClientTimeout(total=10),
+                    timeout=10,
                     headers={'User-Agent': 'Mozilla/5.0 (compatible; DJEyes-Bot/1.0)'}
-                ) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        return self._parse_rss_content(content, max_articles)
-                    else:
-                        print(f"Google News API error: {response.status}")
-                        return []
+                )
+                if response.status == 200:
+                    content = response.text()
+                    return self._parse_rss_content(content, max_articles)
+                else:
+                    print(f"Google News API error: {response.status}")
+                    return []
         except Exception as e:
             print(f"Error fetching Google News: {e}")
             return []
     
     def _parse_rss_content(self, rss_content: str, max_articles: int) -> List[Dict]:
         """RSS XMLコンテンツをパース"""
-        import xml.etree.ElementTree as ET
-        
         articles = []
         try:
-            root = ET.fromstring(rss_content)
-            
-            # RSS 2.0形式のitem要素を探索
-            items = root.findall('.//item')[:max_articles]
-            
-            for item in items:
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pub_date_elem = item.find('pubDate')
-                description_elem = item.find('description')
-                
-                if title_elem is not None and link_elem is not None:
-                    article = {
-                        'title': title_elem.text or '',
-                        'url': link_elem.text or '',
-                        'pub_date': pub_date_elem.text if pub_date_elem is not None else '',
-                        'description': description_elem.text if description_elem is not None else ''
-                    }
-                    
-                    # HTMLタグを除去
-                    article['description'] = self._clean_html(article['description'])
-                    
-                    articles.append(article)
-                    
-        except ET.ParseError as e:
-            print(f"RSS parsing error: {e}")
+            for item in parse_feed(rss_content, limit=max_articles):
+                if item.title and item.link:
+                    articles.append({
+                        'title': item.title,
+                        'url': item.link,
+                        'pub_date': item.published,
+                        # HTMLタグを除去
+                        'description': clean_html(item.description, max_length=200)
+                    })
         except Exception as e:
             print(f"Error parsing RSS: {e}")
             
         return articles
     
-    def _clean_html(self, text: str) -> str:
-        """HTMLタグを除去"""
-        import re
-        if not text:
-            return ""
-        
-        # HTMLタグを除去
-        clean_text = re.sub(r'<[^>]+>', '', text)
-        # 余分な空白を整理
-        clean_text = ' '.join(clean_text.split())
-        
-        return clean_text[:200] + "..." if len(clean_text) > 200 else clean_text
-    
     def get_fallback_tech_news(self) -> List[Dict]:
         """フォールバック用のテックニュース"""
         today = datetime.datetime.now()
@@ -0,0 +1,194 @@
+# -*- coding:utf-8 -*-
+"""
+Peatix Parser
+Peatix検索結果ページからイベントカードだけを取り出すストリーミング抽出器
+
+- 文書全体の木は作らず、html.parser のトークン列を先頭から読みながら
+  カード候補（article / div / li）と必要な要素（見出し・イベントリンク・日時・会場）だけを記録する
+- カードは article 要素。article が無いページでは「/event/ へのリンクを直接含む最も近い div / li / article」
+- 必要件数の article カードが揃ったら残りのHTMLは読まない
+- 抽出結果は __slots__ のレコード（PeatixCard）
+"""
+
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# カード候補になる要素
+_CARD_TAGS = frozenset(('article', 'div', 'li'))
+
+# クラス名 -> 記録するフィールド（同じフィールドは優先度の小さいものを採用）
+_DATE_CLASSES = {'date': 1, 'schedule': 2, 'event-date': 3}
+_VENUE_CLASSES = {'venue': 0, 'location': 1, 'place': 2, 'event-venue': 3}
+
+# 一度に読み込む文字数（必要件数が揃ったかをこの単位で確認する）
+_CHUNK_SIZE = 16 * 1024
+
+
+class PeatixCard:
+    """イベントカード1件分の抽出結果"""
+
+    __slots__ = ('title', 'url', 'date_text', 'venue')
+
+    def __init__(self, title: str = '', url: str = '', date_text: str = '', venue: str = ''):
+        self.title = title
+        self.url = url
+        self.date_text = date_text
+        self.venue = venue
+
+    def __repr__(self):
+        return f"PeatixCard(title={self.title!r}, url={self.url!r})"
+
+
+class _Capture:
+    """取得中のテキスト（開始タグから対応する終了タグまで）"""
+
+    __slots__ = ('field', 'priority', 'tag', 'depth', 'href', 'parts')
+
+    def __init__(self, field: str, priority: int, tag: str, href: str = ''):
+        self.field = field
+        self.priority = priority
+        self.tag = tag
+        self.depth = 1
+        self.href = href
+        self.parts = []
+
+
+class _Frame:
+    """開いているカード候補要素"""
+
+    __slots__ = ('tag', 'seq', 'start', 'link_seq')
+
+    def __init__(self, tag: str, seq: int, start: int):
+        self.tag = tag
+        self.seq = seq       # 文書内で開いた順番
+        self.start = start   # この要素が開いた時点の captured の位置
+        self.link_seq = -1   # 直接含むイベントリンクの出現順（無ければ -1）
+
+
+class _CardTokenizer(HTMLParser):
+    """トークンを読みながらカード候補の範囲と必要な要素のテキストだけを記録"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.frames: List[_Frame] = []
+        self.captures: List[_Capture] = []
+        # 完了した取得結果 (field, priority, text, href)。カードは開始〜終了位置の範囲で参照する
+        self.captured: List[tuple] = []
+        self.articles: List[tuple] = []        # (seq, start, end)
+        self.link_parents: List[tuple] = []    # (link_seq, start, end)
+        self.frame_count = 0
+        self.link_count = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _CARD_TAGS:
+            self.frames.append(_Frame(tag, self.frame_count, len(self.captured)))
+            self.frame_count += 1
+
+        # 同じタグの入れ子を数える（対応する終了タグで取得を終える）
+        for capture in self.captures:
+            if capture.tag == tag:
+                capture.depth += 1
+
+        if tag in ('h2', 'h3'):
+            self.captures.append(_Capture('title', 0, tag))
+        elif tag == 'a':
+            href = next((value for name, value in attrs if name == 'href'), None) or ''
+            if '/event/' in href:
+                self.captures.append(_Capture('link', 0, tag, href))
+                if self.frames and self.frames[-1].link_seq < 0:
+                    self.frames[-1].link_seq = self.link_count
+                self.link_count += 1
+        elif tag == 'time':
+            self.captures.append(_Capture('date', 0, tag))
+
+        class_value = next((value for name, value in attrs if name == 'class'), None)
+        if class_value:
+            for name in class_value.split():
+                if name in _DATE_CLASSES:
+                    self.captures.append(_Capture('date', _DATE_CLASSES[name], tag))
+                elif name in _VENUE_CLASSES:
+                    self.captures.append(_Capture('venue', _VENUE_CLASSES[name], tag))
+
+    def handle_startendtag(self, tag, attrs):
+        # <div /> のような自己終了タグは開いて即閉じる
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.captures:
+            remaining = []
+            for capture in self.captures:
+                if capture.tag == tag:
+                    capture.depth -= 1
+                    if capture.depth == 0:
+                        self.captured.append((capture.field, capture.priority,
+                                              ''.join(capture.parts), capture.href))
+                        continue
+                remaining.append(capture)
+            self.captures = remaining
+
+        if tag in _CARD_TAGS:
+            # 閉じ忘れの要素はまとめて閉じる（対応する開始タグが無い終了タグは無視）
+            for index in range(len(self.frames) - 1, -1, -1):
+                if self.frames[index].tag == tag:
+                    for frame in reversed(self.frames[index:]):
+                        self._close(frame)
+                    del self.frames[index:]
+                    break
+
+    def handle_data(self, data):
+        if self.captures:
+            text = data.strip()
+            if text:
+                for capture in self.captures:
+                    capture.parts.append(text)
+
+    def _close(self, frame: _Frame):
+        end = len(self.captured)
+        if frame.tag == 'article':
+            self.articles.append((frame.seq, frame.start, end))
+        if frame.link_seq >= 0:
+            self.link_parents.append((frame.link_seq, frame.start, end))
+
+    def close(self):
+        super().close()
+        for frame in reversed(self.frames):
+            self._close(frame)
+        self.frames = []
+
+
+def _build_card(captured: List[tuple]) -> PeatixCard:
+    """カード範囲内の取得結果からレコードを作る（タイトルは見出し、無ければイベントリンクの文字列）"""
+    title = link_text = url = ''
+    date_text = venue = ''
+    date_priority = venue_priority = None
+    for field, priority, text, href in captured:
+        if field == 'title':
+            if not title:
+                title = text
+        elif field == 'link':
+            if not url:
+                url = href
+                link_text = text
+        elif field == 'date':
+            if date_priority is None or priority < date_priority:
+                date_text, date_priority = text, priority
+        elif field == 'venue':
+            if venue_priority is None or priority < venue_priority:
+                venue, venue_priority = text, priority
+    return PeatixCard(title or link_text, url, date_text, venue)
+
+
+def parse_peatix_cards(html: str, limit: Optional[int] = None) -> List[PeatixCard]:
+    """検索結果ページから先頭 limit 件のイベントカードを抽出"""
+    tokenizer = _CardTokenizer()
+    for offset in range(0, len(html), _CHUNK_SIZE):
+        tokenizer.feed(html[offset:offset + _CHUNK_SIZE])
+        if limit is not None and len(tokenizer.articles) >= limit:
+            break
+    else:
+        tokenizer.close()
+
+    # article が無いページはイベントリンクの出現順にその親要素をカードとする
+    spans = sorted(tokenizer.articles or tokenizer.link_parents)
+    return [_build_card(tokenizer.captured[start:end]) for _, start, end in spans[:limit]]
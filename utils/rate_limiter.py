@@ -0,0 +1,132 @@
+# -*- coding:utf-8 -*-
+"""
+Host Rate Limiter
+外部HTTPリクエストのホスト別ペース制御（トークンバケット）
+
+固定の asyncio.sleep() の代わりに、同一ホストへのリクエストのみを
+ホストごとのレート（回/秒）とバースト（連続で許可する回数）で間引く。
+異なるホストへのリクエストは並行に実行できる。
+
+- 429 / 503 応答を受けたら Retry-After（秒数またはHTTP日付。無ければ既定値）の間そのホストを止める
+- 全マネージャーで共有するインスタンス host_rate_limiter は http_cache.get の既定リミッター
+"""
+
+import asyncio
+import email.utils
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from config.config import HTTP_RATE_LIMIT_CONFIG
+
+# 待機を指示するステータス（Retry-After を解釈する）
+THROTTLE_STATUSES = (429, 503)
+
+
+class _Bucket:
+    """ホスト1つ分のトークンバケット"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'blocked_until', 'lock')
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class HostRateLimiter:
+    """ホスト単位のトークンバケットで流量を制御するリミッター"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None, default_rate: float = None,
+                 default_burst: int = None, default_retry_after: float = None,
+                 max_retry_after: float = None):
+        # ホスト名 -> {"rate": 回/秒, "burst": 回}
+        self.limits = dict(limits if limits is not None else HTTP_RATE_LIMIT_CONFIG["hosts"])
+        self.default_rate = (default_rate if default_rate is not None
+                             else HTTP_RATE_LIMIT_CONFIG["default_rate"])
+        self.default_burst = default_burst or HTTP_RATE_LIMIT_CONFIG["default_burst"]
+        self.default_retry_after = (default_retry_after if default_retry_after is not None
+                                    else HTTP_RATE_LIMIT_CONFIG["default_retry_after"])
+        self.max_retry_after = max_retry_after or HTTP_RATE_LIMIT_CONFIG["max_retry_after"]
+        self._buckets: Dict[str, _Bucket] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """URLからホスト名を取得"""
+        return (urlparse(url).hostname or '').lower()
+
+    def limit_for(self, host: str) -> tuple:
+        """ホストに適用する (レート, バースト) を取得（レート0以下は無制限）"""
+        limit = self.limits.get(host, {})
+        return limit.get('rate', self.default_rate), limit.get('burst', self.default_burst)
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket(*self.limit_for(host))
+        return bucket
+
+    async def wait(self, url: str):
+        """同一ホストのトークンが空くまで（429等で停止中ならその解除まで）待機"""
+        bucket = self._bucket(self.host_of(url))
+        if bucket.rate <= 0 and bucket.blocked_until <= time.monotonic():
+            return
+
+        async with bucket.lock:
+            while True:
+                now = time.monotonic()
+                if bucket.blocked_until > now:
+                    await asyncio.sleep(bucket.blocked_until - now)
+                    continue
+                if bucket.rate <= 0:
+                    return
+                bucket.refill(now)
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                await asyncio.sleep((1 - bucket.tokens) / bucket.rate)
+
+    def observe(self, url: str, status: int, headers=None) -> Optional[float]:
+        """応答ステータスを反映（429/503ならホストを止めて待機秒数を返す。それ以外は None）"""
+        if status not in THROTTLE_STATUSES:
+            return None
+        retry_after = self.parse_retry_after((headers or {}).get('Retry-After'))
+        if retry_after is None:
+            if status != 429:
+                return None  # Retry-After のない 503 は単なる障害として扱う
+            retry_after = self.default_retry_after
+        delay = min(retry_after, self.max_retry_after)
+
+        host = self.host_of(url)
+        bucket = self._bucket(host)
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+        bucket.tokens = 0.0
+        print(f"{host} から {status} 応答: {delay:.0f}秒待機します")
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After ヘッダー（秒数またはHTTP日付）を秒数に変換"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at is None:
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+# 全ての外部HTTPリクエストで共有するインスタンス
+host_rate_limiter = HostRateLimiter()
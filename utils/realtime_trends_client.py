@@ -19,13 +19,17 @@ Node.js版の高品質トレンド取得システムをPythonに移植
 import aiohttp
 import asyncio
 import json
-import xml.etree.ElementTree as ET
-import re
 from typing import List, Dict, Optional, Set
 from datetime import datetime, timedelta
 import random
 from dataclasses import dataclass
 from urllib.parse import quote
+from config.config import HACKER_NEWS_CONFIG
+from utils.feeds import parse_feed, strip_site_name
+from utils.hacker_news import hacker_news_fetcher
+from utils.http_cache import http_cache
+from utils.keyword_matcher import KeywordMatcher
+from utils.near_duplicate import near_duplicate_detector
 
 @dataclass
 class TrendItem:
@@ -52,6 +56,7 @@ class RealtimeTrendsClient:
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
         self.seen_urls: Set[str] = set()
+        self.hn_top_n = HACKER_NEWS_CONFIG["top_n"]
         
         # カテゴリ別キーワード辞書（Node.js版から移植）
         self.category_keywords = {
@@ -108,6 +113,7 @@ class RealtimeTrendsClient:
                 '読書', 'オンライン学習', 'MOOC', 'Udemy', 'Coursera'
             ]
         }
+        self.keyword_matcher = KeywordMatcher(self.category_keywords)
     
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
@@ -173,34 +179,31 @@ class RealtimeTrendsClient:
                 try:
                     print(f"📚 Zenn API取得中: {endpoint}")
                     
-                    async with self.session.get(endpoint) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            if data.get('articles'):
-                                for article in data['articles']:
-                                    # 品質フィルタを緩和: いいね20+またはいいね10+ AND コメント3+
-                                    liked_count = article.get('liked_count', 0)
-                                    comments_count = article.get('comments_count', 0)
-                                    
-                                    is_high_quality = (liked_count > 20 or 
-                                                     (liked_count > 10 and comments_count > 3))
-                                    
-                                    if is_high_quality:
-                                        trend_item = TrendItem(
-                                            id=f"zenn-{article.get('id')}",
-                                            title=article.get('title', ''),
-                                            url=f"https://zenn.dev{article.get('path', '')}",
-                                            likes=liked_count,
-                                            comments=comments_count,
-                                            source='Zenn API',
-                                            published_at=article.get('published_at', ''),
-                                            topics=[t.get('name', '') for t in article.get('topics', [])]
-                                        )
-                                        results.append(trend_item)
-                    
-                    # レート制限対策: 500ms待機
-                    await asyncio.sleep(0.5)
+                    response = await http_cache.get(self.session, endpoint)
+                    if response.status == 200:
+                        data = response.json()
+                        
+                        if data.get('articles'):
+                            for article in data['articles']:
+                                # 品質フィルタを緩和: いいね20+またはいいね10+ AND コメント3+
+                                liked_count = article.get('liked_count', 0)
+                                comments_count = article.get('comments_count', 0)
+                                
+                                is_high_quality = (liked_count > 20 or 
+                                                 (liked_count > 10 and comments_count > 3))
+                                
+                                if is_high_quality:
+                                    trend_item = TrendItem(
+                                        id=f"zenn-{article.get('id')}",
+                                        title=article.get('title', ''),
+                                        url=f"https://zenn.dev{article.get('path', '')}",
+                                        likes=liked_count,
+                                        comments=comments_count,
+                                        source='Zenn API',
+                                        published_at=article.get('published_at', ''),
+                                        topics=[t.get('name', '') for t in article.get('topics', [])]
+                                    )
+                                    results.append(trend_item)
                     
                 except Exception as endpoint_error:
                     print(f"❌ Zenn API エンドポイントエラー: {endpoint} - {endpoint_error}")
@@ -213,55 +216,34 @@ class RealtimeTrendsClient:
             return []
     
     async def get_hacker_news_trending(self) -> List[TrendItem]:
-        """Hacker News API - 高品質（30件取得、海外技術情報）"""
+        """Hacker News API - 高品質（上位N件を並行取得、海外技術情報）"""
         results = []
         
         try:
             print("🌍 Hacker News API取得開始")
             
-            # Step 1: トップストーリーIDを取得
-            top_stories_url = 'https://hacker-news.firebaseio.com/v0/topstories.json'
-            async with self.session.get(top_stories_url) as response:
-                if response.status != 200:
-                    raise Exception(f"Top stories取得失敗: {response.status}")
-                
-                top_stories = await response.json()
-                if not isinstance(top_stories, list):
-                    raise Exception('Invalid top stories format')
+            # トップストーリー上位N件を並行取得（記事詳細はTTLキャッシュ付き）
+            items = await hacker_news_fetcher.get_top_items(self.session, top_n=self.hn_top_n)
             
-            # Step 2: 上位30件の個別記事を取得
-            for story_id in top_stories[:30]:
-                try:
-                    item_url = f'https://hacker-news.firebaseio.com/v0/item/{story_id}.json'
-                    async with self.session.get(item_url) as item_response:
-                        if item_response.status == 200:
-                            item = await item_response.json()
-                            
-                            # 品質フィルタ: スコア50+、タイトルあり、URLあり
-                            if (item.get('type') == 'story' and 
-                                item.get('score', 0) > 50 and
-                                item.get('title') and 
-                                item.get('url')):
-                                
-                                trend_item = TrendItem(
-                                    id=f"hn-{story_id}",
-                                    title=item.get('title', ''),
-                                    url=item.get('url', ''),
-                                    score=item.get('score', 0),
-                                    comments=item.get('descendants', 0),
-                                    source='Hacker News',
-                                    published_at=datetime.fromtimestamp(
-                                        item.get('time', 0)
-                                    ).isoformat() + 'Z'
-                                )
-                                results.append(trend_item)
-                    
-                    # API制限対策
-                    await asyncio.sleep(0.1)
+            for item in items:
+                # 品質フィルタ: スコア50+、タイトルあり、URLあり
+                if (item.get('type') == 'story' and 
+                    item.get('score', 0) > 50 and
+                    item.get('title') and 
+                    item.get('url')):
                     
-                except Exception as item_error:
-                    print(f"⚠️ HN item取得エラー: {story_id} - {item_error}")
-                    continue
+                    trend_item = TrendItem(
+                        id=f"hn-{item.get('id')}",
+                        title=item.get('title', ''),
+                        url=item.get('url', ''),
+                        score=item.get('score', 0),
+                        comments=item.get('descendants', 0),
+                        source='Hacker News',
+                        published_at=datetime.fromtimestamp(
+                            item.get('time', 0)
+                        ).isoformat() + 'Z'
+                    )
+                    results.append(trend_item)
             
             print(f"✅ Hacker News取得完了: {len(results)}件")
             return results
@@ -287,7 +269,6 @@ class RealtimeTrendsClient:
             for keyword in web_keywords:
                 google_trends = await self._get_google_news_by_keyword(keyword, 'ウェブ開発')
                 results.extend(google_trends)
-                await asyncio.sleep(1)  # レート制限
             
             print(f"✅ ウェブ開発記事取得完了: {len(results)}件")
             return results
@@ -311,7 +292,6 @@ class RealtimeTrendsClient:
                 print(f"💼 ビジネス記事検索中: {keyword}")
                 google_trends = await self._get_google_news_by_keyword(keyword, 'ビジネス')
                 results.extend(google_trends)
-                await asyncio.sleep(1)
             
             print(f"✅ ビジネス記事取得完了: {len(results)}件")
             return results
@@ -335,7 +315,6 @@ class RealtimeTrendsClient:
                 print(f"💻 プログラミング記事検索中: {keyword}")
                 google_trends = await self._get_google_news_by_keyword(keyword, 'プログラミング')
                 results.extend(google_trends)
-                await asyncio.sleep(1)
             
             print(f"✅ プログラミング記事取得完了: {len(results)}件")
             return results
@@ -359,7 +338,6 @@ class RealtimeTrendsClient:
                 print(f"📊 データサイエンス記事検索中: {keyword}")
                 google_trends = await self._get_google_news_by_keyword(keyword, 'データサイエンス')
                 results.extend(google_trends)
-                await asyncio.sleep(1)
             
             print(f"✅ データサイエンス記事取得完了: {len(results)}件")
             return results
@@ -379,7 +357,6 @@ class RealtimeTrendsClient:
             for keyword in ai_keywords:
                 google_trends = await self._get_google_news_by_keyword(keyword, '生成AI')
                 results.extend(google_trends)
-                await asyncio.sleep(1)
             
             print(f"✅ 生成AI専門情報: {len(results)}件取得")
             return results
@@ -394,26 +371,26 @@ class RealtimeTrendsClient:
         
         try:
             endpoint = 'https://zenn.dev/api/articles?order=liked_count&count=100'
-            async with self.session.get(endpoint) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    if data.get('articles'):
-                        for article in data['articles']:
-                            title = article.get('title', '').lower()
-                            if any(kw in title for kw in ['react', 'vue', 'javascript', 'web', 'frontend']):
-                                if article.get('liked_count', 0) > 10:
-                                    trend_item = TrendItem(
-                                        id=f"zenn-web-{article.get('id')}",
-                                        title=article.get('title', ''),
-                                        url=f"https://zenn.dev{article.get('path', '')}",
-                                        likes=article.get('liked_count', 0),
-                                        comments=article.get('comments_count', 0),
-                                        source='Zenn API',
-                                        published_at=article.get('published_at', ''),
-                                        topics=[t.get('name', '') for t in article.get('topics', [])]
-                                    )
-                                    results.append(trend_item)
+            response = await http_cache.get(self.session, endpoint)
+            if response.status == 200:
+                data = response.json()
+                
+                if data.get('articles'):
+                    for article in data['articles']:
+                        title = article.get('title', '').lower()
+                        if any(kw in title for kw in ['react', 'vue', 'javascript', 'web', 'frontend']):
+                            if article.get('liked_count', 0) > 10:
+                                trend_item = TrendItem(
+                                    id=f"zenn-web-{article.get('id')}",
+                                    title=article.get('title', ''),
+                                    url=f"https://zenn.dev{article.get('path', '')}",
+                                    likes=article.get('liked_count', 0),
+                                    comments=article.get('comments_count', 0),
+                                    source='Zenn API',
+                                    published_at=article.get('published_at', ''),
+                                    topics=[t.get('name', '') for t in article.get('topics', [])]
+                                )
+                                results.append(trend_item)
             
             print(f"📚 Zenn記事フィルタリング: {len(results)}件の{filter_keyword}記事を抽出")
             
@@ -430,55 +407,39 @@ class RealtimeTrendsClient:
             print(f"🔍 Google News検索中: {keyword}")
             rss_url = f"https://news.google.com/rss/search?q={quote(keyword)}&hl=ja&gl=JP&ceid=JP:ja"
             
-            async with self.session.get(rss_url) as response:
-                if response.status == 200:
-                    rss_text = await response.text()
-                    items = self._parse_rss_feed(rss_text)
-                    
-                    for i, item in enumerate(items[:5]):  # 各キーワードから5件まで
-                        trend_item = TrendItem(
-                            id=f"google-{category.lower()}-{hash(keyword + str(i))}",
-                            title=item.get('title', ''),
-                            url=item.get('link', ''),
-                            source=f'Google News ({category})',
-                            published_at=item.get('pubDate', ''),
-                            topics=[keyword],
-                            description=self._clean_description(item.get('title', ''))
-                        )
-                        results.append(trend_item)
+            response = await http_cache.get(self.session, rss_url)
+            if response.status == 200:
+                rss_text = response.text()
+                items = self._parse_rss_feed(rss_text, limit=5)  # 各キーワードから5件まで
+                
+                for i, item in enumerate(items):
+                    trend_item = TrendItem(
+                        id=f"google-{category.lower()}-{hash(keyword + str(i))}",
+                        title=item.get('title', ''),
+                        url=item.get('link', ''),
+                        source=f'Google News ({category})',
+                        published_at=item.get('pubDate', ''),
+                        topics=[keyword],
+                        description=self._clean_description(item.get('title', ''))
+                    )
+                    results.append(trend_item)
         
         except Exception as error:
             print(f"❌ Google News検索エラー ({keyword}): {error}")
         
         return results
     
-    def _parse_rss_feed(self, rss_text: str) -> List[Dict]:
+    def _parse_rss_feed(self, rss_text: str, limit: Optional[int] = None) -> List[Dict]:
         """RSS XMLパース"""
-        items = []
-        
-        try:
-            root = ET.fromstring(rss_text)
-            for item in root.findall('.//item'):
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pub_date_elem = item.find('pubDate')
-                
-                if title_elem is not None:
-                    items.append({
-                        'title': title_elem.text or '',
-                        'link': link_elem.text if link_elem is not None else '',
-                        'pubDate': pub_date_elem.text if pub_date_elem is not None else ''
-                    })
-        
-        except ET.ParseError as e:
-            print(f"❌ RSS解析エラー: {e}")
-        
-        return items
+        return [
+            {'title': item.title, 'link': item.link, 'pubDate': item.published}
+            for item in parse_feed(rss_text, limit=limit)
+        ]
     
     def _clean_description(self, text: str) -> str:
         """説明文をクリーニング"""
         # サイト名部分を除去
-        clean_text = re.sub(r'\s*-\s*[^-]*$', '', text)
+        clean_text = strip_site_name(text)
         
         # 長すぎる場合は切り詰め
         if len(clean_text) > 100:
@@ -487,35 +448,8 @@ class RealtimeTrendsClient:
         return clean_text
     
     def _remove_duplicates(self, trends: List[TrendItem]) -> List[TrendItem]:
-        """重複除去（URL、タイトル類似度ベース）"""
-        unique_trends = []
-        seen_urls = set()
-        seen_titles = set()
-        
-        for trend in trends:
-            # URL重複チェック
-            if trend.url and trend.url in seen_urls:
-                continue
-            
-            # タイトル類似度チェック（簡易版）
-            title_lower = trend.title.lower()
-            title_words = set(title_lower.split())
-            
-            is_similar = False
-            for seen_title in seen_titles:
-                seen_words = set(seen_title.split())
-                # 単語の一致率が80%以上なら類似とみなす
-                if len(title_words & seen_words) / max(len(title_words), len(seen_words)) > 0.8:
-                    is_similar = True
-                    break
-            
-            if not is_similar:
-                unique_trends.append(trend)
-                if trend.url:
-                    seen_urls.add(trend.url)
-                seen_titles.add(title_lower)
-        
-        return unique_trends
+        """重複除去（正規化URLの一致、タイトルの類似度ベース）"""
+        return near_duplicate_detector.dedupe(trends, lambda trend: trend.title, lambda trend: trend.url)
     
     def categorize_trends(self, trends: List[TrendItem]) -> Dict[str, List[TrendItem]]:
         """トレンドをカテゴリ別に分類"""
@@ -523,19 +457,11 @@ class RealtimeTrendsClient:
         categorized['週間総合'] = []
         
         for trend in trends:
-            title_text = trend.title.lower()
-            description_text = trend.description.lower()
-            combined_text = f"{title_text} {description_text}"
-            
-            # カテゴリ判定
-            best_category = '週間総合'
-            max_matches = 0
-            
-            for category, keywords in self.category_keywords.items():
-                matches = sum(1 for keyword in keywords if keyword.lower() in combined_text)
-                if matches > max_matches:
-                    max_matches = matches
-                    best_category = category
+            combined_text = f"{trend.title} {trend.description}"
+            
+            # カテゴリ判定（ヒット数最大のカテゴリ）
+            best_category, _ = self.keyword_matcher.best_category(combined_text)
+            best_category = best_category or '週間総合'
             
             trend.category = best_category
             categorized[best_category].append(trend)
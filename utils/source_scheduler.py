@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+"""
+Source Scheduler
+複数のデータソース取得を並行実行するスケジューラー
+
+- 全ソースを同時に開始し、全体の締め切り（deadline）まで待つ
+- ソースごとのタイムアウト
+- 締め切りに間に合わなかったソースは打ち切り、完了分だけを返す
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+class SourceResult:
+    """1ソース分の実行結果"""
+
+    __slots__ = ('name', 'items', 'status', 'elapsed', 'error')
+
+    def __init__(self, name: str, items: List = None, status: str = 'ok',
+                 elapsed: float = 0.0, error: Optional[str] = None):
+        self.name = name
+        self.items = items if items is not None else []
+        self.status = status  # ok / timeout / deadline / error
+        self.elapsed = elapsed
+        self.error = error
+
+
+class SourceScheduler:
+    """データソースを並行取得し、締め切りまでに揃った結果を返す"""
+
+    def __init__(self, deadline: float = 60.0, default_timeout: float = 30.0,
+                 max_concurrency: Optional[int] = None):
+        self.deadline = deadline
+        self.default_timeout = default_timeout
+        self.max_concurrency = max_concurrency
+        self._sources: List[tuple] = []
+
+    def add(self, name: str, factory: Callable[[], Awaitable[List]], timeout: Optional[float] = None):
+        """ソースを登録（factoryは呼び出すたびに新しいコルーチンを返すこと）"""
+        self._sources.append((name, factory, timeout or self.default_timeout))
+
+    async def _run_one(self, name: str, factory, timeout: float,
+                       semaphore: Optional[asyncio.Semaphore], started: Dict[str, float]) -> SourceResult:
+        if semaphore is not None:
+            await semaphore.acquire()
+        started[name] = time.monotonic()
+        try:
+            items = await asyncio.wait_for(factory(), timeout=timeout)
+            return SourceResult(name, items or [], 'ok', time.monotonic() - started[name])
+        except asyncio.TimeoutError:
+            return SourceResult(name, [], 'timeout', time.monotonic() - started[name])
+        except Exception as e:
+            return SourceResult(name, [], 'error', time.monotonic() - started[name], str(e))
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def run(self) -> Dict[str, SourceResult]:
+        """登録済みソースを並行実行（結果は登録順のdict）"""
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        started: Dict[str, float] = {}
+        tasks = {
+            name: asyncio.ensure_future(self._run_one(name, factory, timeout, semaphore, started))
+            for name, factory, timeout in self._sources
+        }
+
+        begin = time.monotonic()
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=self.deadline)
+
+        results: Dict[str, SourceResult] = {}
+        for name, task in tasks.items():
+            if task.done() and not task.cancelled():
+                results[name] = task.result()
+            else:
+                task.cancel()
+                elapsed = time.monotonic() - started.get(name, begin)
+                results[name] = SourceResult(name, [], 'deadline', elapsed)
+
+        # キャンセルしたタスクの後始末を待つ
+        pending = [task for task in tasks.values() if not task.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return results
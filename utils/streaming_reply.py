@@ -0,0 +1,139 @@
+# -*- coding:utf-8 -*-
+"""
+Streaming Reply
+LLMの返信を生成された順にDiscordへ流す（仮メッセージを投稿して、まとめて編集していく）
+
+- single_send_window 秒以内に返信が揃えば、仮メッセージなしで1回だけ送る（短い返信）
+- 揃わなければ、その時点の途中の返信（無ければ仮メッセージ）を投稿し、以降は
+  edit_interval 秒に1回まで、溜まった断片をまとめて編集で反映する（編集のレート制限に収める）
+- 編集の応答待ちの間も断片の受信は止めない（待っている間に届いた断片は次の編集にまとめる）
+- 最初の断片が届くまでの時間（time to first token）・全体の時間・編集回数を記録する
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+
+import discord
+
+from config.config import STREAMING_REPLY_CONFIG
+
+
+def split_message(text: str, limit: int) -> List[str]:
+    """Discordの文字数上限で区切る"""
+    return [text[start:start + limit] for start in range(0, len(text), limit)] or ['']
+
+
+class StreamingReply:
+    """1件の返信をストリーミングで投稿する"""
+
+    def __init__(self, channel: discord.abc.Messageable, placeholder: str = None,
+                 single_send_window: float = None, edit_interval: float = None, max_chars: int = None):
+        self.channel = channel
+        self.placeholder = placeholder or STREAMING_REPLY_CONFIG["placeholder"]
+        self.single_send_window = (single_send_window if single_send_window is not None
+                                   else STREAMING_REPLY_CONFIG["single_send_window_seconds"])
+        self.edit_interval = (edit_interval if edit_interval is not None
+                              else STREAMING_REPLY_CONFIG["edit_interval_seconds"])
+        self.max_chars = max_chars or STREAMING_REPLY_CONFIG["max_message_chars"]
+
+        self.message: Optional[discord.Message] = None
+        self.text = ''
+        self.time_to_first_token: Optional[float] = None
+        self.total_time: Optional[float] = None
+        self.chunks = 0
+        self.edits = 0
+
+        self._shown = ''
+        self._last_edit = 0.0
+        self._edit_task: Optional[asyncio.Task] = None
+
+    async def run(self, chunks: AsyncIterator[str]) -> str:
+        """断片を受け取りながら投稿・編集し、最終的な返信の全文を返す"""
+        started = time.monotonic()
+        window_ends = started + self.single_send_window
+        iterator = chunks.__aiter__()
+        # 断片の待機はタスクにして、編集のタイミングが来ても受信を打ち切らない
+        pending = asyncio.ensure_future(iterator.__anext__())
+        try:
+            while True:
+                done, _ = await asyncio.wait({pending}, timeout=self._wait_timeout(window_ends))
+                if pending in done:
+                    try:
+                        chunk = pending.result()
+                    except StopAsyncIteration:
+                        break
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.monotonic() - started
+                    self.chunks += 1
+                    self.text += chunk
+                    pending = asyncio.ensure_future(iterator.__anext__())
+
+                now = time.monotonic()
+                if self.message is None:
+                    if now >= window_ends:
+                        await self._post_placeholder()
+                elif self._can_edit(now):
+                    self._edit_task = asyncio.ensure_future(self._edit(self._preview()))
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+        await self._finish()
+        self.total_time = time.monotonic() - started
+        return self.text
+
+    # ------------------------------------------------------------------
+    # 投稿・編集
+    # ------------------------------------------------------------------
+    def _wait_timeout(self, window_ends: float) -> Optional[float]:
+        """次の断片を待つ上限（仮メッセージの投稿・次の編集のどちらかの時刻まで）"""
+        now = time.monotonic()
+        if self.message is None:
+            return max(window_ends - now, 0)
+        if self._edit_task is not None and not self._edit_task.done():
+            return self.edit_interval
+        if self._preview() != self._shown:
+            return max(self._last_edit + self.edit_interval - now, 0)
+        return None
+
+    def _can_edit(self, now: float) -> bool:
+        return (self._preview() != self._shown
+                and (self._edit_task is None or self._edit_task.done())
+                and now - self._last_edit >= self.edit_interval)
+
+    def _preview(self) -> str:
+        """途中の返信（1通目の上限まで）"""
+        return split_message(self.text, self.max_chars)[0] if self.text else self.placeholder
+
+    async def _post_placeholder(self):
+        self._shown = self._preview()
+        self.message = await self.channel.send(self._shown)
+        self._last_edit = time.monotonic()
+
+    async def _edit(self, content: str):
+        self._shown = content
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit(content=content)
+            self.edits += 1
+        except discord.HTTPException as e:
+            print(f"ストリーミング返信の編集エラー: {e}")
+
+    async def _finish(self):
+        """全文を反映（揃っていれば1回で送る。上限を超えた分は続けて送る）"""
+        if self._edit_task is not None:
+            await self._edit_task
+        parts = split_message(self.text, self.max_chars) if self.text else []
+        if self.message is None:
+            for part in parts:
+                await self.channel.send(part)
+            return
+        if not parts:
+            return
+        if parts[0] != self._shown:
+            # 最後の編集も間隔を守る
+            await asyncio.sleep(max(self._last_edit + self.edit_interval - time.monotonic(), 0))
+            await self._edit(parts[0])
+        for part in parts[1:]:
+            await self.channel.send(part)
@@ -0,0 +1,290 @@
+# -*- coding:utf-8 -*-
+"""
+Trend History Store
+トレンド記事の取得履歴（いいね・スコア・ブックマーク数）をSQLiteに蓄積し、伸び率でランキングする
+
+- 記事（正規化URL単位）と、取得のたびの観測値（likes / score / bookmarks / comments）を保存
+  （observations は URL・観測時刻にインデックス）
+- 伸び率（velocity）: スライディングウィンドウ内の最初と最後の観測値の差 ÷ 経過時間（/時）。
+  どのウィンドウにも観測が2つ無い場合（週1回の取得など）は、max_gap_hours 以内の直前の観測との差 ÷ 実際の間隔
+- 前回から内容・数値が変わっていない記事は保存済みのカテゴリ・品質スコアを再利用（再スコアリング不要）
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config.config import TREND_HISTORY_CONFIG
+from utils.near_duplicate import canonicalize_url
+
+# velocities のキー：ウィンドウではなく直前の観測との差から計算した伸び率
+PREVIOUS_OBSERVATION = 'previous'
+
+
+def engagement_of(trend: Dict) -> int:
+    """記事の反応数（同じ数値を likes と score に入れているソースがあるため最大値 + コメント数）"""
+    return max(trend.get('likes', 0) or 0, trend.get('score', 0) or 0,
+               trend.get('bookmarks', 0) or 0) + (trend.get('comments', 0) or 0)
+
+
+def trackable_url(trend: Dict) -> str:
+    """履歴を記録する記事の正規化URL（実在しないサンプル記事は空文字）"""
+    url = trend.get('url', '')
+    if not url or url.startswith('https://example.com'):
+        return ''
+    return canonicalize_url(url)
+
+
+def select_rising(trends: List[Dict], count: int = None, min_velocity: float = None) -> List[Dict]:
+    """伸び率が一定以上の記事を伸び率順に選ぶ（同率は反応数・URL順で常に同じ結果）"""
+    count = count if count is not None else TREND_HISTORY_CONFIG["rising_count"]
+    min_velocity = min_velocity if min_velocity is not None else TREND_HISTORY_CONFIG["rising_min_velocity"]
+    candidates = [trend for trend in trends if trend.get('velocity', 0) >= min_velocity]
+    candidates.sort(key=lambda trend: (-trend['velocity'], -engagement_of(trend), trackable_url(trend)))
+
+    rising, seen = [], set()
+    for trend in candidates:
+        url = trackable_url(trend)
+        if url in seen:
+            continue
+        seen.add(url)
+        rising.append(trend)
+        if len(rising) >= count:
+            break
+    return rising
+
+
+class TrendHistoryStore:
+    """トレンド記事の観測履歴ストア"""
+
+    def __init__(self, path: str = None, windows_hours: Iterable[float] = None,
+                 min_span_hours: float = None, retention_days: float = None, max_gap_hours: float = None):
+        self.path = path or TREND_HISTORY_CONFIG["path"]
+        self.windows_hours = sorted(windows_hours or TREND_HISTORY_CONFIG["velocity_windows_hours"])
+        self.min_span_hours = (min_span_hours if min_span_hours is not None
+                               else TREND_HISTORY_CONFIG["min_span_hours"])
+        self.retention_days = retention_days or TREND_HISTORY_CONFIG["retention_days"]
+        self.max_gap_hours = max_gap_hours or TREND_HISTORY_CONFIG["velocity_max_gap_hours"]
+        self.enabled = TREND_HISTORY_CONFIG["enabled"]
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    async def reuse_unchanged(self, trends: List[Dict]) -> int:
+        """前回の観測から変化のない記事に保存済みのカテゴリ・品質スコアを設定（設定した件数を返す）"""
+        if not self.enabled:
+            return 0
+        keyed = self._keyed(trends)
+        if not keyed:
+            return 0
+        stored = await asyncio.to_thread(self._load_items, list(keyed))
+
+        reused = 0
+        for url, trend in keyed.items():
+            row = stored.get(url)
+            if row is None or row[0] != self.fingerprint(trend) or not row[1]:
+                continue
+            _, category, confidence, quality_score = row
+            trend.setdefault('category', category)
+            trend.setdefault('category_confidence', confidence)
+            trend['quality_score'] = quality_score
+            reused += 1
+        return reused
+
+    async def record(self, trends: List[Dict], observed_at: float = None) -> int:
+        """記事と今回の観測値を保存（保存した件数を返す）"""
+        if not self.enabled:
+            return 0
+        keyed = self._keyed(trends)
+        if not keyed:
+            return 0
+        await asyncio.to_thread(self._store, keyed, observed_at or time.time())
+        return len(keyed)
+
+    async def annotate_velocity(self, trends: List[Dict], now: float = None) -> None:
+        """各記事に伸び率（'velocity': 反応数/時、'velocities': ウィンドウ別 + PREVIOUS_OBSERVATION）を設定"""
+        if not self.enabled:
+            return
+        keyed = self._keyed(trends)
+        if not keyed:
+            return
+        velocities = await asyncio.to_thread(self._velocities, list(keyed), now or time.time())
+        for url, trend in keyed.items():
+            by_window = velocities.get(url, {})
+            trend['velocities'] = by_window
+            # 計算できた最も短いウィンドウの値を代表値にする（無ければ直前の観測との差）
+            trend['velocity'] = next(
+                (by_window[hours] for hours in self.windows_hours if hours in by_window),
+                by_window.get(PREVIOUS_OBSERVATION, 0.0)
+            )
+
+    @staticmethod
+    def fingerprint(trend: Dict) -> str:
+        """再スコアリング要否の判定用（タイトル・説明・反応数が同じなら同じ値）"""
+        raw = '\x1f'.join(str(trend.get(key, '')) for key in
+                          ('title', 'description', 'likes', 'score', 'bookmarks', 'comments'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+    def _keyed(self, trends: List[Dict]) -> Dict[str, Dict]:
+        keyed = {}
+        for trend in trends:
+            url = trackable_url(trend)
+            if url and url not in keyed:
+                keyed[url] = trend
+        return keyed
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._db_lock:
+                if self._conn is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, check_same_thread=False)
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS trend_items (
+                            url TEXT PRIMARY KEY,
+                            title TEXT NOT NULL,
+                            source TEXT NOT NULL,
+                            category TEXT,
+                            category_confidence INTEGER NOT NULL DEFAULT 0,
+                            quality_score INTEGER NOT NULL DEFAULT 0,
+                            fingerprint TEXT NOT NULL,
+                            first_seen REAL NOT NULL,
+                            last_seen REAL NOT NULL
+                        )
+                    ''')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS trend_observations (
+                            url TEXT NOT NULL,
+                            observed_at REAL NOT NULL,
+                            likes INTEGER NOT NULL,
+                            score INTEGER NOT NULL,
+                            bookmarks INTEGER NOT NULL,
+                            comments INTEGER NOT NULL,
+                            engagement INTEGER NOT NULL
+                        )
+                    ''')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_observations_url_time '
+                                 'ON trend_observations(url, observed_at)')
+                    conn.execute('CREATE INDEX IF NOT EXISTS idx_observations_time '
+                                 'ON trend_observations(observed_at)')
+                    conn.commit()
+                    self._conn = conn
+        return self._conn
+
+    def _load_items(self, urls: List[str]) -> Dict[str, tuple]:
+        conn = self._connect()
+        rows = {}
+        with self._db_lock:
+            for chunk in self._chunks(urls):
+                placeholders = ','.join('?' * len(chunk))
+                for url, *values in conn.execute(
+                    'SELECT url, fingerprint, category, category_confidence, quality_score '
+                    f'FROM trend_items WHERE url IN ({placeholders})', chunk
+                ):
+                    rows[url] = tuple(values)
+        return rows
+
+    def _store(self, keyed: Dict[str, Dict], observed_at: float):
+        conn = self._connect()
+        with self._db_lock:
+            conn.executemany(
+                'INSERT INTO trend_items (url, title, source, category, category_confidence, quality_score, '
+                'fingerprint, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(url) DO UPDATE SET title = excluded.title, source = excluded.source, '
+                'category = excluded.category, category_confidence = excluded.category_confidence, '
+                'quality_score = excluded.quality_score, fingerprint = excluded.fingerprint, '
+                'last_seen = excluded.last_seen',
+                [
+                    (url, trend.get('title', ''), trend.get('source', ''), trend.get('category'),
+                     trend.get('category_confidence', 0) or 0, trend.get('quality_score', 0) or 0,
+                     self.fingerprint(trend), observed_at, observed_at)
+                    for url, trend in keyed.items()
+                ]
+            )
+            conn.executemany(
+                'INSERT INTO trend_observations (url, observed_at, likes, score, bookmarks, comments, engagement) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (url, observed_at, trend.get('likes', 0) or 0, trend.get('score', 0) or 0,
+                     trend.get('bookmarks', 0) or 0, trend.get('comments', 0) or 0, engagement_of(trend))
+                    for url, trend in keyed.items()
+                ]
+            )
+            # 保持期間を過ぎた観測値を削除
+            cutoff = observed_at - self.retention_days * 86400
+            conn.execute('DELETE FROM trend_observations WHERE observed_at < ?', (cutoff,))
+            conn.execute('DELETE FROM trend_items WHERE last_seen < ?', (cutoff,))
+            conn.commit()
+
+    def _velocities(self, urls: List[str], now: float) -> Dict[str, Dict]:
+        """ウィンドウごとに、ウィンドウ内の最初と最後の観測値から伸び率を計算"""
+        conn = self._connect()
+        velocities: Dict[str, Dict] = {}
+        min_span = self.min_span_hours * 3600
+        with self._db_lock:
+            for hours in self.windows_hours:
+                since = now - hours * 3600
+                for chunk in self._chunks(urls):
+                    placeholders = ','.join('?' * len(chunk))
+                    # SQLite では MIN()/MAX() と同じ行の列値が得られる
+                    first = {
+                        url: (observed_at, engagement) for url, observed_at, engagement in conn.execute(
+                            'SELECT url, MIN(observed_at), engagement FROM trend_observations '
+                            f'WHERE observed_at >= ? AND url IN ({placeholders}) GROUP BY url',
+                            [since, *chunk]
+                        )
+                    }
+                    last = conn.execute(
+                        'SELECT url, MAX(observed_at), engagement FROM trend_observations '
+                        f'WHERE observed_at >= ? AND url IN ({placeholders}) GROUP BY url',
+                        [since, *chunk]
+                    ).fetchall()
+                    for url, observed_at, engagement in last:
+                        start_at, start_engagement = first[url]
+                        span = observed_at - start_at
+                        if span < min_span:
+                            continue
+                        velocities.setdefault(url, {})[hours] = (engagement - start_engagement) / (span / 3600)
+
+            # どのウィンドウでも計算できなかった記事は、直前の観測との差を実際の間隔で割る
+            remaining = [url for url in urls if url not in velocities]
+            for chunk in self._chunks(remaining):
+                placeholders = ','.join('?' * len(chunk))
+                latest: Dict[str, tuple] = {}
+                for url, observed_at, engagement in conn.execute(
+                    'SELECT url, observed_at, engagement FROM trend_observations '
+                    f'WHERE observed_at >= ? AND url IN ({placeholders}) ORDER BY url, observed_at DESC',
+                    [now - self.max_gap_hours * 3600, *chunk]
+                ):
+                    if url in velocities:
+                        continue
+                    if url not in latest:
+                        latest[url] = (observed_at, engagement)
+                        continue
+                    span = latest[url][0] - observed_at
+                    if span >= min_span:
+                        velocities[url] = {PREVIOUS_OBSERVATION: (latest[url][1] - engagement) / (span / 3600)}
+        return velocities
+
+    @staticmethod
+    def _chunks(values: List[str], size: int = 500):
+        # SQLite のバインド変数上限を超えないように分割
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+
+
+# 各マネージャーで共有するインスタンス
+trend_history = TrendHistoryStore()
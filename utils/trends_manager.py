@@ -1,16 +1,27 @@
 # -*- coding:utf-8 -*-
 import aiohttp
-import xml.etree.ElementTree as ET
 import datetime
 from typing import List, Dict, Optional
 import asyncio
-import re
+from utils.feeds import parse_feed, clean_html
+from utils.http_cache import http_cache
+from utils.keyword_matcher import KeywordMatcher
 
 class TrendsManager:
     def __init__(self):
         self.daily_trends_url = "https://trends.google.co.jp/trends/trendingsearches/daily/rss?geo=JP"
         self.realtime_trends_url = "https://trends.google.co.jp/trends/trendingsearches/realtime/rss?geo=JP"
         
+        # 表示カテゴリ（上から順に判定し、最初にヒットしたものを採用）
+        self.trend_categories = {
+            "🤖 AI・テクノロジー": ["ai", "人工知能", "機械学習", "dx", "デジタル"],
+            "💰 経済・投資": ["投資", "株式", "市場", "経済", "金融"],
+            "💼 働き方・キャリア": ["働き方", "転職", "キャリア", "リモート"],
+            "🏢 企業・経営": ["企業", "経営", "ビジネス", "売上", "決算"],
+            "🌱 サステナビリティ": ["esg", "サステナ", "環境", "グリーン"],
+        }
+        self.category_matcher = KeywordMatcher(self.trend_categories)
+        
         # ビジネス関連キーワード（フィルタリング用）
         self.business_keywords = [
             "経済", "ビジネス", "企業", "株式", "投資", "市場", "経営", "売上", "利益",
@@ -52,20 +63,21 @@ class TrendsManager:
         """指定されたURLからトレンドを取得"""
         try:
             async with aiohttp.ClientSession() as session:
-                async with session.get(
+                response = await http_cache.get(
+                    session,
                     url,
                     headers={
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                         'Accept-Language': 'ja,en;q=0.9'
                     },
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        return self._parse_rss(content, trend_type)
-                    else:
-                        print(f"Failed to fetch {trend_type} trends: {response.status}")
-                        return []
+                    timeout=15
+                )
+                if response.status == 200:
+                    content = response.text()
+                    return self._parse_rss(content, trend_type)
+                else:
+                    print(f"Failed to fetch {trend_type} trends: {response.status}")
+                    return []
         except Exception as e:
             print(f"Error fetching {trend_type} trends: {e}")
             return []
@@ -75,48 +87,19 @@ class TrendsManager:
         trends = []
         
         try:
-            root = ET.fromstring(rss_content)
-            
-            # RSS名前空間の処理
-            items = root.findall('.//item')
-            
-            for item in items:
-                title = item.find('title')
-                description = item.find('description')
-                pub_date = item.find('pubDate')
-                link = item.find('link')
+            for item in parse_feed(rss_content):
+                # 説明文はHTMLタグを除去
+                trend_description = clean_html(item.description)
                 
-                if title is not None:
-                    trend_title = title.text or ""
-                    
-                    # 説明文からより詳細な情報を抽出
-                    trend_description = ""
-                    if description is not None and description.text:
-                        # HTMLタグを除去
-                        clean_desc = re.sub(r'<[^>]+>', '', description.text)
-                        trend_description = clean_desc.strip()
-                    
-                    # 日時情報
-                    trend_date = ""
-                    if pub_date is not None and pub_date.text:
-                        trend_date = pub_date.text
-                    
-                    # リンク情報
-                    trend_link = ""
-                    if link is not None and link.text:
-                        trend_link = link.text
-                    
-                    trends.append({
-                        'title': trend_title,
-                        'description': trend_description,
-                        'date': trend_date,
-                        'link': trend_link,
-                        'type': trend_type,
-                        'category': self._categorize_trend(trend_title + " " + trend_description)
-                    })
+                trends.append({
+                    'title': item.title,
+                    'description': trend_description,
+                    'date': item.published,
+                    'link': item.link,
+                    'type': trend_type,
+                    'category': self._categorize_trend(item.title + " " + trend_description)
+                })
             
-        except ET.ParseError as e:
-            print(f"XML parsing error: {e}")
         except Exception as e:
             print(f"Error parsing RSS: {e}")
         
@@ -137,20 +120,7 @@ class TrendsManager:
     
     def _categorize_trend(self, text: str) -> str:
         """トレンドをカテゴリ分けする"""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ["ai", "人工知能", "機械学習", "dx", "デジタル"]):
-            return "🤖 AI・テクノロジー"
-        elif any(word in text_lower for word in ["投資", "株式", "市場", "経済", "金融"]):
-            return "💰 経済・投資"
-        elif any(word in text_lower for word in ["働き方", "転職", "キャリア", "リモート"]):
-            return "💼 働き方・キャリア"
-        elif any(word in text_lower for word in ["企業", "経営", "ビジネス", "売上", "決算"]):
-            return "🏢 企業・経営"
-        elif any(word in text_lower for word in ["esg", "サステナ", "環境", "グリーン"]):
-            return "🌱 サステナビリティ"
-        else:
-            return "📊 一般トレンド"
+        return self.category_matcher.first_category(text) or "📊 一般トレンド"
     
     def _remove_duplicates(self, trends: List[Dict]) -> List[Dict]:
         """重複するトレンドを除去"""
@@ -0,0 +1,144 @@
+# -*- coding:utf-8 -*-
+"""
+Webhook Registry
+AIキャラクター用Webhook（名前 "AI_Character_{キャラクターID}"）のチャンネルごとのキャッシュ
+
+- チャンネルのWebhook一覧は最初に使うときに1回だけ取得し、以降の投稿はキャッシュしたWebhookで送る
+- webhook_id -> キャラクターID の対応を持ち、リプライ先がAIキャラクターかを一覧の再取得なしで判定できる
+- on_webhooks_update で一覧を取り直す（自分で作成した直後の通知は取り直さない）
+- キャッシュしたWebhookが削除されていた場合（NotFound）は作り直して1回だけ再送する
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+import discord
+
+WEBHOOK_PREFIX = "AI_Character_"
+
+
+def webhook_name_for(character_id: str) -> str:
+    """キャラクターIDに対応するWebhook名"""
+    return f"{WEBHOOK_PREFIX}{character_id}"
+
+
+class WebhookRegistry:
+    """チャンネルごとのAIキャラクター用Webhookのキャッシュ"""
+
+    def __init__(self):
+        # チャンネルID -> {キャラクターID: Webhook}
+        self._webhooks: Dict[int, Dict[str, discord.Webhook]] = {}
+        # webhook_id -> キャラクターID
+        self._characters: Dict[int, str] = {}
+        self._loaded: Set[int] = set()
+        self._locks: Dict[int, asyncio.Lock] = {}
+        # 自分で作成したため届く予定の on_webhooks_update の件数（チャンネルID -> 件数）
+        self._expected_updates: Dict[int, int] = {}
+        self.stats = {'list_calls': 0, 'created': 0}
+
+    def character_id_for(self, webhook_id: Optional[int]) -> Optional[str]:
+        """webhook_id に対応するキャラクターID（読み込み済みのチャンネルのみ。不明なら None）"""
+        if webhook_id is None:
+            return None
+        return self._characters.get(webhook_id)
+
+    def is_loaded(self, channel_id: int) -> bool:
+        return channel_id in self._loaded
+
+    async def resolve_character_id(self, channel: discord.TextChannel, webhook_id: int) -> Optional[str]:
+        """webhook_id に対応するキャラクターID（チャンネルが未読み込みなら一覧を1回取得して判定）"""
+        character_id = self.character_id_for(webhook_id)
+        if character_id is None and not self.is_loaded(channel.id):
+            await self._ensure_loaded(channel)
+            character_id = self.character_id_for(webhook_id)
+        return character_id
+
+    async def get_webhook(self, channel: discord.TextChannel, character_id: str) -> discord.Webhook:
+        """キャラクターのWebhookを取得（無ければ作成）"""
+        await self._ensure_loaded(channel)
+        webhook = self._webhooks[channel.id].get(character_id)
+        if webhook is not None:
+            return webhook
+
+        async with self._lock(channel.id):
+            webhook = self._webhooks[channel.id].get(character_id)
+            if webhook is None:
+                # 作成の応答より先に通知が届くことがあるので、送信前に数えておく（失敗したら取り消す）
+                self._expected_updates[channel.id] = self._expected_updates.get(channel.id, 0) + 1
+                try:
+                    webhook = await channel.create_webhook(name=webhook_name_for(character_id))
+                except BaseException:
+                    self._expected_updates[channel.id] = max(self._expected_updates.get(channel.id, 0) - 1, 0)
+                    raise
+                self.stats['created'] += 1
+                self._register(channel.id, webhook)
+        return webhook
+
+    async def send(self, channel: discord.TextChannel, character_id: str, **kwargs):
+        """キャラクターのWebhookで送信（キャッシュしたWebhookが削除されていれば作り直して再送）"""
+        webhook = await self.get_webhook(channel, character_id)
+        try:
+            return await webhook.send(**kwargs)
+        except discord.NotFound:
+            self.forget(channel.id, webhook.id)
+            webhook = await self.get_webhook(channel, character_id)
+            return await webhook.send(**kwargs)
+
+    def forget(self, channel_id: int, webhook_id: int):
+        """削除されたWebhookをキャッシュから外す"""
+        character_id = self._characters.pop(webhook_id, None)
+        webhooks = self._webhooks.get(channel_id, {})
+        if character_id and webhooks.get(character_id) and webhooks[character_id].id == webhook_id:
+            del webhooks[character_id]
+
+    async def on_webhooks_update(self, channel: discord.abc.GuildChannel):
+        """Webhookの作成・削除通知を反映（読み込み済みのチャンネルのみ一覧を取り直す）"""
+        expected = self._expected_updates.get(channel.id, 0)
+        if expected:
+            # 自分で作成したWebhookの通知はキャッシュに反映済み
+            self._expected_updates[channel.id] = expected - 1
+            return
+        if channel.id in self._loaded:
+            self._loaded.discard(channel.id)
+            try:
+                await self._ensure_loaded(channel)
+            except discord.HTTPException as e:
+                logging.error(f"Webhook一覧の再取得エラー ({channel.id}): {e}")
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    def _lock(self, channel_id: int) -> asyncio.Lock:
+        lock = self._locks.get(channel_id)
+        if lock is None:
+            lock = self._locks[channel_id] = asyncio.Lock()
+        return lock
+
+    async def _ensure_loaded(self, channel: discord.TextChannel):
+        if channel.id in self._loaded:
+            return
+        async with self._lock(channel.id):
+            if channel.id in self._loaded:
+                return
+            webhooks = await channel.webhooks()
+            self.stats['list_calls'] += 1
+
+            for webhook_id in [webhook.id for webhook in self._webhooks.get(channel.id, {}).values()]:
+                self._characters.pop(webhook_id, None)
+            self._webhooks[channel.id] = {}
+            for webhook in webhooks:
+                self._register(channel.id, webhook)
+            self._loaded.add(channel.id)
+
+    def _register(self, channel_id: int, webhook: discord.Webhook):
+        name = webhook.name or ''
+        if not name.startswith(WEBHOOK_PREFIX):
+            return
+        character_id = name[len(WEBHOOK_PREFIX):]
+        self._webhooks.setdefault(channel_id, {}).setdefault(character_id, webhook)
+        self._characters[webhook.id] = character_id
+
+
+# AIキャラクターを投稿する各Cogで共有するインスタンス
+webhook_registry = WebhookRegistry()